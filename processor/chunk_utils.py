@@ -1,4 +1,4 @@
-"""Shared helpers for discovering chunk JSON payloads."""
+"""Shared helpers for discovering chunk JSON payloads and JSONL chunk stores."""
 from __future__ import annotations
 
 from pathlib import Path
@@ -8,20 +8,27 @@ __all__ = ["is_chunk_file", "find_chunk_files"]
 
 
 def is_chunk_file(path: Path) -> bool:
-    """Return True if the path looks like a chunk JSON export."""
+    """Return True if the path looks like a chunk JSON export or JSONL chunk store."""
     name = path.name.lower()
     return (
         path.is_file()
-        and path.suffix == ".json"
+        and path.suffix in {".json", ".jsonl"}
         and "chunk" in name
         and not name.endswith("_processing_summary.json")
     )
 
 
 def find_chunk_files(directory: Path) -> List[Path]:
-    """Return all chunk JSON files contained in *directory* (recursively)."""
+    """Return all chunk files contained in *directory* (recursively).
+
+    A ``.jsonl`` chunk store hides a ``.json`` export of the same document.
+    """
     if not directory.exists() or not directory.is_dir():
         return []
 
-    files = {file.resolve(): file for file in directory.rglob("*.json") if is_chunk_file(file)}
-    return sorted(files.values())
+    files = {file.resolve(): file for file in directory.rglob("*.json*") if is_chunk_file(file)}
+    return sorted(
+        file
+        for resolved, file in files.items()
+        if file.suffix == ".jsonl" or resolved.with_suffix(".jsonl") not in files
+    )
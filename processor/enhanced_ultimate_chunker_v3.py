@@ -39,6 +39,8 @@ try:
 except ImportError:  # pragma: no cover - optional dependency
     get_language = None  # type: ignore
 
+from processor.ultimate_embedder.chunk_store import CHUNK_STORE_SUFFIX, dumps_chunk_store
+
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 
@@ -85,8 +87,11 @@ class EnhancedUltimateChunkerV3:
         quality_thresholds: Optional[Dict[str, float]] = None,
         fallback_promotion_ratio: float = 0.25,
         fallback_promotion_cap: int = 40,
+        output_format: str = "jsonl",
     ) -> None:
         self.embedding_model_name = embedding_model or "semantic_scoring_disabled"
+        # "jsonl" writes the compact chunk store; "json" keeps the legacy array.
+        self.output_format = output_format
         self.embedding_dimension = max(1, int(embedding_dimension))
         self.embedder: Optional[Any] = None
         self.enable_semantic_scoring = False
@@ -612,7 +617,6 @@ class EnhancedUltimateChunkerV3:
         output_path = Path(output_dir)
         output_path.mkdir(parents=True, exist_ok=True)
         filename = Path(file_path).stem
-        target = output_path / f"{filename}_{content_type}_chunks.json"
 
         for chunk in chunks:
             scores = chunk.get("advanced_scores", {})
@@ -620,7 +624,13 @@ class EnhancedUltimateChunkerV3:
                 if hasattr(value, "item"):
                     scores[key] = float(value)
 
-        self._write_text(target, json.dumps(chunks, indent=2, ensure_ascii=False))
+        if self.output_format == "json":
+            target = output_path / f"{filename}_{content_type}_chunks.json"
+            self._write_text(target, json.dumps(chunks, indent=2, ensure_ascii=False))
+        else:
+            # Document-level metadata is written once per file; chunks keep only their deltas.
+            target = output_path / f"{filename}_{content_type}{CHUNK_STORE_SUFFIX}"
+            self._write_text(target, dumps_chunk_store([chunks]))
         logger.info("Saved %d chunks to %s", len(chunks), target)
 
     # ------------------------------------------------------------------
@@ -71,6 +71,8 @@ except ImportError:
     KAGGLE_OPTIMIZED_MODELS = {}
     ModelConfig = None
 
+from processor.ultimate_embedder.chunk_store import CHUNK_STORE_SUFFIX, dumps_chunk_store
+
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
 
@@ -112,6 +114,7 @@ class ChunkerConfig:
     
     # Output configuration
     output_dir: str = "Chunked"
+    output_format: str = "jsonl"  # "jsonl" compact chunk store, "json" legacy array
     
     # V5: Hierarchy linking control (Task 3.5: used by Phase2CEnhancer)
     preserve_hierarchy: bool = True
@@ -2071,11 +2074,10 @@ class EnhancedUltimateChunkerV5Unified:
         output_dir: str,
         content_type: str,
     ) -> None:
-        """Save chunks to JSON file"""
+        """Save chunks as a compact JSONL chunk store (or legacy JSON array)"""
         output_path = Path(output_dir)
         output_path.mkdir(parents=True, exist_ok=True)
         filename = Path(file_path).stem
-        target = output_path / f"{filename}_{content_type}_chunks.json"
         
         for chunk in chunks:
             scores = chunk.get("advanced_scores", {})
@@ -2083,7 +2085,13 @@ class EnhancedUltimateChunkerV5Unified:
                 if hasattr(value, "item"):
                     scores[key] = float(value)
         
-        self._write_text(target, json.dumps(chunks, indent=2, ensure_ascii=False))
+        if self.config.output_format == "json":
+            target = output_path / f"{filename}_{content_type}_chunks.json"
+            self._write_text(target, json.dumps(chunks, indent=2, ensure_ascii=False))
+        else:
+            # Document-level metadata is written once per file; chunks keep only their deltas.
+            target = output_path / f"{filename}_{content_type}{CHUNK_STORE_SUFFIX}"
+            self._write_text(target, dumps_chunk_store([chunks]))
         logger.info("Saved %d chunks to %s", len(chunks), target)
     
     # ========================================================================
@@ -1,35 +1,83 @@
 """Public interface for the modular Ultimate Embedder package."""
 
-# Ensure compatibility shims are applied before importing submodules that rely on
-# sentence-transformers. The underscore indicates this import is intentional but
-# not re-exported directly.
-from . import compat as _compat  # noqa: F401
+# Submodules are imported on first attribute access (PEP 562) so config, summary
+# and export-only tools start without pulling in torch or sentence-transformers.
+# ``core`` still imports ``compat`` before touching sentence-transformers.
+import importlib
+from typing import TYPE_CHECKING, Any, Dict
+
+_LAZY_ATTRIBUTES: Dict[str, str] = {
+    "AdvancedPreprocessingConfig": "config",
+    "AdvancedTextCache": "config",
+    "EnsembleConfig": "config",
+    "get_kaggle_model_config": "config",
+    "KAGGLE_OPTIMIZED_MODELS": "config",
+    "KaggleExportConfig": "config",
+    "KaggleGPUConfig": "config",
+    "ModelConfig": "config",
+    "normalize_kaggle_model_names": "config",
+    "resolve_kaggle_model_key": "config",
+    "RERANKING_MODELS": "config",
+    "RerankingConfig": "config",
+    "SPARSE_MODELS": "config",
+    "FeatureToggleConfig": "runtime_config",
+    "load_feature_toggles": "runtime_config",
+    "BatchRunner": "batch_runner",
+    "ExportRuntime": "export_runtime",
+    "AdaptiveBatchController": "controllers",
+    "GPUMemorySnapshot": "controllers",
+    "collect_gpu_snapshots": "controllers",
+    "PerformanceMonitor": "monitoring",
+    "RerankPipeline": "rerank_pipeline",
+    "build_sparse_vector_from_metadata": "sparse_pipeline",
+    "infer_modal_hint": "sparse_pipeline",
+    "UltimateKaggleEmbedderV4": "core",
+    "main": "core",
+    "TelemetryTracker": "telemetry",
+    "resolve_rotation_payload_limit": "telemetry",
+    "BatchProgressContext": "progress",
+}
+
+if TYPE_CHECKING:  # pragma: no cover - typing only
+    from .batch_runner import BatchRunner
+    from .config import (
+        AdvancedPreprocessingConfig,
+        AdvancedTextCache,
+        EnsembleConfig,
+        get_kaggle_model_config,
+        KAGGLE_OPTIMIZED_MODELS,
+        KaggleExportConfig,
+        KaggleGPUConfig,
+        ModelConfig,
+        normalize_kaggle_model_names,
+        resolve_kaggle_model_key,
+        RERANKING_MODELS,
+        RerankingConfig,
+        SPARSE_MODELS,
+    )
+    from .controllers import AdaptiveBatchController, GPUMemorySnapshot, collect_gpu_snapshots
+    from .core import UltimateKaggleEmbedderV4, main
+    from .export_runtime import ExportRuntime
+    from .monitoring import PerformanceMonitor
+    from .progress import BatchProgressContext
+    from .rerank_pipeline import RerankPipeline
+    from .runtime_config import FeatureToggleConfig, load_feature_toggles
+    from .sparse_pipeline import build_sparse_vector_from_metadata, infer_modal_hint
+    from .telemetry import TelemetryTracker, resolve_rotation_payload_limit
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list:
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
 
-from .config import (
-    AdvancedPreprocessingConfig,
-    AdvancedTextCache,
-    EnsembleConfig,
-    get_kaggle_model_config,
-    KAGGLE_OPTIMIZED_MODELS,
-    KaggleExportConfig,
-    KaggleGPUConfig,
-    ModelConfig,
-    normalize_kaggle_model_names,
-    resolve_kaggle_model_key,
-    RERANKING_MODELS,
-    RerankingConfig,
-    SPARSE_MODELS,
-)
-from .runtime_config import FeatureToggleConfig, load_feature_toggles
-from .batch_runner import BatchRunner
-from .export_runtime import ExportRuntime
-from .controllers import AdaptiveBatchController, GPUMemorySnapshot, collect_gpu_snapshots
-from .monitoring import PerformanceMonitor
-from .rerank_pipeline import RerankPipeline
-from .sparse_pipeline import build_sparse_vector_from_metadata, infer_modal_hint
-from .core import UltimateKaggleEmbedderV4, main
-from .telemetry import TelemetryTracker, resolve_rotation_payload_limit
-from .progress import BatchProgressContext
 
 __all__ = [
     "AdvancedPreprocessingConfig",
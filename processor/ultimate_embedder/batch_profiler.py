@@ -0,0 +1,405 @@
+"""Opt-in per-batch hot-path profiler for dense encode passes."""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import torch
+
+PROFILE_STAGES: Tuple[str, ...] = (
+    "tokenize",
+    "h2d",
+    "forward",
+    "d2h",
+    "normalize",
+    "dim_trim",
+    "telemetry",
+    "progress",
+)
+
+_TRUE_VALUES = {"1", "true", "yes", "on"}
+
+
+class _StageTimer:
+    """Time one stage with CUDA events on GPU devices and perf_counter otherwise."""
+
+    __slots__ = ("name", "start_offset", "_start_event", "_end_event", "_start", "_elapsed_ms")
+
+    def __init__(self, name: str, start_offset: float, use_cuda_events: bool) -> None:
+        self.name = name
+        self.start_offset = start_offset
+        self._start_event = None
+        self._end_event = None
+        self._start = 0.0
+        self._elapsed_ms: Optional[float] = None
+        if use_cuda_events:
+            self._start_event = torch.cuda.Event(enable_timing=True)
+            self._end_event = torch.cuda.Event(enable_timing=True)
+
+    def begin(self) -> None:
+        if self._start_event is not None:
+            self._start_event.record()
+        self._start = time.perf_counter()
+
+    def finish(self) -> None:
+        if self._end_event is not None:
+            self._end_event.record()
+        else:
+            self._elapsed_ms = (time.perf_counter() - self._start) * 1000.0
+
+    def elapsed_ms(self) -> float:
+        if self._elapsed_ms is None and self._end_event is not None:
+            self._end_event.synchronize()
+            self._elapsed_ms = float(self._start_event.elapsed_time(self._end_event))  # type: ignore[union-attr]
+        return float(self._elapsed_ms or 0.0)
+
+
+class BatchProfiler:
+    """Record where each encode batch spends its time.
+
+    Disabled profilers make every hook a no-op so the batch loop can call them
+    unconditionally. Completed batches are kept in a bounded columnar trace;
+    per-stage totals keep accumulating after the trace is full. The open batch
+    is tracked per thread so concurrent model passes can share one profiler.
+    """
+
+    def __init__(
+        self,
+        *,
+        enabled: bool = False,
+        logger: Optional[logging.Logger] = None,
+        max_batches: int = 4096,
+    ) -> None:
+        self.enabled = enabled
+        self.logger = logger or logging.getLogger(__name__)
+        self.max_batches = max(1, int(max_batches))
+        self._origin = time.perf_counter()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._columns: Dict[str, List[Any]] = self._empty_columns()
+        self._totals_ms: Dict[str, float] = {stage: 0.0 for stage in PROFILE_STAGES}
+        self._batch_count = 0
+        self._dropped_batches = 0
+
+    @classmethod
+    def from_env(
+        cls,
+        logger: Optional[logging.Logger] = None,
+        *,
+        env_var: str = "EMBEDDER_PROFILE_BATCHES",
+    ) -> "BatchProfiler":
+        """Create a profiler enabled by ``EMBEDDER_PROFILE_BATCHES``."""
+
+        raw = os.environ.get(env_var, "")
+        return cls(enabled=raw.strip().lower() in _TRUE_VALUES, logger=logger)
+
+    @staticmethod
+    def _empty_columns() -> Dict[str, List[Any]]:
+        columns: Dict[str, List[Any]] = {
+            "batch": [],
+            "model": [],
+            "device": [],
+            "size": [],
+            "start_ms": [],
+            "total_ms": [],
+            "timer": [],
+            "_stage_offsets": [],
+        }
+        for stage in PROFILE_STAGES:
+            columns[f"{stage}_ms"] = []
+        return columns
+
+    @property
+    def _current(self) -> Optional[Dict[str, Any]]:
+        return getattr(self._local, "current", None)
+
+    @_current.setter
+    def _current(self, value: Optional[Dict[str, Any]]) -> None:
+        self._local.current = value
+
+    @property
+    def recording(self) -> bool:
+        """Return True while a batch is open on an enabled profiler."""
+
+        return self._current is not None
+
+    @property
+    def batch_count(self) -> int:
+        return self._batch_count
+
+    def reset(self) -> None:
+        """Discard all recorded batches."""
+
+        self._origin = time.perf_counter()
+        self._current = None
+        self._columns = self._empty_columns()
+        self._totals_ms = {stage: 0.0 for stage in PROFILE_STAGES}
+        self._batch_count = 0
+        self._dropped_batches = 0
+
+    def begin_batch(self, *, model: str, device: str, size: int) -> None:
+        """Open a batch record; stages timed until ``end_batch`` attach to it."""
+
+        if not self.enabled:
+            return
+        use_cuda_events = str(device).startswith("cuda") and torch.cuda.is_available()
+        self._current = {
+            "model": model,
+            "device": str(device),
+            "size": int(size),
+            "start": time.perf_counter(),
+            "timers": [],
+            "use_cuda_events": use_cuda_events,
+        }
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time the enclosed block as stage ``name`` of the open batch."""
+
+        current = self._current
+        if current is None:
+            yield
+            return
+        timer = _StageTimer(
+            name,
+            (time.perf_counter() - self._origin) * 1000.0,
+            current["use_cuda_events"],
+        )
+        timer.begin()
+        try:
+            yield
+        finally:
+            timer.finish()
+            current["timers"].append(timer)
+
+    def end_batch(self) -> None:
+        """Resolve stage timings for the open batch and append them to the trace."""
+
+        current = self._current
+        if current is None:
+            return
+        self._current = None
+
+        stage_ms = {stage: 0.0 for stage in PROFILE_STAGES}
+        for timer in current["timers"]:
+            stage_ms[timer.name] = stage_ms.get(timer.name, 0.0) + timer.elapsed_ms()
+        with self._lock:
+            self._append(current, stage_ms)
+
+    def _append(self, current: Dict[str, Any], stage_ms: Dict[str, float]) -> None:
+        for stage, value in stage_ms.items():
+            self._totals_ms[stage] = self._totals_ms.get(stage, 0.0) + value
+
+        self._batch_count += 1
+        if len(self._columns["batch"]) >= self.max_batches:
+            self._dropped_batches += 1
+            return
+
+        columns = self._columns
+        columns["batch"].append(self._batch_count - 1)
+        columns["model"].append(current["model"])
+        columns["device"].append(current["device"])
+        columns["size"].append(current["size"])
+        columns["start_ms"].append(round((current["start"] - self._origin) * 1000.0, 3))
+        columns["total_ms"].append(round((time.perf_counter() - current["start"]) * 1000.0, 3))
+        columns["timer"].append("cuda_event" if current["use_cuda_events"] else "perf_counter")
+        for stage in PROFILE_STAGES:
+            columns[f"{stage}_ms"].append(round(stage_ms.get(stage, 0.0), 3))
+        # Chrome trace needs per-stage offsets; keep them alongside the columns.
+        columns["_stage_offsets"].append(
+            [(timer.name, round(timer.start_offset, 3), round(timer.elapsed_ms(), 3)) for timer in current["timers"]]
+        )
+
+    def abort_batch(self) -> None:
+        """Drop the open batch without recording it (e.g. after an OOM retry)."""
+
+        self._current = None
+
+    def profiled_encode(
+        self,
+        model: Any,
+        texts: Sequence[str],
+        *,
+        batch_size: int,
+        device: str,
+        normalize_embeddings: bool = True,
+    ) -> np.ndarray:
+        """Run the model's own ``encode`` with tokenise/H2D/forward/D2H timing hooks.
+
+        Prompts, length sorting and truncation stay exactly as in an unprofiled
+        call. The model's ``preprocess`` (or ``tokenize``) step is timed as
+        ``tokenize`` and its features are moved to ``device`` as ``h2d``; forward
+        hooks time ``forward``, and the span from a forward's end to the next
+        batch (normalisation and the output copy) is ``d2h``. Models that are not
+        hookable ``torch.nn.Module`` instances are timed as one forward stage.
+        """
+
+        def _encode() -> np.ndarray:
+            return np.asarray(
+                model.encode(
+                    list(texts),
+                    batch_size=batch_size,
+                    show_progress_bar=False,
+                    convert_to_numpy=True,
+                    normalize_embeddings=normalize_embeddings,
+                    device=device,
+                )
+            )
+
+        hook_name = next((name for name in ("preprocess", "tokenize") if callable(getattr(model, name, None))), None)
+        if (
+            hook_name is None
+            or not callable(getattr(model, "encode", None))
+            or not isinstance(model, torch.nn.Module)
+            or isinstance(model, torch.nn.DataParallel)
+        ):
+            with self.stage("forward"):
+                return _encode()
+
+        open_stages: List[Any] = []
+
+        def _enter(name: str) -> None:
+            context = self.stage(name)
+            context.__enter__()
+            open_stages.append(context)
+
+        def _close() -> None:
+            while open_stages:
+                open_stages.pop().__exit__(None, None, None)
+
+        original = getattr(model, hook_name)
+        shadowed = hook_name in vars(model)
+
+        def _timed_preprocess(*args: Any, **kwargs: Any) -> Any:
+            _close()
+            with self.stage("tokenize"):
+                features = original(*args, **kwargs)
+            if isinstance(features, dict):
+                # Moving the features here leaves encode's own device copy a no-op.
+                with self.stage("h2d"):
+                    for key, value in list(features.items()):
+                        if isinstance(value, torch.Tensor):
+                            features[key] = value.to(device, non_blocking=True)
+            return features
+
+        def _before_forward(module: Any, args: Any) -> None:
+            _close()
+            _enter("forward")
+
+        def _after_forward(module: Any, args: Any, output: Any) -> None:
+            _close()
+            _enter("d2h")
+
+        setattr(model, hook_name, _timed_preprocess)
+        handles = [
+            model.register_forward_pre_hook(_before_forward),
+            model.register_forward_hook(_after_forward),
+        ]
+        try:
+            return _encode()
+        finally:
+            _close()
+            for handle in handles:
+                handle.remove()
+            if shadowed:
+                setattr(model, hook_name, original)
+            else:
+                delattr(model, hook_name)
+
+    def to_columnar(self) -> Dict[str, Any]:
+        """Return the trace as a compact column-oriented mapping."""
+
+        columns = {key: list(values) for key, values in self._columns.items() if not key.startswith("_")}
+        return {
+            "stages": list(PROFILE_STAGES),
+            "batches_recorded": len(columns["batch"]),
+            "batches_dropped": self._dropped_batches,
+            "columns": columns,
+        }
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """Return the trace in Chrome ``about://tracing`` JSON format."""
+
+        events: List[Dict[str, Any]] = []
+        columns = self._columns
+        tids: Dict[str, int] = {}
+        for row, offsets in enumerate(columns["_stage_offsets"]):
+            lane = f"{columns['model'][row]}@{columns['device'][row]}"
+            tid = tids.setdefault(lane, len(tids) + 1)
+            events.append(
+                {
+                    "name": f"batch {columns['batch'][row]}",
+                    "cat": "batch",
+                    "ph": "X",
+                    "ts": columns["start_ms"][row] * 1000.0,
+                    "dur": columns["total_ms"][row] * 1000.0,
+                    "pid": 1,
+                    "tid": tid,
+                    "args": {"size": columns["size"][row]},
+                }
+            )
+            for name, start_ms, duration_ms in offsets:
+                events.append(
+                    {
+                        "name": name,
+                        "cat": "stage",
+                        "ph": "X",
+                        "ts": start_ms * 1000.0,
+                        "dur": duration_ms * 1000.0,
+                        "pid": 1,
+                        "tid": tid,
+                    }
+                )
+        for lane, tid in tids.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": lane}})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def summarize(self) -> Dict[str, Any]:
+        """Return a per-stage summary table for the processing summary."""
+
+        if not self._batch_count:
+            return {}
+
+        grand_total = sum(self._totals_ms.values())
+        stages: Dict[str, Dict[str, Any]] = {}
+        for stage in PROFILE_STAGES:
+            samples = np.asarray(self._columns[f"{stage}_ms"], dtype=np.float64)
+            total = self._totals_ms.get(stage, 0.0)
+            stages[stage] = {
+                "total_ms": round(total, 3),
+                "mean_ms": round(total / self._batch_count, 3),
+                "p50_ms": round(float(np.percentile(samples, 50)), 3) if samples.size else 0.0,
+                "p95_ms": round(float(np.percentile(samples, 95)), 3) if samples.size else 0.0,
+                "share": round(total / grand_total, 4) if grand_total else 0.0,
+            }
+        timers = set(self._columns["timer"])
+        return {
+            "batches": self._batch_count,
+            "batches_dropped": self._dropped_batches,
+            "timer": timers.pop() if len(timers) == 1 else sorted(timers),
+            "stages": stages,
+        }
+
+    def write(self, base_path: str) -> Dict[str, str]:
+        """Write the columnar trace and Chrome trace next to ``base_path``."""
+
+        if not self._batch_count:
+            return {}
+        columnar_path = f"{base_path}_batch_profile.json"
+        chrome_path = f"{base_path}_batch_profile.trace.json"
+        with open(columnar_path, "w", encoding="utf-8") as handle:
+            json.dump(self.to_columnar(), handle, separators=(",", ":"))
+        with open(chrome_path, "w", encoding="utf-8") as handle:
+            json.dump(self.to_chrome_trace(), handle, separators=(",", ":"))
+        self.logger.info("Batch profile written: %s, %s", columnar_path, chrome_path)
+        return {"batch_profile": columnar_path, "batch_profile_trace": chrome_path}
+
+
+__all__ = ["BatchProfiler", "PROFILE_STAGES"]
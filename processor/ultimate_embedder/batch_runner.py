@@ -6,8 +6,10 @@ import gc
 import logging
 import math
 import time
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import nullcontext
-from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set, cast
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Set, Tuple, cast
 
 import numpy as np
 import torch
@@ -22,8 +24,19 @@ from rich.progress import (
 )
 
 from processor.ultimate_embedder.config import EnsembleConfig
-from processor.ultimate_embedder.controllers import AdaptiveBatchController
+from processor.ultimate_embedder.controllers import AdaptiveBatchController, lease_snapshots
+from processor.ultimate_embedder.cpu_pool import CpuEncodePool
+from processor.ultimate_embedder.exact_search import SearchIndexCache
+from processor.ultimate_embedder.hybrid_retrieval import (
+    build_query_terms,
+    get_hybrid_retriever,
+    resolve_sparse_query_model,
+)
+from processor.ultimate_embedder.placement import PlacementPlan, PlacementPlanner
+from processor.ultimate_embedder.pre_encode import PreEncodeStage
 from processor.ultimate_embedder.progress import BatchProgressContext
+from processor.ultimate_embedder.replica_pool import ReplicaEncodePool
+from processor.ultimate_embedder.shard_store import ShardStore, ShardsPendingError, corpus_fingerprint
 from processor.ultimate_embedder.sparse_generator import SparseVectorGenerator, ChunkRecord, SparseInferenceResult
 from sklearn.preprocessing import normalize
 
@@ -58,12 +71,65 @@ class _BatchProgressTracker:
         self.completed += 1
 
 
+@dataclass
+class _ModelPassOutcome:
+    """Result of one model pass, merged into the run totals by the caller."""
+
+    model_name: str
+    embeddings: Optional[np.ndarray] = None
+    executed_batches: int = 0
+    primary_batches: int = 0
+    pending_elsewhere: int = 0
+
+
 class BatchRunner:
     """Coordinate adaptive batch embedding generation for the facade."""
 
     def __init__(self, embedder: "UltimateKaggleEmbedderV4", logger: logging.Logger) -> None:
         self.embedder = embedder
         self.logger = logger
+        self._search_index = SearchIndexCache()
+
+    @staticmethod
+    def _model_weight(embedder: "UltimateKaggleEmbedderV4", model_name: str) -> float:
+        weights = embedder.ensemble_config.model_weights if embedder.ensemble_config else None
+        return weights.get(model_name, 1.0) if weights else 1.0
+
+    def _open_shard_store(
+        self,
+        embedder: "UltimateKaggleEmbedderV4",
+        texts: Sequence[str],
+        target_dim: int,
+    ) -> Optional[ShardStore]:
+        """Open per-shard checkpoints when ``export_config.shard_size`` enables them."""
+
+        export_config = embedder.export_config
+        shard_size = getattr(export_config, "shard_size", 0)
+        if not isinstance(shard_size, int) or shard_size <= 0 or not texts:
+            return None
+
+        root = export_config.shard_dir or export_config.get_output_path(
+            "_shards",
+            collection_name=embedder.get_active_collection_alias(),
+        )
+        store = ShardStore(
+            root,
+            fingerprint=corpus_fingerprint(texts, target_dim),
+            total_rows=len(texts),
+            shard_size=shard_size,
+            worker_index=export_config.shard_worker_index,
+            worker_count=export_config.shard_worker_count,
+            logger=self.logger,
+        )
+        self.logger.info(
+            "Sharded run: %d shard(s) of %d rows in %s (worker %d/%d)",
+            store.shard_count,
+            store.shard_size,
+            store.directory,
+            store.worker_index,
+            store.worker_count,
+        )
+        return store
 
     def _prepare_chunk_records(self, embedder: "UltimateKaggleEmbedderV4") -> List[ChunkRecord]:
         """Prepare ChunkRecord instances from embedder state.
@@ -169,7 +235,7 @@ class BatchRunner:
         embedder: "UltimateKaggleEmbedderV4",
         embeddings: np.ndarray,
     ) -> Dict[str, Any]:
-        """Build fused candidate payload mirroring dense similarity retrieval."""
+        """Build the rerank candidate pool by fusing dense and sparse retrieval."""
 
         if embeddings.size == 0:
             return {}
@@ -183,17 +249,23 @@ class BatchRunner:
         if np.ndim(query_vector) != 1:
             query_vector = np.reshape(query_vector, (-1,))
 
-        norm = float(np.linalg.norm(query_vector))
-        if norm > 0.0:
-            query_vector = query_vector / norm
-
-        similarity_scores = embeddings @ query_vector
-        top_indices = np.argsort(similarity_scores)[::-1][:candidate_limit]
+        storage = getattr(embedder.reranking_config, "search_storage", "float32")
+        if not isinstance(storage, str):
+            storage = "float32"
+        index = self._search_index.get(embeddings, storage)
+        query = self._build_rerank_query(embedder)
+        retriever = get_hybrid_retriever(embedder)
+        query_terms = (
+            build_query_terms(query, resolve_sparse_query_model(embedder), self.logger)
+            if retriever.sparse_enabled
+            else None
+        )
+        hybrid = retriever.retrieve_from_index(index, query_vector, [query_terms], candidate_limit)[0]
+        top_indices = hybrid.indices
 
         candidate_ids: List[str] = []
         candidate_texts: List[str] = []
         candidate_metadata: List[Dict[str, Any]] = []
-        dense_scores: List[float] = []
 
         for idx in top_indices:
             candidate_ids.append(str(int(idx)))
@@ -212,16 +284,18 @@ class BatchRunner:
                     metadata_value = dict(raw_meta)
             candidate_metadata.append(metadata_value)
 
-            dense_scores.append(float(similarity_scores[idx]))
-
         return {
-            "query": self._build_rerank_query(embedder),
+            "query": query,
             "candidate_ids": candidate_ids,
             "candidate_texts": candidate_texts,
             "metadata": candidate_metadata,
-            "dense_scores": dense_scores,
+            "dense_scores": list(hybrid.dense_scores),
+            "sparse_scores": list(hybrid.sparse_scores),
+            "fused_scores": list(hybrid.scores),
+            "fusion": hybrid.fusion,
+            "sparse_only_hits": hybrid.sparse_only_hits,
             "indices": [int(idx) for idx in top_indices],
-            "total_candidates": candidate_limit,
+            "total_candidates": len(top_indices),
         }
 
     def _run_rerank_stage(
@@ -581,179 +655,162 @@ class BatchRunner:
         final_embeddings = normalize(final_embeddings, norm="l2", axis=1)
         return final_embeddings
 
-    def run(self, enable_monitoring: bool, save_intermediate: bool) -> Dict[str, Any]:
-        """Run embedding generation using exclusive ensemble mode.
-        
-        Exclusive mode is now the ONLY supported mode. All execution paths use
-        model-first iteration with GPU leasing for optimal VRAM management.
-        
-        For single model (non-ensemble) scenarios, a minimal ensemble config
-        is auto-created to unify the code path.
-        """
-        embedder = self.embedder
-        logger = self.logger
-
-        # Ensure ensemble config exists (even for single model)
-        if not embedder.ensemble_config:
-            logger.info("Creating ensemble config for single model mode")
-            embedder.ensemble_config = EnsembleConfig(
-                ensemble_models=[],  # Empty list = primary model only
-                exclusive_mode=True
+    def _plan_placement(self, embedder: "UltimateKaggleEmbedderV4", models: List[str]) -> PlacementPlan:
+        """Group ``models`` into waves of concurrent passes from their measured footprints."""
+
+        planner = PlacementPlanner.from_env(self.logger)
+        device_ids = list(range(embedder.device_count))
+        if embedder.device != "cuda" or len(models) < 2 or not planner.enabled:
+            return planner.exclusive_plan(models, device_ids)
+
+        weight_bytes: Dict[str, Optional[int]] = {}
+        for name in models:
+            measured = embedder.model_manager.measure_weight_bytes(name)
+            weight_bytes[name] = measured if isinstance(measured, int) else None
+        plan = planner.plan(models, weight_bytes, planner.device_budgets(device_ids))
+        for index, wave in enumerate(plan.waves, 1):
+            self.logger.info(
+                "Placement wave %d/%d: %s",
+                index,
+                len(plan.waves),
+                ", ".join(
+                    f"{placement.model_name} -> GPU{placement.device_ids}"
+                    + (" (exclusive)" if placement.exclusive else "")
+                    for placement in wave
+                ),
             )
-        
-        # Force exclusive mode (it's the only mode now)
-        if not embedder.ensemble_config.exclusive_mode:
-            logger.info("Forcing exclusive_mode=True (parallel mode removed)")
-            embedder.ensemble_config.exclusive_mode = True
-        
-        # Always use exclusive ensemble mode
-        return self.run_exclusive_ensemble(enable_monitoring, save_intermediate)
+        return plan
 
-    def run_exclusive_ensemble(
+    def _run_model_pass(
         self,
-        enable_monitoring: bool,
+        model_name: str,
+        model_idx: int,
+        segments: List[Tuple[Optional[int], int, int]],
+        device_ids: List[int],
+        *,
+        total_passes: int,
+        pre_encode: PreEncodeStage,
+        shard_store: Optional[ShardStore],
+        target_dim: int,
         save_intermediate: bool,
-    ) -> Dict[str, Any]:
-        """Run exclusive ensemble mode: iterate by model, leasing GPUs for each pass."""
-        embedder = self.embedder
-        logger = self.logger
+        show_progress: bool,
+    ) -> _ModelPassOutcome:
+        """Encode ``segments`` with one model under a lease on ``device_ids``.
 
-        # Validate ensemble config (required for exclusive mode)
-        if not embedder.ensemble_config:
-            raise ValueError("Ensemble config required for exclusive ensemble mode")
-        
-        total_chunks = len(embedder.chunk_texts)
-        logger.info("Starting EXCLUSIVE ensemble embedding generation")
-        logger.info("Total chunks: %s", total_chunks)
-        logger.info("Models: %s", embedder.ensemble_config.ensemble_models)
-
-        # Prepare ordered model list
-        ordered_models: List[str] = []
-        seen: Set[str] = set()
-        for candidate in [embedder.model_name, *embedder.ensemble_config.ensemble_models]:
-            if candidate not in seen:
-                ordered_models.append(candidate)
-                seen.add(candidate)
-
-        logger.info("Model execution order: %s", ordered_models)
-
-        embedder.embeddings_by_model = {}
-        embedder.telemetry.reset_runtime_state()
-        embedder.processing_stats.clear()
+        Passes for different models on disjoint devices may run concurrently.
+        """
+        from processor.ultimate_embedder.gpu_lease import lease_gpus
 
-        if enable_monitoring:
-            embedder._start_performance_monitoring()
+        embedder = self.embedder
+        logger = self.logger
+        model_start = time.time()
+        outcome = _ModelPassOutcome(model_name)
 
-        start_time = time.time()
-        total_executed_batches = 0
-        primary_batches_processed = 0
-        batches_per_model: Dict[str, int] = {}
-        per_model_embeddings: Dict[str, np.ndarray] = {}
-        model_weights: Dict[str, float] = {}
+        logger.info("=" * 70)
+        logger.info("MODEL PASS %d/%d: %s", model_idx + 1, total_passes, model_name)
+        logger.info("=" * 70)
 
-        target_dim = embedder.matryoshka_dim or embedder.model_config.vector_dim
+        work_total = sum(end - begin for _, begin, end in segments)
+        cpu_pool: Optional[CpuEncodePool] = None
+        replica_pool: Optional[ReplicaEncodePool] = None
 
-        try:
-            # Import lease helper
-            from processor.ultimate_embedder.gpu_lease import lease_gpus
+        # Acquire GPU lease
+        with lease_gpus(embedder, model_name, logger, device_ids=device_ids) as lease:
+            # Hydrate model onto leased GPUs
+            model = embedder.model_manager.hydrate_model_to_gpus(
+                model_name,
+                device_ids=lease.device_ids,
+            )
 
-            for model_idx, model_name in enumerate(ordered_models):
-                model_start = time.time()
-                
-                logger.info(
-                    "=" * 70
-                )
-                logger.info(
-                    "MODEL PASS %d/%d: %s",
-                    model_idx + 1,
-                    len(ordered_models),
-                    model_name,
-                )
-                logger.info("=" * 70)
+            if model is None:
+                logger.warning("Failed to hydrate %s, skipping", model_name)
+                return outcome
 
-                # Stage previous models to CPU if not the first model
-                if model_idx > 0:
-                    prev_model = ordered_models[model_idx - 1]
-                    embedder.model_manager.stage_model_to_cpu(prev_model)
-                    logger.info("Staged %s to CPU", prev_model)
+            try:
+                encode_texts = pre_encode.prepare(model_name, model)
 
-                # Acquire GPU lease
-                with lease_gpus(embedder, model_name, logger) as lease:
-                    # Hydrate model onto leased GPUs
-                    model = embedder.model_manager.hydrate_model_to_gpus(
+                # Reset adaptive controller for this model pass
+                batch_hint = embedder._get_batch_hint_for_model(model_name)
+                if embedder.device == "cpu":
+                    cpu_pool = CpuEncodePool.from_env(
+                        embedder._unwrap_model(model),
+                        logger,
+                        total_texts=work_total,
+                    )
+                    if cpu_pool is not None:
+                        batch_hint = cpu_pool.dispatch_size
+                controller: Optional[AdaptiveBatchController] = None
+                if embedder.device == "cuda":
+                    controller = AdaptiveBatchController(
+                        primary_batch=batch_hint,
+                        device_count=len(lease.device_ids),
+                        gpu0_soft_limit_bytes=embedder.gpu0_soft_limit_bytes,
+                        companion_enabled=False,  # No companions in exclusive mode
+                    )
+                    logger.info(
+                        "Adaptive batch controller enabled for %s (initial batch: %d)",
                         model_name,
-                        device_ids=lease.device_ids,
+                        batch_hint,
                     )
-
-                    if model is None:
-                        logger.warning("Failed to hydrate %s, skipping", model_name)
-                        batches_per_model[model_name] = 0
-                        continue
-
-                    # Reset adaptive controller for this model pass
-                    batch_hint = embedder._get_batch_hint_for_model(model_name)
-                    controller: Optional[AdaptiveBatchController] = None
-                    if embedder.device == "cuda":
-                        controller = AdaptiveBatchController(
-                            primary_batch=batch_hint,
-                            device_count=len(lease.device_ids),
-                            gpu0_soft_limit_bytes=embedder.gpu0_soft_limit_bytes,
-                            companion_enabled=False,  # No companions in exclusive mode
+                    # One replica per leased GPU, each encoding its own share of every dispatch
+                    if embedder.ensemble_config.sequential_data_parallel:
+                        replica_pool = ReplicaEncodePool.from_env(
+                            embedder._unwrap_model(model),
+                            lease.device_ids,
+                            logger,
                         )
-                        logger.info(
-                            "Adaptive batch controller enabled for %s (initial batch: %d)",
-                            model_name,
-                            batch_hint,
-                        )
-
-                    # Progress tracker for this model
-                    est_batches = max(1, math.ceil(total_chunks / batch_hint))
-                    progress_tracker = _BatchProgressTracker(total_chunks, batch_hint)
-
-                    # Create rich progress bar for batches (disabled on CPU)
-                    show_batch_progress = embedder.device != "cpu"
-                    
-                    # Get chunk file name and model for progress description
-                    chunk_file_name = "unknown"
-                    if hasattr(embedder, 'chunks_metadata') and embedder.chunks_metadata and len(embedder.chunks_metadata) > 0:
-                        first_metadata = embedder.chunks_metadata[0] or {}
-                        chunk_file_name = first_metadata.get("chunk_file_name", "unknown")
-                    
-                    # Build progress description with file and model
-                    progress_desc = f"Batches({chunk_file_name}) {model_name}"
-                    
-                    # Initialize rich progress bar with no text truncation
-                    from rich.console import Console
-                    from rich.table import Column
-                    
-                    console = Console(width=200, legacy_windows=False)  # Fixed wide width
-                    rich_progress = Progress(
-                        SpinnerColumn(),
-                        TextColumn("[progress.description]{task.description}", table_column=Column(no_wrap=True)),  # Never wrap
-                        BarColumn(),
-                        TaskProgressColumn(),
-                        TimeRemainingColumn(),
-                        console=console,
-                        disable=not show_batch_progress,
-                        expand=False  # Don't expand to fill terminal width
-                    )
-                    rich_progress.start()
-                    rich_task = rich_progress.add_task(progress_desc, total=total_chunks)
+                dispatch_hint = replica_pool.dispatch_size(batch_hint) if replica_pool is not None else batch_hint
+
+                # Progress tracker for this model
+                est_batches = max(1, math.ceil(work_total / dispatch_hint))
+                progress_tracker = _BatchProgressTracker(work_total, dispatch_hint)
+
+                # Create rich progress bar for batches (disabled on CPU and for concurrent passes)
+                show_batch_progress = show_progress
+
+                # Get chunk file name and model for progress description
+                chunk_file_name = "unknown"
+                if hasattr(embedder, 'chunks_metadata') and embedder.chunks_metadata and len(embedder.chunks_metadata) > 0:
+                    first_metadata = embedder.chunks_metadata[0] or {}
+                    chunk_file_name = first_metadata.get("chunk_file_name", "unknown")
+
+                # Build progress description with file and model
+                progress_desc = f"Batches({chunk_file_name}) {model_name}"
+
+                # Initialize rich progress bar with no text truncation
+                from rich.console import Console
+                from rich.table import Column
+
+                console = Console(width=200, legacy_windows=False)  # Fixed wide width
+                rich_progress = Progress(
+                    SpinnerColumn(),
+                    TextColumn("[progress.description]{task.description}", table_column=Column(no_wrap=True)),  # Never wrap
+                    BarColumn(),
+                    TaskProgressColumn(),
+                    TimeRemainingColumn(),
+                    console=console,
+                    disable=not show_batch_progress,
+                    expand=False  # Don't expand to fill terminal width
+                )
+                rich_progress.start()
+                rich_task = rich_progress.add_task(progress_desc, total=work_total)
 
-                    # Batch iteration for this model
-                    model_embeddings: List[np.ndarray] = []
-                    batch_index = 0
-                    executed_batches = 0
+                # Batch iteration for this model
+                model_embeddings: List[np.ndarray] = []
 
-                    while batch_index < total_chunks:
+                for shard_index, batch_index, segment_end in segments:
+                    while batch_index < segment_end:
                         current_batch = controller.primary_batch if controller else batch_hint
-                        batch_end = min(batch_index + current_batch, total_chunks)
-                        batch_texts = embedder.chunk_texts[batch_index:batch_end]
+                        dispatch = replica_pool.dispatch_size(current_batch) if replica_pool is not None else current_batch
+                        batch_end = min(batch_index + dispatch, segment_end)
+                        batch_texts = encode_texts[batch_index:batch_end]
 
                         if not batch_texts:
                             break
 
-                        progress_label = embedder._get_batch_progress_label(batch_index, batch_end)
+                        progress_label = embedder._get_batch_progress_label(
+                            *pre_encode.source_range(batch_index, batch_end)
+                        )
                         progress_context = progress_tracker.build_context(progress_label, model_name)
 
                         # Update rich progress description with current file
@@ -764,7 +821,8 @@ class BatchRunner:
 
                         # Check memory and adapt
                         if controller and embedder.device == "cuda":
-                            snapshots = embedder._collect_gpu_snapshots()
+                            # Co-resident passes each watch their own leased device.
+                            snapshots = lease_snapshots(embedder._collect_gpu_snapshots(), lease.device_ids)
                             mitigation = controller.register_snapshot(snapshots)
                             if mitigation:
                                 event_type = mitigation.pop("type", "adaptive_action")
@@ -780,69 +838,95 @@ class BatchRunner:
                                 if embedder.device == "cuda" and lease.device_ids
                                 else embedder.device
                             )
-                            batch_embeddings = embedder._call_encode(
-                                model,
-                                batch_texts,
-                                batch_size=current_batch,
-                                device=target_device,
-                                progress_context=progress_context,
-                                model_name=model_name,
-                            )
-                            batch_embeddings = embedder._normalize_embedding_matrix(
-                                batch_embeddings,
-                                model_name,
+                            profiler = embedder.batch_profiler
+                            profiler.begin_batch(
+                                model=model_name,
+                                device=str(target_device),
+                                size=len(batch_texts),
                             )
+                            batch_started = time.perf_counter()
+                            if cpu_pool is not None:
+                                batch_embeddings = cpu_pool.encode(batch_texts)
+                            elif replica_pool is not None:
+                                batch_embeddings = replica_pool.encode(batch_texts, batch_size=current_batch)
+                            else:
+                                batch_embeddings = embedder._call_encode(
+                                    model,
+                                    batch_texts,
+                                    batch_size=current_batch,
+                                    device=target_device,
+                                    show_progress=show_batch_progress,
+                                    progress_context=progress_context,
+                                    model_name=model_name,
+                                )
+                            with profiler.stage("normalize"):
+                                batch_embeddings = embedder._normalize_embedding_matrix(
+                                    batch_embeddings,
+                                    model_name,
+                                )
 
                             # Ensure dimension and truncate if needed
-                            batch_embeddings, _ = embedder._ensure_embedding_dimension(
-                                batch_embeddings,
-                                expected_dim=target_dim,
-                            )
+                            with profiler.stage("dim_trim"):
+                                batch_embeddings, _ = embedder._ensure_embedding_dimension(
+                                    batch_embeddings,
+                                    expected_dim=target_dim,
+                                )
 
                             model_embeddings.append(batch_embeddings)
-                            executed_batches += 1
-                            total_executed_batches += 1
+                            outcome.executed_batches += 1
                             if model_name == embedder.model_name:
-                                primary_batches_processed += 1
+                                outcome.primary_batches += 1
                             progress_tracker.mark_completed()
 
-                            self._record_progress_event(
-                                progress_context,
-                                status="completed",
-                                model=model_name,
-                                device=target_device,
-                                metadata={
-                                    "mode": "exclusive",
-                                    "model_pass": model_idx + 1,
-                                    "total_passes": len(ordered_models),
-                                },
-                            )
+                            with profiler.stage("telemetry"):
+                                embedder.prometheus_emitter.observe_batch(
+                                    stage="dense",
+                                    model=model_name,
+                                    device=str(target_device),
+                                    latency_seconds=time.perf_counter() - batch_started,
+                                    items=len(batch_texts),
+                                )
+                                self._record_progress_event(
+                                    progress_context,
+                                    status="completed",
+                                    model=model_name,
+                                    device=target_device,
+                                    metadata={
+                                        "mode": "exclusive",
+                                        "model_pass": model_idx + 1,
+                                        "total_passes": total_passes,
+                                    },
+                                )
 
                             if (
                                 save_intermediate
+                                and shard_store is None
                                 and model_name == embedder.model_name
-                                and primary_batches_processed % embedder._intermediate_save_interval == 0
+                                and outcome.primary_batches % embedder._intermediate_save_interval == 0
                             ):
                                 embedder._persist_intermediate_embeddings(
                                     model_embeddings,
-                                    batch_number=primary_batches_processed,
+                                    batch_number=outcome.primary_batches,
                                 )
 
-                            logger.info(
-                                "[%s] Batch %d/%d completed (chunks %d-%d)",
-                                model_name,
-                                executed_batches,
-                                est_batches,
-                                batch_index,
-                                batch_end,
-                            )
+                            with profiler.stage("progress"):
+                                logger.info(
+                                    "[%s] Batch %d/%d completed (chunks %d-%d)",
+                                    model_name,
+                                    outcome.executed_batches,
+                                    est_batches,
+                                    batch_index,
+                                    batch_end,
+                                )
+
+                                # Update rich progress bar
+                                rich_progress.update(rich_task, advance=batch_end - batch_index)
+                            profiler.end_batch()
 
-                            # Update rich progress bar
-                            rich_progress.update(rich_task, advance=batch_end - batch_index)
-                            
                             batch_index = batch_end
 
                         except RuntimeError as exc:
+                            embedder.batch_profiler.abort_batch()
                             if "out of memory" in str(exc).lower() and controller:
                                 mitigation = controller.register_oom(companion_active=False)
                                 if mitigation:
@@ -853,35 +937,254 @@ class BatchRunner:
                                     continue
                             raise
 
-                    # Aggregate model embeddings
-                    if model_embeddings:
-                        full_embeddings = np.vstack(model_embeddings)
-                        per_model_embeddings[model_name] = full_embeddings
-                        model_weights[model_name] = (
-                            embedder.ensemble_config.model_weights.get(model_name, 1.0)
-                            if embedder.ensemble_config.model_weights
-                            else 1.0
-                        )
-
+                    if shard_store is not None and shard_index is not None:
+                        shard_store.write(model_name, shard_index, np.vstack(model_embeddings))
                         logger.info(
-                            "[%s] Pass completed: %d embeddings, %.2fs",
+                            "[%s] Shard %d/%d checkpointed (rows %d-%d)",
                             model_name,
-                            len(full_embeddings),
-                            time.time() - model_start,
+                            shard_index + 1,
+                            shard_store.shard_count,
+                            *shard_store.shard_range(shard_index),
                         )
-
-                        # Log lease summary
-                        lease_summary = lease.summarize()
-                        logger.info("[%s] GPU lease summary: %s", model_name, lease_summary)
+                        model_embeddings = []
+
+                # Aggregate model embeddings
+                full_embeddings: Optional[np.ndarray] = None
+                if shard_store is not None:
+                    missing = shard_store.missing_shards(model_name)
+                    if missing:
+                        outcome.pending_elsewhere = len(missing)
                     else:
-                        logger.warning("[%s] No embeddings generated", model_name)
+                        full_embeddings = pre_encode.expand(shard_store.load_model(model_name))
+                elif model_embeddings:
+                    full_embeddings = pre_encode.expand(np.vstack(model_embeddings))
+
+                if full_embeddings is not None:
+                    outcome.embeddings = full_embeddings
+
+                    logger.info(
+                        "[%s] Pass completed: %d embeddings, %.2fs",
+                        model_name,
+                        len(full_embeddings),
+                        time.time() - model_start,
+                    )
+
+                    # Log lease summary
+                    lease_summary = lease.summarize()
+                    logger.info("[%s] GPU lease summary: %s", model_name, lease_summary)
+                    if replica_pool is not None:
+                        logger.info("[%s] Replica encode split: %s", model_name, replica_pool.summary())
+                elif outcome.pending_elsewhere:
+                    logger.info(
+                        "[%s] Own shards done; %d shard(s) still pending on other workers",
+                        model_name,
+                        outcome.pending_elsewhere,
+                    )
+                else:
+                    logger.warning("[%s] No embeddings generated", model_name)
+
+                # Close rich progress bar for this model pass
+                rich_progress.stop()
+            finally:
+                if cpu_pool is not None:
+                    cpu_pool.close()
+                if replica_pool is not None:
+                    replica_pool.close()
+
+        return outcome
+
+    def run(self, enable_monitoring: bool, save_intermediate: bool) -> Dict[str, Any]:
+        """Run embedding generation using exclusive ensemble mode.
+        
+        Exclusive mode is now the ONLY supported mode. All execution paths use
+        model-first iteration with GPU leasing for optimal VRAM management.
+        
+        For single model (non-ensemble) scenarios, a minimal ensemble config
+        is auto-created to unify the code path.
+        """
+        embedder = self.embedder
+        logger = self.logger
+
+        # Ensure ensemble config exists (even for single model)
+        if not embedder.ensemble_config:
+            logger.info("Creating ensemble config for single model mode")
+            embedder.ensemble_config = EnsembleConfig(
+                ensemble_models=[],  # Empty list = primary model only
+                exclusive_mode=True
+            )
+        
+        # Force exclusive mode (it's the only mode now)
+        if not embedder.ensemble_config.exclusive_mode:
+            logger.info("Forcing exclusive_mode=True (parallel mode removed)")
+            embedder.ensemble_config.exclusive_mode = True
+        
+        # Always use exclusive ensemble mode
+        return self.run_exclusive_ensemble(enable_monitoring, save_intermediate)
+
+    def run_exclusive_ensemble(
+        self,
+        enable_monitoring: bool,
+        save_intermediate: bool,
+    ) -> Dict[str, Any]:
+        """Run exclusive ensemble mode: iterate by model, leasing GPUs for each pass.
+
+        On multi-GPU hosts small models are packed into waves by
+        ``PlacementPlanner`` and run concurrently, each on its own device
+        lease; models that need the whole budget still rotate exclusively.
+        """
+        embedder = self.embedder
+        logger = self.logger
 
-                    batches_per_model[model_name] = executed_batches
+        # Validate ensemble config (required for exclusive mode)
+        if not embedder.ensemble_config:
+            raise ValueError("Ensemble config required for exclusive ensemble mode")
+        
+        total_chunks = len(embedder.chunk_texts)
+        logger.info("Starting EXCLUSIVE ensemble embedding generation")
+        logger.info("Total chunks: %s", total_chunks)
+        logger.info("Models: %s", embedder.ensemble_config.ensemble_models)
 
-                    # Close rich progress bar for this model pass
-                    rich_progress.stop()
+        # Prepare ordered model list
+        ordered_models: List[str] = []
+        seen: Set[str] = set()
+        for candidate in [embedder.model_name, *embedder.ensemble_config.ensemble_models]:
+            if candidate not in seen:
+                ordered_models.append(candidate)
+                seen.add(candidate)
 
-                # Lease released automatically here
+        logger.info("Model execution order: %s", ordered_models)
+
+        embedder.embeddings_by_model = {}
+        embedder.telemetry.reset_runtime_state()
+        embedder.processing_stats.clear()
+        embedder.batch_profiler.reset()
+
+        # Encode each distinct text once per model; rows are fanned back out after the pass.
+        pre_encode = PreEncodeStage.from_env(embedder.chunk_texts, logger)
+        encode_total = len(pre_encode.texts)
+        if encode_total != total_chunks:
+            logger.info(
+                "Pre-encode dedup: %d unique texts (%d duplicates skipped)",
+                encode_total,
+                total_chunks - encode_total,
+            )
+
+        if enable_monitoring:
+            embedder._start_performance_monitoring()
+
+        start_time = time.time()
+        total_executed_batches = 0
+        primary_batches_processed = 0
+        batches_per_model: Dict[str, int] = {}
+        per_model_embeddings: Dict[str, np.ndarray] = {}
+        model_weights: Dict[str, float] = {}
+
+        target_dim = embedder.matryoshka_dim or embedder.model_config.vector_dim
+        shard_store = self._open_shard_store(embedder, pre_encode.texts, target_dim)
+        shards_pending_elsewhere: Dict[str, int] = {}
+
+        try:
+            segments_by_model: Dict[str, List[Tuple[Optional[int], int, int]]] = {}
+            for model_name in ordered_models:
+                segments: List[Tuple[Optional[int], int, int]] = [(None, 0, encode_total)]
+                if shard_store is not None:
+                    pending_shards = shard_store.pending_shards(model_name)
+                    if not pending_shards:
+                        batches_per_model[model_name] = 0
+                        missing = shard_store.missing_shards(model_name)
+                        if missing:
+                            shards_pending_elsewhere[model_name] = len(missing)
+                            logger.info(
+                                "[%s] No shards left for this worker (%d pending elsewhere); skipping pass",
+                                model_name,
+                                len(missing),
+                            )
+                        else:
+                            per_model_embeddings[model_name] = pre_encode.expand(
+                                shard_store.load_model(model_name)
+                            )
+                            model_weights[model_name] = self._model_weight(embedder, model_name)
+                            logger.info(
+                                "[%s] All %d shards already complete; restored without loading the model",
+                                model_name,
+                                shard_store.shard_count,
+                            )
+                        continue
+                    segments = [(index, *shard_store.shard_range(index)) for index in pending_shards]
+                    logger.info(
+                        "[%s] %d/%d shards to encode on this worker",
+                        model_name,
+                        len(pending_shards),
+                        shard_store.shard_count,
+                    )
+                segments_by_model[model_name] = segments
+
+            plan = self._plan_placement(embedder, list(segments_by_model))
+            previous_models: List[str] = []
+
+            for wave in plan.waves:
+                # Stage the previously hydrated models to CPU before leasing GPUs again
+                for previous_model in previous_models:
+                    embedder.model_manager.stage_model_to_cpu(previous_model)
+                    logger.info("Staged %s to CPU", previous_model)
+                previous_models = [placement.model_name for placement in wave]
+
+                pass_kwargs = dict(
+                    total_passes=len(ordered_models),
+                    pre_encode=pre_encode,
+                    shard_store=shard_store,
+                    target_dim=target_dim,
+                    save_intermediate=save_intermediate,
+                    show_progress=embedder.device != "cpu" and len(wave) == 1,
+                )
+                if len(wave) == 1:
+                    placement = wave[0]
+                    outcomes = [
+                        self._run_model_pass(
+                            placement.model_name,
+                            ordered_models.index(placement.model_name),
+                            segments_by_model[placement.model_name],
+                            placement.device_ids,
+                            **pass_kwargs,
+                        )
+                    ]
+                else:
+                    logger.info(
+                        "Running %d co-resident model passes concurrently: %s",
+                        len(wave),
+                        ", ".join(f"{p.model_name}->GPU{p.device_ids}" for p in wave),
+                    )
+                    with ThreadPoolExecutor(max_workers=len(wave), thread_name_prefix="model-pass") as pool:
+                        futures = [
+                            pool.submit(
+                                self._run_model_pass,
+                                placement.model_name,
+                                ordered_models.index(placement.model_name),
+                                segments_by_model[placement.model_name],
+                                placement.device_ids,
+                                **pass_kwargs,
+                            )
+                            for placement in wave
+                        ]
+                        outcomes = [future.result() for future in futures]
+
+                for outcome in outcomes:
+                    batches_per_model[outcome.model_name] = outcome.executed_batches
+                    total_executed_batches += outcome.executed_batches
+                    primary_batches_processed += outcome.primary_batches
+                    if outcome.embeddings is not None:
+                        per_model_embeddings[outcome.model_name] = outcome.embeddings
+                        model_weights[outcome.model_name] = self._model_weight(embedder, outcome.model_name)
+                    elif outcome.pending_elsewhere:
+                        shards_pending_elsewhere[outcome.model_name] = outcome.pending_elsewhere
+
+            # Waves may finish out of run order; keep the aggregation order stable.
+            per_model_embeddings = {
+                name: per_model_embeddings[name] for name in ordered_models if name in per_model_embeddings
+            }
+
+            if shards_pending_elsewhere:
+                raise ShardsPendingError(shards_pending_elsewhere)
 
             # Aggregate across models
             if not per_model_embeddings:
@@ -1016,6 +1319,9 @@ class BatchRunner:
 
             self._run_rerank_stage(embedder, final_embeddings)
 
+        except ShardsPendingError as exc:
+            logger.info("Sharded run paused before aggregation: %s", exc)
+            raise
         except Exception as exc:
             logger.error("Exclusive ensemble generation failed: %s", exc)
             raise
@@ -1056,6 +1362,13 @@ class BatchRunner:
             "primary_batches_processed": primary_batches_processed,
             "batches_per_model": dict(batches_per_model),
         }
+        pre_encode_summary = pre_encode.summarize()
+        if pre_encode_summary:
+            results["pre_encode"] = pre_encode_summary
+        if plan.concurrent:
+            results["placement"] = plan.summarize()
+        if shard_store is not None:
+            results["shards"] = shard_store.summarize(list(per_model_embeddings.keys()))
         
         # Add sparse inference results if available
         if hasattr(embedder, 'sparse_inference_result') and embedder.sparse_inference_result:
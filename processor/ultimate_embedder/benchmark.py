@@ -0,0 +1,447 @@
+"""Deterministic CPU benchmark harness for the embed pipeline stages."""
+
+from __future__ import annotations
+
+import contextlib
+import io
+import json
+import logging
+import platform
+import random
+import shutil
+import statistics
+import tempfile
+import time
+import zlib
+from dataclasses import asdict, dataclass, field, replace
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+from processor.ultimate_embedder.batch_runner import BatchRunner
+from processor.ultimate_embedder.config import (
+    AdvancedTextCache,
+    KaggleExportConfig,
+    KaggleGPUConfig,
+    RerankingConfig,
+)
+from processor.ultimate_embedder.core import UltimateKaggleEmbedderV4
+from processor.ultimate_embedder.runtime_config import FeatureToggleConfig
+from processor.ultimate_embedder.sparse_generator import SparseVectorGenerator
+from processor.ultimate_embedder.summary import (
+    build_performance_baseline,
+    build_processing_summary,
+    build_telemetry_summary,
+)
+from processor.ultimate_embedder.telemetry import TelemetryTracker
+
+BENCHMARK_SCHEMA_VERSION = "embed-bench/v1"
+BENCHMARK_STAGES: tuple[str, ...] = (
+    "chunk_loading",
+    "preprocessing",
+    "dense_batching",
+    "sparse_conversion",
+    "candidate_assembly",
+    "export",
+    "summary",
+)
+
+_WORDS = (
+    "qdrant vector index payload filter embedding chunk collection shard replica "
+    "tokenizer transformer attention pooling normalize cosine similarity rerank "
+    "sparse dense hybrid fusion query document metadata section heading code "
+    "python function class return import async await batch device memory"
+).split()
+
+
+@dataclass
+class BenchmarkConfig:
+    """Size and repetition knobs for a benchmark run."""
+
+    chunk_count: int = 512
+    words_per_chunk: int = 120
+    files: int = 8
+    vector_dim: int = 64
+    sparse_vocab: int = 2048
+    batch_size: int = 32
+    repeats: int = 3
+    seed: int = 13
+
+
+@dataclass
+class StageResult:
+    """Timing samples for a single benchmark stage."""
+
+    stage: str
+    items: int
+    samples_seconds: List[float] = field(default_factory=list)
+
+    @property
+    def median_seconds(self) -> float:
+        return float(statistics.median(self.samples_seconds)) if self.samples_seconds else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        median = self.median_seconds
+        return {
+            "items": self.items,
+            "repeats": len(self.samples_seconds),
+            "median_seconds": round(median, 6),
+            "min_seconds": round(min(self.samples_seconds), 6) if self.samples_seconds else 0.0,
+            "items_per_second": round(self.items / median, 3) if median > 0 else 0.0,
+        }
+
+
+class StubDenseModel:
+    """Deterministic hashing encoder standing in for SentenceTransformer."""
+
+    def __init__(self, dim: int) -> None:
+        self.dim = dim
+
+    def encode(self, texts: Sequence[str], **_: Any) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in text.split():
+                matrix[row, zlib.crc32(token.encode("utf-8")) % self.dim] += 1.0
+        return matrix
+
+
+class _StubTokenizer:
+    def __init__(self, vocab_size: int) -> None:
+        self._vocab = {f"tok{idx}": idx for idx in range(vocab_size)}
+
+    def get_vocab(self) -> Dict[str, int]:
+        return self._vocab
+
+
+class StubSparseModel:
+    """Deterministic SPLADE-like encoder returning vocabulary-sized activations."""
+
+    def __init__(self, vocab_size: int) -> None:
+        self.vocab_size = vocab_size
+        self.tokenizer = _StubTokenizer(vocab_size)
+
+    def encode(self, texts: Sequence[str], **_: Any) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.vocab_size), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in text.split():
+                matrix[row, zlib.crc32(token.encode("utf-8")) % self.vocab_size] += 0.5
+        return matrix
+
+
+def build_synthetic_corpus(config: BenchmarkConfig) -> List[List[Dict[str, Any]]]:
+    """Return ``config.files`` lists of chunk records with deterministic text."""
+
+    rng = random.Random(config.seed)
+    files: List[List[Dict[str, Any]]] = [[] for _ in range(max(1, config.files))]
+    for index in range(config.chunk_count):
+        words = [rng.choice(_WORDS) for _ in range(config.words_per_chunk)]
+        text = " ".join(words)
+        if index % 7 == 0:
+            text = text + "\n\n\n\n" + "    ".join(words[:10])
+        target = files[index % len(files)]
+        target.append(
+            {
+                "text": text,
+                "metadata": {
+                    "token_count": len(words),
+                    "source_file": f"docs/doc_{index % len(files)}.md",
+                    "section_path": ["Guide", f"Section {index % 11}"],
+                    "heading_text": f"Section {index % 11}",
+                    "sparse_features": {
+                        "term_weights": [
+                            {"term": word, "weight": round(1.0 / (rank + 1), 4)}
+                            for rank, word in enumerate(sorted(set(words[:12])))
+                        ]
+                    },
+                },
+            }
+        )
+    return files
+
+
+def write_synthetic_corpus(root: Path, config: BenchmarkConfig) -> Path:
+    """Materialise the synthetic corpus as chunk JSON files under ``root``."""
+
+    collection_dir = root / "bench_collection"
+    collection_dir.mkdir(parents=True, exist_ok=True)
+    for file_index, chunks in enumerate(build_synthetic_corpus(config)):
+        (collection_dir / f"doc_{file_index:03d}_chunks.json").write_text(
+            json.dumps(chunks), encoding="utf-8"
+        )
+    return collection_dir
+
+
+# Registry key the bench embedder is built as; its ModelConfig is resized to the bench corpus.
+_BENCH_MODEL = "all-miniLM-l6"
+
+
+class _BenchEmbedder(UltimateKaggleEmbedderV4):
+    """Real embedder whose model initialisers install the stub models.
+
+    Only the ``_initialize_*`` model loaders are overridden, so every stage runs
+    the production facade methods on CPU without downloading anything.
+    """
+
+    def __init__(self, config: BenchmarkConfig, export_root: Path, logger: logging.Logger) -> None:
+        self._bench_config = config
+        super().__init__(
+            model_name=_BENCH_MODEL,
+            gpu_config=KaggleGPUConfig(device_count=0, kaggle_environment=False),
+            export_config=KaggleExportConfig(
+                working_dir=str(export_root),
+                output_prefix="bench",
+                export_numpy=True,
+                export_jsonl=True,
+                export_faiss=False,
+                export_sparse_jsonl=True,
+            ),
+            reranking_config=RerankingConfig(enable_reranking=False, top_k_candidates=100),
+            feature_toggles=FeatureToggleConfig(enable_rerank=False, enable_sparse=False, sparse_models=[], sources={}),
+            enable_sparse=False,
+            force_cpu=True,
+        )
+        self.telemetry = TelemetryTracker(logger=logger)
+
+    def _initialize_embedding_models(self) -> None:
+        config = self._bench_config
+        self.model_config = replace(
+            self.model_config,
+            vector_dim=config.vector_dim,
+            max_tokens=max(16, config.words_per_chunk // 2),
+        )
+        # Stub models have no tokenizer; preprocessing falls back to the character trim.
+        self.primary_model = StubDenseModel(config.vector_dim)  # type: ignore[assignment]
+        self.models[self.model_name] = self.primary_model
+
+    def _initialize_companion_models(self) -> None:
+        return None
+
+    def _initialize_sparse_models(self) -> None:
+        return None
+
+    def _initialize_reranking_model(self) -> None:
+        return None
+
+
+class PipelineBenchmark:
+    """Run each pipeline stage on CPU with stub models and synthetic data."""
+
+    def __init__(self, config: Optional[BenchmarkConfig] = None, logger: Optional[logging.Logger] = None) -> None:
+        self.config = config or BenchmarkConfig()
+        self.logger = logger or logging.getLogger("embed_benchmark")
+        self._quiet_logger = logging.getLogger("embed_benchmark.stages")
+        self._quiet_logger.setLevel(logging.ERROR)
+        self._quiet_logger.propagate = False
+
+    def _time(self, stage: str, items: int, setup: Callable[[], Any], run: Callable[[Any], Any]) -> StageResult:
+        result = StageResult(stage=stage, items=items)
+        for _ in range(max(1, self.config.repeats)):
+            state = setup()
+            with contextlib.redirect_stdout(io.StringIO()):
+                started = time.perf_counter()
+                run(state)
+                result.samples_seconds.append(time.perf_counter() - started)
+        return result
+
+    def run(self, stages: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """Run the selected stages and return a JSON-serialisable results payload."""
+
+        selected = list(stages or BENCHMARK_STAGES)
+        unknown = [stage for stage in selected if stage not in BENCHMARK_STAGES]
+        if unknown:
+            raise ValueError(f"Unknown benchmark stages: {', '.join(unknown)}")
+
+        config = self.config
+        workspace = Path(tempfile.mkdtemp(prefix="embed_bench_"))
+        core_logger = logging.getLogger("processor.ultimate_embedder.core")
+        previous_level = core_logger.level
+        core_logger.setLevel(logging.ERROR)
+        try:
+            corpus_dir = write_synthetic_corpus(workspace / "Chunked", config)
+            embedder = _BenchEmbedder(config, workspace / "exports", self._quiet_logger)
+
+            def _fresh_cache() -> None:
+                embedder.text_cache = AdvancedTextCache(max_size=embedder.preprocessing_config.max_cache_size or None)
+
+            def _load_chunks() -> Dict[str, Any]:
+                return embedder.load_chunks_from_processing(str(corpus_dir), collection_name="bench_collection")
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                _load_chunks()
+            raw_texts = list(embedder.raw_chunk_texts)
+            chunk_count = len(raw_texts)
+
+            dense_model = embedder.primary_model
+            sparse_model = StubSparseModel(config.sparse_vocab)
+            with contextlib.redirect_stdout(io.StringIO()):
+                embedder.embeddings = self._encode_all(embedder, dense_model)
+            embedder.embeddings_by_model = {embedder.model_name: embedder.embeddings}
+            sparse_outputs = sparse_model.encode(embedder.chunk_texts)
+            generator = SparseVectorGenerator(embedder, self._quiet_logger)
+            with contextlib.redirect_stdout(io.StringIO()):
+                token_lookup = generator._build_token_lookup(sparse_model, "bench-sparse")  # type: ignore[arg-type]
+            embedder.sparse_vectors = [
+                generator._convert_embedding_to_sparse_vector(row, token_lookup=token_lookup)
+                for row in sparse_outputs
+            ]
+            runner = BatchRunner(embedder, self._quiet_logger)
+
+            stage_plans: Dict[str, tuple[Callable[[], Any], Callable[[Any], Any]]] = {
+                "chunk_loading": (
+                    _fresh_cache,
+                    lambda _: _load_chunks(),
+                ),
+                "preprocessing": (
+                    _fresh_cache,
+                    lambda _: embedder.preprocess_texts_batch(raw_texts),
+                ),
+                "dense_batching": (
+                    lambda: None,
+                    lambda _: self._encode_all(embedder, dense_model),
+                ),
+                "sparse_conversion": (
+                    lambda: None,
+                    lambda _: [
+                        generator._convert_embedding_to_sparse_vector(row, token_lookup=token_lookup)
+                        for row in sparse_outputs
+                    ],
+                ),
+                "candidate_assembly": (
+                    lambda: None,
+                    lambda _: runner._assemble_fused_candidates(embedder, embedder.embeddings),
+                ),
+                "export": (
+                    lambda: shutil.rmtree(workspace / "exports", ignore_errors=True),
+                    lambda _: embedder.export_for_local_qdrant(),
+                ),
+                "summary": (
+                    lambda: None,
+                    lambda _: self._build_summary(embedder, chunk_count),
+                ),
+            }
+
+            results: Dict[str, Dict[str, Any]] = {}
+            for stage in selected:
+                setup, run = stage_plans[stage]
+                stage_result = self._time(stage, chunk_count, setup, run)
+                results[stage] = stage_result.to_dict()
+                self.logger.info(
+                    "[bench] %s: median=%.4fs items/s=%.1f",
+                    stage,
+                    stage_result.median_seconds,
+                    results[stage]["items_per_second"],
+                )
+        finally:
+            core_logger.setLevel(previous_level)
+            shutil.rmtree(workspace, ignore_errors=True)
+
+        return {
+            "schema_version": BENCHMARK_SCHEMA_VERSION,
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "config": asdict(config),
+            "environment": {
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "platform": platform.platform(),
+                "numpy": np.__version__,
+            },
+            "stages": results,
+        }
+
+    def _encode_all(self, embedder: _BenchEmbedder, model: Any) -> np.ndarray:
+        batches: List[np.ndarray] = []
+        texts = embedder.chunk_texts
+        step = max(1, self.config.batch_size)
+        for start in range(0, len(texts), step):
+            batch = embedder._call_encode(
+                model,
+                texts[start:start + step],
+                batch_size=step,
+                device="cpu",
+                model_name=embedder.model_name,
+            )
+            batch = embedder._normalize_embedding_matrix(batch, embedder.model_name)
+            batch, _ = embedder._ensure_embedding_dimension(batch, expected_dim=self.config.vector_dim)
+            batches.append(batch)
+        if not batches:
+            return np.empty((0, self.config.vector_dim), dtype=np.float32)
+        return np.vstack(batches)
+
+    @staticmethod
+    def _build_summary(embedder: _BenchEmbedder, chunk_count: int) -> str:
+        telemetry = build_telemetry_summary(
+            mitigation_events=embedder.telemetry.mitigation_events,
+            rotation_events=embedder.telemetry.rotation_events,
+            lease_events=embedder.telemetry.gpu_lease_events,
+            batch_progress_events=embedder.telemetry.batch_progress_events,
+            span_events=embedder.telemetry.span_events,
+            metrics_report=embedder.telemetry.metrics_reports,
+        )
+        summary = build_processing_summary(
+            feature_toggles=embedder.feature_toggles,
+            dense_run={"total_embeddings_generated": chunk_count},
+            rerank_stage=None,
+            sparse_stage=None,
+            telemetry=telemetry,
+            collection_name="bench_collection",
+            chunk_count=chunk_count,
+        )
+        baseline = build_performance_baseline(dict(embedder.processing_stats))
+        if baseline:
+            summary["performance_baseline"] = baseline
+        return json.dumps(summary, indent=2)
+
+
+def compare_results(
+    current: Mapping[str, Any],
+    baseline: Mapping[str, Any],
+    *,
+    threshold: float = 0.2,
+    stage_thresholds: Optional[Mapping[str, float]] = None,
+) -> List[Dict[str, Any]]:
+    """Return one entry per stage whose throughput fell more than its threshold.
+
+    Throughput (items/second) is compared rather than wall time so baselines
+    captured on a different corpus size remain meaningful.
+    """
+
+    regressions: List[Dict[str, Any]] = []
+    overrides = dict(stage_thresholds or {})
+    current_stages = current.get("stages", {}) or {}
+    for stage, reference in (baseline.get("stages", {}) or {}).items():
+        measured = current_stages.get(stage)
+        if not measured:
+            continue
+        reference_rate = float(reference.get("items_per_second") or 0.0)
+        measured_rate = float(measured.get("items_per_second") or 0.0)
+        if reference_rate <= 0.0:
+            continue
+        allowed = float(overrides.get(stage, threshold))
+        change = (measured_rate - reference_rate) / reference_rate
+        if change < -allowed:
+            regressions.append(
+                {
+                    "stage": stage,
+                    "baseline_items_per_second": reference_rate,
+                    "current_items_per_second": measured_rate,
+                    "change": round(change, 4),
+                    "threshold": allowed,
+                }
+            )
+    return regressions
+
+
+__all__ = [
+    "BENCHMARK_SCHEMA_VERSION",
+    "BENCHMARK_STAGES",
+    "BenchmarkConfig",
+    "PipelineBenchmark",
+    "StageResult",
+    "StubDenseModel",
+    "StubSparseModel",
+    "build_synthetic_corpus",
+    "compare_results",
+    "write_synthetic_corpus",
+]
@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import hashlib
+import itertools
 import json
 import logging
 import time
@@ -10,7 +11,7 @@ from collections import defaultdict
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
 # Defensive import for psutil - optional dependency for memory monitoring
 try:
@@ -19,6 +20,7 @@ try:
 except ImportError:
     PSUTIL_AVAILABLE = False
 
+from processor.ultimate_embedder.chunk_store import is_chunk_store, iter_chunk_store
 from processor.ultimate_embedder.sparse_pipeline import (
     build_sparse_vector_from_metadata,
     infer_modal_hint,
@@ -168,6 +170,7 @@ class ChunkLoader:
         model_name: str,
         model_vector_dim: int,
         text_cache: Any = None,
+        preprocess_batch: Optional[Callable[[Sequence[str]], List[str]]] = None,
         device: str = "unknown",
         collection_name_hint: Optional[str] = None,
         single_collection_mode: Optional[bool] = None,
@@ -252,6 +255,7 @@ class ChunkLoader:
                 canonical_collection=canonical_collection,
                 priority=priority,
                 preprocess_text=preprocess_text,
+                preprocess_batch=preprocess_batch,
                 model_name=model_name,
                 model_vector_dim=model_vector_dim,
                 device=device,
@@ -397,20 +401,25 @@ class ChunkLoader:
             for entry in path.iterdir():
                 if entry.is_dir():
                     return True
-                if entry.suffix.lower() == ".json":
+                if entry.suffix.lower() in {".json", ".jsonl"}:
                     return True
         except Exception:
             return False
         return False
 
     def _collect_chunk_files(self, directory: Path) -> List[Path]:
-        patterns = ["*_chunks.json", "*chunks.json", "*.json"]
+        patterns = ["*_chunks.jsonl", "*_chunks.json", "*chunks.json", "*.json"]
         discovered: Dict[Path, None] = {}
         for pattern in patterns:
             for path in directory.rglob(pattern):
                 if path.is_file() and not self._is_summary_file(path):
                     discovered.setdefault(path, None)
-        return sorted(discovered.keys())
+        # A compact chunk store supersedes a legacy JSON export of the same document.
+        return sorted(
+            path
+            for path in discovered
+            if is_chunk_store(path) or path.with_suffix(".jsonl") not in discovered
+        )
 
     @staticmethod
     def _is_summary_file(path: Path) -> bool:
@@ -441,6 +450,7 @@ class ChunkLoader:
         modal_hint_distribution: defaultdict[str, int],
         results: Dict[str, Any],
         device: str,
+        preprocess_batch: Optional[Callable[[Sequence[str]], List[str]]] = None,
     ) -> int:
         chunk_count = 0
         processed_files = 0
@@ -491,38 +501,38 @@ class ChunkLoader:
                 flush=True,
             )
             
-            try:
-                with open(chunk_file, "r", encoding="utf-8") as handle:
-                    raw_chunks = json.load(handle)
-            except Exception as exc:
-                message = f"Error loading {chunk_file}: {exc}"
-                self.logger.error(message)
-                results["loading_errors"].append(message)
-                continue
+            file_chunks: Iterable[Dict[str, Any]]
+            if is_chunk_store(chunk_file):
+                # Stream the compact store; peek once so empty files are reported.
+                stream = self._stream_chunk_store(chunk_file, results)
+                first_chunk = next(stream, None)
+                file_chunks = itertools.chain([first_chunk], stream) if first_chunk is not None else []
+            else:
+                try:
+                    with open(chunk_file, "r", encoding="utf-8") as handle:
+                        raw_chunks = json.load(handle)
+                except Exception as exc:
+                    message = f"Error loading {chunk_file}: {exc}"
+                    self.logger.error(message)
+                    results["loading_errors"].append(message)
+                    continue
 
-            file_chunks = self._coerce_file_chunks(raw_chunks, chunk_file)
+                file_chunks = self._coerce_file_chunks(raw_chunks, chunk_file)
             if not file_chunks:
                 message = f"No usable chunks extracted from {chunk_file}"
                 self.logger.warning(message)
                 results["loading_errors"].append(message)
                 continue
 
-            for chunk_idx, chunk in enumerate(file_chunks, start=1):
+            chunk_stream = self._with_batch_preprocessing(file_chunks, preprocess_batch)
+            for chunk_idx, (chunk, original_text, token_count, skip_reason, batch_processed) in enumerate(
+                chunk_stream, start=1
+            ):
                 metadata = chunk.get("metadata", {}) or {}
-                original_text = chunk.get("text", "")
-                if not isinstance(original_text, str):
-                    original_text = str(original_text)
-
-                token_count_value = metadata.get("token_count")
-                if isinstance(token_count_value, (int, float)):
-                    token_count = int(token_count_value)
-                else:
-                    token_count = len(original_text.split())
-                    if token_count:
-                        metadata.setdefault("token_count", token_count)
+                if token_count and not isinstance(metadata.get("token_count"), (int, float)):
+                    metadata.setdefault("token_count", token_count)
 
-                viable, skip_reason = self._evaluate_chunk_viability(token_count, original_text)
-                if not viable:
+                if skip_reason is not None:
                     self._log_chunk_skip(
                         file_name=file_name,
                         chunk_idx=chunk_idx,
@@ -532,7 +542,7 @@ class ChunkLoader:
                     )
                     continue
 
-                processed_text = preprocess_text(original_text)
+                processed_text = batch_processed if batch_processed is not None else preprocess_text(original_text)
                 chunk_id = len(metadata_list)
                 hierarchy_path = metadata.get("hierarchy_path") or _build_hierarchy_path(metadata.get("section_path"))
 
@@ -708,6 +718,59 @@ class ChunkLoader:
 
         return chunk_count
 
+    @staticmethod
+    def _chunk_token_count(chunk: Dict[str, Any], text: str) -> int:
+        """Token count from chunk metadata, else a whitespace word estimate."""
+
+        token_count_value = (chunk.get("metadata", {}) or {}).get("token_count")
+        if isinstance(token_count_value, (int, float)):
+            return int(token_count_value)
+        return len(text.split())
+
+    def _with_batch_preprocessing(
+        self,
+        chunks: Iterable[Dict[str, Any]],
+        preprocess_batch: Optional[Callable[[Sequence[str]], List[str]]],
+        window: int = 4096,
+    ) -> Iterator[Tuple[Dict[str, Any], str, int, Optional[str], Optional[str]]]:
+        """Yield ``(chunk, text, token_count, skip_reason, processed)`` a window at a time.
+
+        Viability is checked first, so only chunks that survive it are batch
+        preprocessed; skipped chunks carry their reason and no processed text.
+        """
+
+        iterator = iter(chunks)
+        while True:
+            block = list(itertools.islice(iterator, window))
+            if not block:
+                return
+            texts = [
+                chunk.get("text", "") if isinstance(chunk.get("text", ""), str) else str(chunk.get("text"))
+                for chunk in block
+            ]
+            token_counts = [self._chunk_token_count(chunk, text) for chunk, text in zip(block, texts)]
+            skip_reasons = [
+                self._evaluate_chunk_viability(token_count, text)[1]
+                for token_count, text in zip(token_counts, texts)
+            ]
+            processed: List[Optional[str]] = [None] * len(texts)
+            if preprocess_batch is not None:
+                keep = [index for index, reason in enumerate(skip_reasons) if reason is None]
+                if keep:
+                    for index, value in zip(keep, preprocess_batch([texts[index] for index in keep])):
+                        processed[index] = value
+            yield from zip(block, texts, token_counts, skip_reasons, processed)
+
+    def _stream_chunk_store(self, chunk_file: Path, results: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """Yield chunks from a JSONL chunk store, recording a read error and stopping on bad input."""
+
+        try:
+            yield from iter_chunk_store(chunk_file)
+        except (OSError, ValueError) as exc:
+            message = f"Error loading {chunk_file}: {exc}"
+            self.logger.error(message)
+            results["loading_errors"].append(message)
+
     def _coerce_file_chunks(self, payload: Any, chunk_file: Path) -> List[Dict[str, Any]]:
         """Normalize arbitrary JSON payloads into chunk dictionaries."""
 
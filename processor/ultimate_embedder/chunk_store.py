@@ -0,0 +1,135 @@
+"""Compact JSONL chunk store shared by the chunkers and ``ChunkLoader``.
+
+Layout: one compact JSON object per line. A document header line carries the
+metadata every chunk of that document shares; each following chunk line holds
+its text plus only the metadata that differs from the header::
+
+    {"chunk_store": 1, "document": {"source_path": "...", "model": "...", ...}}
+    {"text": "...", "metadata": {"chunk_index": 0, "token_count": 412, ...}}
+    {"text": "...", "metadata": {"chunk_index": 1, "token_count": 388, ...}}
+
+A file may hold several documents; each header replaces the previous one.
+Readers merge ``{**document, **metadata}`` and stream line by line, so a file
+never has to be parsed as a whole.
+"""
+
+from __future__ import annotations
+
+import io
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Sequence, TextIO, Union
+
+CHUNK_STORE_VERSION = 1
+CHUNK_STORE_SUFFIX = "_chunks.jsonl"
+
+_HEADER_KEY = "chunk_store"
+_SEPARATORS = (",", ":")
+
+
+def split_shared_metadata(chunks: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+    """Metadata entries present with an identical value in every chunk."""
+
+    if not chunks:
+        return {}
+    first = chunks[0].get("metadata") or {}
+    shared: Dict[str, Any] = {}
+    for key, value in first.items():
+        if all(
+            key in (chunk.get("metadata") or {}) and (chunk.get("metadata") or {})[key] == value
+            for chunk in chunks[1:]
+        ):
+            shared[key] = value
+    return shared
+
+
+def _dumps(payload: Any) -> str:
+    return json.dumps(payload, ensure_ascii=False, separators=_SEPARATORS, default=_json_default)
+
+
+def _json_default(value: Any) -> Any:
+    # numpy scalars and arrays leak into chunk scores; ``item``/``tolist`` cover both.
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def write_document(handle: TextIO, chunks: Sequence[Dict[str, Any]]) -> None:
+    """Append one document (header + per-chunk deltas) to an open text handle."""
+
+    shared = split_shared_metadata(chunks)
+    handle.write(_dumps({_HEADER_KEY: CHUNK_STORE_VERSION, "document": shared}))
+    handle.write("\n")
+    for chunk in chunks:
+        metadata = chunk.get("metadata") or {}
+        record = {key: value for key, value in chunk.items() if key != "metadata"}
+        record["metadata"] = {key: value for key, value in metadata.items() if key not in shared}
+        handle.write(_dumps(record))
+        handle.write("\n")
+
+
+def dumps_chunk_store(documents: Iterable[Sequence[Dict[str, Any]]]) -> str:
+    """Serialise documents (each a list of chunks) to chunk-store text."""
+
+    buffer = io.StringIO()
+    for chunks in documents:
+        write_document(buffer, chunks)
+    return buffer.getvalue()
+
+
+def write_chunk_store(path: Union[str, Path], chunks: Sequence[Dict[str, Any]]) -> Path:
+    """Write one document's chunks to ``path`` in chunk-store format."""
+
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    with open(target, "w", encoding="utf-8") as handle:
+        write_document(handle, chunks)
+    return target
+
+
+def iter_chunk_store(path: Union[str, Path]) -> Iterator[Dict[str, Any]]:
+    """Stream ``{"text", "metadata", ...}`` chunk dicts back out of a chunk store.
+
+    Raises ``ValueError`` naming the line for malformed records.
+    """
+
+    document: Dict[str, Any] = {}
+    with open(path, "r", encoding="utf-8") as handle:
+        for line_number, line in enumerate(handle, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as exc:
+                raise ValueError(f"{path}:{line_number}: invalid chunk store record ({exc})") from exc
+            if not isinstance(record, dict):
+                raise ValueError(f"{path}:{line_number}: chunk store record is not an object")
+            if _HEADER_KEY in record:
+                version = record.get(_HEADER_KEY)
+                if not isinstance(version, int) or version > CHUNK_STORE_VERSION:
+                    raise ValueError(f"{path}:{line_number}: unsupported chunk store version {version!r}")
+                header = record.get("document")
+                document = dict(header) if isinstance(header, dict) else {}
+                continue
+            delta = record.get("metadata")
+            record["metadata"] = {**document, **delta} if isinstance(delta, dict) else dict(document)
+            yield record
+
+
+def is_chunk_store(path: Union[str, Path]) -> bool:
+    return str(path).lower().endswith(".jsonl")
+
+
+__all__ = [
+    "CHUNK_STORE_SUFFIX",
+    "CHUNK_STORE_VERSION",
+    "dumps_chunk_store",
+    "is_chunk_store",
+    "iter_chunk_store",
+    "split_shared_metadata",
+    "write_chunk_store",
+    "write_document",
+]
@@ -279,7 +279,17 @@ def load_sentence_transformers() -> Tuple[Any, Any, Any]:
     return cross_encoder_cls, sentence_transformer_cls, sparse_encoder_cls
 
 
-CrossEncoder, SentenceTransformer, SparseEncoder = load_sentence_transformers()
+_SENTENCE_TRANSFORMER_EXPORTS = ("CrossEncoder", "SentenceTransformer", "SparseEncoder")
+
+
+def __getattr__(name: str) -> Any:
+    """Import sentence-transformers (and run the sanitizer) on first class access."""
+
+    if name not in _SENTENCE_TRANSFORMER_EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    loaded = dict(zip(_SENTENCE_TRANSFORMER_EXPORTS, load_sentence_transformers()))
+    globals().update(loaded)
+    return loaded[name]
 
 
 def get_conflict_sanitizer_status() -> Tuple[Optional[bool], Optional[str]]:
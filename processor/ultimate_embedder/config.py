@@ -4,8 +4,10 @@ from __future__ import annotations
 
 import hashlib
 import os
+import sys
+from collections import OrderedDict
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional, Sequence
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 
 @dataclass
@@ -279,13 +281,32 @@ class KaggleExportConfig:
     export_faiss: bool = True
     export_pickle: bool = False
     export_sparse_jsonl: bool = True
-    compress_embeddings: bool = True
-    quantize_int8: bool = False
+    compress_embeddings: bool = False  # Float32 stores as zlib .npz (smaller download, not memory-mappable)
+    quantize_int8: bool = False  # Per-dimension int8 codes + scale/offset (4x smaller)
+    quantize_binary: bool = False  # Packed sign bits for coarse retrieval (32x smaller)
+    export_fp16: bool = False  # Half-precision copy (2x smaller)
+    # "flat" | "auto" | "ivf-flat" | "ivf-pq" | "hnsw" | any faiss.index_factory string.
+    # Exact "flat" by default; "auto" switches to IVF from 20k rows (approximate).
+    faiss_index_factory: str = "flat"
+    faiss_train_size: int = 100000
+    faiss_nprobe: int = 16
+    faiss_recall_k: int = 10
+    faiss_recall_queries: int = 200
+    # Opt-in indexed text/metadata store (<prefix>_docs.*) beside _texts.json and
+    # _metadata.json, which the upload script still reads. Compression: "auto" | "zstd" | "none".
+    export_doc_store: bool = False
+    doc_store_compression: str = "auto"
+    doc_store_block_records: int = 32
     include_full_metadata: bool = True
     include_processing_stats: bool = True
     include_model_info: bool = True
     working_dir: str = "/kaggle/working"
     output_prefix: str = "ultimate_embeddings_v4"
+    # Sharded, resumable dense runs: 0 keeps the single in-memory pass.
+    shard_size: int = 0
+    shard_dir: Optional[str] = None
+    shard_worker_index: int = 0
+    shard_worker_count: int = 1
 
     def get_output_path(self, suffix: str = "", collection_name: Optional[str] = None) -> str:
         base = f"{self.output_prefix}{suffix}"
@@ -336,8 +357,37 @@ class RerankingConfig:
     top_k_candidates: int = 100
     rerank_top_k: int = 20
     batch_size: int = 32
+    # Pair-score cache: ``cache_size`` bounds in-memory (query, chunk) entries;
+    # ``score_cache_path`` adds an on-disk SQLite copy shared across runs.
     enable_caching: bool = True
-    cache_size: int = 1000
+    cache_size: int = 50000
+    score_cache_path: Optional[str] = None
+    # Learned per-model peak bytes per token for token-budgeted rerank batches.
+    token_budget_path: Optional[str] = None
+    # Candidate retrieval: "rrf" or "weighted" fuse dense + sparse, "dense" disables sparse.
+    hybrid_fusion: str = "rrf"
+    rrf_k: int = 60
+    dense_weight: float = 1.0
+    sparse_weight: float = 1.0
+    # Exact dense search storage: "float32", "fp16" (half memory) or "int8" (quarter).
+    search_storage: str = "float32"
+
+
+@dataclass
+class ServingConfig:
+    """Async search service limits and request coalescing."""
+
+    host: str = "127.0.0.1"
+    port: int = 8080
+    # Requests executing at once; up to ``max_queue`` more wait before 503s.
+    max_concurrency: int = 64
+    max_queue: int = 256
+    # Coalescing window and cap for batched encode / dense / rerank stages.
+    batch_window_ms: float = 5.0
+    max_batch_size: int = 32
+    default_top_k: int = 10
+    rerank_candidates: int = 50
+    max_top_k: int = 1000
 
 
 @dataclass
@@ -349,39 +399,170 @@ class AdvancedPreprocessingConfig:
     remove_excessive_newlines: bool = True
     trim_long_sequences: bool = True
     enable_tokenizer_caching: bool = True
+    # Text cache entry cap (0 = bytes only), byte budget, and optional
+    # ``text_cache_path`` persisting entries across runs.
     max_cache_size: int = 10000
+    text_cache_max_mb: float = 256.0
+    text_cache_path: Optional[str] = None
     cache_hit_threshold: float = 0.8
     enable_memory_scaling: bool = True
     memory_scale_factor: float = 0.8
     adaptive_batch_sizing: bool = True
 
 
-class AdvancedTextCache:
-    """Intelligent text preprocessing cache."""
+# Rough per-entry bookkeeping cost of an OrderedDict slot plus the key string.
+_TEXT_CACHE_ENTRY_OVERHEAD = 120
+_TEXT_CACHE_FLUSH_EVERY = 512
+
+try:  # Optional fast non-cryptographic hash
+    import xxhash
+
+    def _fast_text_key(text: str) -> str:
+        return xxhash.xxh3_64_hexdigest(text.encode("utf-8"))
 
-    def __init__(self, max_size: int = 10000) -> None:
-        self.cache: Dict[str, str] = {}
+except ImportError:  # pragma: no cover - depends on optional package
+
+    def _fast_text_key(text: str) -> str:
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class AdvancedTextCache:
+    """Byte-bounded LRU cache of preprocessed texts, optionally persisted to SQLite.
+
+    Entry sizes are tracked incrementally, so ``get_stats`` is O(1). Texts that
+    preprocessing leaves unchanged are stored as a marker rather than a copy.
+    Entries are scoped to a namespace (the preprocessing settings); binding a
+    new namespace drops the in-memory entries.
+    """
+
+    def __init__(
+        self,
+        max_size: Optional[int] = None,
+        *,
+        max_bytes: int = 256 * 1024 * 1024,
+        path: Optional[str] = None,
+        namespace: str = "",
+    ) -> None:
+        self.cache: "OrderedDict[str, Optional[str]]" = OrderedDict()
         self.max_size = max_size
+        self.max_bytes = max(1, int(max_bytes))
+        self.namespace = namespace
         self.hit_count = 0
         self.miss_count = 0
+        self.eviction_count = 0
+        self._sizes: Dict[str, int] = {}
+        self._bytes = 0
+        self._pending: List[Tuple[str, str, Optional[str]]] = []
+        self._db: Any = None
+        if path:
+            import sqlite3
+
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                self._db = sqlite3.connect(path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS text_cache ("
+                    "namespace TEXT NOT NULL, key TEXT NOT NULL, processed TEXT, "
+                    "PRIMARY KEY (namespace, key))"
+                )
+                self._db.commit()
+            except sqlite3.Error:
+                self._db = None
 
     def _get_text_hash(self, text: str) -> str:
-        return hashlib.md5(text.encode("utf-8")).hexdigest()[:16]
+        return _fast_text_key(text)
+
+    def bind_namespace(self, namespace: str) -> None:
+        """Scope entries to ``namespace``; a different one invalidates memory entries."""
+
+        if namespace == self.namespace:
+            return
+        self.flush()
+        self.cache.clear()
+        self._sizes.clear()
+        self._bytes = 0
+        self.namespace = namespace
 
     def get_processed_text(self, text: str, processor_func) -> str:
         text_hash = self._get_text_hash(text)
-        if text_hash in self.cache:
-            self.hit_count += 1
-            return self.cache[text_hash]
+        cached = self._lookup(text_hash, text)
+        if cached is not None:
+            return cached
 
         processed = processor_func(text)
-        if len(self.cache) >= self.max_size:
-            oldest_key = next(iter(self.cache))
-            del self.cache[oldest_key]
+        self._store(text_hash, text, processed)
+        return processed
+
+    def get_processed_texts(self, texts: Sequence[str], batch_processor_func) -> List[str]:
+        """Batch variant: ``batch_processor_func`` receives only the cache misses."""
 
-        self.cache[text_hash] = processed
+        hashes = [self._get_text_hash(text) for text in texts]
+        results: List[Optional[str]] = [self._lookup(text_hash, text) for text_hash, text in zip(hashes, texts)]
+        misses = [idx for idx, value in enumerate(results) if value is None]
+        if misses:
+            processed = batch_processor_func([texts[idx] for idx in misses])
+            for idx, value in zip(misses, processed):
+                self._store(hashes[idx], texts[idx], value)
+                results[idx] = value
+        return results  # type: ignore[return-value]
+
+    def _lookup(self, text_hash: str, text: str) -> Optional[str]:
+        if text_hash in self.cache:
+            self.cache.move_to_end(text_hash)
+            self.hit_count += 1
+            stored = self.cache[text_hash]
+            return text if stored is None else stored
+
+        if self._db is not None:
+            row = self._db.execute(
+                "SELECT processed FROM text_cache WHERE namespace = ? AND key = ?",
+                (self.namespace, text_hash),
+            ).fetchone()
+            if row is not None:
+                self.hit_count += 1
+                self._remember(text_hash, row[0])
+                return text if row[0] is None else row[0]
+        return None
+
+    def _store(self, text_hash: str, text: str, processed: str) -> None:
+        stored = None if processed == text else processed
+        self._remember(text_hash, stored)
+        if self._db is not None:
+            self._pending.append((self.namespace, text_hash, stored))
+            if len(self._pending) >= _TEXT_CACHE_FLUSH_EVERY:
+                self.flush()
         self.miss_count += 1
-        return processed
+
+    def flush(self) -> None:
+        """Write pending entries to the backing file, if any."""
+
+        if self._db is None or not self._pending:
+            return
+        with self._db:
+            self._db.executemany("INSERT OR REPLACE INTO text_cache VALUES (?, ?, ?)", self._pending)
+        self._pending.clear()
+
+    def close(self) -> None:
+        self.flush()
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _remember(self, text_hash: str, stored: Optional[str]) -> None:
+        previous = self._sizes.pop(text_hash, None)
+        if previous is not None:
+            self._bytes -= previous
+        size = _TEXT_CACHE_ENTRY_OVERHEAD + (sys.getsizeof(stored) if stored is not None else 0)
+        self.cache[text_hash] = stored
+        self.cache.move_to_end(text_hash)
+        self._sizes[text_hash] = size
+        self._bytes += size
+        while self.cache and (
+            self._bytes > self.max_bytes or (self.max_size is not None and len(self.cache) > self.max_size)
+        ):
+            evicted, _ = self.cache.popitem(last=False)
+            self._bytes -= self._sizes.pop(evicted)
+            self.eviction_count += 1
 
     def get_stats(self) -> Dict[str, Any]:
         total = self.hit_count + self.miss_count
@@ -391,7 +572,10 @@ class AdvancedTextCache:
             "hit_count": self.hit_count,
             "miss_count": self.miss_count,
             "hit_rate": hit_rate,
-            "memory_mb": len(str(self.cache).encode("utf-8")) / 1024 / 1024,
+            "memory_mb": self._bytes / 1024 / 1024,
+            "max_memory_mb": self.max_bytes / 1024 / 1024,
+            "eviction_count": self.eviction_count,
+            "persistent": self._db is not None,
         }
 
 
@@ -4,7 +4,7 @@ from __future__ import annotations
 
 import time
 from dataclasses import dataclass, field
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Sequence
 
 try:  # Optional dependency handling mirrors legacy module behaviour.
     import torch
@@ -187,4 +187,17 @@ def collect_gpu_snapshots(device: str, device_count: int) -> Dict[int, GPUMemory
     return snapshots
 
 
-__all__ = ["GPUMemorySnapshot", "AdaptiveBatchController", "collect_gpu_snapshots"]
+def lease_snapshots(
+    snapshots: Dict[int, GPUMemorySnapshot],
+    device_ids: Sequence[int],
+) -> Dict[int, GPUMemorySnapshot]:
+    """Snapshots of the leased devices only, re-indexed so slot 0 is the first lease."""
+
+    return {
+        slot: snapshots[device_id]
+        for slot, device_id in enumerate(device_ids)
+        if device_id in snapshots
+    }
+
+
+__all__ = ["GPUMemorySnapshot", "AdaptiveBatchController", "collect_gpu_snapshots", "lease_snapshots"]
@@ -153,7 +153,6 @@ _PROTOBUF_COMPAT_PATCH_TARGETS = _apply_protobuf_messagefactory_shim()
 import gc
 import inspect
 import logging
-import re
 import time
 from collections import Counter, defaultdict
 from datetime import datetime
@@ -195,8 +194,6 @@ if TYPE_CHECKING:  # pragma: no cover - typing only
 else:
     CrossEncoder, SentenceTransformer, SparseEncoder = load_sentence_transformers()
 
-from sklearn.metrics.pairwise import cosine_similarity
-
 # Advanced optimization libraries (optional on Kaggle)
 _ORT_IMPORT_ERROR: Optional[str] = None
 try:
@@ -291,20 +288,30 @@ if TYPE_CHECKING:
 
 
 # Module extractions
+from processor.ultimate_embedder.batch_profiler import BatchProfiler
+from processor.ultimate_embedder.hybrid_retrieval import (
+    build_query_terms,
+    get_hybrid_retriever,
+    resolve_sparse_query_model,
+)
 from processor.ultimate_embedder.batch_runner import BatchRunner
 from processor.ultimate_embedder.progress import BatchProgressContext
 from processor.ultimate_embedder.chunk_loader import ChunkLoader
+from processor.ultimate_embedder.pre_encode import resolve_tokenizer, tokenizer_family
 from processor.ultimate_embedder.controllers import (
     AdaptiveBatchController,
     GPUMemorySnapshot,
     collect_gpu_snapshots,
 )
+from processor.ultimate_embedder.exact_search import ExactSearchIndex, SearchIndexCache
 from processor.ultimate_embedder.export_runtime import ExportRuntime
 from processor.ultimate_embedder.model_manager import ModelManager, ONNX_AVAILABLE
 from processor.ultimate_embedder.monitoring import PerformanceMonitor
 from processor.ultimate_embedder.prometheus_metrics import create_prometheus_emitter, PrometheusMetricsEmitter
+from processor.ultimate_embedder.query_encoder import QueryEncoder
 from processor.ultimate_embedder.rerank_pipeline import RerankPipeline, create_reranker_from_spec
 from processor.ultimate_embedder.telemetry import TelemetryTracker, resolve_rotation_payload_limit
+from processor.ultimate_embedder.text_preprocessing import preprocess_texts
 from processor.ultimate_embedder.throughput_monitor import ThroughputMonitor
 from processor.ultimate_embedder.config import (
     AdvancedPreprocessingConfig,
@@ -343,6 +350,9 @@ from processor.ultimate_embedder.backend_encoder import encode_with_backend
 
 CPU_DENSE_FALLBACK_PRIMARY = "qwen3-embedding-0.6b"
 CPU_DENSE_FALLBACK_ENSEMBLE = ["nomic-coderank", "all-miniLM-l6"]
+# Queries scored against the corpus per block in multi-query reranking; bounds
+# the dense similarity matrix at block x corpus floats.
+GROUPED_RERANK_QUERY_BLOCK = 256
 
 
 
@@ -562,7 +572,15 @@ class UltimateKaggleEmbedderV4:
 
         self._auto_select_backend()
 
-        self.text_cache = AdvancedTextCache() if self.preprocessing_config.enable_text_caching else None
+        self.text_cache = (
+            AdvancedTextCache(
+                max_size=self.preprocessing_config.max_cache_size or None,
+                max_bytes=int(self.preprocessing_config.text_cache_max_mb * 1024 * 1024),
+                path=self.preprocessing_config.text_cache_path,
+            )
+            if self.preprocessing_config.enable_text_caching
+            else None
+        )
 
         self.models: Dict[str, Any] = {}
         self.primary_model: Optional[SentenceTransformer] = None
@@ -633,6 +651,7 @@ class UltimateKaggleEmbedderV4:
         self.prometheus_emitter = create_prometheus_emitter(
             logger_instance=logger,
         )
+        self.batch_profiler = BatchProfiler.from_env(logger)
 
         self.model_manager = ModelManager(self, logger)
         self.chunk_loader = ChunkLoader(
@@ -647,6 +666,11 @@ class UltimateKaggleEmbedderV4:
         self.cross_encoder_executor: Optional[Any] = None
         if self.reranking_config.enable_reranking:
             from processor.ultimate_embedder.cross_encoder_executor import CrossEncoderBatchExecutor
+            if self.reranking_config.token_budget_path is None:
+                # Learned rerank token budgets live beside the model cache so they survive runs.
+                self.reranking_config.token_budget_path = str(
+                    self.hf_cache_root / "ultimate_embedder" / "rerank_token_budgets.json"
+                )
             self.cross_encoder_executor = CrossEncoderBatchExecutor(
                 config=self.reranking_config,
                 gpu_config=self.gpu_config,
@@ -770,6 +794,30 @@ class UltimateKaggleEmbedderV4:
             raise RuntimeError("Embeddings have not been generated yet")
         return self.embeddings
 
+    def _get_query_encoder(self) -> QueryEncoder:
+        """Cached query encoder bound to the current primary model and its query prefix."""
+        # Unwrap all wrappers (torch.compile + DataParallel)
+        encode_model = self._unwrap_model(self._get_primary_model())
+        encoder = getattr(self, "_query_encoder", None)
+        if encoder is None:
+            encoder = QueryEncoder.from_env(logger=logger)
+            self._query_encoder = encoder
+        encoder.bind_model(
+            encode_model,
+            model_id=self.model_config.hf_model_id,
+            query_prefix=self.model_config.query_prefix,
+            device=self.device,
+        )
+        return encoder
+
+    def _exact_search_index(self) -> ExactSearchIndex:
+        """Brute-force search index over the current embeddings, rebuilt when they change."""
+        storage = getattr(self.reranking_config, "search_storage", "float32")
+        cache = getattr(self, "_search_index", None)
+        if cache is None:
+            cache = self._search_index = SearchIndexCache()
+        return cache.get(self._require_embeddings(), storage)
+
     def _record_mitigation(self, event_type: str, **details: Any) -> None:
         """Track mitigation events for telemetry and diagnostics."""
         if hasattr(self, "telemetry"):
@@ -1095,11 +1143,15 @@ class UltimateKaggleEmbedderV4:
                 "device": device,
             }
 
+        # Profiled batches run encode() under stage-timing hooks; the runner's own bar tracks them.
+        profiler = getattr(self, "batch_profiler", None)
+        profiling = profiler is not None and profiler.recording and not is_sparse_encoder
+
         # Always use rich progress for SentenceTransformer models (more reliable than tqdm_kwargs)
         # Note: We skip tqdm_kwargs check entirely to avoid compatibility issues
         rich_progress = None
         rich_task = None
-        if show_progress and progress_context:
+        if show_progress and progress_context and not profiling:
             try:
                 from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn, TimeRemainingColumn
                 desc = progress_context.tqdm_description()
@@ -1130,8 +1182,15 @@ class UltimateKaggleEmbedderV4:
                 rich_progress = None
 
         try:
+            if profiling:
+                result = profiler.profiled_encode(
+                    model,
+                    texts,
+                    batch_size=batch_size,
+                    device=device,
+                )
             # For models without tqdm_kwargs support, batch manually with rich progress
-            if rich_progress is not None and rich_task is not None:
+            elif rich_progress is not None and rich_task is not None:
                 result_batches = []
                 for i in range(0, len(texts), batch_size):
                     batch_texts = texts[i:i + batch_size]
@@ -1427,19 +1486,6 @@ class UltimateKaggleEmbedderV4:
         if self.gpu_config.precision == "fp16" and self.device == "cuda":
             model = model.half()
 
-        if (
-            self.ensemble_config
-            and self.ensemble_config.sequential_data_parallel
-            and self.device == "cuda"
-            and self.device_count > 1
-            and not isinstance(model, torch.nn.DataParallel)
-        ):
-            try:
-                model = torch.nn.DataParallel(model)
-                self._record_mitigation("ensemble_data_parallel_wrapped", model=model_name)
-            except Exception as exc:
-                logger.warning("Failed to wrap %s with DataParallel: %s", model_name, exc)
-
         self.models[model_name] = model
         self._record_model_dtype(model_name, model)
         return model
@@ -1975,28 +2021,26 @@ class UltimateKaggleEmbedderV4:
         
         if self.embeddings is None:
             raise ValueError("No embeddings available. Generate embeddings first.")
-        embeddings = self._require_embeddings()
         
         if not self.reranking_config.enable_reranking or not self.reranker:
             logger.warning("Reranking not enabled, falling back to embedding similarity")
             return self._embedding_only_search(query, top_k)
         
         # Step 1: Generate query embedding
-        primary_model = self._get_primary_model()
-        # Unwrap all wrappers (torch.compile + DataParallel)
-        encode_model = self._unwrap_model(primary_model)
-        query_embedding = encode_model.encode(
-            [query],
-            convert_to_numpy=True,
-            normalize_embeddings=True,
-            device=self.device
-        )[0]
+        query_embedding = self._get_query_encoder().encode(query)
         
-        # Step 2: Initial retrieval with embedding similarity
-        similarities = cosine_similarity(np.array([query_embedding]), embeddings)[0]
-        
-        # Get top candidates for reranking
-        top_indices = np.argsort(similarities)[::-1][:initial_candidates]
+        # Step 2: Initial top-k retrieval by embedding similarity, fusing sparse hits when sparse vectors exist
+        retriever = get_hybrid_retriever(self)
+        query_terms = (
+            build_query_terms(query, resolve_sparse_query_model(self), logger)
+            if retriever.sparse_enabled
+            else None
+        )
+        pool = retriever.retrieve_from_index(
+            self._exact_search_index(), query_embedding, [query_terms], initial_candidates
+        )[0]
+        top_indices = pool.indices
+        similarities = dict(zip(pool.indices, pool.dense_scores))
         
         # Step 3: Prepare candidate data for reranking
         candidate_ids = [str(idx) for idx in top_indices if idx < len(self.chunk_texts)]
@@ -2077,12 +2121,111 @@ class UltimateKaggleEmbedderV4:
             logger.error(f"Reranking failed: {e}")
             return self._embedding_only_search(query, top_k)
     
+    def search_many_with_reranking(
+        self,
+        queries: Sequence[str],
+        top_k: int = 20,
+        initial_candidates: int = 100,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Rerank many queries at once, e.g. for evaluation sweeps.
+
+        Queries are encoded and scored against the corpus a block at a time, and
+        each block's candidate pools go to ``execute_rerank_groups`` so the
+        candidates of several queries share reranker calls.
+
+        Args:
+            queries: Search queries
+            top_k: Final number of results per query
+            initial_candidates: Initial retrieval candidates per query
+
+        Returns:
+            One ``search_with_reranking``-style result list per query, in input order
+        """
+
+        if self.embeddings is None:
+            raise ValueError("No embeddings available. Generate embeddings first.")
+        if not queries:
+            return []
+
+        executor = self.cross_encoder_executor
+        if not self.reranking_config.enable_reranking or not self.reranker or not executor:
+            logger.warning("Grouped reranking not available, falling back to embedding similarity")
+            return [self._embedding_only_search(query, top_k) for query in queries]
+
+        from processor.ultimate_embedder.cross_encoder_executor import RerankGroup
+
+        encoder = self._get_query_encoder()
+        index = self._exact_search_index()
+        retriever = get_hybrid_retriever(self)
+        sparse_model = resolve_sparse_query_model(self) if retriever.sparse_enabled else None
+
+        results: List[List[Dict[str, Any]]] = []
+        latency_ms = 0.0
+        gpu_peak_gb = 0.0
+        for start in range(0, len(queries), GROUPED_RERANK_QUERY_BLOCK):
+            block = list(queries[start:start + GROUPED_RERANK_QUERY_BLOCK])
+            query_terms = [
+                build_query_terms(query, sparse_model, logger) if retriever.sparse_enabled else None
+                for query in block
+            ]
+            pools = retriever.retrieve_from_index(index, encoder.encode_many(block), query_terms, initial_candidates)
+            similarities = [dict(zip(pool.indices, pool.dense_scores)) for pool in pools]
+
+            groups: List[RerankGroup] = []
+            for row, query in enumerate(block):
+                valid = [int(idx) for idx in pools[row].indices if idx < len(self.chunk_texts)]
+                groups.append(
+                    RerankGroup(
+                        query=query,
+                        candidate_ids=[str(idx) for idx in valid],
+                        candidate_texts=[self.chunk_texts[idx] for idx in valid],
+                    )
+                )
+
+            try:
+                runs = executor.execute_rerank_groups(groups, top_k=top_k)
+            except Exception as e:
+                logger.error(f"Grouped reranking failed: {e}")
+                results.extend(self._embedding_only_search(query, top_k) for query in block)
+                continue
+
+            for row, run in enumerate(runs):
+                latency_ms += run.latency_ms
+                gpu_peak_gb = max(gpu_peak_gb, run.gpu_peak_gb)
+                query_results = []
+                for rank, (cand_id, score) in enumerate(zip(run.candidate_ids, run.scores)):
+                    result = self._build_rerank_result(
+                        rank=rank,
+                        score=score,
+                        original_idx=int(cand_id),
+                        similarities=similarities[row],
+                    )
+                    if result is not None:
+                        query_results.append(result)
+                results.append(query_results)
+
+        self._emit_metrics_for_stage(
+            "rerank",
+            active=True,
+            reason="Grouped query-time reranking executed via CrossEncoderBatchExecutor",
+            details={
+                "latency_seconds": latency_ms / 1000.0,
+                "gpu_peak_gb": gpu_peak_gb,
+                "queries": len(queries),
+                "model": self.reranking_config.model_name,
+                "device": getattr(executor.rerank_pipeline, "device", "cpu"),
+            },
+        )
+        logger.info(f"Grouped reranking complete: {len(queries)} queries, latency: {latency_ms:.1f}ms")
+        return results
+
     def _build_rerank_result(
         self,
         rank: int,
         score: float,
         original_idx: int,
-        similarities: Sequence[float],
+        similarities: Mapping[int, float],
     ) -> Optional[Dict[str, Any]]:
         """
         Build a single reranking result dictionary.
@@ -2091,7 +2234,7 @@ class UltimateKaggleEmbedderV4:
             rank: Zero-based rank in reranked results
             score: Reranking score from CrossEncoder
             original_idx: Index into chunk_texts/chunks_metadata/embeddings
-            similarities: Array of embedding similarity scores
+            similarities: Embedding similarity score per candidate index
             
         Returns:
             Result dictionary with rank, scores, text, metadata, and chunk_id.
@@ -2100,7 +2243,7 @@ class UltimateKaggleEmbedderV4:
         # Validate index bounds
         if original_idx is None or original_idx < 0:
             return None
-        if original_idx >= len(similarities):
+        if original_idx not in similarities:
             return None
         if original_idx >= len(self.chunk_texts):
             return None
@@ -2119,25 +2262,15 @@ class UltimateKaggleEmbedderV4:
     def _embedding_only_search(self, query: str, top_k: int) -> List[Dict[str, Any]]:
         """Fallback search using only embedding similarity"""
         
-        primary_model = self._get_primary_model()
-        # Unwrap all wrappers (torch.compile + DataParallel)
-        encode_model = self._unwrap_model(primary_model)
-        query_embedding = encode_model.encode(
-            [query],
-            convert_to_numpy=True,
-            normalize_embeddings=True,
-            device=self.device
-        )[0]
+        query_embedding = self._get_query_encoder().encode(query)
         
-        embeddings = self._require_embeddings()
-        similarities = cosine_similarity(np.array([query_embedding]), embeddings)[0]
-        top_indices = np.argsort(similarities)[::-1][:top_k]
+        top_indices, top_scores = self._exact_search_index().search(query_embedding, top_k)
         
         results = []
-        for rank, idx in enumerate(top_indices):
+        for rank, (idx, score) in enumerate(zip(top_indices.tolist(), top_scores.tolist())):
             result = {
                 "rank": rank + 1,
-                "score": float(similarities[idx]),
+                "score": float(score),
                 "text": self.chunk_texts[idx],
                 "metadata": self.chunks_metadata[idx],
                 "chunk_id": idx
@@ -2190,13 +2323,8 @@ class UltimateKaggleEmbedderV4:
         if self.device_count > 1:
             logger.info(f"Setting up multi-GPU processing ({self.device_count} GPUs)")
             if self.gpu_config.strategy == "data_parallel":
-                logger.info(f"📦 Applying DataParallel wrapper to {type(model).__name__}")
-                logger.info(f"   → Model before wrap has encode(): {hasattr(model, 'encode')}")
-                model = torch.nn.DataParallel(model)
-                logger.info(f"   → Model after wrap type: {type(model).__name__}")
-                logger.info(f"   → Wrapped model has encode(): {hasattr(model, 'encode')}")
-                logger.info(f"   → Wrapped model.module has encode(): {hasattr(model.module, 'encode')}")
-                logger.info("✅ Data parallel enabled")
+                # DataParallel only splits forward(); encode() would still run on one GPU.
+                logger.info("✅ Data parallel enabled via per-device encode replicas")
         
         # PyTorch 2.0 compilation (if available)
         if self.gpu_config.enable_torch_compile and hasattr(torch, 'compile'):
@@ -2257,21 +2385,56 @@ class UltimateKaggleEmbedderV4:
 
         return self.text_cache.get_processed_text(text, self._preprocess_text_core)
 
+    def _preprocessing_fingerprint(self) -> str:
+        """Settings that determine preprocessing output; scopes cached texts."""
+
+        config = self.preprocessing_config
+        tokenizer, max_length = self._preprocessing_tokenizer()
+        return "|".join(
+            str(value)
+            for value in (
+                config.normalize_whitespace,
+                config.remove_excessive_newlines,
+                config.trim_long_sequences,
+                self.model_config.max_tokens,
+                tokenizer_family(tokenizer, max_length) if tokenizer is not None else "chars",
+            )
+        )
+
+    def preprocess_texts_batch(self, texts: Sequence[str]) -> List[str]:
+        """Preprocess many texts in one pass, reusing cached results where possible."""
+
+        if not self.preprocessing_config.enable_text_caching or not self.text_cache:
+            return self._preprocess_texts_core(texts)
+
+        return self.text_cache.get_processed_texts(texts, self._preprocess_texts_core)
+
     def _preprocess_text_core(self, text: str) -> str:
         """Core normalization pipeline shared across preprocessing modes."""
 
-        if self.preprocessing_config.normalize_whitespace:
-            text = " ".join(text.split())
+        return self._preprocess_texts_core([text])[0]
 
-        if self.preprocessing_config.remove_excessive_newlines:
-            text = re.sub(r"\n{3,}", "\n\n", text)
+    def _preprocess_texts_core(self, texts: Sequence[str]) -> List[str]:
+        """Normalise then truncate ``texts`` at the primary model's real token limit."""
 
-        if self.preprocessing_config.trim_long_sequences:
-            max_chars = self.model_config.max_tokens * 4
-            if len(text) > max_chars:
-                text = f"{text[:max_chars]}..."
+        config = self.preprocessing_config
+        tokenizer, max_length = self._preprocessing_tokenizer() if config.trim_long_sequences else (None, None)
+        return preprocess_texts(
+            texts,
+            config=config,
+            max_tokens=self.model_config.max_tokens,
+            tokenizer=tokenizer,
+            max_length=max_length,
+            logger=logger,
+        )
 
-        return text
+    def _preprocessing_tokenizer(self) -> Tuple[Optional[Any], Optional[int]]:
+        """Tokenizer of the already-loaded primary model; never triggers a load."""
+
+        model = self.primary_model
+        if model is None:
+            return None, None
+        return resolve_tokenizer(self._unwrap_model(model))
     
     def load_chunks_from_processing(
         self,
@@ -2282,9 +2445,13 @@ class UltimateKaggleEmbedderV4:
     ) -> Dict[str, Any]:
         """Load processed chunks via the delegated chunk loader."""
 
+        if self.text_cache is not None:
+            self.text_cache.bind_namespace(self._preprocessing_fingerprint())
+
         result = self.chunk_loader.load(
             chunks_dir,
             preprocess_text=self.preprocess_text_advanced,
+            preprocess_batch=self.preprocess_texts_batch,
             model_name=self.model_name,
             model_vector_dim=self.model_config.vector_dim,
             text_cache=self.text_cache,
@@ -2293,6 +2460,9 @@ class UltimateKaggleEmbedderV4:
             single_collection_mode=single_collection_mode,
         )
 
+        if self.text_cache is not None:
+            self.text_cache.flush()
+
         self.chunks_metadata = result.metadata
         self.chunk_texts = result.processed_texts
         self.raw_chunk_texts = result.raw_texts
@@ -2666,8 +2836,15 @@ class UltimateKaggleEmbedderV4:
                         "candidate_ids": list(rerank_run.candidate_ids),
                         "scores": list(rerank_run.scores),
                         "result_count": len(rerank_run.candidate_ids),
+                        "cache_hits": rerank_run.cache_hits,
+                        "cache_misses": rerank_run.cache_misses,
+                        "cache_hit_rate": rerank_run.cache_hit_rate,
                     }
                 )
+            score_cache = getattr(self.cross_encoder_executor, "score_cache", None)
+            cache_stats = score_cache.stats() if score_cache is not None else None
+            if isinstance(cache_stats, dict):
+                rerank_stage["score_cache"] = cache_stats
             rerank_stage.setdefault("fallback_count", self.rerank_fallback_count)
             if self.rerank_fallback_reason:
                 rerank_stage.setdefault("fallback_reason", self.rerank_fallback_reason)
@@ -2681,6 +2858,11 @@ class UltimateKaggleEmbedderV4:
                 dense_scores = fused_candidates.get("dense_scores")
                 if isinstance(dense_scores, list) and dense_scores:
                     rerank_stage["dense_scores"] = [float(score) for score in dense_scores]
+                if fused_candidates.get("fusion"):
+                    rerank_stage["candidate_fusion"] = {
+                        "mode": fused_candidates["fusion"],
+                        "sparse_only_hits": int(fused_candidates.get("sparse_only_hits", 0)),
+                    }
                 reranked_metadata = fused_candidates.get("reranked_metadata")
                 if reranked_metadata:
                     rerank_stage["candidate_metadata"] = list(reranked_metadata)
@@ -2951,6 +3133,14 @@ class UltimateKaggleEmbedderV4:
                     gpu_section["peak_memory_used_gb"] = peak_from_history
             summary["performance_baseline"] = performance_baseline
 
+        batch_profiler = getattr(self, "batch_profiler", None)
+        batch_profile = batch_profiler.summarize() if batch_profiler is not None else {}
+        if batch_profile:
+            summary["batch_profile"] = batch_profile
+
+        if isinstance(dense_run, Mapping) and isinstance(dense_run.get("pre_encode"), Mapping):
+            summary["pre_encode"] = dict(dense_run["pre_encode"])
+
         self.last_processing_summary = summary
         return summary
 
@@ -2994,7 +3184,10 @@ class UltimateKaggleEmbedderV4:
         matrix: np.ndarray,
         expected_dim: Optional[int] = None,
     ) -> Tuple[np.ndarray, bool]:
-        """Ensure embeddings align with the configured vector dimension."""
+        """Ensure embeddings align with the configured vector dimension.
+
+        Trimmed rows are renormalised so cosine scores stay plain dot products.
+        """
 
         expected_dim = expected_dim or self.model_config.vector_dim
         actual_dim = matrix.shape[1]
@@ -3013,7 +3206,9 @@ class UltimateKaggleEmbedderV4:
             actual_dim,
             expected_dim,
         )
-        return matrix[:, :expected_dim], True
+        trimmed = np.asarray(matrix[:, :expected_dim], dtype=np.float32)
+        norms = np.linalg.norm(trimmed, axis=1, keepdims=True)
+        return trimmed / np.where(norms > 0, norms, 1.0), True
     
     def export_for_local_qdrant(self) -> Dict[str, str]:
         """Export embeddings in formats optimized for local Qdrant upload."""
@@ -3061,6 +3256,7 @@ class UltimateKaggleEmbedderV4:
         """Start performance monitoring for Kaggle environment."""
 
         self.performance_monitor.start()
+        self.prometheus_emitter.start_http_server()
         self.monitoring_active = True
         self.monitor_thread = None
 
@@ -3068,6 +3264,7 @@ class UltimateKaggleEmbedderV4:
         """Stop performance monitoring."""
 
         self.performance_monitor.stop()
+        self.prometheus_emitter.stop_http_server()
         self.monitoring_active = False
         self.monitor_thread = None
 
@@ -0,0 +1,272 @@
+"""Multi-process data-parallel dense encoding for CPU-only hosts.
+
+A single process leaves most cores of a large CPU box idle: torch intra-op
+threading stops scaling long before 96 cores. ``CpuEncodePool`` runs N spawn
+workers, each pinned to its own core subset with ``torch.set_num_threads``
+matched to it. Model weights are moved to shared memory once
+(``share_memory()``) so workers map the same pages instead of holding copies.
+Work is fed through one queue of length-sorted batches, longest first, and
+every worker writes its rows straight into a shared-memory output matrix.
+
+Configured through the environment:
+
+* ``EMBEDDER_CPU_WORKERS``: worker count (``0``/``1`` disables; default is
+  usable cores // threads per worker).
+* ``EMBEDDER_CPU_THREADS_PER_WORKER``: cores per worker (default 4).
+* ``EMBEDDER_CPU_WORKER_BATCH``: texts per queued batch (default 16).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import queue
+import traceback
+from multiprocessing import shared_memory
+from typing import Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+import torch
+import torch.multiprocessing as torch_mp
+
+_DEFAULT_THREADS_PER_WORKER = 4
+_DEFAULT_WORKER_BATCH = 16
+# Batches queued per worker per dispatch; keeps every worker busy while the
+# longest batches drain.
+_BATCHES_PER_WORKER = 4
+_RESULT_POLL_SECONDS = 5.0
+
+
+def _env_int(name: str) -> Optional[int]:
+    raw = os.environ.get(name, "").strip()
+    if not raw:
+        return None
+    try:
+        return int(raw)
+    except ValueError:
+        return None
+
+
+def _available_cores() -> List[int]:
+    if hasattr(os, "sched_getaffinity"):
+        try:
+            return sorted(os.sched_getaffinity(0))
+        except OSError:
+            pass
+    return list(range(os.cpu_count() or 1))
+
+
+def plan_core_groups(cores: Sequence[int], workers: int, threads_per_worker: int) -> List[List[int]]:
+    """Split ``cores`` into ``workers`` contiguous, non-overlapping groups."""
+
+    cores = list(cores)
+    workers = max(1, min(workers, len(cores) or 1))
+    per_worker = max(1, min(threads_per_worker, len(cores) // workers or 1))
+    return [cores[index * per_worker:(index + 1) * per_worker] or cores[:1] for index in range(workers)]
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # type: ignore[call-arg]
+    except TypeError:  # Python < 3.13 has no ``track``
+        return shared_memory.SharedMemory(name=name)
+
+
+def _worker_main(
+    model: Any,
+    cores: List[int],
+    task_queue: Any,
+    result_queue: Any,
+) -> None:
+    if cores and hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(0, cores)
+        except OSError:
+            pass
+    torch.set_num_threads(max(1, len(cores)))
+
+    attached: Optional[shared_memory.SharedMemory] = None
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+        task_id, shm_name, shape, indices, texts = task
+        try:
+            if attached is None or attached.name != shm_name:
+                if attached is not None:
+                    attached.close()
+                attached = _attach(shm_name)
+            output = np.ndarray(shape, dtype=np.float32, buffer=attached.buf)
+            with torch.inference_mode():
+                embeddings = model.encode(
+                    list(texts),
+                    batch_size=len(texts),
+                    show_progress_bar=False,
+                    convert_to_numpy=True,
+                    normalize_embeddings=True,
+                    device="cpu",
+                )
+            output[np.asarray(indices)] = np.asarray(embeddings, dtype=np.float32)[:, : shape[1]]
+            del output
+            result_queue.put((task_id, None))
+        except Exception:
+            result_queue.put((task_id, traceback.format_exc()))
+    if attached is not None:
+        attached.close()
+
+
+class CpuEncodePool:
+    """Spawned CPU workers sharing one model's weights and one output matrix."""
+
+    def __init__(
+        self,
+        model: Any,
+        *,
+        workers: int,
+        threads_per_worker: int = _DEFAULT_THREADS_PER_WORKER,
+        worker_batch: int = _DEFAULT_WORKER_BATCH,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        self.logger = logger or logging.getLogger(__name__)
+        self.worker_batch = max(1, int(worker_batch))
+        self.core_groups = plan_core_groups(_available_cores(), workers, threads_per_worker)
+        self.dimension = self._probe_dimension(model)
+
+        if hasattr(model, "to"):
+            model = model.to("cpu")
+        if hasattr(model, "share_memory"):
+            model.share_memory()
+
+        context = torch_mp.get_context("spawn")
+        self._task_queue = context.Queue()
+        self._result_queue = context.Queue()
+        self._processes = []
+        self._next_task = 0
+        try:
+            for cores in self.core_groups:
+                process = context.Process(
+                    target=_worker_main,
+                    args=(model, cores, self._task_queue, self._result_queue),
+                    daemon=True,
+                )
+                process.start()
+                self._processes.append(process)
+        except Exception:
+            self.close()
+            raise
+
+    @classmethod
+    def from_env(
+        cls,
+        model: Any,
+        logger: Optional[logging.Logger] = None,
+        *,
+        total_texts: Optional[int] = None,
+    ) -> Optional["CpuEncodePool"]:
+        """Start a pool when the host has cores to spare, else ``None``.
+
+        Small corpora (fewer than one batch per worker) stay in-process, where
+        spawning workers would cost more than it saves.
+        """
+
+        log = logger or logging.getLogger(__name__)
+        threads = max(1, _env_int("EMBEDDER_CPU_THREADS_PER_WORKER") or _DEFAULT_THREADS_PER_WORKER)
+        workers = _env_int("EMBEDDER_CPU_WORKERS")
+        if workers is None:
+            workers = len(_available_cores()) // threads
+        worker_batch = max(1, _env_int("EMBEDDER_CPU_WORKER_BATCH") or _DEFAULT_WORKER_BATCH)
+        if workers < 2 or (total_texts is not None and total_texts < workers * worker_batch):
+            return None
+
+        try:
+            pool = cls(
+                model,
+                workers=workers,
+                threads_per_worker=threads,
+                worker_batch=worker_batch,
+                logger=log,
+            )
+        except Exception as exc:
+            log.warning("CPU worker pool unavailable, encoding in-process: %s", exc)
+            return None
+        log.info(
+            "CPU worker pool: %d workers x %d threads (batch %d)",
+            len(pool.core_groups),
+            len(pool.core_groups[0]),
+            pool.worker_batch,
+        )
+        return pool
+
+    @staticmethod
+    def _probe_dimension(model: Any) -> int:
+        getter = getattr(model, "get_sentence_embedding_dimension", None)
+        dimension = getter() if callable(getter) else None
+        if isinstance(dimension, int) and dimension > 0:
+            return dimension
+        probe = model.encode(["dimension probe"], convert_to_numpy=True, show_progress_bar=False)
+        return int(np.asarray(probe).reshape(1, -1).shape[1])
+
+    @property
+    def workers(self) -> int:
+        return len(self._processes)
+
+    @property
+    def dispatch_size(self) -> int:
+        """Texts per ``encode`` call that keep every worker busy."""
+
+        return max(1, self.workers) * self.worker_batch * _BATCHES_PER_WORKER
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        """Encode ``texts`` across the pool; rows come back in input order."""
+
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+
+        shape: Tuple[int, int] = (len(texts), self.dimension)
+        shm = shared_memory.SharedMemory(create=True, size=max(1, shape[0] * shape[1] * 4))
+        try:
+            # Longest first: similar lengths pad less, and the slowest batches start earliest.
+            order = sorted(range(len(texts)), key=lambda index: len(texts[index]), reverse=True)
+            outstanding = set()
+            for start in range(0, len(order), self.worker_batch):
+                indices = order[start:start + self.worker_batch]
+                task_id = self._next_task
+                self._next_task += 1
+                self._task_queue.put((task_id, shm.name, shape, indices, [texts[i] for i in indices]))
+                outstanding.add(task_id)
+            self._collect(outstanding)
+            return np.ndarray(shape, dtype=np.float32, buffer=shm.buf).copy()
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def _collect(self, outstanding: set) -> None:
+        while outstanding:
+            try:
+                task_id, error = self._result_queue.get(timeout=_RESULT_POLL_SECONDS)
+            except queue.Empty:
+                dead = [process.exitcode for process in self._processes if process.exitcode is not None]
+                if dead:
+                    raise RuntimeError(f"CPU encode worker exited unexpectedly (exit codes {dead})")
+                continue
+            if error is not None:
+                raise RuntimeError(f"CPU encode worker failed:\n{error}")
+            outstanding.discard(task_id)
+
+    def close(self) -> None:
+        for _ in self._processes:
+            self._task_queue.put(None)
+        for process in self._processes:
+            process.join(timeout=30)
+            if process.is_alive():
+                process.terminate()
+        self._processes = []
+
+    def __enter__(self) -> "CpuEncodePool":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+__all__ = ["CpuEncodePool", "plan_core_groups"]
@@ -6,13 +6,16 @@ and telemetry integration for the Ultimate Embedder ensemble pipeline.
 
 from __future__ import annotations
 
+import inspect
 import logging
 import math
 import time
 import uuid
+from collections import deque
 from dataclasses import dataclass, field
-from typing import TYPE_CHECKING, Any, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Deque, Dict, List, Optional, Sequence
 
+import numpy as np
 import torch
 from rich.progress import (
     Progress,
@@ -25,12 +28,21 @@ from rich.progress import (
 
 from processor.ultimate_embedder.config import KaggleGPUConfig, RerankingConfig
 from processor.ultimate_embedder.gpu_lease import lease_gpus
-from processor.ultimate_embedder.rerank_pipeline import RerankPipeline
+from processor.ultimate_embedder.rerank_batching import (
+    RerankTokenBudget,
+    pair_token_lengths,
+    plan_token_batches,
+)
+from processor.ultimate_embedder.rerank_cache import RerankScoreCache
+from processor.ultimate_embedder.rerank_pipeline import RerankPipeline, resolve_document_store
 from processor.ultimate_embedder.throughput_monitor import ThroughputMonitor
 
 if TYPE_CHECKING:  # pragma: no cover
     from processor.ultimate_embedder.core import UltimateKaggleEmbedderV4
 
+# Fraction of the per-GPU memory allowance rerank batches may plan against.
+_RERANK_SAFETY_FACTOR = 0.8
+
 
 @dataclass
 class CrossEncoderRerankRun:
@@ -43,6 +55,8 @@ class CrossEncoderRerankRun:
     gpu_peak_gb: float = 0.0
     batch_size: int = 0
     throughput_cands_per_sec: float = 0.0
+    cache_hits: int = 0
+    cache_misses: int = 0
     run_id: str = field(default_factory=lambda: uuid.uuid4().hex)
 
     def __post_init__(self) -> None:
@@ -50,6 +64,11 @@ class CrossEncoderRerankRun:
         if len(self.query) > 100:
             self.query = self.query[:100]
 
+    @property
+    def cache_hit_rate(self) -> float:
+        total = self.cache_hits + self.cache_misses
+        return round(self.cache_hits / total, 4) if total else 0.0
+
     def to_dict(self) -> Dict[str, Any]:
         """Serialize to dictionary for JSON export."""
         return {
@@ -61,17 +80,58 @@ class CrossEncoderRerankRun:
             "gpu_peak_gb": self.gpu_peak_gb,
             "batch_size": self.batch_size,
             "throughput_cands_per_sec": self.throughput_cands_per_sec,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "cache_hit_rate": self.cache_hit_rate,
         }
 
 
+@dataclass
+class RerankGroup:
+    """One query with its candidate pool for grouped rerank execution."""
+
+    query: str
+    candidate_ids: List[str]
+    candidate_texts: List[str]
+    top_k: Optional[int] = None
+
+
+def plan_group_bins(group_sizes: Sequence[int], budget: int) -> List[List[int]]:
+    """Bin-pack groups into calls of at most ``budget`` pairs (first-fit decreasing).
+
+    Groups are never split; a group larger than the budget gets its own call.
+    Groups keep their original order inside each bin.
+    """
+
+    budget = max(1, int(budget))
+    bins: List[List[int]] = []
+    loads: List[int] = []
+    for group_idx in sorted(range(len(group_sizes)), key=lambda idx: (-group_sizes[idx], idx)):
+        size = group_sizes[group_idx]
+        if size <= 0:
+            continue
+        for bin_idx, load in enumerate(loads):
+            if load + size <= budget:
+                bins[bin_idx].append(group_idx)
+                loads[bin_idx] += size
+                break
+        else:
+            bins.append([group_idx])
+            loads.append(size)
+    return [sorted(members) for members in bins]
+
+
 class CrossEncoderBatchExecutor:
     """Execute CrossEncoder reranking with GPU leasing and dynamic batching.
     
     Orchestrates rerank inference with:
     - Adaptive batch sizing respecting 12 GB VRAM ceiling
+    - Length-sorted batches packed to a per-model token budget learned from
+      measured peak memory per token
     - Exclusive GPU leasing via context manager
     - OOM recovery with exponential backoff
     - Telemetry capture (latency, VRAM peak, lease events)
+    - Pair-score caching so only uncached (query, chunk) pairs reach the model
     """
 
     def __init__(
@@ -94,6 +154,15 @@ class CrossEncoderBatchExecutor:
         self.logger = logger
         self.embedder = embedder
         self.rerank_pipeline = RerankPipeline(config, logger)
+        self.score_cache: Optional[RerankScoreCache] = None
+        if config.enable_caching:
+            self.score_cache = RerankScoreCache(
+                config.cache_size,
+                path=config.score_cache_path,
+                logger=logger,
+            )
+        self.token_budget = RerankTokenBudget(config.token_budget_path, logger=logger)
+        self._batch_peak_bytes = 0
 
     def ensure_model(self, device: str) -> None:
         """Load CrossEncoder model via RerankPipeline if enabled.
@@ -126,7 +195,7 @@ class CrossEncoderBatchExecutor:
         # Calculate available memory per GPU
         vram_gb = self.gpu_config.vram_per_gpu_gb
         max_memory_factor = self.gpu_config.max_memory_per_gpu
-        safety_factor = 0.8
+        safety_factor = _RERANK_SAFETY_FACTOR
 
         # Available memory after safety margin
         available_gb = vram_gb * max_memory_factor * safety_factor
@@ -196,6 +265,21 @@ class CrossEncoderBatchExecutor:
                 batch_size=0,
             )
 
+        # Serve cached pair scores; only misses are sent to the model
+        cache_keys, cached_scores = self._lookup_cached_scores(query, candidate_texts)
+        miss_positions = [idx for idx, score in enumerate(cached_scores) if score is None]
+        cache_hits = len(cached_scores) - len(miss_positions)
+        if not miss_positions:
+            return self._build_ranked_run(
+                truncated_query,
+                candidate_ids,
+                [float(score) for score in cached_scores],
+                top_k,
+                cache_hits=cache_hits,
+            )
+        miss_texts = [candidate_texts[idx] for idx in miss_positions]
+        miss_ids = [candidate_ids[idx] for idx in miss_positions]
+
         # Calculate optimal batch size
         batch_size = self._calculate_optimal_batch_size()
 
@@ -219,6 +303,7 @@ class CrossEncoderBatchExecutor:
 
         # Execute rerank with appropriate device handling
         start_time = time.time()
+        self._batch_peak_bytes = 0
         gpu_peak_gb = 0.0
         throughput_cands_per_sec = 0.0
 
@@ -234,24 +319,27 @@ class CrossEncoderBatchExecutor:
                     self.ensure_model(device=target_device)
 
                     # Execute rerank with OOM recovery on GPU
-                    scores = self._execute_rerank_with_retry(
+                    miss_scores = self._execute_rerank_with_retry(
                         query=query,
-                        candidate_texts=candidate_texts,
+                        candidate_texts=miss_texts,
                         batch_size=batch_size,
+                        candidate_ids=miss_ids,
                     )
 
                     if torch.cuda.is_available():
                         torch.cuda.synchronize(device_index)
-                        gpu_peak_bytes = torch.cuda.max_memory_allocated(device_index)
+                        # Batch profiling resets the peak counter, so fold in its maximum.
+                        gpu_peak_bytes = max(torch.cuda.max_memory_allocated(device_index), self._batch_peak_bytes)
                         gpu_peak_gb = gpu_peak_bytes / (1024 ** 3)
                         self.logger.debug("Peak GPU memory: %.2f GB", gpu_peak_gb)
             else:
                 self.logger.info("GPU unavailable; running CrossEncoder rerank on CPU")
                 self.ensure_model(device="cpu")
-                scores = self._execute_rerank_with_retry(
+                miss_scores = self._execute_rerank_with_retry(
                     query=query,
-                    candidate_texts=candidate_texts,
+                    candidate_texts=miss_texts,
                     batch_size=batch_size,
+                    candidate_ids=miss_ids,
                 )
 
         except Exception as exc:  # pragma: no cover
@@ -287,8 +375,18 @@ class CrossEncoderBatchExecutor:
                 gpu_peak_gb=gpu_peak_gb,
                 batch_size=batch_size,
                 throughput_cands_per_sec=throughput_cands_per_sec,
+                cache_hits=cache_hits,
+                cache_misses=len(miss_positions),
             )
 
+        scored_ids, scores = self._merge_cached_scores(
+            candidate_ids,
+            cache_keys,
+            cached_scores,
+            miss_positions,
+            miss_scores,
+        )
+
         # Calculate latency
         raw_latency_ms = (time.time() - start_time) * 1000.0
         latency_ms = round(raw_latency_ms, 2)
@@ -312,47 +410,388 @@ class CrossEncoderBatchExecutor:
         )
         monitor.end()
 
-        # Rank candidates by score and return top_k
+        return self._build_ranked_run(
+            truncated_query,
+            scored_ids,
+            scores,
+            top_k,
+            latency_ms=latency_ms,
+            gpu_peak_gb=gpu_peak_gb,
+            batch_size=batch_size,
+            throughput_cands_per_sec=throughput_cands_per_sec,
+            cache_hits=cache_hits,
+            cache_misses=len(miss_positions),
+        )
+
+    def _build_ranked_run(
+        self,
+        truncated_query: str,
+        candidate_ids: List[str],
+        scores: Sequence[float],
+        top_k: int,
+        **telemetry: Any,
+    ) -> CrossEncoderRerankRun:
+        """Rank candidates by score and wrap the top_k in a run payload."""
+
         import numpy as np
         ranked_indices = np.argsort(scores)[::-1][:top_k]
-        
+
         top_candidate_ids = [candidate_ids[idx] for idx in ranked_indices]
         top_scores = [float(scores[idx]) for idx in ranked_indices]
 
         self.logger.info(
-            "Rerank complete: top_k=%d, latency=%.2fms, peak_gpu=%.2fGB",
+            "Rerank complete: top_k=%d, latency=%.2fms, peak_gpu=%.2fGB, cache_hits=%d",
             len(top_candidate_ids),
-            latency_ms,
-            gpu_peak_gb,
+            telemetry.get("latency_ms", 0.0),
+            telemetry.get("gpu_peak_gb", 0.0),
+            telemetry.get("cache_hits", 0),
         )
 
         return CrossEncoderRerankRun(
             query=truncated_query,
             candidate_ids=top_candidate_ids,
             scores=top_scores,
-            latency_ms=latency_ms,
-            gpu_peak_gb=gpu_peak_gb,
-            batch_size=batch_size,
-            throughput_cands_per_sec=throughput_cands_per_sec,
+            **telemetry,
         )
 
+    def _lookup_cached_scores(
+        self,
+        query: str,
+        candidate_texts: Sequence[str],
+    ) -> tuple[Optional[List[Any]], List[Optional[float]]]:
+        """Return cache keys and cached scores (``None`` marks a miss)."""
+
+        if self.score_cache is None:
+            return None, [None] * len(candidate_texts)
+        self.score_cache.bind_model(self.config.model_name)
+        keys = self.score_cache.keys_for(query, candidate_texts)
+        return keys, self.score_cache.lookup(keys)
+
+    def _merge_cached_scores(
+        self,
+        candidate_ids: List[str],
+        cache_keys: Optional[List[Any]],
+        cached_scores: List[Optional[float]],
+        miss_positions: Sequence[int],
+        miss_scores: Sequence[float],
+    ) -> tuple[List[str], List[float]]:
+        """Fill misses with fresh scores, cache them and return ``(ids, scores)``."""
+
+        fresh = {
+            position: float(score)
+            for position, score in zip(miss_positions, miss_scores)
+            if not math.isnan(float(score))
+        }
+        if len(fresh) != len(miss_positions):
+            self.logger.warning(
+                "Reranker returned %d scores for %d candidates; unscored candidates dropped",
+                len(fresh),
+                len(miss_positions),
+            )
+        if self.score_cache is not None and cache_keys is not None:
+            self.score_cache.store([cache_keys[idx] for idx in fresh], list(fresh.values()))
+
+        ranked_ids: List[str] = []
+        scores: List[float] = []
+        for idx, cached in enumerate(cached_scores):
+            score = fresh.get(idx) if cached is None else float(cached)
+            if score is not None:
+                ranked_ids.append(candidate_ids[idx])
+                scores.append(score)
+        return ranked_ids, scores
+
+    def execute_rerank_groups(
+        self,
+        groups: Sequence[RerankGroup],
+        top_k: int,
+        max_retries: int = 3,
+    ) -> List[CrossEncoderRerankRun]:
+        """Rerank many queries, packing their candidate groups into shared calls.
+
+        Groups are bin-packed into calls of at most the optimal batch size in
+        pairs. An OOM splits the failing call at group boundaries; a single group
+        that still fails falls back to ``_execute_rerank_with_retry`` batch
+        halving. Cached pair scores are reused, so only uncached candidates are
+        packed. Returns one run per input group, in input order.
+
+        Pairwise cross-encoders score a packed call in shared forwards; the
+        listwise Jina adapter still runs one forward per query within a call.
+        """
+
+        if not groups:
+            return []
+
+        if not self.config.enable_reranking:
+            return [
+                CrossEncoderRerankRun(
+                    query=group.query[:100],
+                    candidate_ids=list(group.candidate_ids[: group.top_k or top_k]),
+                    scores=[0.0] * len(group.candidate_ids[: group.top_k or top_k]),
+                    batch_size=0,
+                )
+                for group in groups
+            ]
+
+        lookups = [self._lookup_cached_scores(group.query, group.candidate_texts) for group in groups]
+        miss_positions = [
+            [idx for idx, score in enumerate(cached_scores) if score is None]
+            for _, cached_scores in lookups
+        ]
+        miss_groups = [
+            RerankGroup(
+                query=group.query,
+                candidate_ids=[group.candidate_ids[idx] for idx in misses],
+                candidate_texts=[group.candidate_texts[idx] for idx in misses],
+            )
+            for group, misses in zip(groups, miss_positions)
+        ]
+
+        gpu_peak_gb = 0.0
+        group_scores: List[List[float]] = [[] for _ in groups]
+        group_calls: List[tuple[int, float]] = [(0, 0.0) for _ in groups]
+        if any(miss_positions):
+            budget = self._calculate_optimal_batch_size()
+            use_gpu = (
+                self.embedder.device == "cuda"
+                and torch.cuda.is_available()
+                and getattr(self.embedder, "device_count", 0) > 0
+            )
+            if use_gpu:
+                with lease_gpus(self.embedder, f"rerank-{self.config.model_name}", self.logger) as lease:
+                    device_index = lease.device_ids[0] if lease.device_ids else 0
+                    self.ensure_model(device=f"cuda:{device_index}")
+                    self._batch_peak_bytes = 0
+                    group_scores, group_calls = self._execute_group_bins(miss_groups, budget, max_retries)
+                    if torch.cuda.is_available():
+                        torch.cuda.synchronize(device_index)
+                        # Batch profiling resets the peak counter, so fold in its maximum.
+                        gpu_peak_bytes = max(torch.cuda.max_memory_allocated(device_index), self._batch_peak_bytes)
+                        gpu_peak_gb = gpu_peak_bytes / (1024 ** 3)
+            else:
+                self.ensure_model(device="cpu")
+                group_scores, group_calls = self._execute_group_bins(miss_groups, budget, max_retries)
+
+        runs: List[CrossEncoderRerankRun] = []
+        total_latency_ms = 0.0
+        for group, (cache_keys, cached_scores), misses, fresh_scores, (call_pairs, call_latency_ms) in zip(
+            groups, lookups, miss_positions, group_scores, group_calls
+        ):
+            scored_ids, scores = self._merge_cached_scores(
+                group.candidate_ids,
+                cache_keys,
+                cached_scores,
+                misses,
+                fresh_scores,
+            )
+            limit = group.top_k or top_k
+            ranked = sorted(range(len(scores)), key=lambda idx: scores[idx], reverse=True)[:limit]
+            # Attribute the shared call's latency by candidate share.
+            latency_ms = call_latency_ms * len(fresh_scores) / call_pairs if call_pairs else 0.0
+            total_latency_ms += latency_ms
+            runs.append(
+                CrossEncoderRerankRun(
+                    query=group.query[:100],
+                    candidate_ids=[scored_ids[idx] for idx in ranked],
+                    scores=[scores[idx] for idx in ranked],
+                    latency_ms=round(latency_ms, 2),
+                    gpu_peak_gb=gpu_peak_gb,
+                    batch_size=call_pairs,
+                    throughput_cands_per_sec=round(len(scores) / (latency_ms / 1000.0), 2) if latency_ms > 0 else 0.0,
+                    cache_hits=len(cached_scores) - len(misses),
+                    cache_misses=len(misses),
+                )
+            )
+
+        total_pairs = sum(len(group.candidate_texts) for group in groups)
+        self.logger.info(
+            "Grouped rerank complete: %d queries, %d candidates, %.2fms (%.1f candidates/sec)",
+            len(groups),
+            total_pairs,
+            total_latency_ms,
+            total_pairs / (total_latency_ms / 1000.0) if total_latency_ms > 0 else 0.0,
+        )
+        return runs
+
+    def _execute_group_bins(
+        self,
+        groups: Sequence[RerankGroup],
+        budget: int,
+        max_retries: int,
+    ) -> tuple[List[List[float]], List[tuple[int, float]]]:
+        """Run packed calls; return per-group scores and (call pairs, call latency).
+
+        Bi-encoder rerankers score each call against stored document vectors via
+        the groups' candidate ids; other models score each call in length-sorted
+        batches packed to the learned token budget.
+        """
+
+        model = self.rerank_pipeline.model
+        if model is None:
+            raise RuntimeError("CrossEncoder model not loaded")
+
+        model_name = self.config.model_name
+        uses_candidate_ids = getattr(model, "accepts_candidate_ids", False) is True
+        if uses_candidate_ids:
+            self._attach_document_store(model)
+        token_budget = self.token_budget.token_budget(model_name, self._activation_budget_bytes())
+
+        sizes = [len(group.candidate_texts) for group in groups]
+        group_scores: List[List[float]] = [[] for _ in groups]
+        group_calls: List[tuple[int, float]] = [(0, 0.0) for _ in groups]
+        pending: Deque[List[int]] = deque(plan_group_bins(sizes, budget))
+
+        while pending:
+            members = pending.popleft()
+            pairs = [[groups[idx].query, text] for idx in members for text in groups[idx].candidate_texts]
+            started = time.perf_counter()
+            try:
+                if uses_candidate_ids:
+                    candidate_ids = [cid for idx in members for cid in groups[idx].candidate_ids]
+                    scores = list(model.predict(pairs, candidate_ids=candidate_ids))
+                else:
+                    lengths = np.concatenate(
+                        [pair_token_lengths(model, groups[idx].query, groups[idx].candidate_texts) for idx in members]
+                    )
+                    bin_scores = np.full(len(pairs), np.nan, dtype=np.float64)
+                    for batch in plan_token_batches(lengths, token_budget, budget):
+                        self._score_token_batch(model, pairs, batch, lengths, bin_scores)
+                    scores = bin_scores.tolist()
+            except torch.cuda.OutOfMemoryError:
+                if torch.cuda.is_available():
+                    torch.cuda.empty_cache()
+                self.token_budget.record_oom(model_name)
+                token_budget = max(1, token_budget // 2)
+                if len(members) > 1:
+                    middle = len(members) // 2
+                    self.logger.warning(
+                        "OOM during grouped rerank; splitting %d groups (%d pairs) in two",
+                        len(members),
+                        len(pairs),
+                    )
+                    pending.appendleft(members[middle:])
+                    pending.appendleft(members[:middle])
+                    continue
+                # A lone group falls back to the per-query batch-halving path.
+                group = groups[members[0]]
+                scores = self._execute_rerank_with_retry(
+                    query=group.query,
+                    candidate_texts=group.candidate_texts,
+                    batch_size=max(1, len(pairs) // 2),
+                    max_retries=max_retries,
+                    candidate_ids=group.candidate_ids,
+                )
+
+            latency_ms = (time.perf_counter() - started) * 1000.0
+            offset = 0
+            for idx in members:
+                group_scores[idx] = [float(score) for score in scores[offset:offset + sizes[idx]]]
+                group_calls[idx] = (len(pairs), latency_ms)
+                offset += sizes[idx]
+
+        self.token_budget.save()
+        return group_scores, group_calls
+
+    def _attach_document_store(self, model: Any) -> None:
+        """Give a bi-encoder reranker the stored document vectors for its model."""
+
+        store = self.rerank_pipeline.document_store or resolve_document_store(
+            self.embedder,
+            self.config.model_name,
+        )
+        model.attach_document_store(store)
+
+    def _measurable_cuda_device(self) -> Optional[int]:
+        """CUDA device index the reranker runs on, or ``None`` when not on a GPU."""
+
+        device = str(getattr(self.rerank_pipeline, "device", "cpu"))
+        if not device.startswith("cuda") or not torch.cuda.is_available():
+            return None
+        try:
+            return int(device.split(":", 1)[1]) if ":" in device else torch.cuda.current_device()
+        except (ValueError, RuntimeError):
+            return None
+
+    def _activation_budget_bytes(self) -> float:
+        """Memory left for rerank activations once the loaded weights are accounted for."""
+
+        allowance = (
+            self.gpu_config.vram_per_gpu_gb
+            * self.gpu_config.max_memory_per_gpu
+            * _RERANK_SAFETY_FACTOR
+            * (1024 ** 3)
+        )
+        available = allowance
+        device_index = self._measurable_cuda_device()
+        if device_index is not None:
+            try:
+                available -= torch.cuda.memory_allocated(device_index)
+            except RuntimeError:  # pragma: no cover - defensive
+                pass
+        # Never plan against less than a sliver of the allowance; OOMs shrink further.
+        return max(available, 0.05 * allowance, 1.0)
+
+    def _score_token_batch(
+        self,
+        model: Any,
+        query_doc_pairs: Sequence[Sequence[str]],
+        indices: np.ndarray,
+        lengths: np.ndarray,
+        scores: np.ndarray,
+    ) -> None:
+        """Score one planned batch into ``scores`` and feed its memory use to the budget."""
+
+        pairs = [query_doc_pairs[idx] for idx in indices]
+        predict_kwargs: Dict[str, Any] = {}
+        try:
+            if "batch_size" in inspect.signature(model.predict).parameters:
+                # CrossEncoder re-batches internally; keep the planned batch whole.
+                predict_kwargs["batch_size"] = len(pairs)
+        except (TypeError, ValueError):
+            pass
+
+        device_index = self._measurable_cuda_device()
+        baseline = 0
+        if device_index is not None:
+            baseline = torch.cuda.memory_allocated(device_index)
+            torch.cuda.reset_peak_memory_stats(device_index)
+
+        batch_scores = np.asarray(model.predict(pairs, **predict_kwargs), dtype=np.float64).reshape(-1)
+
+        if device_index is not None:
+            peak = torch.cuda.max_memory_allocated(device_index)
+            self._batch_peak_bytes = max(self._batch_peak_bytes, peak)
+            padded_tokens = len(indices) * int(lengths[indices].max())
+            self.token_budget.observe(self.config.model_name, padded_tokens, peak - baseline)
+
+        count = min(len(indices), batch_scores.size)
+        scores[indices[:count]] = batch_scores[:count]
+
     def _execute_rerank_with_retry(
         self,
         query: str,
         candidate_texts: List[str],
         batch_size: int,
         max_retries: int = 3,
+        candidate_ids: Optional[List[str]] = None,
     ) -> List[float]:
-        """Execute rerank with OOM recovery via batch halving.
+        """Execute rerank with length-sorted, token-budgeted batches and OOM recovery.
+
+        Pairs are sorted by token length and packed so each padded batch fits
+        the model's learned token budget; scores come back in candidate order.
+        An OOM halves both the pair cap and the token budget for the pairs not
+        yet scored.
         
         Args:
             query: Search query string
             candidate_texts: List of candidate document texts
-            batch_size: Initial batch size
+            batch_size: Initial maximum pairs per batch
             max_retries: Maximum retry attempts on OOM
+            candidate_ids: Candidate ids used by bi-encoder rerankers to reuse
+                stored document vectors instead of re-encoding the texts
             
         Returns:
-            List of rerank scores for all candidates
+            List of rerank scores for all candidates (NaN where the model
+            returned no score)
             
         Raises:
             RuntimeError: If rerank fails after max retries
@@ -360,26 +799,38 @@ class CrossEncoderBatchExecutor:
         if self.rerank_pipeline.model is None:
             raise RuntimeError("CrossEncoder model not loaded")
 
+        model = self.rerank_pipeline.model
+        if candidate_ids is not None and getattr(model, "accepts_candidate_ids", False) is True:
+            # Stored vectors reduce scoring to one query encode plus a mat-vec; no batching needed.
+            self._attach_document_store(model)
+            query_doc_pairs = [[query, text] for text in candidate_texts]
+            return list(model.predict(query_doc_pairs, candidate_ids=candidate_ids))
+
+        model_name = self.config.model_name
+        query_doc_pairs = [[query, text] for text in candidate_texts]
+        lengths = pair_token_lengths(model, query, candidate_texts)
+        # NaN marks pairs the model returned no score for.
+        scores = np.full(len(candidate_texts), np.nan, dtype=np.float64)
+        remaining = np.arange(len(candidate_texts))
         current_batch_size = batch_size
+        token_budget = self.token_budget.token_budget(model_name, self._activation_budget_bytes())
         attempt = 0
 
         while attempt < max_retries:
+            # Longest pairs first so each batch pads to similar lengths; scores
+            # are scattered back to the original candidate order.
+            batches = plan_token_batches(lengths[remaining], token_budget, current_batch_size)
+            done = 0
             try:
-                # Prepare query-document pairs
-                query_doc_pairs = [[query, text] for text in candidate_texts]
-
-                # Execute rerank in batches if needed
-                if len(query_doc_pairs) <= current_batch_size:
-                    # Single batch
-                    scores = self.rerank_pipeline.model.predict(query_doc_pairs)
+                if len(batches) <= 1:
+                    for batch in batches:
+                        self._score_token_batch(model, query_doc_pairs, remaining[batch], lengths, scores)
+                        done += 1
                 else:
                     # Multiple batches with rich progress
-                    total_batches = math.ceil(len(query_doc_pairs) / current_batch_size)
-                    
-                    # Create rich progress with no text truncation
                     from rich.console import Console
                     from rich.table import Column
-                    
+
                     console = Console(width=200, legacy_windows=False)  # Fixed wide width
                     progress = Progress(
                         SpinnerColumn(),
@@ -390,25 +841,28 @@ class CrossEncoderBatchExecutor:
                         console=console,
                         expand=False  # Don't expand to fill terminal width
                     )
-                    
-                    scores = []
+
                     with progress:
                         task = progress.add_task(
-                            f"[cyan]Reranking candidates (batch_size={current_batch_size})",
-                            total=total_batches
+                            f"[cyan]Reranking candidates (token_budget={token_budget}, max_batch={current_batch_size})",
+                            total=len(batches)
                         )
-                        
-                        for i in range(0, len(query_doc_pairs), current_batch_size):
-                            batch = query_doc_pairs[i:i + current_batch_size]
-                            batch_scores = self.rerank_pipeline.model.predict(batch)
-                            scores.extend(batch_scores)
+
+                        for batch in batches:
+                            self._score_token_batch(model, query_doc_pairs, remaining[batch], lengths, scores)
+                            done += 1
                             progress.update(task, advance=1)
 
-                # Success - return scores
-                return list(scores)
+                self.token_budget.save()
+                return scores.tolist()
 
             except torch.cuda.OutOfMemoryError as oom_error:
                 attempt += 1
+                self.token_budget.record_oom(model_name)
+                self.token_budget.save()
+                # Keep finished batches; only the rest is replanned.
+                if done:
+                    remaining = np.setdiff1d(remaining, np.concatenate(batches[:done]), assume_unique=True)
                 if attempt >= max_retries:
                     self.logger.error(
                         "OOM after %d attempts, raising exception",
@@ -418,12 +872,14 @@ class CrossEncoderBatchExecutor:
                         f"Rerank failed after {max_retries} OOM recovery attempts"
                     ) from oom_error
 
-                # Halve batch size and retry
+                # Halve batch size and token budget, then retry
                 new_batch_size = max(1, current_batch_size // 2)
                 self.logger.warning(
-                    "OOM during rerank, reducing batch size: %d -> %d (attempt %d/%d)",
+                    "OOM during rerank, reducing batch size: %d -> %d, token budget: %d -> %d (attempt %d/%d)",
                     current_batch_size,
                     new_batch_size,
+                    token_budget,
+                    max(1, token_budget // 2),
                     attempt,
                     max_retries,
                 )
@@ -433,6 +889,7 @@ class CrossEncoderBatchExecutor:
                     torch.cuda.empty_cache()
 
                 current_batch_size = new_batch_size
+                token_budget = max(1, token_budget // 2)
 
             except Exception as exc:  # pragma: no cover
                 self.logger.error("Rerank inference failed: %s", exc)
@@ -442,4 +899,4 @@ class CrossEncoderBatchExecutor:
         raise RuntimeError("Rerank failed: unexpected error")  # pragma: no cover
 
 
-__all__ = ["CrossEncoderBatchExecutor", "CrossEncoderRerankRun"]
+__all__ = ["CrossEncoderBatchExecutor", "CrossEncoderRerankRun", "RerankGroup", "plan_group_bins"]
@@ -0,0 +1,220 @@
+"""Indexed, optionally zstd-compressed text and metadata store for exports.
+
+Three files share the ``<base>_docs`` stem:
+
+* ``_docs.bin``: blocks of length-prefixed records. Each record is a
+  ``<u32 little-endian length>`` followed by compact JSON
+  ``{"text": ..., "metadata": ...}``. A block holds ``block_records`` consecutive
+  point ids and is zstd-compressed as a unit when compression is on.
+* ``_docs.idx.npy``: ``int64`` byte offsets of every block plus the end offset.
+* ``_docs.json``: manifest (record count, block size, compression).
+
+Point id ``i`` lives in block ``i // block_records``, so fetching the top-20
+hits reads at most 20 blocks no matter how large the corpus is. Uncompressed
+stores use one record per block and read exactly the record's bytes.
+
+``zstandard`` is optional; ``compression="auto"`` uses it only when installed.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import struct
+from collections import OrderedDict
+from collections.abc import Sequence as SequenceABC
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from processor.ultimate_embedder.chunk_store import _dumps
+
+DOC_STORE_VERSION = 1
+DOC_STORE_STEM = "_docs"
+_LENGTH = struct.Struct("<I")
+_DEFAULT_BLOCK_RECORDS = 32
+_CACHED_BLOCKS = 64
+
+_ZSTD_UNSET = object()
+zstandard: Any = _ZSTD_UNSET
+
+
+def _load_zstandard() -> Any:
+    """Import the optional zstandard dependency on first use; None when missing."""
+
+    global zstandard
+    if zstandard is _ZSTD_UNSET:
+        try:
+            import zstandard as _zstandard  # type: ignore
+        except ImportError:  # pragma: no cover - optional dependency
+            _zstandard = None
+        zstandard = _zstandard
+    return zstandard
+
+
+def _resolve_compression(compression: str) -> str:
+    key = (compression or "none").strip().lower()
+    if key == "auto":
+        return "zstd" if _load_zstandard() is not None else "none"
+    if key == "zstd" and _load_zstandard() is None:
+        raise RuntimeError("doc store compression 'zstd' requires the zstandard package")
+    if key not in ("zstd", "none"):
+        raise ValueError(f"Unknown doc store compression {compression!r}")
+    return key
+
+
+def doc_store_paths(base_path: str) -> Dict[str, str]:
+    stem = f"{base_path}{DOC_STORE_STEM}"
+    return {"doc_store": f"{stem}.bin", "doc_store_index": f"{stem}.idx.npy", "doc_store_manifest": f"{stem}.json"}
+
+
+def write_doc_store(
+    base_path: str,
+    texts: Sequence[str],
+    metadata: Optional[Sequence[Dict[str, Any]]] = None,
+    *,
+    compression: str = "auto",
+    block_records: int = _DEFAULT_BLOCK_RECORDS,
+    level: int = 3,
+) -> Dict[str, str]:
+    """Write the store for ``texts``/``metadata`` (point id = position); returns its paths."""
+
+    codec = _resolve_compression(compression)
+    block_records = max(1, int(block_records)) if codec == "zstd" else 1
+    compressor = _load_zstandard().ZstdCompressor(level=level) if codec == "zstd" else None
+    paths = doc_store_paths(base_path)
+    total = len(texts)
+
+    offsets = [0]
+    with open(paths["doc_store"], "wb") as handle:
+        for start in range(0, total, block_records):
+            parts: List[bytes] = []
+            for point_id in range(start, min(start + block_records, total)):
+                record = {
+                    "text": texts[point_id],
+                    "metadata": metadata[point_id] if metadata is not None and point_id < len(metadata) else {},
+                }
+                payload = _dumps(record).encode("utf-8")
+                parts.append(_LENGTH.pack(len(payload)))
+                parts.append(payload)
+            block = b"".join(parts)
+            if compressor is not None:
+                block = compressor.compress(block)
+            handle.write(block)
+            offsets.append(offsets[-1] + len(block))
+
+    np.save(paths["doc_store_index"], np.asarray(offsets, dtype=np.int64))
+    manifest = {
+        "doc_store": DOC_STORE_VERSION,
+        "records": total,
+        "block_records": block_records,
+        "compression": codec,
+        "data": os.path.basename(paths["doc_store"]),
+        "index": os.path.basename(paths["doc_store_index"]),
+    }
+    with open(paths["doc_store_manifest"], "w", encoding="utf-8") as handle:
+        json.dump(manifest, handle, indent=2)
+    return paths
+
+
+class _FieldView(SequenceABC):
+    """Sequence of one record field (``text`` or ``metadata``) backed by a ``DocStore``."""
+
+    def __init__(self, store: "DocStore", field: str) -> None:
+        self._store = store
+        self._field = field
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def __getitem__(self, index: Any) -> Any:
+        if isinstance(index, slice):
+            return [record[self._field] for record in self._store.get_many(range(*index.indices(len(self))))]
+        return self._store.get(index)[self._field]
+
+
+class DocStore:
+    """Random-access reader for a store written by ``write_doc_store``."""
+
+    def __init__(self, manifest_path: str) -> None:
+        with open(manifest_path, "r", encoding="utf-8") as handle:
+            manifest = json.load(handle)
+        version = manifest.get("doc_store")
+        if not isinstance(version, int) or version > DOC_STORE_VERSION:
+            raise ValueError(f"{manifest_path}: unsupported doc store version {version!r}")
+
+        directory = os.path.dirname(manifest_path)
+        self.records = int(manifest["records"])
+        self.block_records = max(1, int(manifest["block_records"]))
+        self.compression = manifest.get("compression", "none")
+        self._offsets = np.load(os.path.join(directory, manifest["index"]))
+        data_path = os.path.join(directory, manifest["data"])
+        self._data = np.memmap(data_path, dtype=np.uint8, mode="r") if os.path.getsize(data_path) else np.zeros(0, np.uint8)
+        self._decompressor = _load_zstandard().ZstdDecompressor() if self.compression == "zstd" else None
+        if self.compression == "zstd" and self._decompressor is None:
+            raise RuntimeError(f"{manifest_path} is zstd-compressed; install zstandard to read it")
+        self._blocks: "OrderedDict[int, bytes]" = OrderedDict()
+        self.texts = _FieldView(self, "text")
+        self.metadata = _FieldView(self, "metadata")
+
+    @classmethod
+    def open(cls, base_path: str) -> "DocStore":
+        """Open ``<base>_docs.json`` (``base_path`` may also name the manifest itself)."""
+
+        manifest = base_path if base_path.endswith(".json") else doc_store_paths(base_path)["doc_store_manifest"]
+        return cls(manifest)
+
+    def __len__(self) -> int:
+        return self.records
+
+    def _block(self, block_id: int) -> bytes:
+        cached = self._blocks.get(block_id)
+        if cached is not None:
+            self._blocks.move_to_end(block_id)
+            return cached
+        raw = bytes(self._data[self._offsets[block_id]:self._offsets[block_id + 1]])
+        if self._decompressor is not None:
+            raw = self._decompressor.decompress(raw)
+        self._blocks[block_id] = raw
+        while len(self._blocks) > _CACHED_BLOCKS:
+            self._blocks.popitem(last=False)
+        return raw
+
+    def get(self, point_id: Any) -> Dict[str, Any]:
+        """``{"text", "metadata"}`` for one point id."""
+
+        position = int(point_id)
+        if position < 0:
+            position += self.records
+        if not 0 <= position < self.records:
+            raise IndexError(f"point id {point_id} out of range for {self.records} records")
+        block = self._block(position // self.block_records)
+        cursor = 0
+        for _ in range(position % self.block_records):
+            cursor += _LENGTH.size + _LENGTH.unpack_from(block, cursor)[0]
+        (length,) = _LENGTH.unpack_from(block, cursor)
+        start = cursor + _LENGTH.size
+        return json.loads(block[start:start + length])
+
+    def get_many(self, point_ids: Iterable[Any]) -> List[Dict[str, Any]]:
+        """Records for ``point_ids`` in input order, read in ascending block order."""
+
+        ids = [int(point_id) for point_id in point_ids]
+        records: Dict[int, Dict[str, Any]] = {}
+        for point_id in sorted(set(ids)):
+            records[point_id] = self.get(point_id)
+        return [records[point_id] for point_id in ids]
+
+    def text(self, point_id: Any) -> str:
+        return self.get(point_id)["text"]
+
+    def meta(self, point_id: Any) -> Dict[str, Any]:
+        return self.get(point_id)["metadata"]
+
+
+__all__ = [
+    "DOC_STORE_VERSION",
+    "DocStore",
+    "doc_store_paths",
+    "write_doc_store",
+]
@@ -0,0 +1,222 @@
+"""Exact brute-force inner-product search over pre-normalised embeddings.
+
+This is the reference every ANN path is measured against, and the fast path
+for corpora small enough not to need one. Cosine similarity is a plain dot
+product over L2-normalised rows: the norms are checked once on construction
+and a matrix whose rows are off unit length (e.g. one trimmed to a smaller
+vector dimension) is normalised into a copy, never per query.
+
+The matrix is scanned in cache-sized row blocks. Each block is scored with a
+float32 matmul (fp16 and int8 storage are widened per block, never as a
+whole), reduced to its local top-k with ``argpartition``, and merged. Blocks
+run on a thread pool; BLAS releases the GIL, so threads scale across cores.
+"""
+
+from __future__ import annotations
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+
+from processor.ultimate_embedder.quantization import Int8Codes, quantize_int8
+
+STORAGE_TYPES = ("float32", "fp16", "int8")
+# Target bytes of widened float32 rows per block: sized to stay cache-resident.
+_BLOCK_BYTES = 4 * 1024 * 1024
+_MIN_BLOCK_ROWS = 1024
+# Rows whose L2 norm is within this of 1 count as already normalised.
+_NORM_TOLERANCE = 1e-3
+
+
+def _top_positions(scores: np.ndarray, ids: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the ``k`` largest ``scores``, descending; equal scores order by ``ids``."""
+
+    k = min(int(k), scores.shape[0])
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    part = np.argpartition(-scores, k - 1)[:k] if k < scores.shape[0] else np.arange(scores.shape[0])
+    return part[np.lexsort((ids[part], -scores[part]))]
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the ``k`` largest ``scores``, descending.
+
+    ``argpartition`` plus a sort of only ``k`` items instead of a full N-log-N sort.
+    """
+
+    scores = np.asarray(scores).reshape(-1)
+    return _top_positions(scores, np.arange(scores.shape[0]), k)
+
+
+def _unit_rows(matrix: Any) -> Any:
+    """Return ``matrix`` unchanged when its rows are unit length, else a normalised float32 copy.
+
+    Norms are measured a block at a time so a memory-mapped matrix is never
+    widened whole just to be checked. All-zero rows are left at zero.
+    """
+
+    step = max(_MIN_BLOCK_ROWS, _BLOCK_BYTES // max(1, 4 * int(matrix.shape[1])))
+    norms = np.empty(int(matrix.shape[0]), dtype=np.float32)
+    for start in range(0, norms.shape[0], step):
+        block = np.asarray(matrix[start:start + step], dtype=np.float32)
+        norms[start:start + step] = np.sqrt(np.einsum("ij,ij->i", block, block))
+    nonzero = norms > 0
+    if not np.any(np.abs(norms[nonzero] - 1.0) > _NORM_TOLERANCE):
+        return matrix
+    return np.asarray(matrix, dtype=np.float32) / np.where(nonzero, norms, 1.0)[:, None]
+
+
+def _default_threads() -> int:
+    raw = os.environ.get("EMBEDDER_SEARCH_THREADS", "").strip()
+    if raw.isdigit() and int(raw) > 0:
+        return int(raw)
+    return max(1, min(8, os.cpu_count() or 1))
+
+
+class ExactSearchIndex:
+    """Block-wise exact top-k search with float32, fp16 or int8 storage."""
+
+    def __init__(
+        self,
+        matrix: Any,
+        *,
+        storage: str = "float32",
+        block_rows: Optional[int] = None,
+        threads: Optional[int] = None,
+    ) -> None:
+        if storage not in STORAGE_TYPES:
+            raise ValueError(f"storage must be one of {STORAGE_TYPES}, got {storage!r}")
+        # Pre-quantised codes (e.g. an exported ``_int8.npz``) are used as-is.
+        codes = matrix if isinstance(matrix, Int8Codes) else None
+        if codes is not None:
+            if storage != "int8":
+                raise ValueError("Int8Codes can only back int8 storage")
+            matrix = codes.codes
+        if np.ndim(matrix) != 2:
+            raise ValueError("ExactSearchIndex expects a 2D matrix")
+        if codes is None:
+            matrix = _unit_rows(matrix)
+
+        self.storage = storage
+        self.rows, self.dimension = int(matrix.shape[0]), int(matrix.shape[1])
+        self._codes: Optional[Int8Codes] = None
+        if storage == "int8":
+            self._codes = codes if codes is not None else quantize_int8(matrix)
+            self._data = self._codes.codes
+        elif storage == "fp16":
+            self._data = np.asarray(matrix, dtype=np.float16)
+        else:
+            # No copy when the matrix is already float32 (including memory maps).
+            self._data = np.asarray(matrix, dtype=np.float32)
+
+        self.block_rows = int(block_rows) if block_rows else max(
+            _MIN_BLOCK_ROWS, _BLOCK_BYTES // max(1, 4 * self.dimension)
+        )
+        self.threads = max(1, int(threads) if threads else _default_threads())
+
+    @property
+    def nbytes(self) -> int:
+        return int(self._data.nbytes)
+
+    def _prepare_queries(self, queries: Any) -> np.ndarray:
+        matrix = np.asarray(queries, dtype=np.float32).reshape(-1, self.dimension)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.where(norms > 0, norms, 1.0)
+
+    def _block_scores(self, queries: np.ndarray, start: int, end: int) -> np.ndarray:
+        return self._score_rows(queries, self._data[start:end])
+
+    def _score_rows(self, queries: np.ndarray, block: np.ndarray) -> np.ndarray:
+        if self._codes is not None:
+            # Score codes directly: q . x == (q * scale) . codes + q . (offset + 128 * scale)
+            scaled = queries * self._codes.scale
+            bias = queries @ (self._codes.offset + 128 * self._codes.scale)
+            return block.astype(np.float32) @ scaled.T + bias
+        return np.asarray(block, dtype=np.float32) @ queries.T
+
+    def _ranges(self) -> List[Tuple[int, int]]:
+        return [(start, min(start + self.block_rows, self.rows)) for start in range(0, self.rows, self.block_rows)]
+
+    def _map_blocks(self, func: Any) -> List[Any]:
+        ranges = self._ranges()
+        if self.threads == 1 or len(ranges) == 1:
+            return [func(start, end) for start, end in ranges]
+        with ThreadPoolExecutor(max_workers=min(self.threads, len(ranges))) as pool:
+            return list(pool.map(lambda bounds: func(*bounds), ranges))
+
+    def scores(self, queries: Any) -> np.ndarray:
+        """Float32 similarity of each query to every row: ``(Q, N)``, or ``(N,)`` for one query."""
+
+        single = np.ndim(queries) == 1
+        prepared = self._prepare_queries(queries)
+        if not self.rows:
+            empty = np.zeros((prepared.shape[0], 0), dtype=np.float32)
+            return empty[0] if single else empty
+        output = np.empty((self.rows, prepared.shape[0]), dtype=np.float32)
+
+        def fill(start: int, end: int) -> None:
+            output[start:end] = self._block_scores(prepared, start, end)
+
+        self._map_blocks(fill)
+        result = output.T
+        return result[0] if single else result
+
+    def row_scores(self, query: Any, ids: Any) -> np.ndarray:
+        """Float32 similarity of one query to just the rows at ``ids``."""
+
+        ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+        if not ids.size:
+            return np.zeros(0, dtype=np.float32)
+        return self._score_rows(self._prepare_queries(query), self._data[ids])[:, 0]
+
+    def search(self, queries: Any, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Exact top-``k`` ``(ids, scores)`` per query, sorted by descending score."""
+
+        single = np.ndim(queries) == 1
+        prepared = self._prepare_queries(queries)
+        k = min(int(k), self.rows)
+        count = prepared.shape[0]
+        if k <= 0:
+            ids = np.zeros((count, 0), dtype=np.int64)
+            scores = np.zeros((count, 0), dtype=np.float32)
+            return (ids[0], scores[0]) if single else (ids, scores)
+
+        def local_top(start: int, end: int) -> Tuple[np.ndarray, np.ndarray]:
+            block_scores = self._block_scores(prepared, start, end).T
+            keep = min(k, end - start)
+            if keep < end - start:
+                local = np.argpartition(-block_scores, keep - 1, axis=1)[:, :keep]
+            else:
+                local = np.broadcast_to(np.arange(end - start), block_scores.shape)
+            return local + start, np.take_along_axis(block_scores, local, axis=1)
+
+        partials = self._map_blocks(local_top)
+        candidate_ids = np.concatenate([ids for ids, _ in partials], axis=1)
+        candidate_scores = np.concatenate([scores for _, scores in partials], axis=1)
+
+        ids = np.empty((count, k), dtype=np.int64)
+        scores = np.empty((count, k), dtype=np.float32)
+        for row in range(count):
+            order = _top_positions(candidate_scores[row], candidate_ids[row], k)
+            ids[row] = candidate_ids[row][order]
+            scores[row] = candidate_scores[row][order]
+        return (ids[0], scores[0]) if single else (ids, scores)
+
+
+class SearchIndexCache:
+    """Reuse one ``ExactSearchIndex`` while the matrix (by identity) and storage stay the same."""
+
+    def __init__(self) -> None:
+        self._entry: Optional[Tuple[Any, ExactSearchIndex]] = None
+
+    def get(self, matrix: Any, storage: str = "float32") -> ExactSearchIndex:
+        entry = self._entry
+        if entry is None or entry[0] is not matrix or entry[1].storage != storage:
+            entry = (matrix, ExactSearchIndex(matrix, storage=storage))
+            self._entry = entry
+        return entry[1]
+
+
+__all__ = ["STORAGE_TYPES", "ExactSearchIndex", "SearchIndexCache", "top_k_indices"]
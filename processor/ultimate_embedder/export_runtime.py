@@ -12,14 +12,34 @@ from typing import TYPE_CHECKING, Any, Dict, Optional
 
 import numpy as np
 
-try:  # Optional dependency for FAISS export
-    import faiss  # type: ignore
-except ImportError:  # pragma: no cover - optional dependency
-    faiss = None  # type: ignore
+_FAISS_UNSET = object()
+faiss: Any = _FAISS_UNSET
+
+
+def _load_faiss() -> Any:
+    """Import the optional FAISS dependency on first use; None when missing."""
+
+    global faiss
+    if faiss is _FAISS_UNSET:
+        try:
+            import faiss as _faiss  # type: ignore
+        except ImportError:  # pragma: no cover - optional dependency
+            _faiss = None
+        faiss = _faiss
+    return faiss
 
 if TYPE_CHECKING:  # pragma: no cover
     from processor.ultimate_embedder.core import UltimateKaggleEmbedderV4
 
+from processor.ultimate_embedder.doc_store import write_doc_store
+from processor.ultimate_embedder.faiss_index import build_index, recall_at_k
+from processor.ultimate_embedder.quantization import (
+    embedding_paths,
+    load_embedding_store,
+    quantize_binary,
+    quantize_int8,
+    to_fp16,
+)
 from processor.ultimate_embedder.summary import (
     SCHEMA_VERSION,
     build_performance_baseline,
@@ -33,6 +53,7 @@ class ExportRuntime:
         self.embedder = embedder
         self.logger = logger
         self.skipped_exports: Dict[str, str] = {}
+        self.faiss_reports: Dict[str, Dict[str, Any]] = {}
 
     @staticmethod
     def _sanitize_name_token(name: str) -> str:
@@ -50,6 +71,7 @@ class ExportRuntime:
 
         # Reset skipped export tracking for fresh run
         self.skipped_exports = {}
+        self.faiss_reports = {}
 
         embeddings = embedder._require_embeddings()
         companion_arrays = {
@@ -67,18 +89,23 @@ class ExportRuntime:
         base_path = embedder.export_config.get_output_path(collection_name=collection_alias)
 
         if embedder.export_config.export_numpy:
-            numpy_path = f"{base_path}_embeddings.npy"
-            np.save(numpy_path, embeddings)
+            compress = getattr(embedder.export_config, "compress_embeddings", False) is True
+            numpy_path = self._save_float_store(embedding_paths(base_path), embeddings, compress)
             exported_files["numpy"] = numpy_path
             self.logger.info("NumPy embeddings: %s", numpy_path)
 
             for companion_name, companion_array in companion_arrays.items():
                 safe_name = self._sanitize_name_token(companion_name)
-                companion_path = f"{base_path}_{safe_name}_embeddings.npy"
-                np.save(companion_path, companion_array)
+                companion_path = self._save_float_store(
+                    embedding_paths(base_path, f"_{safe_name}"),
+                    companion_array,
+                    compress,
+                )
                 exported_files[f"numpy_{safe_name}"] = companion_path
                 self.logger.info("NumPy embeddings (%s): %s", companion_name, companion_path)
 
+        exported_files.update(self._export_quantized(base_path, embeddings, companion_arrays))
+
         if embedder.export_config.export_jsonl:
             jsonl_path = f"{base_path}_qdrant.jsonl"
             self._export_qdrant_jsonl(jsonl_path, embeddings, companion_arrays)
@@ -105,17 +132,32 @@ class ExportRuntime:
 
         faiss_performed = False
         if embedder.export_config.export_faiss:
-            if faiss is None:
+            if _load_faiss() is None:
                 reason = "faiss package not installed; skipping FAISS index export"
                 self.logger.warning(reason)
                 self.skipped_exports["faiss"] = reason
             else:
                 faiss_path = f"{base_path}_index.faiss"
-                self._export_faiss_index(faiss_path)
+                self._export_faiss_index(
+                    faiss_path,
+                    self._embedding_store(exported_files.get("numpy"), embeddings),
+                    name=embedder.model_name,
+                )
                 exported_files["faiss"] = faiss_path
                 faiss_performed = True
                 self.logger.info("FAISS index: %s", faiss_path)
 
+                for companion_name, companion_array in companion_arrays.items():
+                    safe_name = self._sanitize_name_token(companion_name)
+                    companion_path = f"{base_path}_{safe_name}_index.faiss"
+                    self._export_faiss_index(
+                        companion_path,
+                        self._embedding_store(exported_files.get(f"numpy_{safe_name}"), companion_array),
+                        name=companion_name,
+                    )
+                    exported_files[f"faiss_{safe_name}"] = companion_path
+                    self.logger.info("FAISS index (%s): %s", companion_name, companion_path)
+
         metadata_path = f"{base_path}_metadata.json"
         self._export_metadata(metadata_path)
         exported_files["metadata"] = metadata_path
@@ -124,10 +166,17 @@ class ExportRuntime:
         self._export_texts(texts_path)
         exported_files["texts"] = texts_path
 
+        if getattr(embedder.export_config, "export_doc_store", False) is True:
+            exported_files.update(self._export_doc_store(base_path))
+
         stats_path = f"{base_path}_stats.json"
         self._export_processing_stats(stats_path)
         exported_files["stats"] = stats_path
 
+        batch_profiler = getattr(embedder, "batch_profiler", None)
+        if batch_profiler is not None:
+            exported_files.update(batch_profiler.write(base_path))
+
         script_path = f"{base_path}_upload_script.py"
         self._generate_upload_script(script_path, exported_files)
         exported_files["upload_script"] = script_path
@@ -193,6 +242,68 @@ class ExportRuntime:
 
         return exported_files
 
+    @staticmethod
+    def _save_float_store(paths: Dict[str, str], matrix: np.ndarray, compress: bool) -> str:
+        """Write ``matrix`` as ``.npy``, or as a zlib-compressed ``.npz`` when ``compress`` is set."""
+
+        if compress:
+            np.savez_compressed(paths["compressed"], embeddings=np.asarray(matrix, dtype=np.float32))
+            return paths["compressed"]
+        np.save(paths["numpy"], matrix)
+        return paths["numpy"]
+
+    def _export_quantized(
+        self,
+        base_path: str,
+        embeddings: np.ndarray,
+        companion_arrays: Dict[str, np.ndarray],
+    ) -> Dict[str, str]:
+        """Write int8 / binary / fp16 encodings enabled on the export config.
+
+        Keys mirror the NumPy exports: ``int8``, ``binary``, ``fp16`` for the
+        primary matrix and ``<format>_<model>`` for companions.
+        """
+
+        config = self.embedder.export_config
+        formats = [
+            name
+            for name, flag in (
+                ("int8", "quantize_int8"),
+                ("binary", "quantize_binary"),
+                ("fp16", "export_fp16"),
+            )
+            if getattr(config, flag, False) is True
+        ]
+        if not formats:
+            return {}
+
+        written: Dict[str, str] = {}
+        arrays = [("", embeddings)]
+        for companion_name, companion_array in companion_arrays.items():
+            arrays.append((f"_{self._sanitize_name_token(companion_name)}", companion_array))
+
+        for key_suffix, matrix in arrays:
+            if matrix.size == 0:
+                continue
+            paths = embedding_paths(base_path, key_suffix)
+            for fmt in formats:
+                path = paths[fmt]
+                if fmt == "int8":
+                    quantize_int8(matrix).save(path)
+                elif fmt == "binary":
+                    np.save(path, quantize_binary(matrix))
+                else:
+                    np.save(path, to_fp16(matrix))
+                written[f"{fmt}{key_suffix}"] = path
+                self.logger.info(
+                    "%s embeddings%s: %s (%.1fx smaller than float32)",
+                    fmt,
+                    f" ({key_suffix[1:]})" if key_suffix else "",
+                    path,
+                    (matrix.shape[0] * matrix.shape[1] * 4) / max(1, os.path.getsize(path)),
+                )
+        return written
+
     def _export_qdrant_jsonl(
         self,
         file_path: str,
@@ -312,17 +423,54 @@ class ExportRuntime:
 
                 handle.write(json.dumps(record, ensure_ascii=False) + "\n")
 
-    def _export_faiss_index(self, file_path: str) -> None:
+    @staticmethod
+    def _embedding_store(numpy_path: Optional[str], fallback: np.ndarray) -> np.ndarray:
+        """Memory-map the exported ``.npy`` when present so index builds stream from disk."""
+
+        if numpy_path and numpy_path.endswith(".npy") and os.path.exists(numpy_path):
+            return load_embedding_store(numpy_path)
+        return fallback
+
+    def _export_faiss_index(
+        self,
+        file_path: str,
+        source: Optional[np.ndarray] = None,
+        *,
+        name: Optional[str] = None,
+    ) -> None:
+        faiss = _load_faiss()
         if faiss is None:
             raise RuntimeError("FAISS export requires the `faiss` package to be installed")
 
-        embeddings = self.embedder._require_embeddings()
-        dimension = embeddings.shape[1]
+        if source is None:
+            source = self.embedder._require_embeddings()
+        config = self.embedder.export_config
 
-        index = faiss.IndexFlatIP(dimension)
-        embeddings_float32 = embeddings.astype(np.float32)
-        index.add(embeddings_float32)  # type: ignore[arg-type]
+        index, report = build_index(
+            faiss,
+            source,
+            getattr(config, "faiss_index_factory", "flat"),
+            train_size=getattr(config, "faiss_train_size", 100000),
+            nprobe=getattr(config, "faiss_nprobe", 16),
+        )
+        if report["factory"] != "Flat":
+            recall = recall_at_k(
+                index,
+                source,
+                k=getattr(config, "faiss_recall_k", 10),
+                queries=getattr(config, "faiss_recall_queries", 200),
+            )
+            if recall is not None:
+                report["recall_at_k"] = recall
+                self.logger.info(
+                    "FAISS %s recall@%d vs flat: %.4f",
+                    report["factory"],
+                    recall["k"],
+                    recall["recall"],
+                )
         faiss.write_index(index, file_path)
+        report["path"] = os.path.basename(file_path)
+        self.faiss_reports[name or self.embedder.model_name] = report
 
     def _export_metadata(self, file_path: str) -> None:
         with open(file_path, "w", encoding="utf-8") as handle:
@@ -332,6 +480,24 @@ class ExportRuntime:
         with open(file_path, "w", encoding="utf-8") as handle:
             json.dump(self.embedder.chunk_texts, handle, indent=2, ensure_ascii=False)
 
+    def _export_doc_store(self, base_path: str) -> Dict[str, str]:
+        config = self.embedder.export_config
+        try:
+            paths = write_doc_store(
+                base_path,
+                self.embedder.chunk_texts,
+                self.embedder.chunks_metadata,
+                compression=config.doc_store_compression,
+                block_records=config.doc_store_block_records,
+            )
+        except (RuntimeError, ValueError) as exc:
+            reason = f"doc store export failed: {exc}"
+            self.logger.warning(reason)
+            self.skipped_exports["doc_store"] = reason
+            return {}
+        self.logger.info("Doc store: %s", paths["doc_store_manifest"])
+        return paths
+
     def _export_processing_stats(self, file_path: str) -> None:
         embedder = self.embedder
         embeddings = embedder.embeddings
@@ -361,6 +527,8 @@ class ExportRuntime:
             "processing_performance": dict(embedder.processing_stats),
             "export_timestamp": datetime.now().isoformat(),
         }
+        if self.faiss_reports:
+            stats["faiss_indexes"] = dict(self.faiss_reports)
 
         summary_snapshot = getattr(embedder, "last_processing_summary", None)
         if isinstance(summary_snapshot, dict):
@@ -554,8 +722,10 @@ class ExportRuntime:
         vector_dimensions_map: Dict[str, int] = {}
 
         primary_numpy_filename = ""
-        if "numpy" in exported_files:
-            primary_numpy_filename = os.path.basename(exported_files["numpy"])
+        # fp16 copies load the same way, so they stand in when float32 export is off.
+        primary_numpy_path = exported_files.get("numpy") or exported_files.get("fp16")
+        if primary_numpy_path:
+            primary_numpy_filename = os.path.basename(primary_numpy_path)
             vector_files_map[embedder.model_name] = primary_numpy_filename
             vector_dimensions_map[embedder.model_name] = embedder.model_config.vector_dim
         else:
@@ -568,7 +738,7 @@ class ExportRuntime:
                 continue
             safe_name = self._sanitize_name_token(model_name)
             numpy_key = f"numpy_{safe_name}"
-            companion_path = exported_files.get(numpy_key)
+            companion_path = exported_files.get(numpy_key) or exported_files.get(f"fp16_{safe_name}")
             if not companion_path:
                 self.logger.warning(
                     "Companion embeddings for %s not exported; skipping in upload script",
@@ -649,7 +819,11 @@ def upload_to_qdrant():
         logger.info(f"Connected to Qdrant at {{qdrant_host}}:{{qdrant_port}}")
 
         logger.info("Loading exported data...")
-        dense_vectors = {{name: np.load(path) for name, path in vector_files.items()}}
+        # Compressed exports hold the matrix under "embeddings" in an .npz archive.
+        dense_vectors = {{
+            name: np.load(path)["embeddings"] if path.endswith(".npz") else np.load(path)
+            for name, path in vector_files.items()
+        }}
 
         with open(files["metadata"], "r", encoding="utf-8") as handle:
             metadata_list = json.load(handle)
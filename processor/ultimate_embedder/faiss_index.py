@@ -0,0 +1,174 @@
+"""Trained FAISS index construction streamed from an embedding store.
+
+``build_index`` turns a factory spec into an inner-product index, trains it on
+a row sample when the index type needs training, and adds vectors in batches
+read from the (usually memory-mapped) embedding matrix, so no full float32
+copy is ever materialised. ``recall_at_k`` measures the result against exact
+inner-product search computed blockwise from the same store.
+
+The ``faiss`` module is passed in by the caller, which owns the optional import.
+"""
+
+from __future__ import annotations
+
+import math
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+# Below this many rows a trained index is not worth its recall loss.
+AUTO_FLAT_MAX_ROWS = 20000
+# FAISS wants at least ~39 training points per IVF centroid.
+_MIN_POINTS_PER_CENTROID = 39
+_ADD_BATCH_ROWS = 65536
+_EXACT_BLOCK_ROWS = 65536
+
+
+def _ivf_lists(rows: int) -> int:
+    nlist = max(1, int(4 * math.sqrt(rows)))
+    return max(1, min(nlist, rows // _MIN_POINTS_PER_CENTROID))
+
+
+def _pq_subquantizers(dimension: int) -> int:
+    for target in (dimension // 16, dimension // 8, dimension // 4, 8, 4, 2):
+        if target > 0 and dimension % target == 0:
+            return target
+    return 1
+
+
+def resolve_factory(spec: str, rows: int, dimension: int) -> str:
+    """Expand ``auto``/``flat``/``ivf-flat``/``ivf-pq``/``hnsw`` to a FAISS factory string.
+
+    Anything else is passed to ``faiss.index_factory`` verbatim.
+    """
+
+    key = (spec or "flat").strip().lower()
+    if key == "auto":
+        key = "flat" if rows < AUTO_FLAT_MAX_ROWS else "ivf-flat"
+    if key == "flat":
+        return "Flat"
+    if key == "ivf-flat":
+        return f"IVF{_ivf_lists(rows)},Flat"
+    if key == "ivf-pq":
+        return f"IVF{_ivf_lists(rows)},PQ{_pq_subquantizers(dimension)}"
+    if key == "hnsw":
+        return "HNSW32"
+    return spec
+
+
+def _rows(source: Any, start: int, end: int) -> np.ndarray:
+    return np.ascontiguousarray(source[start:end], dtype=np.float32)
+
+
+def _training_sample(source: Any, size: int, seed: int = 0) -> np.ndarray:
+    rows = source.shape[0]
+    if size >= rows:
+        return _rows(source, 0, rows)
+    picks = np.sort(np.random.default_rng(seed).choice(rows, size=size, replace=False))
+    return np.ascontiguousarray(source[picks], dtype=np.float32)
+
+
+def _set_search_params(faiss: Any, index: Any, nprobe: int) -> None:
+    try:
+        faiss.extract_index_ivf(index).nprobe = nprobe
+        return
+    except Exception:
+        pass
+    hnsw = getattr(index, "hnsw", None)
+    if hnsw is not None:
+        hnsw.efSearch = max(hnsw.efSearch, 4 * nprobe)
+
+
+def build_index(
+    faiss: Any,
+    source: Any,
+    factory: str = "flat",
+    *,
+    train_size: int = 100000,
+    nprobe: int = 16,
+    batch_rows: int = _ADD_BATCH_ROWS,
+) -> Tuple[Any, Dict[str, Any]]:
+    """Build an inner-product index over ``source`` rows; returns ``(index, report)``."""
+
+    rows, dimension = int(source.shape[0]), int(source.shape[1])
+    resolved = resolve_factory(factory, rows, dimension)
+    index = faiss.index_factory(dimension, resolved, faiss.METRIC_INNER_PRODUCT)
+
+    started = time.perf_counter()
+    trained_on = 0
+    if not index.is_trained:
+        sample = _training_sample(source, min(rows, max(1, int(train_size))))
+        index.train(sample)
+        trained_on = int(sample.shape[0])
+        del sample
+    train_seconds = time.perf_counter() - started
+
+    for start in range(0, rows, max(1, int(batch_rows))):
+        index.add(_rows(source, start, min(start + batch_rows, rows)))
+    _set_search_params(faiss, index, nprobe)
+
+    return index, {
+        "factory": resolved,
+        "rows": rows,
+        "dimension": dimension,
+        "trained_on": trained_on,
+        "nprobe": nprobe if resolved != "Flat" else None,
+        "train_seconds": round(train_seconds, 3),
+        "build_seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def exact_top_k(source: Any, queries: np.ndarray, k: int, block_rows: int = _EXACT_BLOCK_ROWS) -> np.ndarray:
+    """Exact inner-product top-k ids, streamed over ``source`` in row blocks."""
+
+    rows = source.shape[0]
+    k = min(k, rows)
+    best_scores = np.full((queries.shape[0], 0), -np.inf, dtype=np.float32)
+    best_ids = np.zeros((queries.shape[0], 0), dtype=np.int64)
+    for start in range(0, rows, block_rows):
+        block = _rows(source, start, min(start + block_rows, rows))
+        scores = np.concatenate([best_scores, queries @ block.T], axis=1)
+        ids = np.concatenate(
+            [best_ids, np.broadcast_to(np.arange(start, start + block.shape[0]), (queries.shape[0], block.shape[0]))],
+            axis=1,
+        )
+        keep = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        best_scores = np.take_along_axis(scores, keep, axis=1)
+        best_ids = np.take_along_axis(ids, keep, axis=1)
+    return best_ids
+
+
+def recall_at_k(
+    index: Any,
+    source: Any,
+    *,
+    k: int = 10,
+    queries: int = 200,
+    seed: int = 0,
+) -> Optional[Dict[str, Any]]:
+    """Recall@k of ``index`` against exact search, using stored rows as queries."""
+
+    rows = int(source.shape[0])
+    if rows == 0 or queries <= 0:
+        return None
+    k = min(k, rows)
+    picks = np.sort(np.random.default_rng(seed).choice(rows, size=min(queries, rows), replace=False))
+    query_matrix = np.ascontiguousarray(source[picks], dtype=np.float32)
+
+    expected = exact_top_k(source, query_matrix, k)
+    _, found = index.search(query_matrix, k)
+    hits = sum(
+        len(set(expected_row.tolist()) & set(found_row.tolist()))
+        for expected_row, found_row in zip(expected, found)
+    )
+    return {"k": k, "queries": int(query_matrix.shape[0]), "recall": hits / float(k * query_matrix.shape[0])}
+
+
+__all__ = [
+    "AUTO_FLAT_MAX_ROWS",
+    "build_index",
+    "exact_top_k",
+    "recall_at_k",
+    "resolve_factory",
+]
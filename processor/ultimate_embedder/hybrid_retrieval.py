@@ -0,0 +1,409 @@
+"""In-process hybrid dense + sparse candidate retrieval."""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from processor.ultimate_embedder.sparse_pipeline import build_query_term_weights
+
+FUSION_MODES = ("rrf", "weighted", "dense")
+
+
+class SparseInvertedIndex:
+    """Term id → posting list of ``(doc, weight)`` built from sparse vectors.
+
+    Postings are stored as one contiguous array sorted by term, with a per-term
+    maximum weight so ``search`` can apply MaxScore-style pruning.
+    """
+
+    def __init__(
+        self,
+        term_ids: np.ndarray,
+        offsets: np.ndarray,
+        docs: np.ndarray,
+        weights: np.ndarray,
+        doc_count: int,
+    ) -> None:
+        self._slots: Dict[int, int] = {int(term): slot for slot, term in enumerate(term_ids.tolist())}
+        self._offsets = offsets
+        self._docs = docs
+        self._weights = weights
+        self._max_weights = (
+            np.maximum.reduceat(weights, offsets[:-1]) if weights.size else np.zeros(0, dtype=np.float32)
+        )
+        self.doc_count = doc_count
+        self.last_query_stats: Dict[str, int] = {}
+
+    @classmethod
+    def build(cls, sparse_vectors: Sequence[Optional[Mapping[str, Any]]]) -> "SparseInvertedIndex":
+        """Index ``{"indices": [...], "values": [...]}`` vectors by position."""
+
+        term_parts: List[np.ndarray] = []
+        doc_parts: List[np.ndarray] = []
+        weight_parts: List[np.ndarray] = []
+        for doc, vector in enumerate(sparse_vectors):
+            if not isinstance(vector, Mapping):
+                continue
+            indices = vector.get("indices") or []
+            values = vector.get("values") or []
+            if not indices or len(indices) != len(values):
+                continue
+            term_parts.append(np.asarray(indices, dtype=np.int64))
+            weight_parts.append(np.asarray(values, dtype=np.float32))
+            doc_parts.append(np.full(len(indices), doc, dtype=np.int64))
+
+        if not term_parts:
+            empty = np.zeros(0, dtype=np.int64)
+            return cls(empty, np.zeros(1, dtype=np.int64), empty, np.zeros(0, dtype=np.float32), len(sparse_vectors))
+
+        terms = np.concatenate(term_parts)
+        order = np.argsort(terms, kind="stable")
+        terms = terms[order]
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(terms)) + 1))
+        offsets = np.append(starts, terms.size).astype(np.int64)
+        return cls(
+            terms[starts],
+            offsets,
+            np.concatenate(doc_parts)[order],
+            np.concatenate(weight_parts)[order],
+            len(sparse_vectors),
+        )
+
+    @property
+    def term_count(self) -> int:
+        return len(self._slots)
+
+    @property
+    def posting_count(self) -> int:
+        return int(self._docs.size)
+
+    def posting(self, term: int) -> Tuple[np.ndarray, np.ndarray]:
+        slot = self._slots.get(int(term))
+        if slot is None:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        start, end = self._offsets[slot], self._offsets[slot + 1]
+        return self._docs[start:end], self._weights[start:end]
+
+    def search(self, query: Mapping[int, float], top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return ``(docs, scores)`` for the top-k dot products with ``query``.
+
+        Terms are scored in descending upper-bound order. Once the k-th best
+        score reaches the summed bound of the remaining terms, those terms can
+        only refine documents already seen, and seen documents that can no
+        longer reach the threshold are dropped (MaxScore).
+        """
+
+        terms: List[Tuple[int, float, float]] = []
+        for term, weight in query.items():
+            slot = self._slots.get(int(term))
+            if slot is None or weight <= 0.0:
+                continue
+            terms.append((slot, float(weight), float(weight) * float(self._max_weights[slot])))
+        if not terms or top_k <= 0:
+            self.last_query_stats = {"terms": 0, "postings_scored": 0, "postings_skipped": 0}
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        terms.sort(key=lambda item: item[2], reverse=True)
+        remaining = np.cumsum([bound for _, _, bound in terms][::-1])[::-1]
+
+        scores = np.zeros(self.doc_count, dtype=np.float32)
+        alive = np.zeros(self.doc_count, dtype=bool)
+        threshold = 0.0
+        scored = skipped = 0
+        for position, (slot, weight, _) in enumerate(terms):
+            start, end = self._offsets[slot], self._offsets[slot + 1]
+            docs = self._docs[start:end]
+            postings = self._weights[start:end]
+            alive_count = int(alive.sum())
+            if alive_count >= top_k and threshold >= remaining[position]:
+                alive &= scores + remaining[position] >= threshold
+                keep = alive[docs]
+                skipped += int(docs.size - keep.sum())
+                docs = docs[keep]
+                postings = postings[keep]
+            scores[docs] += weight * postings
+            alive[docs] = True
+            scored += int(docs.size)
+            candidates = scores[alive]
+            if candidates.size >= top_k:
+                threshold = float(np.partition(candidates, candidates.size - top_k)[candidates.size - top_k])
+
+        self.last_query_stats = {"terms": len(terms), "postings_scored": scored, "postings_skipped": skipped}
+        docs = np.flatnonzero(alive)
+        doc_scores = scores[docs]
+        if docs.size > top_k:
+            keep = np.argpartition(-doc_scores, top_k - 1)[:top_k]
+            docs, doc_scores = docs[keep], doc_scores[keep]
+        order = np.lexsort((docs, -doc_scores))
+        return docs[order], doc_scores[order]
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[int]],
+    *,
+    k: int = 60,
+    weights: Optional[Sequence[float]] = None,
+) -> List[Tuple[int, float]]:
+    """Fuse ranked id lists with ``sum(weight / (k + rank))``."""
+
+    fused: Dict[int, float] = {}
+    for list_idx, ranking in enumerate(rankings):
+        weight = float(weights[list_idx]) if weights is not None else 1.0
+        for rank, doc in enumerate(ranking, start=1):
+            fused[int(doc)] = fused.get(int(doc), 0.0) + weight / (k + rank)
+    return sorted(fused.items(), key=lambda item: (-item[1], item[0]))
+
+
+def weighted_score_fusion(
+    scored_lists: Sequence[Tuple[Sequence[int], Sequence[float]]],
+    weights: Sequence[float],
+) -> List[Tuple[int, float]]:
+    """Fuse min-max normalised scores with per-list weights."""
+
+    fused: Dict[int, float] = {}
+    for (docs, scores), weight in zip(scored_lists, weights):
+        values = np.asarray(scores, dtype=np.float64)
+        if not values.size:
+            continue
+        low, high = float(values.min()), float(values.max())
+        span = high - low
+        normalised = (values - low) / span if span > 0 else np.ones_like(values)
+        for doc, value in zip(docs, normalised.tolist()):
+            fused[int(doc)] = fused.get(int(doc), 0.0) + float(weight) * value
+    return sorted(fused.items(), key=lambda item: (-item[1], item[0]))
+
+
+def sparse_terms_from_embedding(embedding: Any, threshold: float = 1e-6) -> Dict[int, float]:
+    """Extract non-zero ``{vocab_id: weight}`` pairs from a SPLADE query output."""
+
+    to_dense = getattr(embedding, "to_dense", None)
+    if callable(to_dense):
+        embedding = to_dense()
+    cpu = getattr(embedding, "cpu", None)
+    if callable(cpu):
+        embedding = cpu().numpy()
+    values = np.asarray(embedding, dtype=np.float32).reshape(-1)
+    nonzero = np.flatnonzero(values > threshold)
+    if not nonzero.size:
+        return {}
+    weights = values[nonzero]
+    weights = weights / float(np.linalg.norm(weights))
+    return {int(idx): float(weight) for idx, weight in zip(nonzero.tolist(), weights.tolist())}
+
+
+def build_query_terms(query: str, sparse_model: Any = None, logger: Optional[logging.Logger] = None) -> Dict[int, float]:
+    """Build a query sparse vector covering both SPLADE and metadata vectors.
+
+    Metadata-derived document vectors use hashed term ids while SPLADE vectors
+    use vocabulary ids; the two ranges do not collide, so one query vector can
+    carry both.
+    """
+
+    terms = build_query_term_weights(query)
+    if sparse_model is not None and callable(getattr(sparse_model, "encode", None)):
+        try:
+            encoded = sparse_model.encode([query], convert_to_tensor=False, show_progress_bar=False)
+            terms.update(sparse_terms_from_embedding(encoded[0]))
+        except Exception as exc:  # pragma: no cover - model specific failures
+            (logger or logging.getLogger(__name__)).debug("Sparse query encode failed: %s", exc)
+    return terms
+
+
+@dataclass
+class HybridCandidates:
+    """Fused candidate pool with per-source scores aligned to ``indices``."""
+
+    indices: List[int]
+    scores: List[float]
+    dense_scores: List[float]
+    sparse_scores: List[float]
+    fusion: str
+    sparse_only_hits: int = 0
+    sparse_stats: Dict[str, int] = field(default_factory=dict)
+
+
+class HybridRetriever:
+    """Combine dense similarity with sparse inverted-index retrieval."""
+
+    def __init__(
+        self,
+        index: Optional[SparseInvertedIndex],
+        *,
+        fusion: str = "rrf",
+        rrf_k: int = 60,
+        dense_weight: float = 1.0,
+        sparse_weight: float = 1.0,
+    ) -> None:
+        if fusion not in FUSION_MODES:
+            raise ValueError(f"Unknown fusion mode {fusion!r}; expected one of {FUSION_MODES}")
+        self.index = index
+        self.fusion = fusion
+        self.rrf_k = max(1, int(rrf_k))
+        self.dense_weight = float(dense_weight)
+        self.sparse_weight = float(sparse_weight)
+
+    @property
+    def sparse_enabled(self) -> bool:
+        return self.fusion != "dense" and self.index is not None and self.index.posting_count > 0
+
+    def retrieve(
+        self,
+        dense_scores: np.ndarray,
+        query_terms: Optional[Mapping[int, float]],
+        top_k: int,
+    ) -> HybridCandidates:
+        """Return up to ``top_k`` candidates fused from dense and sparse rankings."""
+
+        dense_scores = np.asarray(dense_scores, dtype=np.float32).reshape(-1)
+        total = dense_scores.shape[0]
+        limit = total if top_k <= 0 else min(int(top_k), total)
+        if limit <= 0:
+            return HybridCandidates([], [], [], [], self.fusion)
+
+        dense_top = np.argpartition(-dense_scores, limit - 1)[:limit] if limit < total else np.arange(total)
+        dense_top = dense_top[np.lexsort((dense_top, -dense_scores[dense_top]))]
+        return self._fuse(dense_top, dense_scores[dense_top], query_terms, limit, total, lambda docs: dense_scores[docs])
+
+    def retrieve_from_index(
+        self,
+        index: Any,
+        queries: Any,
+        query_terms: Sequence[Optional[Mapping[int, float]]],
+        top_k: int,
+    ) -> List[HybridCandidates]:
+        """``retrieve`` for each query row without materialising full similarity vectors.
+
+        ``index`` is an ``ExactSearchIndex``: its ``search`` supplies the dense
+        top-k for all queries in one pass, and ``row_scores`` fills in dense
+        scores for sparse-only hits. ``query_terms`` aligns with the query rows.
+        """
+
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        total = int(index.rows)
+        limit = total if top_k <= 0 else min(int(top_k), total)
+        if limit <= 0:
+            return [HybridCandidates([], [], [], [], self.fusion) for _ in range(queries.shape[0])]
+
+        dense_ids, dense_values = index.search(queries, limit)
+        return [
+            self._fuse(
+                dense_ids[row],
+                dense_values[row],
+                query_terms[row],
+                limit,
+                total,
+                lambda docs, query=queries[row]: index.row_scores(query, docs),
+            )
+            for row in range(queries.shape[0])
+        ]
+
+    def _fuse(
+        self,
+        dense_top: np.ndarray,
+        dense_values: np.ndarray,
+        query_terms: Optional[Mapping[int, float]],
+        limit: int,
+        total: int,
+        score_docs: Callable[[np.ndarray], np.ndarray],
+    ) -> HybridCandidates:
+        """Fuse a descending dense top-``limit`` with sparse hits; ``score_docs`` scores sparse-only docs."""
+
+        dense_values = np.asarray(dense_values, dtype=np.float32)
+        if not self.sparse_enabled or not query_terms:
+            return HybridCandidates(
+                indices=[int(idx) for idx in dense_top],
+                scores=[float(score) for score in dense_values],
+                dense_scores=[float(score) for score in dense_values],
+                sparse_scores=[0.0] * len(dense_top),
+                fusion="dense",
+            )
+
+        assert self.index is not None
+        sparse_docs, sparse_values = self.index.search(query_terms, limit)
+        sparse_docs = sparse_docs[sparse_docs < total]
+        sparse_lookup = {int(doc): float(score) for doc, score in zip(sparse_docs, sparse_values)}
+        weights = (self.dense_weight, self.sparse_weight)
+        if self.fusion == "weighted":
+            fused = weighted_score_fusion(
+                [(dense_top.tolist(), dense_values.tolist()), (list(sparse_lookup), list(sparse_lookup.values()))],
+                weights,
+            )
+        else:
+            fused = reciprocal_rank_fusion([dense_top.tolist(), list(sparse_lookup)], k=self.rrf_k, weights=weights)
+        fused = fused[:limit]
+
+        indices = [doc for doc, _ in fused]
+        dense_lookup = {int(doc): float(score) for doc, score in zip(dense_top, dense_values)}
+        dense_set = set(dense_lookup)
+        sparse_only = [doc for doc in indices if doc not in dense_set]
+        if sparse_only:
+            extra = np.asarray(score_docs(np.asarray(sparse_only, dtype=np.int64)), dtype=np.float32)
+            dense_lookup.update(zip(sparse_only, (float(score) for score in extra)))
+        return HybridCandidates(
+            indices=indices,
+            scores=[score for _, score in fused],
+            dense_scores=[dense_lookup[doc] for doc in indices],
+            sparse_scores=[sparse_lookup.get(doc, 0.0) for doc in indices],
+            fusion=self.fusion,
+            sparse_only_hits=len(sparse_only),
+            sparse_stats=dict(self.index.last_query_stats),
+        )
+
+
+def resolve_sparse_query_model(embedder: Any) -> Any:
+    """Return the loaded sparse model that produced ``embedder.sparse_vectors``."""
+
+    result = getattr(embedder, "sparse_inference_result", None)
+    model_name = getattr(result, "model_name", None)
+    models = getattr(embedder, "sparse_models", None) or {}
+    if not model_name or not isinstance(models, Mapping):
+        return None
+    return models.get(model_name)
+
+
+def get_hybrid_retriever(embedder: Any) -> HybridRetriever:
+    """Return a retriever for ``embedder.sparse_vectors``, rebuilding when they change."""
+
+    config = getattr(embedder, "reranking_config", None)
+    fusion = getattr(config, "hybrid_fusion", "rrf")
+    rrf_k = getattr(config, "rrf_k", 60)
+    dense_weight = getattr(config, "dense_weight", 1.0)
+    sparse_weight = getattr(config, "sparse_weight", 1.0)
+    sparse_vectors = getattr(embedder, "sparse_vectors", None) or []
+
+    key = (id(sparse_vectors), len(sparse_vectors), fusion, rrf_k, dense_weight, sparse_weight)
+    cached = getattr(embedder, "_hybrid_retriever_cache", None)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    index = SparseInvertedIndex.build(sparse_vectors) if fusion != "dense" and any(sparse_vectors) else None
+    retriever = HybridRetriever(
+        index,
+        fusion=fusion,
+        rrf_k=rrf_k,
+        dense_weight=dense_weight,
+        sparse_weight=sparse_weight,
+    )
+    try:
+        embedder._hybrid_retriever_cache = (key, retriever)
+    except AttributeError:  # pragma: no cover - slotted stubs
+        pass
+    return retriever
+
+
+__all__ = [
+    "FUSION_MODES",
+    "HybridCandidates",
+    "HybridRetriever",
+    "SparseInvertedIndex",
+    "build_query_terms",
+    "get_hybrid_retriever",
+    "reciprocal_rank_fusion",
+    "resolve_sparse_query_model",
+    "sparse_terms_from_embedding",
+    "weighted_score_fusion",
+]
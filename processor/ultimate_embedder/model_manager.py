@@ -15,6 +15,7 @@ from processor.ultimate_embedder.config import (
     KAGGLE_OPTIMIZED_MODELS,
     SPARSE_MODELS,
 )
+from processor.ultimate_embedder.weight_cache import PinnedWeightCache, module_nbytes, safetensors_nbytes
 
 if TYPE_CHECKING:  # pragma: no cover - typing only
     from sentence_transformers import SentenceTransformer, SparseEncoder
@@ -51,6 +52,9 @@ class ModelManager:
     def __init__(self, embedder: "UltimateKaggleEmbedderV4", logger: logging.Logger) -> None:
         self.embedder = embedder
         self.logger = logger
+        self.weight_cache = PinnedWeightCache.from_env(logger)
+        # Devices whose per-process memory fraction has already been applied.
+        self._memory_fraction_devices: set = set()
 
         if _ORT_IMPORT_ERROR:
             logger.warning(
@@ -502,9 +506,8 @@ class ModelManager:
         if embedder.device_count > 1:
             logger.info("Setting up multi-GPU processing (%s GPUs)", embedder.device_count)
             if embedder.gpu_config.strategy == "data_parallel":
-                logger.info("Applying DataParallel wrapper to %s", type(model).__name__)
-                model = torch.nn.DataParallel(model)
-                logger.info("Data parallel enabled")
+                # DataParallel only splits forward(); encode() would still run on one GPU.
+                logger.info("Data parallel enabled via per-device encode replicas")
 
         if embedder.gpu_config.enable_torch_compile and hasattr(torch, "compile"):
             try:
@@ -631,6 +634,28 @@ class ModelManager:
             embedder.models[model_name] = model.module
             model = model.module
 
+        if embedder.device == "cuda" and isinstance(model, torch.nn.Module):
+            if self.weight_cache.keep_resident(model_name, model):
+                return
+            event = self.weight_cache.stage(
+                model_name,
+                model,
+                fp16=embedder.gpu_config.precision == "fp16",
+            )
+            embedder.processing_stats.setdefault("staging_events", []).append({"timestamp": time.time(), **event})
+            if model_name in getattr(embedder, "sparse_models", {}):
+                embedder.sparse_models[model_name] = model
+                if hasattr(embedder, "sparse_device_map"):
+                    embedder.sparse_device_map[model_name] = "cpu"
+            embedder._record_model_dtype(model_name, model)
+            logger.info(
+                "Model %s staged to %s host memory (%.2fs)",
+                model_name,
+                event["source"],
+                event["duration_seconds"],
+            )
+            return
+
         # Move to CPU
         if hasattr(model, "to"):
             model = model.to("cpu")
@@ -644,6 +669,36 @@ class ModelManager:
         else:
             logger.warning("Model %s does not support .to() method", model_name)
 
+    def measure_weight_bytes(self, model_name: str) -> Optional[int]:
+        """Weight bytes ``model_name`` occupies once hydrated, without loading it.
+
+        Loaded models are measured directly; others are sized from the
+        safetensors headers in their cached snapshot. Returns None when neither
+        is available, which makes the placement planner lease it every GPU.
+        """
+        embedder = self.embedder
+        fp16 = embedder.gpu_config.precision == "fp16"
+
+        model = embedder.models.get(model_name)
+        if model is None and model_name in getattr(embedder, "sparse_models", {}):
+            model = embedder.sparse_models[model_name]
+        if model is not None:
+            module = embedder._unwrap_model(model)
+            if not isinstance(module, torch.nn.Module):
+                return None
+            return module_nbytes(module, fp16=fp16)
+
+        config = KAGGLE_OPTIMIZED_MODELS.get(model_name)
+        if config is None:
+            return None
+        repo_cache_dir = embedder.hf_cache_dir / f"models--{config.hf_model_id.replace('/', '--')}"
+        snapshot_root = next(repo_cache_dir.glob("snapshots/*"), None)
+        if snapshot_root is None:
+            self.logger.debug("No cached snapshot to size %s for placement", model_name)
+            return None
+        # Sentence-transformers repos may ship extra copies under subfolders (e.g. onnx/).
+        return safetensors_nbytes(sorted(snapshot_root.glob("*.safetensors")), fp16=fp16)
+
     def dispose_model(self, model_name: str, *, keep_primary: bool = False) -> None:
         """Remove a model reference to free host memory."""
 
@@ -658,6 +713,7 @@ class ModelManager:
 
         if model_name == embedder.model_name:
             embedder.primary_model = None
+        self.weight_cache.drop(model_name)
 
         with suppress(Exception):
             if hasattr(model, "to"):
@@ -675,7 +731,9 @@ class ModelManager:
     ) -> Any:
         """Hydrate an ensemble model from CPU onto leased GPUs.
 
-        Returns the model ready for encoding, potentially wrapped in DataParallel.
+        Returns the model ready for encoding on the first leased device. Passes
+        leasing several devices encode through ``ReplicaEncodePool``, which
+        copies the hydrated model to the remaining devices.
         """
         embedder = self.embedder
         logger = self.logger
@@ -714,6 +772,7 @@ class ModelManager:
         status = "skipped"
         success = False
         error_message: Optional[str] = None
+        weight_source: Optional[str] = None
 
         try:
             if not device_ids:
@@ -722,8 +781,11 @@ class ModelManager:
                 return model
 
             if hasattr(model, "to"):
-                model = model.to(primary_device)
-                logger.debug("Model %s moved to %s", model_name, primary_device)
+                if isinstance(model, torch.nn.Module):
+                    weight_source = self.weight_cache.hydrate(model_name, model, primary_device)
+                else:
+                    model = model.to(primary_device)
+                logger.debug("Model %s moved to %s (%s)", model_name, primary_device, weight_source or "to")
 
                 if embedder.gpu_config.precision == "fp16" and embedder.device == "cuda":
                     model = model.half()
@@ -734,13 +796,12 @@ class ModelManager:
                     and embedder.ensemble_config
                     and embedder.ensemble_config.exclusive_mode
                 ):
-                    for gpu_id in device_ids:
+                    new_devices = [gpu_id for gpu_id in device_ids if gpu_id not in self._memory_fraction_devices]
+                    for gpu_id in new_devices:
                         torch.cuda.set_per_process_memory_fraction(0.75, device=gpu_id)
-                    logger.info(
-                        "Set GPU memory limit to 12GB (75%%) for %s on GPUs %s",
-                        model_name,
-                        device_ids,
-                    )
+                        self._memory_fraction_devices.add(gpu_id)
+                    if new_devices:
+                        logger.info("Set GPU memory limit to 75%% on GPUs %s", new_devices)
 
                     for gpu_id in device_ids:
                         mem_allocated = torch.cuda.memory_allocated(gpu_id) / (1024**3)
@@ -752,23 +813,6 @@ class ModelManager:
                             mem_reserved,
                         )
 
-                if (
-                    len(device_ids) > 1
-                    and embedder.ensemble_config
-                    and embedder.ensemble_config.sequential_data_parallel
-                ):
-                    logger.debug(
-                        "Wrapping %s with DataParallel on devices %s",
-                        model_name,
-                        device_ids,
-                    )
-                    model = torch.nn.DataParallel(model, device_ids=device_ids)
-                    logger.info(
-                        "Model %s wrapped with DataParallel across %d GPUs",
-                        model_name,
-                        len(device_ids),
-                    )
-
                 embedder.models[model_name] = model
                 if model_name in getattr(embedder, "sparse_models", {}):
                     embedder.sparse_models[model_name] = model
@@ -799,6 +843,8 @@ class ModelManager:
                 "status": status,
                 "success": success,
             }
+            if weight_source:
+                event["weight_source"] = weight_source
             if error_message:
                 event["error"] = error_message[:200]
             embedder.processing_stats["hydration_events"].append(event)
@@ -63,13 +63,24 @@ class PerformanceMonitor:
         """Collect GPU and system metrics until monitoring is disabled."""
 
         embedder = self.embedder
+        emitter = getattr(embedder, "prometheus_emitter", None)
+        process = None
+        if psutil is not None and hasattr(psutil, "Process"):
+            try:
+                process = psutil.Process()
+            except Exception:  # pragma: no cover - defensive
+                process = None
 
         while self._active:
             try:
+                gpu_gauges = []
                 if torch.cuda.is_available() and embedder.device_count > 0:
                     for idx in range(embedder.device_count):
-                        memory_used = torch.cuda.memory_allocated(idx) / 1e9
-                        memory_reserved = torch.cuda.memory_reserved(idx) / 1e9
+                        allocated_bytes = torch.cuda.memory_allocated(idx)
+                        reserved_bytes = torch.cuda.memory_reserved(idx)
+                        gpu_gauges.append((idx, allocated_bytes, reserved_bytes))
+                        memory_used = allocated_bytes / 1e9
+                        memory_reserved = reserved_bytes / 1e9
                         properties = torch.cuda.get_device_properties(idx)
                         memory_total = properties.total_memory / 1e9 if properties else 0.0
                         utilization = (memory_used / memory_total * 100) if memory_total else 0.0
@@ -102,6 +113,10 @@ class PerformanceMonitor:
                     )
                     self._psutil_warning_logged = True
 
+                if emitter is not None and getattr(emitter, "enabled", False):
+                    rss_bytes = process.memory_info().rss if process is not None else None
+                    emitter.update_resource_gauges(rss_bytes=rss_bytes, gpu_memory=gpu_gauges)
+
                 time.sleep(2)
             except Exception as exc:  # pragma: no cover - defensive logging
                 self.logger.error("Monitoring error: %s", exc)
@@ -0,0 +1,188 @@
+"""Device placement planner for co-resident ensemble model passes.
+
+Exclusive rotation leases every GPU to one model at a time, so a 90M-parameter
+model holds both T4s while using a sliver of one. ``PlacementPlanner`` packs
+models into *waves* from their measured footprints instead:
+
+* Every model in a wave runs concurrently under its own device-level lease.
+  Models are spread over the least-loaded device first, so two small models on
+  a two-GPU host land on disjoint devices; further models share a device
+  whenever its budget still has room.
+* A model whose footprint exceeds a single device's budget, or whose footprint
+  is unknown, gets a wave of its own with every device (exclusive rotation).
+* A wave holding a single model also leases every device.
+
+A model's footprint is its weight bytes in the run's precision scaled by
+``1 + activation_factor`` to leave room for encode activations.
+
+Configured through the environment:
+
+* ``EMBEDDER_CORESIDENT``: ``1`` enables co-residency (default off, i.e.
+  exclusive rotation). Footprints come from loaded models or the safetensors
+  headers of cached snapshots; nothing is loaded just to size it.
+* ``EMBEDDER_PLACEMENT_ACTIVATION_FACTOR``: activation headroom as a multiple
+  of weight bytes (default 1.0).
+* ``EMBEDDER_PLACEMENT_BUDGET_FRACTION``: usable share of each device's memory
+  (default 0.75, matching the per-process memory fraction set on hydration).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+import torch
+
+_DEFAULT_ACTIVATION_FACTOR = 1.0
+_DEFAULT_BUDGET_FRACTION = 0.75
+
+
+def _env_float(name: str, default: float) -> float:
+    raw = os.environ.get(name, "").strip()
+    if not raw:
+        return default
+    try:
+        return float(raw)
+    except ValueError:
+        return default
+
+
+@dataclass
+class ModelPlacement:
+    """Devices leased to one model within a wave."""
+
+    model_name: str
+    device_ids: List[int]
+    footprint_bytes: Optional[int] = None
+    exclusive: bool = False
+
+
+@dataclass
+class PlacementPlan:
+    """Ordered waves; the models of a wave run concurrently."""
+
+    waves: List[List[ModelPlacement]] = field(default_factory=list)
+
+    @property
+    def concurrent(self) -> bool:
+        return any(len(wave) > 1 for wave in self.waves)
+
+    def summarize(self) -> List[List[Dict[str, Any]]]:
+        return [
+            [
+                {
+                    "model": placement.model_name,
+                    "device_ids": list(placement.device_ids),
+                    "footprint_gb": (
+                        round(placement.footprint_bytes / 1024**3, 3)
+                        if placement.footprint_bytes is not None
+                        else None
+                    ),
+                    "exclusive": placement.exclusive,
+                }
+                for placement in wave
+            ]
+            for wave in self.waves
+        ]
+
+
+class PlacementPlanner:
+    """Pack models into concurrent waves over per-device memory budgets."""
+
+    def __init__(
+        self,
+        *,
+        enabled: bool = True,
+        activation_factor: float = _DEFAULT_ACTIVATION_FACTOR,
+        budget_fraction: float = _DEFAULT_BUDGET_FRACTION,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        self.enabled = bool(enabled)
+        self.activation_factor = max(0.0, float(activation_factor))
+        self.budget_fraction = min(1.0, max(0.0, float(budget_fraction)))
+        self.logger = logger or logging.getLogger(__name__)
+
+    @classmethod
+    def from_env(cls, logger: Optional[logging.Logger] = None) -> "PlacementPlanner":
+        return cls(
+            enabled=os.environ.get("EMBEDDER_CORESIDENT", "0").strip() == "1",
+            activation_factor=_env_float("EMBEDDER_PLACEMENT_ACTIVATION_FACTOR", _DEFAULT_ACTIVATION_FACTOR),
+            budget_fraction=_env_float("EMBEDDER_PLACEMENT_BUDGET_FRACTION", _DEFAULT_BUDGET_FRACTION),
+            logger=logger,
+        )
+
+    def device_budgets(self, device_ids: Sequence[int]) -> Dict[int, int]:
+        """Usable bytes per CUDA device."""
+
+        return {
+            device_id: int(torch.cuda.get_device_properties(device_id).total_memory * self.budget_fraction)
+            for device_id in device_ids
+        }
+
+    def footprint(self, weight_bytes: Optional[int]) -> Optional[int]:
+        if weight_bytes is None:
+            return None
+        return int(weight_bytes * (1.0 + self.activation_factor))
+
+    def exclusive_plan(self, models: Sequence[str], device_ids: Sequence[int]) -> PlacementPlan:
+        return PlacementPlan(
+            waves=[[ModelPlacement(name, list(device_ids), exclusive=True)] for name in models]
+        )
+
+    def plan(
+        self,
+        models: Sequence[str],
+        weight_bytes: Mapping[str, Optional[int]],
+        budgets: Mapping[int, int],
+    ) -> PlacementPlan:
+        """Place ``models`` (in run order) onto the devices in ``budgets``."""
+
+        device_ids = list(budgets)
+        if not self.enabled or not device_ids:
+            return self.exclusive_plan(models, device_ids)
+
+        largest = max(budgets.values())
+        waves: List[List[ModelPlacement]] = []
+        # Remaining budget per device for each co-resident wave (None = exclusive wave).
+        free: List[Optional[Dict[int, int]]] = []
+
+        for name in models:
+            need = self.footprint(weight_bytes.get(name))
+            if need is None or need > largest:
+                waves.append([ModelPlacement(name, list(device_ids), need, exclusive=True)])
+                free.append(None)
+                continue
+
+            placed = False
+            for wave, remaining in zip(waves, free):
+                if remaining is None:
+                    continue
+                fitting = [device_id for device_id in device_ids if remaining[device_id] >= need]
+                if not fitting:
+                    continue
+                # Least-loaded device first so models spread before they stack.
+                device_id = max(fitting, key=lambda candidate: (remaining[candidate], -candidate))
+                remaining[device_id] -= need
+                wave.append(ModelPlacement(name, [device_id], need))
+                placed = True
+                break
+            if not placed:
+                remaining = dict(budgets)
+                device_id = max(device_ids, key=lambda candidate: (remaining[candidate], -candidate))
+                remaining[device_id] -= need
+                waves.append([ModelPlacement(name, [device_id], need)])
+                free.append(remaining)
+
+        for wave in waves:
+            if len(wave) == 1:
+                wave[0].device_ids = list(device_ids)
+        return PlacementPlan(waves=waves)
+
+
+__all__ = [
+    "ModelPlacement",
+    "PlacementPlan",
+    "PlacementPlanner",
+]
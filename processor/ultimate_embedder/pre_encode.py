@@ -0,0 +1,291 @@
+"""Pre-encode dedup, token accounting and truncation shared across ensemble models."""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+_FALSE_VALUES = {"0", "false", "no", "off"}
+# Tokenizers report sentinel values (e.g. 1e30) when no limit is configured.
+_MAX_SANE_LENGTH = 1_000_000
+
+
+@dataclass
+class DedupResult:
+    """Unique texts plus the index maps needed to fan results back out."""
+
+    unique_texts: List[str]
+    inverse: np.ndarray
+    first_index: np.ndarray
+
+    @property
+    def total_count(self) -> int:
+        return int(self.inverse.shape[0])
+
+    @property
+    def duplicate_count(self) -> int:
+        return self.total_count - len(self.unique_texts)
+
+
+@dataclass
+class TokenizedTexts:
+    """Token lengths and pre-truncated texts for one tokenizer family."""
+
+    family: str
+    texts: List[str]
+    lengths: np.ndarray
+    max_length: Optional[int]
+    truncated_count: int = 0
+    models: List[str] = field(default_factory=list)
+
+    def stats(self) -> Dict[str, Any]:
+        lengths = self.lengths
+        payload: Dict[str, Any] = {
+            "models": list(self.models),
+            "max_length": self.max_length,
+            "truncated": self.truncated_count,
+            "texts": int(lengths.size),
+        }
+        if lengths.size:
+            payload.update(
+                {
+                    "total_tokens": int(lengths.sum()),
+                    "mean_tokens": round(float(lengths.mean()), 2),
+                    "p50_tokens": int(np.percentile(lengths, 50)),
+                    "p95_tokens": int(np.percentile(lengths, 95)),
+                    "max_tokens": int(lengths.max()),
+                }
+            )
+        return payload
+
+
+def dedupe_texts(texts: Sequence[str]) -> DedupResult:
+    """Collapse identical texts while remembering where each one came from."""
+
+    positions: Dict[str, int] = {}
+    unique_texts: List[str] = []
+    first_index: List[int] = []
+    inverse = np.empty(len(texts), dtype=np.int64)
+    for idx, text in enumerate(texts):
+        position = positions.get(text)
+        if position is None:
+            position = len(unique_texts)
+            positions[text] = position
+            unique_texts.append(text)
+            first_index.append(idx)
+        inverse[idx] = position
+    return DedupResult(unique_texts, inverse, np.asarray(first_index, dtype=np.int64))
+
+
+def resolve_tokenizer(model: Any) -> Tuple[Optional[Any], Optional[int]]:
+    """Return ``(tokenizer, max_length)`` for SentenceTransformer-like models."""
+
+    current = model
+    for _ in range(4):
+        tokenizer = getattr(current, "tokenizer", None)
+        if tokenizer is not None and callable(tokenizer):
+            max_length = getattr(current, "max_seq_length", None)
+            if not isinstance(max_length, int) or max_length <= 0:
+                max_length = getattr(tokenizer, "model_max_length", None)
+            if not isinstance(max_length, int) or not 0 < max_length < _MAX_SANE_LENGTH:
+                max_length = None
+            return tokenizer, max_length
+        unwrapped = getattr(current, "module", None) or getattr(current, "_orig_mod", None)
+        if unwrapped is None or unwrapped is current:
+            break
+        current = unwrapped
+    return None, None
+
+
+def tokenizer_family(tokenizer: Any, max_length: Optional[int]) -> str:
+    """Key tokenizers so models sharing a vocabulary share one tokenisation pass."""
+
+    # Unnamed tokenizers (built in-memory) only share results with themselves.
+    name = getattr(tokenizer, "name_or_path", None) or f"{type(tokenizer).__name__}@{id(tokenizer):x}"
+    vocab_size = getattr(tokenizer, "vocab_size", None)
+    return f"{name}|{vocab_size}|{max_length}"
+
+
+def tokenize_family(
+    tokenizer: Any,
+    texts: Sequence[str],
+    *,
+    family: str,
+    max_length: Optional[int],
+    chunk_size: int = 1024,
+) -> TokenizedTexts:
+    """Count tokens for ``texts`` and cut overlong inputs at the model's limit.
+
+    Truncation uses the fast tokenizer's offset mapping, so the kept prefix is
+    exactly the text the model would have seen after its own truncation. Slow
+    tokenizers only contribute lengths; the model still truncates internally.
+    """
+
+    use_offsets = bool(getattr(tokenizer, "is_fast", False)) and max_length is not None
+    special_tokens = 0
+    if max_length is not None:
+        try:
+            special_tokens = int(tokenizer.num_special_tokens_to_add(pair=False))
+        except Exception:
+            special_tokens = 0
+    budget = (max_length - special_tokens) if max_length is not None else None
+
+    output_texts = list(texts)
+    lengths = np.zeros(len(output_texts), dtype=np.int32)
+    truncated = 0
+    step = max(1, int(chunk_size))
+    for start in range(0, len(output_texts), step):
+        chunk = output_texts[start:start + step]
+        encoded = tokenizer(
+            chunk,
+            add_special_tokens=True,
+            truncation=False,
+            return_attention_mask=False,
+            return_token_type_ids=False,
+            return_offsets_mapping=use_offsets,
+            verbose=False,
+        )
+        input_ids = encoded["input_ids"]
+        offsets = encoded.get("offset_mapping") if use_offsets else None
+        for offset, ids in enumerate(input_ids):
+            position = start + offset
+            lengths[position] = len(ids)
+            if offsets is None or budget is None or budget <= 0 or len(ids) <= max_length:  # type: ignore[operator]
+                continue
+            content = [span for span in offsets[offset] if span[1] > span[0]]
+            if len(content) <= budget:
+                continue
+            output_texts[position] = chunk[offset][: content[budget - 1][1]]
+            truncated += 1
+
+    return TokenizedTexts(
+        family=family,
+        texts=output_texts,
+        lengths=lengths,
+        max_length=max_length,
+        truncated_count=truncated,
+    )
+
+
+class PreEncodeStage:
+    """Dedup chunk texts once and prepare per-tokenizer inputs for each model pass.
+
+    Identical texts are encoded once and fanned back out with ``expand``. Token
+    lengths and truncation are computed once per tokenizer family and reused by
+    every model sharing it.
+    """
+
+    def __init__(
+        self,
+        texts: Sequence[str],
+        *,
+        enabled: bool = True,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        self.enabled = enabled
+        self.logger = logger or logging.getLogger(__name__)
+        if enabled:
+            self.dedup = dedupe_texts(texts)
+        else:
+            count = len(texts)
+            self.dedup = DedupResult(list(texts), np.arange(count), np.arange(count))
+        self._families: Dict[str, TokenizedTexts] = {}
+        # Concurrent model passes share tokenised families.
+        self._lock = threading.Lock()
+        self._model_families: Dict[str, Optional[str]] = {}
+
+    @classmethod
+    def from_env(
+        cls,
+        texts: Sequence[str],
+        logger: Optional[logging.Logger] = None,
+        *,
+        env_var: str = "EMBEDDER_PRE_ENCODE",
+    ) -> "PreEncodeStage":
+        """Create a stage that is on unless ``EMBEDDER_PRE_ENCODE`` disables it."""
+
+        raw = os.environ.get(env_var, "")
+        return cls(texts, enabled=raw.strip().lower() not in _FALSE_VALUES, logger=logger)
+
+    @property
+    def texts(self) -> List[str]:
+        return self.dedup.unique_texts
+
+    def prepare(self, model_name: str, model: Any) -> List[str]:
+        """Return the encode inputs for ``model`` (deduplicated and pre-truncated)."""
+
+        if not self.enabled:
+            self._model_families[model_name] = None
+            return self.texts
+
+        tokenizer, max_length = resolve_tokenizer(model)
+        if tokenizer is None:
+            self._model_families[model_name] = None
+            return self.texts
+
+        family = tokenizer_family(tokenizer, max_length)
+        with self._lock:
+            tokenized = self._families.get(family)
+            if tokenized is None:
+                try:
+                    tokenized = tokenize_family(tokenizer, self.texts, family=family, max_length=max_length)
+                except Exception as exc:  # pragma: no cover - tokenizer quirks
+                    self.logger.warning("Pre-encode tokenisation failed for %s: %s", model_name, exc)
+                    self._model_families[model_name] = None
+                    return self.texts
+                self._families[family] = tokenized
+                self.logger.info(
+                    "[%s] Pre-encode: %d texts, %d truncated to %s tokens",
+                    model_name,
+                    len(tokenized.texts),
+                    tokenized.truncated_count,
+                    max_length,
+                )
+            if model_name not in tokenized.models:
+                tokenized.models.append(model_name)
+            self._model_families[model_name] = family
+            return tokenized.texts
+
+    def expand(self, matrix: np.ndarray) -> np.ndarray:
+        """Fan rows computed for unique texts back out to every original chunk."""
+
+        if not self.dedup.duplicate_count:
+            return matrix
+        return matrix[self.dedup.inverse]
+
+    def source_range(self, start: int, end: int) -> Tuple[int, int]:
+        """Map a unique-text batch range to original chunk indices for labelling."""
+
+        first_index = self.dedup.first_index
+        if end <= start or not first_index.size:
+            return start, end
+        return int(first_index[start]), int(first_index[end - 1]) + 1
+
+    def summarize(self) -> Dict[str, Any]:
+        """Return dedup and token-length stats for the processing summary."""
+
+        if not self.enabled:
+            return {}
+        return {
+            "total_texts": self.dedup.total_count,
+            "unique_texts": len(self.dedup.unique_texts),
+            "duplicates_skipped": self.dedup.duplicate_count,
+            "tokenizer_families": {family: tokenized.stats() for family, tokenized in self._families.items()},
+            "model_families": dict(self._model_families),
+        }
+
+
+__all__ = [
+    "DedupResult",
+    "PreEncodeStage",
+    "TokenizedTexts",
+    "dedupe_texts",
+    "resolve_tokenizer",
+    "tokenize_family",
+    "tokenizer_family",
+]
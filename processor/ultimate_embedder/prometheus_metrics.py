@@ -2,12 +2,299 @@
 
 from __future__ import annotations
 
+import bisect
 import logging
 import os
-from typing import Any, Dict, Optional, Sequence
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0,
+)
+DEFAULT_MAX_SERIES = 512
+_LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Optional[Dict[str, Any]]) -> _LabelKey:
+    if not labels:
+        return ()
+    return tuple(sorted((str(key), str(value)) for key, value in labels.items()))
+
+
+def _format_labels(key: _LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key)
+    if extra is not None:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    rendered = ",".join(
+        '%s="%s"' % (name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in pairs
+    )
+    return "{" + rendered + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Histogram:
+    """Fixed-bucket histogram whose slots are preallocated at creation."""
+
+    __slots__ = ("bounds", "counts", "total", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]) -> None:
+        self.bounds = bounds
+        self.counts: List[int] = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def snapshot(self) -> Tuple[List[int], float, int]:
+        return list(self.counts), self.total, self.count
+
+
+class MetricsRegistry:
+    """Bounded in-process registry rendering the Prometheus text format.
+
+    Series live in plain dicts keyed by sorted label tuples. Updates are
+    read-modify-write on those slots and may arrive from concurrent model
+    passes, so updates and the scrape snapshot share one short lock. The
+    number of series per metric is capped so memory stays flat no matter how
+    long a run lasts; observations for series beyond the cap are counted as
+    dropped.
+    """
+
+    def __init__(
+        self,
+        *,
+        namespace: str = "rag",
+        latency_buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+        max_series: int = DEFAULT_MAX_SERIES,
+    ) -> None:
+        self.namespace = namespace
+        self.latency_buckets: Tuple[float, ...] = tuple(sorted(float(b) for b in latency_buckets))
+        self.max_series = max(1, int(max_series))
+        self._histograms: Dict[str, Dict[_LabelKey, _Histogram]] = {}
+        self._counters: Dict[str, Dict[_LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[_LabelKey, float]] = {}
+        self._help: Dict[str, str] = {}
+        self.dropped_series = 0
+        self._lock = threading.Lock()
+
+    def _full_name(self, name: str) -> str:
+        prefix = f"{self.namespace}_"
+        return name if name.startswith(prefix) else prefix + name
+
+    def _series_slot(self, family: Dict[_LabelKey, Any], key: _LabelKey) -> bool:
+        if key in family:
+            return True
+        if len(family) >= self.max_series:
+            self.dropped_series += 1
+            return False
+        return True
+
+    def observe(
+        self,
+        name: str,
+        value: float,
+        labels: Optional[Dict[str, Any]] = None,
+        *,
+        help_text: str = "",
+    ) -> None:
+        """Record ``value`` in the fixed-bucket histogram ``name``."""
+
+        full_name = self._full_name(name)
+        key = _label_key(labels)
+        with self._lock:
+            family = self._histograms.setdefault(full_name, {})
+            if not self._series_slot(family, key):
+                return
+            histogram = family.get(key)
+            if histogram is None:
+                histogram = family.setdefault(key, _Histogram(self.latency_buckets))
+            histogram.observe(float(value))
+            if help_text:
+                self._help.setdefault(full_name, help_text)
+
+    def inc(
+        self,
+        name: str,
+        value: float = 1.0,
+        labels: Optional[Dict[str, Any]] = None,
+        *,
+        help_text: str = "",
+    ) -> None:
+        """Increment counter ``name`` by ``value``."""
+
+        full_name = self._full_name(name)
+        key = _label_key(labels)
+        with self._lock:
+            family = self._counters.setdefault(full_name, {})
+            if not self._series_slot(family, key):
+                return
+            family[key] = family.get(key, 0.0) + float(value)
+            if help_text:
+                self._help.setdefault(full_name, help_text)
+
+    def set_gauge(
+        self,
+        name: str,
+        value: float,
+        labels: Optional[Dict[str, Any]] = None,
+        *,
+        help_text: str = "",
+    ) -> None:
+        """Overwrite gauge ``name`` with ``value``."""
+
+        full_name = self._full_name(name)
+        key = _label_key(labels)
+        with self._lock:
+            family = self._gauges.setdefault(full_name, {})
+            if not self._series_slot(family, key):
+                return
+            family[key] = float(value)
+            if help_text:
+                self._help.setdefault(full_name, help_text)
+
+    def series_count(self) -> int:
+        """Return the number of live series across all metric families."""
+
+        with self._lock:
+            return sum(
+                len(family)
+                for families in (self._histograms, self._counters, self._gauges)
+                for family in families.values()
+            )
+
+    def render(self) -> str:
+        """Render all series using the Prometheus text exposition format."""
+
+        with self._lock:
+            return self._render_locked()
+
+    def _render_locked(self) -> str:
+        lines: List[str] = []
+
+        def _header(name: str, metric_type: str) -> None:
+            help_text = self._help.get(name)
+            if help_text:
+                lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+
+        for name, family in sorted(list(self._counters.items())):
+            _header(name, "counter")
+            for key, value in sorted(list(family.items())):
+                lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+
+        for name, family in sorted(list(self._gauges.items())):
+            _header(name, "gauge")
+            for key, value in sorted(list(family.items())):
+                lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+
+        for name, family in sorted(list(self._histograms.items())):
+            _header(name, "histogram")
+            for key, histogram in sorted(list(family.items()), key=lambda item: item[0]):
+                counts, total, count = histogram.snapshot()
+                cumulative = 0
+                for bound, bucket_count in zip(histogram.bounds, counts):
+                    cumulative += bucket_count
+                    lines.append(
+                        f"{name}_bucket{_format_labels(key, ('le', _format_value(bound)))} {cumulative}"
+                    )
+                lines.append(f"{name}_bucket{_format_labels(key, ('le', '+Inf'))} {count}")
+                lines.append(f"{name}_sum{_format_labels(key)} {_format_value(total)}")
+                lines.append(f"{name}_count{_format_labels(key)} {count}")
+
+        dropped_name = self._full_name("metrics_dropped_series_total")
+        lines.append(f"# TYPE {dropped_name} counter")
+        lines.append(f"{dropped_name} {self.dropped_series}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsHTTPServer:
+    """Serve a registry on ``/metrics`` from a daemon thread."""
+
+    def __init__(
+        self,
+        registry: MetricsRegistry,
+        *,
+        host: str = "127.0.0.1",
+        port: int = 9464,
+        logger_instance: Optional[logging.Logger] = None,
+    ) -> None:
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._logger = logger_instance or logger
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._server is not None
+
+    def start(self) -> int:
+        """Bind the server and return the port actually in use."""
+
+        if self._server is not None:
+            return self.port
+
+        registry = self.registry
+
+        class _Handler(BaseHTTPRequestHandler):
+            def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+                pass
+
+            def do_GET(self) -> None:  # noqa: N802
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404, "Not Found")
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        server = ThreadingHTTPServer((self.host, self.port), _Handler)
+        server.daemon_threads = True
+        self._server = server
+        self.port = int(server.server_address[1])
+        self._thread = threading.Thread(
+            target=server.serve_forever,
+            name="metrics-http",
+            daemon=True,
+        )
+        self._thread.start()
+        self._logger.info("Prometheus metrics endpoint listening on http://%s:%d/metrics", self.host, self.port)
+        return self.port
+
+    def stop(self) -> None:
+        """Shut down the server and join its thread."""
+
+        server = self._server
+        if server is None:
+            return
+        self._server = None
+        server.shutdown()
+        server.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=3)
+            self._thread = None
+        self._logger.info("Prometheus metrics endpoint stopped")
+
 
 class PrometheusMetricsEmitter:
     """
@@ -24,11 +311,25 @@ class PrometheusMetricsEmitter:
         enabled: bool = False,
         namespace: str = "rag",
         logger_instance: Optional[logging.Logger] = None,
+        http_port: Optional[int] = None,
+        http_host: str = "127.0.0.1",
+        max_buffer: int = 1024,
     ) -> None:
         self.enabled = enabled
         self.namespace = namespace
         self._logger = logger_instance or logger
         self._metric_buffer: list[Dict[str, Any]] = []
+        self.max_buffer = max(1, int(max_buffer))
+        self.http_port = http_port
+        self.http_host = http_host
+        self.registry = MetricsRegistry(namespace=namespace)
+        self._http_server: Optional[MetricsHTTPServer] = None
+
+    def _buffer(self, payload: Dict[str, Any]) -> None:
+        self._metric_buffer.append(payload)
+        overflow = len(self._metric_buffer) - self.max_buffer
+        if overflow > 0:
+            del self._metric_buffer[:overflow]
 
     def emit_latency_metric(
         self,
@@ -59,7 +360,13 @@ class PrometheusMetricsEmitter:
             "labels": labels or {},
         }
         
-        self._metric_buffer.append(payload)
+        self._buffer(payload)
+        self.registry.observe(
+            f"{stage}_latency_seconds",
+            float(latency_seconds),
+            labels,
+            help_text=f"Latency of the {stage} stage in seconds",
+        )
         self._logger.debug(
             "Emitted %s = %.3fs with labels %s",
             metric_name,
@@ -98,7 +405,13 @@ class PrometheusMetricsEmitter:
             "labels": full_labels,
         }
         
-        self._metric_buffer.append(payload)
+        self._buffer(payload)
+        self.registry.set_gauge(
+            "gpu_peak_bytes",
+            float(peak_bytes),
+            full_labels,
+            help_text="Peak GPU memory observed per stage in bytes",
+        )
         self._logger.debug(
             "Emitted %s{stage=%s} = %d bytes with labels %s",
             metric_name,
@@ -137,7 +450,8 @@ class PrometheusMetricsEmitter:
             "labels": labels or {},
         }
         
-        self._metric_buffer.append(payload)
+        self._buffer(payload)
+        self.registry.inc(metric_name, float(value), labels)
         self._logger.debug(
             "Emitted counter %s = %.1f with labels %s",
             full_name,
@@ -146,6 +460,127 @@ class PrometheusMetricsEmitter:
         )
         return True
 
+    def observe_batch(
+        self,
+        *,
+        stage: str,
+        model: str,
+        device: str,
+        latency_seconds: float,
+        items: int,
+    ) -> bool:
+        """
+        Record one encode batch into the live registry.
+
+        Batches are high-frequency, so they bypass the payload buffer and only
+        update the fixed-size histogram and counters scraped from ``/metrics``.
+
+        Returns:
+            True if the batch was recorded, False otherwise
+        """
+        if not self.enabled:
+            return False
+
+        labels = {"stage": stage, "model": model, "device": device}
+        registry = self.registry
+        registry.observe(
+            "batch_latency_seconds",
+            float(latency_seconds),
+            labels,
+            help_text="Per-batch encode latency in seconds",
+        )
+        registry.inc("batches_total", 1.0, labels, help_text="Encode batches completed")
+        registry.inc("items_total", float(items), labels, help_text="Items encoded")
+        if latency_seconds > 0:
+            registry.set_gauge(
+                "batch_throughput_items_per_second",
+                float(items) / float(latency_seconds),
+                labels,
+                help_text="Throughput of the most recent batch",
+            )
+        return True
+
+    def update_resource_gauges(
+        self,
+        *,
+        rss_bytes: Optional[float] = None,
+        gpu_memory: Optional[Iterable[Tuple[int, float, float]]] = None,
+    ) -> bool:
+        """
+        Refresh process RSS and per-GPU memory gauges.
+
+        Args:
+            rss_bytes: Resident set size of the current process
+            gpu_memory: Iterable of (gpu_id, allocated_bytes, reserved_bytes)
+
+        Returns:
+            True if gauges were updated, False otherwise
+        """
+        if not self.enabled:
+            return False
+
+        if rss_bytes is not None:
+            self.registry.set_gauge(
+                "process_resident_memory_bytes",
+                float(rss_bytes),
+                help_text="Resident set size of the embedder process",
+            )
+        for gpu_id, allocated, reserved in gpu_memory or ():
+            labels = {"device": f"cuda:{gpu_id}"}
+            self.registry.set_gauge(
+                "gpu_memory_allocated_bytes",
+                float(allocated),
+                labels,
+                help_text="GPU memory allocated by tensors",
+            )
+            self.registry.set_gauge(
+                "gpu_memory_reserved_bytes",
+                float(reserved),
+                labels,
+                help_text="GPU memory reserved by the caching allocator",
+            )
+        return True
+
+    def start_http_server(self, port: Optional[int] = None) -> Optional[int]:
+        """
+        Start the background ``/metrics`` endpoint if enabled and configured.
+
+        Returns:
+            The bound port, or None when the endpoint is not running
+        """
+        if not self.enabled:
+            return None
+        target_port = self.http_port if port is None else port
+        if target_port is None:
+            return None
+        if self._http_server is not None and self._http_server.running:
+            return self._http_server.port
+
+        server = MetricsHTTPServer(
+            self.registry,
+            host=self.http_host,
+            port=int(target_port),
+            logger_instance=self._logger,
+        )
+        try:
+            bound_port = server.start()
+        except OSError as exc:
+            self._logger.warning("Unable to start metrics endpoint on port %s: %s", target_port, exc)
+            return None
+        self._http_server = server
+        return bound_port
+
+    def stop_http_server(self) -> None:
+        """Stop the background ``/metrics`` endpoint if running."""
+        server = self._http_server
+        self._http_server = None
+        if server is not None:
+            server.stop()
+
+    def render_metrics(self) -> str:
+        """Return the current registry in Prometheus text format."""
+        return self.registry.render()
+
     def get_buffered_metrics(self) -> Sequence[Dict[str, Any]]:
         """Return all buffered metrics and clear the buffer."""
         metrics = list(self._metric_buffer)
@@ -200,6 +635,8 @@ def create_prometheus_emitter(
     *,
     env_var: str = "EMBEDDER_METRICS_ENABLED",
     namespace_var: str = "EMBEDDER_METRICS_NAMESPACE",
+    port_var: str = "EMBEDDER_METRICS_PORT",
+    host_var: str = "EMBEDDER_METRICS_HOST",
     logger_instance: Optional[logging.Logger] = None,
 ) -> PrometheusMetricsEmitter:
     """
@@ -208,6 +645,8 @@ def create_prometheus_emitter(
     Args:
         env_var: Environment variable name for enable/disable flag
         namespace_var: Environment variable for metrics namespace
+        port_var: Environment variable for the ``/metrics`` port (unset disables it)
+        host_var: Environment variable for the ``/metrics`` bind address
         logger_instance: Optional logger for emission logging
         
     Returns:
@@ -217,12 +656,38 @@ def create_prometheus_emitter(
     enabled = metrics_flag.strip().lower() in {"1", "true", "yes", "on"}
     
     namespace = os.environ.get(namespace_var, "rag").strip() or "rag"
-    
+
+    http_port: Optional[int] = None
+    raw_port = os.environ.get(port_var, "").strip()
+    if raw_port:
+        try:
+            http_port = int(raw_port)
+        except ValueError:
+            (logger_instance or logger).warning(
+                "Ignoring invalid %s=%r; metrics endpoint disabled", port_var, raw_port
+            )
+            http_port = None
+        else:
+            if http_port < 0 or http_port > 65535:
+                (logger_instance or logger).warning(
+                    "Ignoring out-of-range %s=%d; metrics endpoint disabled", port_var, http_port
+                )
+                http_port = None
+    http_host = os.environ.get(host_var, "127.0.0.1").strip() or "127.0.0.1"
+
     return PrometheusMetricsEmitter(
         enabled=enabled,
         namespace=namespace,
         logger_instance=logger_instance,
+        http_port=http_port,
+        http_host=http_host,
     )
 
 
-__all__ = ["PrometheusMetricsEmitter", "create_prometheus_emitter"]
+__all__ = [
+    "DEFAULT_LATENCY_BUCKETS",
+    "MetricsHTTPServer",
+    "MetricsRegistry",
+    "PrometheusMetricsEmitter",
+    "create_prometheus_emitter",
+]
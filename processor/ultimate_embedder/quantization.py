@@ -0,0 +1,174 @@
+"""Compact embedding encodings for export plus exact float rescoring.
+
+Three encodings trade size for fidelity against the float32 matrix:
+
+* ``int8``: per-dimension scalar quantisation with stored ``scale`` and
+  ``offset`` (4x smaller); inner products are computed without dequantising.
+* ``binary``: one sign bit per dimension packed with ``np.packbits`` (32x
+  smaller), searched by Hamming distance for coarse candidate generation.
+* ``fp16``: half-precision copy (2x smaller), usable as the rescoring store.
+
+Coarse search over a compact code only picks candidates; ``rescore_exact``
+then reads just those rows from the float store (typically an ``np.load``
+memory map) to produce the final top-k.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+_INT8_LEVELS = 255
+_INT8_ZERO = 128
+# Bit counts for every byte value, for Hamming distance over packed codes.
+_POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+
+@dataclass
+class Int8Codes:
+    """Per-dimension scalar-quantised matrix: ``x ~= (codes + 128) * scale + offset``."""
+
+    codes: np.ndarray
+    scale: np.ndarray
+    offset: np.ndarray
+
+    def dequantize(self) -> np.ndarray:
+        return (self.codes.astype(np.float32) + _INT8_ZERO) * self.scale + self.offset
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        """Approximate inner products of ``query`` with every row."""
+
+        query = np.asarray(query, dtype=np.float32).reshape(-1)
+        bias = float(query @ (self.offset + _INT8_ZERO * self.scale))
+        return self.codes.astype(np.float32) @ (query * self.scale) + bias
+
+    def save(self, path: str) -> None:
+        np.savez(path, codes=self.codes, scale=self.scale, offset=self.offset)
+
+    @classmethod
+    def load(cls, path: str) -> "Int8Codes":
+        with np.load(path) as payload:
+            return cls(codes=payload["codes"], scale=payload["scale"], offset=payload["offset"])
+
+
+def embedding_paths(base_path: str, key_suffix: str = "") -> Dict[str, str]:
+    """Export file per encoding for ``<base_path><key_suffix>_embeddings``."""
+
+    stem = f"{base_path}{key_suffix}_embeddings"
+    return {
+        "numpy": f"{stem}.npy",
+        "compressed": f"{stem}.npz",
+        "int8": f"{stem}_int8.npz",
+        "binary": f"{stem}_binary.npy",
+        "fp16": f"{stem}_fp16.npy",
+    }
+
+
+def load_embedding_store(path: str) -> np.ndarray:
+    """Open an exported float store: ``.npy`` memory-mapped, compressed ``.npz`` read in full."""
+
+    if path.endswith(".npz"):
+        with np.load(path) as payload:
+            return payload["embeddings"]
+    return np.load(path, mmap_mode="r")
+
+
+def quantize_int8(matrix: np.ndarray) -> Int8Codes:
+    """Scalar-quantise each dimension of ``matrix`` to int8 over its own range."""
+
+    matrix = np.asarray(matrix, dtype=np.float32)
+    low = matrix.min(axis=0)
+    high = matrix.max(axis=0)
+    scale = (high - low) / _INT8_LEVELS
+    # Constant dimensions get a unit scale so they round-trip exactly to ``offset``.
+    scale = np.where(scale > 0, scale, 1.0).astype(np.float32)
+    levels = np.rint((matrix - low) / scale)
+    codes = (np.clip(levels, 0, _INT8_LEVELS) - _INT8_ZERO).astype(np.int8)
+    return Int8Codes(codes=codes, scale=scale, offset=low.astype(np.float32))
+
+
+def quantize_binary(matrix: np.ndarray) -> np.ndarray:
+    """Pack the sign of every dimension into bits (``uint8``, ``ceil(dim / 8)`` per row)."""
+
+    return np.packbits(np.asarray(matrix) > 0, axis=1)
+
+
+def to_fp16(matrix: np.ndarray) -> np.ndarray:
+    return np.asarray(matrix).astype(np.float16)
+
+
+def hamming_distances(query_code: np.ndarray, codes: np.ndarray) -> np.ndarray:
+    """Hamming distance from one packed query code to every packed row."""
+
+    return _POPCOUNT[np.bitwise_xor(codes, query_code.reshape(1, -1))].sum(axis=1, dtype=np.int32)
+
+
+def _top_indices(values: np.ndarray, k: int, *, largest: bool) -> np.ndarray:
+    k = min(k, values.shape[0])
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    keyed = -values if largest else values
+    part = np.argpartition(keyed, k - 1)[:k]
+    return part[np.argsort(keyed[part], kind="stable")]
+
+
+def binary_candidates(query: np.ndarray, codes: np.ndarray, k: int) -> np.ndarray:
+    """Row ids of the ``k`` nearest packed codes by Hamming distance."""
+
+    query_code = quantize_binary(np.asarray(query, dtype=np.float32).reshape(1, -1))[0]
+    return _top_indices(hamming_distances(query_code, codes), k, largest=False)
+
+
+def int8_candidates(
+    query: np.ndarray,
+    codes: Int8Codes,
+    k: int,
+    subset: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Row ids of the ``k`` best approximate int8 scores (within ``subset`` if given)."""
+
+    if subset is None:
+        return _top_indices(codes.scores(query), k, largest=True)
+    subset = np.asarray(subset, dtype=np.int64)
+    narrowed = Int8Codes(codes=codes.codes[subset], scale=codes.scale, offset=codes.offset)
+    return subset[_top_indices(narrowed.scores(query), k, largest=True)]
+
+
+def rescore_exact(
+    query: np.ndarray,
+    candidates: np.ndarray,
+    float_store: np.ndarray,
+    k: int,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Exact inner-product top-k over ``candidates`` only.
+
+    ``float_store`` may be a memory-mapped ``.npy``; only candidate rows are read.
+    Returns ``(ids, scores)`` sorted by descending score.
+    """
+
+    candidates = np.asarray(candidates, dtype=np.int64)
+    if not candidates.size:
+        return candidates, np.zeros(0, dtype=np.float32)
+    # Sorted fancy indexing keeps memory-mapped reads sequential.
+    order = np.argsort(candidates, kind="stable")
+    rows = np.asarray(float_store[candidates[order]], dtype=np.float32)
+    scores = np.empty(candidates.size, dtype=np.float32)
+    scores[order] = rows @ np.asarray(query, dtype=np.float32).reshape(-1)
+    top = _top_indices(scores, k, largest=True)
+    return candidates[top], scores[top]
+
+
+__all__ = [
+    "Int8Codes",
+    "binary_candidates",
+    "embedding_paths",
+    "hamming_distances",
+    "int8_candidates",
+    "load_embedding_store",
+    "quantize_binary",
+    "quantize_int8",
+    "rescore_exact",
+    "to_fp16",
+]
@@ -0,0 +1,256 @@
+"""Query-side encoding with an LRU vector cache and micro-batching.
+
+Interactive search is dominated by the single-item ``encode([query])`` call.
+``QueryEncoder`` answers repeated queries from an LRU keyed by
+``(model id, normalised query, query prefix)`` and coalesces concurrent
+misses: the first caller to miss waits a short window (or until the batch is
+full), then encodes every pending query in one forward pass and hands each
+waiter its row. Identical in-flight queries share one slot.
+
+``ModelConfig.query_prefix`` is prepended to the normalised query before
+encoding, so query vectors land in the space the model was trained to match
+against documents.
+
+Configured through the environment:
+
+* ``EMBEDDER_QUERY_CACHE_SIZE``: cached query vectors (default 4096, ``0`` disables).
+* ``EMBEDDER_QUERY_BATCH_WINDOW_MS``: coalescing window for misses (default 2).
+* ``EMBEDDER_QUERY_MAX_BATCH``: queries per coalesced encode (default 32).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from processor.ultimate_embedder.text_preprocessing import normalize_text
+
+QueryKey = Tuple[str, str, str]
+
+_DEFAULT_CACHE_SIZE = 4096
+_DEFAULT_WINDOW_MS = 2.0
+_DEFAULT_MAX_BATCH = 32
+
+
+def _env_number(name: str, default: float) -> float:
+    raw = os.environ.get(name, "").strip()
+    if not raw:
+        return default
+    try:
+        return max(0.0, float(raw))
+    except ValueError:
+        return default
+
+
+def normalize_query(query: str) -> str:
+    """Cache-key form of a query: whitespace collapsed, case preserved."""
+
+    return normalize_text(str(query)).strip()
+
+
+class QueryEncoder:
+    """Cached, micro-batched query encoder bound to one dense model."""
+
+    def __init__(
+        self,
+        *,
+        max_entries: int = _DEFAULT_CACHE_SIZE,
+        batch_window_ms: float = _DEFAULT_WINDOW_MS,
+        max_batch_size: int = _DEFAULT_MAX_BATCH,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        self.max_entries = max(0, int(max_entries))
+        self.batch_window = max(0.0, float(batch_window_ms)) / 1000.0
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.logger = logger or logging.getLogger(__name__)
+
+        self.model: Any = None
+        self.model_id = ""
+        self.query_prefix = ""
+        self.device: Optional[str] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.batches = 0
+        self.encoded = 0
+
+        self._entries: "OrderedDict[QueryKey, np.ndarray]" = OrderedDict()
+        self._inflight: Dict[QueryKey, Future] = {}
+        self._pending: List[QueryKey] = []
+        self._batch_full = threading.Event()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, logger: Optional[logging.Logger] = None) -> "QueryEncoder":
+        return cls(
+            max_entries=int(_env_number("EMBEDDER_QUERY_CACHE_SIZE", _DEFAULT_CACHE_SIZE)),
+            batch_window_ms=_env_number("EMBEDDER_QUERY_BATCH_WINDOW_MS", _DEFAULT_WINDOW_MS),
+            max_batch_size=int(_env_number("EMBEDDER_QUERY_MAX_BATCH", _DEFAULT_MAX_BATCH)) or 1,
+            logger=logger,
+        )
+
+    def bind_model(
+        self,
+        model: Any,
+        *,
+        model_id: str,
+        query_prefix: str = "",
+        device: Optional[str] = None,
+    ) -> None:
+        """Encode with ``model``; a different model or id drops every cached vector."""
+
+        with self._lock:
+            self.device = device
+            if model is self.model and model_id == self.model_id:
+                self.query_prefix = query_prefix or ""
+                return
+            if self.model is not None and self._entries:
+                self.logger.info(
+                    "Query model changed (%s -> %s); invalidating %d cached query vectors",
+                    self.model_id,
+                    model_id,
+                    len(self._entries),
+                )
+            self._entries.clear()
+            self.model = model
+            self.model_id = model_id
+            self.query_prefix = query_prefix or ""
+
+    def cache_key(self, query: str) -> QueryKey:
+        return (self.model_id, normalize_query(query), self.query_prefix)
+
+    def encode(self, query: str) -> np.ndarray:
+        """Unit-normalised float32 vector for ``query``; concurrent misses share a batch."""
+
+        key = self.cache_key(query)
+        with self._lock:
+            cached = self._lookup(key)
+            if cached is not None:
+                return cached
+            future = self._inflight.get(key)
+            leader = False
+            if future is None:
+                future = Future()
+                self._inflight[key] = future
+                self._pending.append(key)
+                leader = len(self._pending) == 1
+                if len(self._pending) >= self.max_batch_size:
+                    self._batch_full.set()
+
+        if leader:
+            if self.batch_window > 0:
+                self._batch_full.wait(self.batch_window)
+            with self._lock:
+                batch, self._pending = self._pending, []
+                self._batch_full.clear()
+            self._run_batch(batch)
+        return future.result()
+
+    def encode_many(self, queries: Sequence[str]) -> np.ndarray:
+        """Encode ``queries`` as one batch (cache hits skipped); rows follow input order."""
+
+        keys = [self.cache_key(query) for query in queries]
+        rows: List[Optional[np.ndarray]] = []
+        missing: Dict[QueryKey, None] = {}
+        with self._lock:
+            for key in keys:
+                row = self._lookup(key)
+                rows.append(row)
+                if row is None:
+                    missing[key] = None
+        if missing:
+            encoded = dict(zip(missing, self._encode_keys(list(missing))))
+            with self._lock:
+                for key, vector in encoded.items():
+                    self._remember(key, vector)
+            rows = [row if row is not None else encoded[key] for row, key in zip(rows, keys)]
+        if not rows:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.stack(rows)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "model": self.model_id,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 4),
+            "batches": self.batches,
+            "encoded": self.encoded,
+            "mean_batch": round(self.encoded / self.batches, 2) if self.batches else 0.0,
+        }
+
+    def _run_batch(self, batch: List[QueryKey]) -> None:
+        try:
+            vectors = self._encode_keys(batch)
+        except BaseException as exc:
+            with self._lock:
+                futures = [self._inflight.pop(key) for key in batch]
+            for future in futures:
+                future.set_exception(exc)
+            return
+        with self._lock:
+            futures = []
+            for key, vector in zip(batch, vectors):
+                self._remember(key, vector)
+                futures.append(self._inflight.pop(key))
+        for future, vector in zip(futures, vectors):
+            future.set_result(vector)
+
+    def _encode_keys(self, keys: Sequence[QueryKey]) -> List[np.ndarray]:
+        if self.model is None:
+            raise RuntimeError("QueryEncoder has no model bound")
+        texts = [prefix + text for _, text, prefix in keys]
+        kwargs: Dict[str, Any] = {
+            "batch_size": len(texts),
+            "convert_to_numpy": True,
+            "normalize_embeddings": True,
+            "show_progress_bar": False,
+        }
+        if self.device is not None:
+            kwargs["device"] = self.device
+        matrix = np.asarray(self.model.encode(texts, **kwargs), dtype=np.float32).reshape(len(texts), -1)
+        self.batches += 1
+        self.encoded += len(texts)
+        vectors = []
+        for row in matrix:
+            vector = row.copy()
+            vector.flags.writeable = False
+            vectors.append(vector)
+        return vectors
+
+    def _lookup(self, key: QueryKey) -> Optional[np.ndarray]:
+        vector = self._entries.get(key)
+        if vector is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return vector
+
+    def _remember(self, key: QueryKey, vector: np.ndarray) -> None:
+        if not self.max_entries:
+            return
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+__all__ = ["QueryEncoder", "normalize_query"]
@@ -0,0 +1,216 @@
+"""Multi-device data-parallel dense encoding with one model replica per device.
+
+``torch.nn.DataParallel`` only parallelises ``forward``; ``encode()`` is called
+on the wrapped module and runs on a single GPU. ``ReplicaEncodePool`` keeps one
+replica per device instead, each driven by its own worker thread (CUDA kernels
+release the GIL, so threads keep every device busy). Work is fed through one
+queue of length-sorted batches, longest first, and every worker writes its rows
+straight into a shared output matrix.
+
+Replicas beyond the first are copied device-to-device from the hydrated model,
+so no extra host round trip is needed. Devices are plain ``torch`` device
+strings, so the pool also runs (and is tested) with ``"cpu"`` devices.
+
+Configured through the environment:
+
+* ``EMBEDDER_REPLICA_ENCODE``: ``0`` disables replicas; multi-GPU leases then
+  encode on the first leased device only (default on).
+"""
+
+from __future__ import annotations
+
+import copy
+import logging
+import os
+import queue
+import threading
+from contextlib import nullcontext
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import torch
+
+# Batches queued per replica per dispatch; keeps every device busy while the
+# longest batches drain.
+_BATCHES_PER_REPLICA = 4
+
+
+def replicate_module(model: torch.nn.Module, device: str) -> torch.nn.Module:
+    """Deep copy ``model`` with every parameter and buffer copied straight to ``device``."""
+
+    memo: Dict[int, Any] = {}
+    for tensor in list(model.parameters()) + list(model.buffers()):
+        if id(tensor) in memo:
+            continue
+        moved = tensor.detach().to(device, copy=True)
+        if isinstance(tensor, torch.nn.Parameter):
+            moved = torch.nn.Parameter(moved, requires_grad=tensor.requires_grad)
+        memo[id(tensor)] = moved
+    return copy.deepcopy(model, memo)
+
+
+class _EncodeJob:
+    """One ``encode`` call: pending batch count, output matrix and first error."""
+
+    def __init__(self, texts: Sequence[str], batches: int) -> None:
+        self.texts = texts
+        self.remaining = batches
+        self.output: Optional[np.ndarray] = None
+        self.error: Optional[BaseException] = None
+        self.lock = threading.Lock()
+        self.done = threading.Event()
+
+    def finish_batch(self, indices: List[int], rows: Optional[np.ndarray], error: Optional[BaseException]) -> None:
+        with self.lock:
+            if error is not None and self.error is None:
+                self.error = error
+            elif rows is not None and self.error is None:
+                if self.output is None:
+                    self.output = np.empty((len(self.texts), rows.shape[1]), dtype=np.float32)
+                self.output[indices] = rows
+            self.remaining -= 1
+            if self.remaining == 0:
+                self.done.set()
+
+
+class ReplicaEncodePool:
+    """Per-device model replicas sharing one batch queue and output matrix."""
+
+    def __init__(
+        self,
+        model: Any,
+        devices: Sequence[str],
+        *,
+        normalize_embeddings: bool = True,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        if not devices:
+            raise ValueError("ReplicaEncodePool needs at least one device")
+        self.logger = logger or logging.getLogger(__name__)
+        self.devices = [str(device) for device in devices]
+        self.normalize_embeddings = normalize_embeddings
+        self.replicas: List[Any] = [model] + [replicate_module(model, device) for device in self.devices[1:]]
+        self.batches = [0] * len(self.devices)
+        self.rows = [0] * len(self.devices)
+        self._tasks: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._threads: List[threading.Thread] = []
+        for slot, device in enumerate(self.devices):
+            thread = threading.Thread(
+                target=self._worker,
+                args=(slot,),
+                name=f"replica-encode-{slot}-{device}",
+                daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    @classmethod
+    def from_env(
+        cls,
+        model: Any,
+        device_ids: Sequence[int],
+        logger: Optional[logging.Logger] = None,
+    ) -> Optional["ReplicaEncodePool"]:
+        """Start a pool over ``cuda:<id>`` for each leased device, else ``None``."""
+
+        log = logger or logging.getLogger(__name__)
+        if len(device_ids) < 2 or os.environ.get("EMBEDDER_REPLICA_ENCODE", "1").strip() == "0":
+            return None
+        if not isinstance(model, torch.nn.Module) or not callable(getattr(model, "encode", None)):
+            return None
+
+        try:
+            pool = cls(model, [f"cuda:{device_id}" for device_id in device_ids], logger=log)
+        except Exception as exc:
+            log.warning("Replica encode pool unavailable, encoding on one device: %s", exc)
+            return None
+        log.info("Replica encode pool: %d replicas on %s", len(pool.devices), ", ".join(pool.devices))
+        return pool
+
+    @property
+    def replica_count(self) -> int:
+        return len(self.replicas)
+
+    def dispatch_size(self, batch_size: int) -> int:
+        """Texts per ``encode`` call that keep every replica busy at ``batch_size``."""
+
+        return max(1, int(batch_size)) * self.replica_count * _BATCHES_PER_REPLICA
+
+    def _worker(self, slot: int) -> None:
+        device = self.devices[slot]
+        replica = self.replicas[slot]
+        device_context = torch.cuda.device(device) if device.startswith("cuda") else nullcontext()
+        with device_context:
+            while True:
+                task = self._tasks.get()
+                if task is None:
+                    return
+                job, indices, batch_size = task
+                if job.error is not None:
+                    job.finish_batch(indices, None, None)
+                    continue
+                try:
+                    rows = replica.encode(
+                        [job.texts[index] for index in indices],
+                        batch_size=batch_size,
+                        show_progress_bar=False,
+                        convert_to_numpy=True,
+                        normalize_embeddings=self.normalize_embeddings,
+                        device=device,
+                    )
+                    rows = np.asarray(rows, dtype=np.float32).reshape(len(indices), -1)
+                except BaseException as exc:
+                    job.finish_batch(indices, None, exc)
+                    continue
+                self.batches[slot] += 1
+                self.rows[slot] += len(indices)
+                job.finish_batch(indices, rows, None)
+
+    def encode(self, texts: Sequence[str], *, batch_size: int) -> np.ndarray:
+        """Encode ``texts`` across every replica; rows come back in input order."""
+
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        if not self._threads:
+            raise RuntimeError("ReplicaEncodePool is closed")
+
+        step = max(1, int(batch_size))
+        # Longest first: similar lengths pad less, and the slowest batches start earliest.
+        order = sorted(range(len(texts)), key=lambda index: len(texts[index]), reverse=True)
+        starts = range(0, len(order), step)
+        job = _EncodeJob(texts, len(starts))
+        for start in starts:
+            self._tasks.put((job, order[start:start + step], step))
+        job.done.wait()
+        if job.error is not None:
+            raise job.error
+        assert job.output is not None
+        return job.output
+
+    def summary(self) -> Dict[str, Any]:
+        """Batches and rows per replica, keyed ``"<slot>:<device>"`` (devices may repeat)."""
+
+        return {
+            f"{slot}:{device}": {"batches": self.batches[slot], "rows": self.rows[slot]}
+            for slot, device in enumerate(self.devices)
+        }
+
+    def close(self) -> None:
+        for _ in self._threads:
+            self._tasks.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        # The first replica is the caller's model; only the copies are dropped.
+        del self.replicas[1:]
+        if any(device.startswith("cuda") for device in self.devices):
+            torch.cuda.empty_cache()
+
+    def __enter__(self) -> "ReplicaEncodePool":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+__all__ = ["ReplicaEncodePool", "replicate_module"]
@@ -0,0 +1,177 @@
+"""Length-sorted, token-budgeted batch planning for rerank inference."""
+
+from __future__ import annotations
+
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from processor.ultimate_embedder.pre_encode import resolve_tokenizer
+
+# Rough fallback when no tokenizer is reachable (code averages ~4 chars/token).
+_CHARS_PER_TOKEN = 4
+# Seed for models without a learned profile: the old 50 MB/pair heuristic
+# spread over a 512-token pair.
+DEFAULT_BYTES_PER_TOKEN = 0.05 * (1024 ** 3) / 512
+_EMA_WEIGHT = 0.3
+
+
+def pair_token_lengths(model: Any, query: str, texts: Sequence[str]) -> np.ndarray:
+    """Token count of each ``(query, text)`` pair as the reranker would see it.
+
+    Lengths are clipped to the model's maximum sequence length. Falls back to a
+    character heuristic when the model exposes no usable tokenizer.
+    """
+
+    tokenizer, max_length = resolve_tokenizer(model)
+    lengths: Optional[np.ndarray] = None
+    if tokenizer is not None:
+        try:
+            encoded = tokenizer(
+                [query, *texts],
+                add_special_tokens=False,
+                truncation=False,
+                return_attention_mask=False,
+                return_token_type_ids=False,
+                verbose=False,
+            )
+            input_ids = encoded["input_ids"]
+            if isinstance(input_ids, list) and len(input_ids) == len(texts) + 1:
+                counts = np.fromiter((len(ids) for ids in input_ids), dtype=np.int64, count=len(input_ids))
+                try:
+                    special = int(tokenizer.num_special_tokens_to_add(pair=True))
+                except Exception:
+                    special = 3
+                lengths = counts[1:] + counts[0] + special
+        except Exception:
+            lengths = None
+
+    if lengths is None:
+        query_tokens = len(query) // _CHARS_PER_TOKEN + 1
+        lengths = np.fromiter(
+            (len(text) // _CHARS_PER_TOKEN + 1 + query_tokens for text in texts),
+            dtype=np.int64,
+            count=len(texts),
+        )
+    if max_length is not None:
+        lengths = np.minimum(lengths, max_length)
+    return np.maximum(lengths, 1)
+
+
+def plan_token_batches(
+    lengths: Sequence[int],
+    token_budget: int,
+    max_batch_size: int,
+) -> List[np.ndarray]:
+    """Pack pair indices longest-first so each padded batch fits ``token_budget``.
+
+    A batch pads every pair to its longest member, so its cost is
+    ``len(batch) * max(lengths in batch)``. A single pair longer than the budget
+    still gets its own batch.
+    """
+
+    lengths = np.asarray(lengths, dtype=np.int64)
+    if not lengths.size:
+        return []
+    order = np.argsort(-lengths, kind="stable")
+    budget = max(1, int(token_budget))
+    cap = max(1, int(max_batch_size))
+
+    batches: List[np.ndarray] = []
+    start = 0
+    while start < order.size:
+        # Sorted descending, so the first member sets the padded width.
+        width = int(lengths[order[start]])
+        size = min(cap, max(1, budget // width), order.size - start)
+        batches.append(order[start:start + size])
+        start += size
+    return batches
+
+
+class RerankTokenBudget:
+    """Per-model peak-memory-per-token profile, learned online and persisted as JSON.
+
+    ``observe`` folds measured activation memory of each GPU batch into an
+    exponential moving average; ``record_oom`` doubles the estimate so the next
+    plan halves its budget. Profiles are keyed by reranker model name.
+    """
+
+    def __init__(self, path: Optional[str] = None, logger: Optional[logging.Logger] = None) -> None:
+        self.path = Path(path).expanduser() if path else None
+        self.logger = logger or logging.getLogger(__name__)
+        self.profiles: Dict[str, Dict[str, Any]] = {}
+        self._dirty = False
+        if self.path is not None and self.path.exists():
+            try:
+                payload = json.loads(self.path.read_text(encoding="utf-8"))
+                if isinstance(payload, dict):
+                    self.profiles = {
+                        str(model): dict(profile)
+                        for model, profile in payload.items()
+                        if isinstance(profile, dict) and float(profile.get("bytes_per_token", 0)) > 0
+                    }
+            except (OSError, ValueError, TypeError) as exc:
+                self.logger.warning("Ignoring unreadable rerank token budgets %s: %s", self.path, exc)
+
+    def bytes_per_token(self, model_name: str) -> float:
+        profile = self.profiles.get(model_name)
+        if profile:
+            return float(profile["bytes_per_token"])
+        return DEFAULT_BYTES_PER_TOKEN
+
+    def token_budget(self, model_name: str, available_bytes: float) -> int:
+        """Padded tokens per batch that fit in ``available_bytes`` of activations."""
+
+        return max(1, int(available_bytes / self.bytes_per_token(model_name)))
+
+    def observe(self, model_name: str, padded_tokens: int, peak_bytes: float) -> None:
+        if padded_tokens <= 0 or peak_bytes <= 0:
+            return
+        sample = peak_bytes / padded_tokens
+        profile = self.profiles.get(model_name)
+        if profile is None:
+            profile = {"bytes_per_token": sample, "samples": 0, "ooms": 0}
+            self.profiles[model_name] = profile
+        else:
+            current = float(profile["bytes_per_token"])
+            # Grow immediately, shrink slowly: under-estimates are what cause OOMs.
+            profile["bytes_per_token"] = sample if sample > current else (
+                (1 - _EMA_WEIGHT) * current + _EMA_WEIGHT * sample
+            )
+        profile["samples"] = int(profile.get("samples", 0)) + 1
+        profile["updated_at"] = time.time()
+        self._dirty = True
+
+    def record_oom(self, model_name: str) -> None:
+        profile = self.profiles.setdefault(
+            model_name,
+            {"bytes_per_token": self.bytes_per_token(model_name), "samples": 0, "ooms": 0},
+        )
+        profile["bytes_per_token"] = float(profile["bytes_per_token"]) * 2
+        profile["ooms"] = int(profile.get("ooms", 0)) + 1
+        profile["updated_at"] = time.time()
+        self._dirty = True
+
+    def save(self) -> None:
+        if self.path is None or not self._dirty:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+            tmp_path.write_text(json.dumps(self.profiles, indent=2, sort_keys=True), encoding="utf-8")
+            tmp_path.replace(self.path)
+            self._dirty = False
+        except OSError as exc:
+            self.logger.warning("Could not persist rerank token budgets to %s: %s", self.path, exc)
+
+
+__all__ = [
+    "DEFAULT_BYTES_PER_TOKEN",
+    "RerankTokenBudget",
+    "pair_token_lengths",
+    "plan_token_batches",
+]
@@ -0,0 +1,165 @@
+"""Rerank score cache keyed by (query hash, chunk content digest, reranker model)."""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import sqlite3
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+CacheKey = Tuple[str, str]
+
+
+def text_digest(text: str) -> str:
+    """Content digest matching the ``chunk_hash`` convention used by the chunkers."""
+
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+class RerankScoreCache:
+    """Bounded in-memory LRU of pair scores with an optional SQLite backing file.
+
+    Entries are keyed by ``(query digest, chunk content digest)`` and belong to a
+    single reranker model; binding a different model id drops the in-memory
+    entries. On-disk rows carry their model id and are only ever read for the
+    bound model, so switching back to an earlier reranker finds its scores
+    again. Edited chunks change their digest, so stale scores are simply never
+    looked up again.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        path: Optional[str] = None,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        self.max_entries = max(1, int(max_entries))
+        self.logger = logger or logging.getLogger(__name__)
+        self.model_id: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[CacheKey, float]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        if path:
+            try:
+                Path(path).parent.mkdir(parents=True, exist_ok=True)
+                self._db = sqlite3.connect(path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS rerank_scores ("
+                    "model TEXT NOT NULL, query TEXT NOT NULL, digest TEXT NOT NULL, "
+                    "score REAL NOT NULL, PRIMARY KEY (model, query, digest))"
+                )
+                self._db.commit()
+            except sqlite3.Error as exc:
+                self.logger.warning("Rerank score cache file %s unavailable: %s", path, exc)
+                self._db = None
+
+    def bind_model(self, model_id: str) -> None:
+        """Scope the cache to ``model_id``; in-memory entries of the previous model are dropped."""
+
+        if model_id == self.model_id:
+            return
+        if self.model_id is not None:
+            self.logger.info(
+                "Reranker changed (%s -> %s); invalidating %d cached scores",
+                self.model_id,
+                model_id,
+                len(self._entries),
+            )
+        self._entries.clear()
+        self.model_id = model_id
+
+    def keys_for(self, query: str, texts: Sequence[str]) -> List[CacheKey]:
+        query_digest = text_digest(query)
+        return [(query_digest, text_digest(text)) for text in texts]
+
+    def lookup(self, keys: Sequence[CacheKey]) -> List[Optional[float]]:
+        """Return cached scores (``None`` on miss) and update hit counters."""
+
+        scores: List[Optional[float]] = []
+        disk_misses: Dict[CacheKey, List[int]] = {}
+        for position, key in enumerate(keys):
+            score = self._entries.get(key)
+            if score is not None:
+                self._entries.move_to_end(key)
+            elif self._db is not None:
+                disk_misses.setdefault(key, []).append(position)
+            scores.append(score)
+
+        if disk_misses:
+            for key, score in self._load_from_disk(list(disk_misses)).items():
+                self._remember(key, score)
+                for position in disk_misses[key]:
+                    scores[position] = score
+
+        hits = sum(score is not None for score in scores)
+        self.hits += hits
+        self.misses += len(scores) - hits
+        return scores
+
+    def store(self, keys: Sequence[CacheKey], scores: Sequence[float]) -> None:
+        rows = []
+        for key, score in zip(keys, scores):
+            value = float(score)
+            self._remember(key, value)
+            rows.append((self.model_id or "", key[0], key[1], value))
+        if self._db is not None and rows:
+            with self._db:
+                self._db.executemany("INSERT OR REPLACE INTO rerank_scores VALUES (?, ?, ?, ?)", rows)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        if self._db is not None:
+            with self._db:
+                self._db.execute("DELETE FROM rerank_scores")
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "model": self.model_id or "",
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 4),
+            "persistent": self._db is not None,
+        }
+
+    def _remember(self, key: CacheKey, score: float) -> None:
+        self._entries[key] = score
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _load_from_disk(self, keys: Sequence[CacheKey]) -> Dict[CacheKey, float]:
+        assert self._db is not None
+        found: Dict[CacheKey, float] = {}
+        model = self.model_id or ""
+        # Stay well under SQLite's bound-parameter limit.
+        for start in range(0, len(keys), 400):
+            chunk = keys[start:start + 400]
+            clause = " OR ".join("(query = ? AND digest = ?)" for _ in chunk)
+            params: List[str] = [model]
+            for query_digest, digest in chunk:
+                params.extend((query_digest, digest))
+            rows = self._db.execute(
+                f"SELECT query, digest, score FROM rerank_scores WHERE model = ? AND ({clause})",
+                params,
+            )
+            for query_digest, digest, score in rows:
+                found[(query_digest, digest)] = float(score)
+        return found
+
+
+__all__ = ["RerankScoreCache", "text_digest"]
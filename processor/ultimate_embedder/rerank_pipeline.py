@@ -3,17 +3,18 @@
 from __future__ import annotations
 
 import logging
-from typing import Any, Dict, List, Optional, Sequence
+from typing import Any, Dict, List, Mapping, Optional, Sequence
 
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
 
 from processor.ultimate_embedder.compat import CrossEncoder, SentenceTransformer
 from processor.ultimate_embedder.config import (
+    KAGGLE_OPTIMIZED_MODELS,
     RERANKING_MODELS,
     RerankingConfig,
     get_reranking_model_config,
 )
+from processor.ultimate_embedder.exact_search import SearchIndexCache
 
 try:  # Lazy import for optional transformer-based loaders
     from transformers import AutoModel
@@ -35,44 +36,134 @@ class _JinaRerankerAdapter:
         self._model.eval()
 
     def predict(self, query_doc_pairs: Sequence[Sequence[str]]) -> List[float]:
+        """Score pairs, issuing one listwise ``rerank`` call per unique query.
+
+        Pairs may mix queries (grouped executor calls); scores come back in the
+        original pair order. The listwise model attends over one query and all
+        of its documents in a single sequence, so queries cannot share a forward
+        pass: a mixed batch still costs one ``rerank`` call per query. Grouping
+        saves the per-call executor overhead (leases, cache lookups, OOM
+        handling), not model forwards.
+        """
+
         if not query_doc_pairs:
             return []
 
-        queries = {pair[0] for pair in query_doc_pairs if pair}
-        if not queries:
+        groups: Dict[str, List[int]] = {}
+        for position, pair in enumerate(query_doc_pairs):
+            if pair:
+                groups.setdefault(pair[0], []).append(position)
+        if not groups:
             return []
-        if len(queries) != 1:
-            raise ValueError("Jina reranker expects batches with a single unique query")
 
-        query = next(iter(queries))
-        documents = [pair[1] for pair in query_doc_pairs]
+        scores: List[float] = [0.0] * len(query_doc_pairs)
+        for query, positions in groups.items():
+            documents = [query_doc_pairs[position][1] for position in positions]
+            results = self._model.rerank(
+                query=query,
+                documents=documents,
+                top_n=len(documents),
+                return_embeddings=False,
+            )
+            for entry in results:
+                try:
+                    index = int(entry.get("index", -1))
+                except Exception:  # pragma: no cover - defensive cast
+                    index = -1
+                if 0 <= index < len(positions):
+                    scores[positions[index]] = float(entry.get("relevance_score", 0.0))
+
+        return scores
+
 
-        results = self._model.rerank(
-            query=query,
-            documents=documents,
-            top_n=len(documents),
-            return_embeddings=False,
+class DocumentVectorStore:
+    """Candidate-id addressable document vectors for bi-encoder reranking.
+
+    Rows come from an in-memory matrix (e.g. ``embeddings_by_model``) or an
+    exported ``*_embeddings.npy`` opened with ``mmap_mode="r"``. Candidate ids
+    default to the row index rendered as a string, matching the ids produced
+    by candidate assembly.
+    """
+
+    def __init__(self, vectors: np.ndarray, ids: Optional[Sequence[str]] = None) -> None:
+        if np.ndim(vectors) != 2:
+            raise ValueError("DocumentVectorStore expects a 2D matrix")
+        self.vectors = vectors
+        self._id_lookup: Optional[Dict[str, int]] = (
+            {str(doc_id): row for row, doc_id in enumerate(ids)} if ids is not None else None
         )
 
-        scores: List[float] = [0.0] * len(documents)
-        for entry in results:
+    @classmethod
+    def from_npy(cls, path: str, ids: Optional[Sequence[str]] = None) -> "DocumentVectorStore":
+        return cls(np.load(path, mmap_mode="r"), ids=ids)
+
+    def __len__(self) -> int:
+        return int(self.vectors.shape[0])
+
+    @property
+    def dimension(self) -> int:
+        return int(self.vectors.shape[1])
+
+    def rows_for(self, candidate_ids: Sequence[Any]) -> np.ndarray:
+        """Return the row for each id, or -1 when the id is not stored."""
+
+        rows = np.full(len(candidate_ids), -1, dtype=np.int64)
+        total = len(self)
+        for position, candidate_id in enumerate(candidate_ids):
+            if self._id_lookup is not None:
+                rows[position] = self._id_lookup.get(str(candidate_id), -1)
+                continue
             try:
-                index = int(entry.get("index", -1))
-            except Exception:  # pragma: no cover - defensive cast
-                index = -1
-            if 0 <= index < len(scores):
-                score = entry.get("relevance_score", 0.0)
-                scores[index] = float(score)
+                row = int(candidate_id)
+            except (TypeError, ValueError):
+                continue
+            if 0 <= row < total:
+                rows[position] = row
+        return rows
 
-        return scores
+    def gather(self, rows: np.ndarray) -> np.ndarray:
+        """Fetch rows as L2-normalised float32 (dimension trimming drops unit norm)."""
+
+        matrix = np.asarray(self.vectors[rows], dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
+
+
+def resolve_document_store(embedder: Any, reranker_name: str) -> Optional[DocumentVectorStore]:
+    """Find per-model embeddings produced by the same checkpoint as a bi-encoder reranker."""
+
+    spec = RERANKING_MODELS.get(reranker_name)
+    if spec is None or spec.loader != "bi_encoder":
+        return None
+
+    by_model = getattr(embedder, "embeddings_by_model", None) or {}
+    primary = getattr(embedder, "model_name", None)
+    for model_key, matrix in by_model.items():
+        model_config = KAGGLE_OPTIMIZED_MODELS.get(model_key)
+        if model_config is None or model_config.hf_model_id != spec.hf_model_id:
+            continue
+        # After an ensemble run the primary slot holds the fused matrix, not this model's vectors.
+        if model_key == primary and len(by_model) > 1:
+            continue
+        if isinstance(matrix, np.ndarray) and matrix.ndim == 2 and matrix.size:
+            return DocumentVectorStore(matrix)
+    return None
 
 
 class _BiEncoderRerankerAdapter:
-    """Adapt a SentenceTransformer bi-encoder for query-document scoring."""
+    """Adapt a SentenceTransformer bi-encoder for query-document scoring.
+
+    With a ``DocumentVectorStore`` attached and candidate ids supplied, stored
+    document vectors are reused so only the query is encoded.
+    """
+
+    accepts_candidate_ids = True
 
     def __init__(self, model: SentenceTransformer) -> None:
         self._model = model
         self._device = getattr(model, "device", "cpu")
+        self.document_store: Optional[DocumentVectorStore] = None
 
     def to(self, device: str) -> "_BiEncoderRerankerAdapter":
         if hasattr(self._model, "to"):
@@ -84,12 +175,29 @@ class _BiEncoderRerankerAdapter:
         if hasattr(self._model, "eval"):
             self._model.eval()
 
-    def predict(self, query_doc_pairs: Sequence[Sequence[str]]) -> List[float]:
+    def attach_document_store(self, store: Optional[DocumentVectorStore]) -> None:
+        self.document_store = store
+
+    def _encode(self, texts: Sequence[str]) -> np.ndarray:
+        return np.asarray(
+            self._model.encode(
+                list(texts),
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                device=self._device,
+            ),
+            dtype=np.float32,
+        )
+
+    def predict(
+        self,
+        query_doc_pairs: Sequence[Sequence[str]],
+        candidate_ids: Optional[Sequence[Any]] = None,
+    ) -> List[float]:
         if not query_doc_pairs:
             return []
 
-        scores: List[float] = [0.0] * len(query_doc_pairs)
-        valid_pairs: List[Sequence[str]] = []
+        scores = np.zeros(len(query_doc_pairs), dtype=np.float32)
         valid_indices: List[int] = []
 
         for idx, pair in enumerate(query_doc_pairs):
@@ -98,53 +206,68 @@ class _BiEncoderRerankerAdapter:
             query, document = pair[0], pair[1]
             if not isinstance(query, str) or not isinstance(document, str):
                 continue
-            valid_pairs.append(pair)
             valid_indices.append(idx)
 
-        if not valid_pairs:
-            return scores
-
-        queries = [pair[0] for pair in valid_pairs]
-        documents = [pair[1] for pair in valid_pairs]
-
-        unique_queries: List[str] = []
-        query_lookup: Dict[str, np.ndarray] = {}
-        for query in queries:
-            if query not in query_lookup:
-                unique_queries.append(query)
-
-        if unique_queries:
-            query_vectors = self._model.encode(
-                unique_queries,
-                convert_to_numpy=True,
-                normalize_embeddings=True,
-                device=self._device,
-            )
-            for query, vector in zip(unique_queries, query_vectors):
-                query_lookup[query] = np.asarray(vector, dtype=np.float32)
-
-        if documents:
-            doc_vectors = self._model.encode(
-                documents,
-                convert_to_numpy=True,
-                normalize_embeddings=True,
-                device=self._device,
-            )
-        else:
-            doc_vectors = np.empty((0, 0), dtype=np.float32)
-
-        for offset, idx in enumerate(valid_indices):
-            query = queries[offset]
-            if query not in query_lookup:
-                continue
-            doc_vector = np.asarray(doc_vectors[offset], dtype=np.float32)
+        if not valid_indices:
+            return scores.tolist()
+
+        queries = [query_doc_pairs[idx][0] for idx in valid_indices]
+        unique_queries = list(dict.fromkeys(queries))
+        query_vectors = self._encode(unique_queries)
+        query_lookup = {query: query_vectors[pos] for pos, query in enumerate(unique_queries)}
+
+        # Rows found in the document store skip the document forward pass entirely.
+        rows = np.full(len(valid_indices), -1, dtype=np.int64)
+        store = self.document_store
+        if (
+            store is not None
+            and candidate_ids is not None
+            and len(candidate_ids) == len(query_doc_pairs)
+            and query_vectors.shape[1] >= store.dimension
+        ):
+            rows = store.rows_for([candidate_ids[idx] for idx in valid_indices])
+
+        stored = np.flatnonzero(rows >= 0)
+        if stored.size:
+            doc_matrix = store.gather(rows[stored])  # type: ignore[union-attr]
+            self._score_into(scores, doc_matrix, stored, valid_indices, queries, query_lookup, store.dimension)  # type: ignore[union-attr]
+
+        missing = np.flatnonzero(rows < 0)
+        if missing.size:
+            doc_matrix = self._encode([query_doc_pairs[valid_indices[pos]][1] for pos in missing])
+            self._score_into(scores, doc_matrix, missing, valid_indices, queries, query_lookup, None)
+
+        return scores.tolist()
+
+    @staticmethod
+    def _score_into(
+        scores: np.ndarray,
+        doc_matrix: np.ndarray,
+        positions: np.ndarray,
+        valid_indices: Sequence[int],
+        queries: Sequence[str],
+        query_lookup: Dict[str, np.ndarray],
+        dimension: Optional[int],
+    ) -> None:
+        """Score one matrix-vector product per unique query."""
+
+        if doc_matrix.size == 0:
+            return
+        grouped: Dict[str, List[int]] = {}
+        for local, position in enumerate(positions.tolist()):
+            grouped.setdefault(queries[position], []).append(local)
+        for query, locals_ in grouped.items():
             query_vector = query_lookup[query]
-            if query_vector.size == 0 or doc_vector.size == 0:
-                continue
-            score = float(np.dot(query_vector, doc_vector))
-            scores[idx] = score
-
-        return scores
+            if dimension is not None and query_vector.shape[0] != dimension:
+                # Matryoshka-trimmed document vectors: compare on the shared prefix.
+                query_vector = query_vector[:dimension]
+                norm = float(np.linalg.norm(query_vector))
+                if norm > 0:
+                    query_vector = query_vector / norm
+            local_rows = np.asarray(locals_, dtype=np.int64)
+            values = doc_matrix[local_rows] @ query_vector
+            for local, value in zip(locals_, values.tolist()):
+                scores[valid_indices[int(positions[local])]] = value
 
 
 def create_reranker_from_spec(
@@ -220,6 +343,9 @@ class RerankPipeline:
         self.logger = logger
         self.model: Optional[Any] = None
         self.device: str = "cpu"
+        # Optional explicit store (e.g. an mmap'd export) for bi-encoder rerankers.
+        self.document_store: Optional[DocumentVectorStore] = None
+        self._search_index = SearchIndexCache()
 
     def ensure_model(self, *, device: str) -> None:
         """Load the reranking model if enabled and not already available."""
@@ -271,7 +397,7 @@ class RerankPipeline:
             raise ValueError("No embeddings available. Generate embeddings first.")
 
         query_embedding = self._encode_query(encode_model, query, device)
-        similarities = self._compute_similarities(query_embedding, embeddings)
+        similarities = self._dense_top_k(query_embedding, embeddings, max(top_k, initial_candidates))
 
         if not self.config.enable_reranking or self.model is None:
             self.logger.warning("Reranking not enabled, using embedding-only search")
@@ -282,7 +408,7 @@ class RerankPipeline:
                 top_k,
             )
 
-        top_indices = np.argsort(similarities)[::-1][:initial_candidates]
+        top_indices = list(similarities)[:max(0, initial_candidates)]
         query_doc_pairs: List[List[str]] = []
         candidate_indices: List[int] = []
 
@@ -300,7 +426,15 @@ class RerankPipeline:
             return []
 
         try:
-            rerank_scores = self.model.predict(query_doc_pairs)
+            if getattr(self.model, "accepts_candidate_ids", False) is True:
+                if self.document_store is not None:
+                    self.model.attach_document_store(self.document_store)
+                rerank_scores = self.model.predict(
+                    query_doc_pairs,
+                    candidate_ids=[str(idx) for idx in candidate_indices],
+                )
+            else:
+                rerank_scores = self.model.predict(query_doc_pairs)
         except Exception as exc:  # pragma: no cover - defensive path
             self.logger.error("Reranking failed: %s", exc)
             return self._build_embedding_only_results(
@@ -338,18 +472,22 @@ class RerankPipeline:
         )[0]
         return np.array(vector, dtype=np.float32)
 
-    def _compute_similarities(self, query_embedding: np.ndarray, embeddings: np.ndarray) -> np.ndarray:
-        matrix = np.array([query_embedding], dtype=np.float32)
-        return cosine_similarity(matrix, embeddings)[0]
+    def _dense_top_k(self, query_embedding: np.ndarray, embeddings: np.ndarray, k: int) -> Dict[int, float]:
+        """Exact top-``k`` ``{row: similarity}``, in descending order of similarity."""
+
+        storage = getattr(self.config, "search_storage", "float32")
+        index = self._search_index.get(embeddings, storage)
+        ids, scores = index.search(np.asarray(query_embedding, dtype=np.float32), k)
+        return dict(zip(ids.tolist(), scores.tolist()))
 
     def _build_embedding_only_results(
         self,
-        similarities: np.ndarray,
+        similarities: Mapping[int, float],
         chunk_texts: Sequence[str],
         chunks_metadata: Sequence[Dict[str, Any]],
         top_k: int,
     ) -> List[Dict[str, Any]]:
-        top_indices = np.argsort(similarities)[::-1][:top_k]
+        top_indices = list(similarities)[:max(0, top_k)]
         results: List[Dict[str, Any]] = []
         for rank, idx in enumerate(top_indices):
             if idx >= len(chunk_texts):
@@ -370,4 +508,4 @@ class RerankPipeline:
         return results
 
 
-__all__ = ["RerankPipeline"]
+__all__ = ["DocumentVectorStore", "RerankPipeline", "resolve_document_store"]
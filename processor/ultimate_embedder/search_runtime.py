@@ -0,0 +1,368 @@
+"""Load-only search over exported artefacts, without the embedding stack.
+
+``SearchIndex.open(export_dir)`` memory-maps the exported ``.npy`` vectors,
+reads texts and metadata from the indexed ``_docs`` store when the export has
+one (else indexes ``_texts.json`` / ``_metadata.json`` by byte offset instead
+of parsing them), and loads only the query-side encoder named in ``_stats.json``.
+Nothing else from the training pipeline (chunk loader, telemetry, GPU
+leases, sparse models) is imported.
+
+The JSON exports are written with ``indent=2``, so every top-level array
+element starts on a line indented by exactly two spaces. The offsets of those
+lines are found with one vectorised scan of the memory-mapped file and cached
+next to it as ``<file>.offsets.npy``; a record is then decoded on access from
+its own byte range only.
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import logging
+import os
+from collections.abc import Sequence as SequenceABC
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from processor.ultimate_embedder.doc_store import DocStore, doc_store_paths
+from processor.ultimate_embedder.exact_search import ExactSearchIndex
+from processor.ultimate_embedder.quantization import Int8Codes, embedding_paths, load_embedding_store
+
+logger = logging.getLogger(__name__)
+
+_STATS_SUFFIX = "_stats.json"
+_OFFSETS_SUFFIX = ".offsets.npy"
+_SPACE, _NEWLINE = ord(" "), ord("\n")
+_CLOSERS = (ord(" "), ord("}"), ord("]"))
+_SCAN_BLOCK_BYTES = 64 * 1024 * 1024
+
+
+def _scan_array_offsets(data: np.ndarray) -> np.ndarray:
+    """Start offsets of top-level elements in an ``indent=2`` JSON array, plus the end offset."""
+
+    size = int(data.size)
+    found: List[np.ndarray] = []
+    # Scan in blocks so the comparison masks stay small for multi-GB files.
+    for block_start in range(0, size, _SCAN_BLOCK_BYTES):
+        block = data[block_start:block_start + _SCAN_BLOCK_BYTES]
+        line_starts = np.flatnonzero(block == _NEWLINE) + block_start + 1
+        line_starts = line_starts[line_starts + 2 < size]
+        element = (
+            (data[line_starts] == _SPACE)
+            & (data[line_starts + 1] == _SPACE)
+            & ~np.isin(data[line_starts + 2], _CLOSERS)
+        )
+        found.append(line_starts[element] + 2)
+    starts = np.concatenate(found).astype(np.int64) if found else np.zeros(0, dtype=np.int64)
+    if not starts.size:
+        return np.zeros(1, dtype=np.int64)
+    tail_start = max(0, size - 64)
+    end = tail_start + bytes(data[tail_start:]).rfind(b"]")
+    return np.append(starts, end)
+
+
+class JsonArrayRecords(SequenceABC):
+    """Random-access view over a JSON array file written with ``indent=2``.
+
+    Only the requested elements are decoded. Files in any other layout fall
+    back to a full ``json.load`` (with a warning), so older exports still open.
+    """
+
+    def __init__(self, path: str, *, cache_offsets: bool = True) -> None:
+        self.path = path
+        self._data = np.memmap(path, dtype=np.uint8, mode="r") if os.path.getsize(path) else np.zeros(0, np.uint8)
+        self._items: Optional[List[Any]] = None
+        if bytes(self._data[:2]) == b"[\n":
+            self._offsets = self._load_offsets(cache_offsets)
+        else:
+            logger.warning("%s is not an indented JSON array; parsing it in full", path)
+            with open(path, "r", encoding="utf-8") as handle:
+                self._items = json.load(handle)
+            self._offsets = np.zeros(1, dtype=np.int64)
+
+    def _load_offsets(self, cache: bool) -> np.ndarray:
+        sidecar = self.path + _OFFSETS_SUFFIX
+        if os.path.exists(sidecar) and os.path.getmtime(sidecar) >= os.path.getmtime(self.path):
+            try:
+                return np.load(sidecar)
+            except (OSError, ValueError):
+                pass
+        offsets = _scan_array_offsets(self._data)
+        if cache:
+            try:
+                with open(sidecar, "wb") as handle:
+                    np.save(handle, offsets)
+            except OSError as exc:
+                logger.debug("Could not cache offsets for %s: %s", self.path, exc)
+        return offsets
+
+    def __len__(self) -> int:
+        if self._items is not None:
+            return len(self._items)
+        return int(self._offsets.shape[0]) - 1
+
+    def __getitem__(self, index: Any) -> Any:
+        if isinstance(index, slice):
+            return [self[position] for position in range(*index.indices(len(self)))]
+        if self._items is not None:
+            return self._items[index]
+        position = int(index)
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError(f"record {index} out of range for {len(self)} records")
+        raw = bytes(self._data[self._offsets[position]:self._offsets[position + 1]]).rstrip()
+        return json.loads(raw[:-1] if raw.endswith(b",") else raw)
+
+    def __iter__(self) -> Iterator[Any]:
+        for position in range(len(self)):
+            yield self[position]
+
+
+def _find_export_base(export_dir: str, collection: Optional[str]) -> str:
+    """Resolve ``<dir>/<prefix>`` from the single ``*_stats.json`` of the export."""
+
+    search_dirs = [export_dir]
+    if collection:
+        search_dirs.insert(0, os.path.join(export_dir, collection))
+    for directory in search_dirs:
+        candidates = sorted(glob.glob(os.path.join(directory, f"*{_STATS_SUFFIX}")))
+        if len(candidates) == 1:
+            return candidates[0][: -len(_STATS_SUFFIX)]
+        if len(candidates) > 1:
+            raise ValueError(
+                f"Several exports in {directory} ({', '.join(os.path.basename(c) for c in candidates)}); "
+                "pass the directory of one export or collection="
+            )
+    raise FileNotFoundError(f"No *{_STATS_SUFFIX} export found under {export_dir}")
+
+
+def _load_query_model(hf_model_id: str, device: str, trust_remote_code: bool) -> Any:
+    from processor.ultimate_embedder.compat import load_sentence_transformers
+
+    _, sentence_transformer_cls, _ = load_sentence_transformers()
+    return sentence_transformer_cls(hf_model_id, device=device, trust_remote_code=trust_remote_code)
+
+
+class _FaissSearcher:
+    """Adapter giving a FAISS index the ``ExactSearchIndex.search`` signature."""
+
+    def __init__(self, index: Any) -> None:
+        self.index = index
+
+    def search(self, queries: Any, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        single = np.ndim(queries) == 1
+        matrix = np.ascontiguousarray(np.asarray(queries, dtype=np.float32).reshape(1 if single else -1, self.index.d))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        scores, ids = self.index.search(matrix / np.where(norms > 0, norms, 1.0), k)
+        return (ids[0], scores[0]) if single else (ids, scores)
+
+
+class SearchIndex:
+    """Read-only search over one export directory."""
+
+    def __init__(
+        self,
+        *,
+        vectors: Any,
+        texts: Sequence[str],
+        metadata: Sequence[Dict[str, Any]],
+        searcher: Any,
+        encoder: Any = None,
+        stats: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self.vectors = vectors
+        self.texts = texts
+        self.metadata = metadata
+        self.searcher = searcher
+        self.encoder = encoder
+        self.stats = stats or {}
+
+    @classmethod
+    def open(
+        cls,
+        export_dir: str,
+        *,
+        collection: Optional[str] = None,
+        model: Any = None,
+        device: str = "cpu",
+        storage: Optional[str] = None,
+        use_faiss: bool = False,
+        load_encoder: bool = True,
+    ) -> "SearchIndex":
+        """Open an export produced by ``ExportRuntime.export_for_local_qdrant``.
+
+        ``model`` supplies a ready query model (anything with ``encode``);
+        otherwise the export's model is loaded when ``load_encoder`` is set.
+        ``storage`` picks the exact-search storage (default follows the file's
+        dtype, so vectors stay memory-mapped); ``fp16`` prefers the exported
+        ``_embeddings_fp16.npy`` and ``int8`` the exported ``_embeddings_int8.npz``
+        codes. Without ``_embeddings.npy`` the compressed ``_embeddings.npz`` (read
+        into memory) or else the fp16 copy is used.
+        ``use_faiss`` searches the exported FAISS index instead.
+        """
+
+        base = _find_export_base(export_dir, collection)
+        with open(base + _STATS_SUFFIX, "r", encoding="utf-8") as handle:
+            stats = json.load(handle)
+
+        paths = embedding_paths(base)
+        codes: Optional[Int8Codes] = None
+        if storage == "int8" and os.path.exists(paths["int8"]):
+            codes = Int8Codes.load(paths["int8"])
+        vector_path = paths["numpy"]
+        if not os.path.exists(vector_path) and os.path.exists(paths["compressed"]):
+            vector_path = paths["compressed"]
+        # Exports with the float32 copy disabled still carry the fp16 one.
+        if (storage == "fp16" or not os.path.exists(vector_path)) and os.path.exists(paths["fp16"]):
+            vector_path = paths["fp16"]
+        if codes is not None and not os.path.exists(vector_path):
+            vectors = codes.codes
+        else:
+            vectors = load_embedding_store(vector_path)
+        if storage is None:
+            storage = "fp16" if vectors.dtype == np.float16 else "float32"
+
+        searcher: Any = None
+        if use_faiss and os.path.exists(base + "_index.faiss"):
+            from processor.ultimate_embedder.export_runtime import _load_faiss
+
+            faiss = _load_faiss()
+            if faiss is None:
+                logger.warning("faiss not installed; falling back to exact search")
+            else:
+                searcher = _FaissSearcher(faiss.read_index(base + "_index.faiss", faiss.IO_FLAG_MMAP))
+        if searcher is None:
+            searcher = ExactSearchIndex(codes if codes is not None else vectors, storage=storage)
+
+        encoder = None
+        if model is not None or load_encoder:
+            encoder = cls._build_encoder(stats, model, device)
+
+        if os.path.exists(doc_store_paths(base)["doc_store_manifest"]):
+            store = DocStore.open(base)
+            texts: Sequence[str] = store.texts
+            metadata: Sequence[Dict[str, Any]] = store.metadata
+        else:
+            texts = JsonArrayRecords(base + "_texts.json")
+            metadata = JsonArrayRecords(base + "_metadata.json")
+
+        return cls(
+            vectors=vectors,
+            texts=texts,
+            metadata=metadata,
+            searcher=searcher,
+            encoder=encoder,
+            stats=stats,
+        )
+
+    @staticmethod
+    def _build_encoder(stats: Dict[str, Any], model: Any, device: str) -> Any:
+        from processor.ultimate_embedder.config import KAGGLE_OPTIMIZED_MODELS
+        from processor.ultimate_embedder.query_encoder import QueryEncoder
+
+        model_section = stats.get("model_config") or {}
+        model_config = KAGGLE_OPTIMIZED_MODELS.get(model_section.get("name", ""))
+        hf_model_id = model_section.get("hf_model_id") or (model_config.hf_model_id if model_config else "")
+        if model is None:
+            if not hf_model_id:
+                raise ValueError("Export stats do not name a model; pass model=")
+            trust_remote_code = model_config.trust_remote_code if model_config else True
+            model = _load_query_model(hf_model_id, device, trust_remote_code)
+
+        encoder = QueryEncoder.from_env(logger=logger)
+        encoder.bind_model(
+            model,
+            model_id=hf_model_id,
+            query_prefix=model_config.query_prefix if model_config else "",
+            device=device,
+        )
+        return encoder
+
+    def __len__(self) -> int:
+        return int(self.vectors.shape[0])
+
+    def text(self, chunk_id: int) -> str:
+        return self.texts[chunk_id]
+
+    def meta(self, chunk_id: int) -> Dict[str, Any]:
+        return self.metadata[chunk_id]
+
+    def search_vectors(self, vectors: Any, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        return self.searcher.search(vectors, k)
+
+    def search(self, query: str, top_k: int = 10) -> List[Dict[str, Any]]:
+        if self.encoder is None:
+            raise RuntimeError("SearchIndex was opened without a query encoder")
+        ids, scores = self.searcher.search(self.encoder.encode(query), top_k)
+        results = []
+        for rank, (chunk_id, score) in enumerate(zip(ids.tolist(), scores.tolist())):
+            if chunk_id < 0:  # FAISS pads short result lists with -1
+                continue
+            results.append(
+                {
+                    "rank": rank + 1,
+                    "score": float(score),
+                    "text": self.texts[chunk_id],
+                    "metadata": self.metadata[chunk_id],
+                    "chunk_id": chunk_id,
+                }
+            )
+        return results
+
+    def as_backend(self, reranker: Any = None) -> Any:
+        """``SearchBackend`` for ``SearchService`` over this index."""
+
+        from processor.ultimate_embedder.search_service import SearchBackend
+
+        return SearchBackend(
+            encoder=self.encoder,
+            index=self.searcher,
+            texts=self.texts,
+            metadata=self.metadata,
+            reranker=reranker,
+        )
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Search an exported embedding directory.")
+    parser.add_argument("export_dir", help="Directory holding *_embeddings.npy, *_texts.json, *_stats.json")
+    parser.add_argument("--collection", help="Collection sub-directory when the export has several")
+    parser.add_argument("--query", action="append", default=[], help="Query to run (repeatable)")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--storage", choices=("float32", "fp16", "int8"))
+    parser.add_argument("--faiss", action="store_true", help="Search the exported FAISS index")
+    parser.add_argument("--serve", action="store_true", help="Start the HTTP search service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    index = SearchIndex.open(
+        args.export_dir,
+        collection=args.collection,
+        device=args.device,
+        storage=args.storage,
+        use_faiss=args.faiss,
+    )
+    logger.info("Opened %d vectors from %s", len(index), args.export_dir)
+
+    for query in args.query:
+        print(json.dumps({"query": query, "results": index.search(query, args.top_k)}, ensure_ascii=False))
+
+    if args.serve:
+        from processor.ultimate_embedder.config import ServingConfig
+        from processor.ultimate_embedder.search_service import run_search_service
+
+        run_search_service(index.as_backend(), ServingConfig(host=args.host, port=args.port), logger=logger)
+    return 0
+
+
+__all__ = ["JsonArrayRecords", "SearchIndex", "main"]
+
+
+if __name__ == "__main__":  # pragma: no cover - CLI entry point
+    raise SystemExit(main())
@@ -0,0 +1,521 @@
+"""Asyncio HTTP/JSON search front end over dense search and reranking.
+
+Every request passes through three batched stages, each owned by a single
+worker thread so model calls never run concurrently on one device:
+
+* ``encode``: queries arriving within ``batch_window_ms`` are encoded together;
+* ``dense``: their vectors are searched as one ``(Q, D)`` matrix;
+* ``rerank``: every query's candidate pool goes to one grouped rerank call.
+
+``max_concurrency`` requests run at once and ``max_queue`` more may wait;
+beyond that the service answers ``503`` with ``Retry-After`` instead of
+queueing without bound. Per-stage latency histograms and batch counters are
+exposed in the Prometheus text format on ``/metrics``.
+
+Endpoints: ``POST /search`` (``{"query", "top_k", "rerank", "candidates"}``),
+``GET /healthz``, ``GET /stats`` and ``GET /metrics``. The HTTP layer is
+plain ``asyncio`` streams, so no web framework is required.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from processor.ultimate_embedder.config import ServingConfig
+from processor.ultimate_embedder.prometheus_metrics import MetricsRegistry
+
+_MAX_BODY_BYTES = 1 << 20
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+class ServiceOverloaded(RuntimeError):
+    """Raised when admission would exceed ``max_concurrency + max_queue``."""
+
+
+class SearchBackend:
+    """Query encoder, dense index, optional reranker and chunk store behind the service.
+
+    ``encoder`` needs ``encode_many(queries) -> (Q, D)`` (see ``QueryEncoder``),
+    ``index`` needs ``search(vectors, k) -> (ids, scores)`` (see
+    ``ExactSearchIndex``) and ``reranker`` needs ``predict(pairs) -> scores``.
+    ``rerank_executor`` (a ``CrossEncoderBatchExecutor``) takes precedence over
+    ``reranker`` and brings GPU leasing, OOM recovery, the pair-score cache and
+    token-budgeted batching.
+    """
+
+    def __init__(
+        self,
+        *,
+        encoder: Any,
+        index: Any,
+        texts: Sequence[str],
+        metadata: Optional[Sequence[Dict[str, Any]]] = None,
+        reranker: Any = None,
+        rerank_executor: Any = None,
+    ) -> None:
+        self.encoder = encoder
+        self.index = index
+        self.texts = texts
+        self.metadata = metadata
+        self.reranker = reranker
+        self.rerank_executor = rerank_executor
+
+    @classmethod
+    def from_embedder(cls, embedder: Any) -> "SearchBackend":
+        """Serve an in-memory ``UltimateKaggleEmbedderV4`` after embeddings exist."""
+
+        reranking = getattr(embedder.reranking_config, "enable_reranking", False) is True
+        return cls(
+            encoder=embedder._get_query_encoder(),
+            index=embedder._exact_search_index(),
+            texts=embedder.chunk_texts,
+            metadata=embedder.chunks_metadata,
+            reranker=embedder.reranker if reranking else None,
+            rerank_executor=getattr(embedder, "cross_encoder_executor", None) if reranking else None,
+        )
+
+    @property
+    def can_rerank(self) -> bool:
+        return self.reranker is not None or self.rerank_executor is not None
+
+    def encode(self, queries: Sequence[str]) -> np.ndarray:
+        return np.asarray(self.encoder.encode_many(list(queries)), dtype=np.float32)
+
+    def dense(self, vectors: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        ids, scores = self.index.search(vectors, k)
+        return np.asarray(ids).reshape(len(vectors), -1), np.asarray(scores).reshape(len(vectors), -1)
+
+    def rerank(self, pairs: Sequence[Sequence[str]]) -> List[float]:
+        return [float(score) for score in self.reranker.predict([list(pair) for pair in pairs])]
+
+    def text(self, chunk_id: int) -> str:
+        return self.texts[chunk_id] if chunk_id < len(self.texts) else ""
+
+    def meta(self, chunk_id: int) -> Dict[str, Any]:
+        if self.metadata is None or chunk_id >= len(self.metadata):
+            return {}
+        return self.metadata[chunk_id]
+
+
+class StageBatcher:
+    """Coalesce awaiting callers into batched calls of one blocking function.
+
+    ``func`` receives the list of submitted items and returns one result per
+    item; it runs on this stage's single worker thread.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[List[Any]], Sequence[Any]],
+        *,
+        window_ms: float,
+        max_batch: int,
+        on_batch: Optional[Callable[[str, int, float], None]] = None,
+    ) -> None:
+        self.name = name
+        self.func = func
+        self.window = max(0.0, float(window_ms)) / 1000.0
+        self.max_batch = max(1, int(max_batch))
+        self.on_batch = on_batch
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"search-{name}")
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._full: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def submit(self, item: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        if self._full is None:
+            self._full = asyncio.Event()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch:
+            self._full.set()
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._drain())
+        return await future
+
+    async def _drain(self) -> None:
+        assert self._full is not None
+        loop = asyncio.get_running_loop()
+        while self._pending:
+            if len(self._pending) < self.max_batch and self.window > 0:
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.window)
+                except asyncio.TimeoutError:
+                    pass
+            batch = self._pending[: self.max_batch]
+            del self._pending[: self.max_batch]
+            if len(self._pending) < self.max_batch:
+                self._full.clear()
+
+            started = time.perf_counter()
+            try:
+                results = await loop.run_in_executor(self._executor, self.func, [item for item, _ in batch])
+            except Exception as exc:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+            if self.on_batch is not None:
+                self.on_batch(self.name, len(batch), time.perf_counter() - started)
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+class SearchService:
+    """Batched, admission-controlled search over a ``SearchBackend``."""
+
+    def __init__(
+        self,
+        backend: SearchBackend,
+        config: Optional[ServingConfig] = None,
+        *,
+        registry: Optional[MetricsRegistry] = None,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        self.backend = backend
+        self.config = config or ServingConfig()
+        self.registry = registry or MetricsRegistry()
+        self.logger = logger or logging.getLogger(__name__)
+        self.active = 0
+        self.rejected = 0
+        self.completed = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+
+        batching = {
+            "window_ms": self.config.batch_window_ms,
+            "max_batch": self.config.max_batch_size,
+            "on_batch": self._record_batch,
+        }
+        self._encode = StageBatcher("encode", self._encode_batch, **batching)
+        self._dense = StageBatcher("dense", self._dense_batch, **batching)
+        self._rerank = StageBatcher("rerank", self._rerank_batch, **batching)
+
+    # ------------------------------------------------------------------
+    # Stage functions (worker threads)
+    # ------------------------------------------------------------------
+    def _encode_batch(self, queries: List[str]) -> List[np.ndarray]:
+        return list(self.backend.encode(queries))
+
+    def _dense_batch(self, items: List[Tuple[np.ndarray, int]]) -> List[Tuple[np.ndarray, np.ndarray]]:
+        k = max(k for _, k in items)
+        ids, scores = self.backend.dense(np.stack([vector for vector, _ in items]), k)
+        return [(ids[row][:want], scores[row][:want]) for row, (_, want) in enumerate(items)]
+
+    def _rerank_batch(self, items: List[Tuple[str, List[int]]]) -> List[List[float]]:
+        executor = self.backend.rerank_executor
+        if executor is not None:
+            from processor.ultimate_embedder.cross_encoder_executor import RerankGroup
+
+            groups = [
+                RerankGroup(
+                    query=query,
+                    candidate_ids=[str(chunk_id) for chunk_id in chunk_ids],
+                    candidate_texts=[self.backend.text(chunk_id) for chunk_id in chunk_ids],
+                    top_k=len(chunk_ids),
+                )
+                for query, chunk_ids in items
+            ]
+            runs = executor.execute_rerank_groups(groups, top_k=max(len(chunk_ids) for _, chunk_ids in items))
+            # Runs come back ranked; restore each pool's candidate order.
+            split = []
+            for group, run in zip(groups, runs):
+                by_id = dict(zip(run.candidate_ids, run.scores))
+                split.append([float(by_id.get(chunk_id, float("-inf"))) for chunk_id in group.candidate_ids])
+            return split
+
+        pairs = [(query, self.backend.text(chunk_id)) for query, chunk_ids in items for chunk_id in chunk_ids]
+        scores = self.backend.rerank(pairs) if pairs else []
+        split: List[List[float]] = []
+        offset = 0
+        for _, chunk_ids in items:
+            split.append(list(scores[offset:offset + len(chunk_ids)]))
+            offset += len(chunk_ids)
+        return split
+
+    # ------------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------------
+    def _record_batch(self, stage: str, size: int, seconds: float) -> None:
+        labels = {"stage": stage}
+        self.registry.observe("search_stage_batch_seconds", seconds, labels, help_text="Batched stage call latency")
+        self.registry.inc("search_stage_batches_total", 1, labels, help_text="Batched stage calls")
+        self.registry.inc("search_stage_items_total", size, labels, help_text="Requests served by batched stage calls")
+
+    def _observe(self, stage: str, seconds: float) -> None:
+        self.registry.observe(
+            "search_request_stage_seconds",
+            seconds,
+            {"stage": stage},
+            help_text="Per-request latency by stage, including queueing",
+        )
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+    async def search(
+        self,
+        query: str,
+        *,
+        top_k: Optional[int] = None,
+        rerank: Optional[bool] = None,
+        candidates: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Run one query through the batched stages; raises ``ServiceOverloaded`` when full."""
+
+        config = self.config
+        if self.active >= config.max_concurrency + config.max_queue:
+            self.rejected += 1
+            self.registry.inc("search_rejected_total", 1, help_text="Requests refused by backpressure")
+            raise ServiceOverloaded("search service is at capacity")
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(max(1, config.max_concurrency))
+
+        top_k = max(1, min(int(top_k or config.default_top_k), config.max_top_k))
+        use_rerank = self.backend.can_rerank if rerank is None else bool(rerank) and self.backend.can_rerank
+        pool = max(top_k, min(int(candidates or config.rerank_candidates), config.max_top_k)) if use_rerank else top_k
+
+        self.active += 1
+        self.registry.set_gauge("search_inflight", self.active, help_text="Admitted search requests")
+        started = time.perf_counter()
+        try:
+            async with self._semaphore:
+                timings: Dict[str, float] = {"queue": time.perf_counter() - started}
+
+                mark = time.perf_counter()
+                vector = await self._encode.submit(query)
+                timings["encode"] = time.perf_counter() - mark
+
+                mark = time.perf_counter()
+                ids, similarities = await self._dense.submit((vector, pool))
+                timings["dense"] = time.perf_counter() - mark
+
+                chunk_ids = [int(chunk_id) for chunk_id in ids]
+                dense_scores = {chunk_id: float(score) for chunk_id, score in zip(chunk_ids, similarities)}
+                if use_rerank and chunk_ids:
+                    mark = time.perf_counter()
+                    rerank_scores = await self._rerank.submit((query, chunk_ids))
+                    timings["rerank"] = time.perf_counter() - mark
+                    ranked = sorted(zip(chunk_ids, rerank_scores), key=lambda item: -item[1])[:top_k]
+                else:
+                    ranked = [(chunk_id, dense_scores[chunk_id]) for chunk_id in chunk_ids[:top_k]]
+        finally:
+            self.active -= 1
+            self.registry.set_gauge("search_inflight", self.active, help_text="Admitted search requests")
+
+        timings["total"] = time.perf_counter() - started
+        for stage, seconds in timings.items():
+            self._observe(stage, seconds)
+        self.completed += 1
+
+        results = []
+        for rank, (chunk_id, score) in enumerate(ranked):
+            result = {
+                "rank": rank + 1,
+                "score": float(score),
+                "text": self.backend.text(chunk_id),
+                "metadata": self.backend.meta(chunk_id),
+                "chunk_id": chunk_id,
+            }
+            if use_rerank:
+                result["embedding_similarity"] = dense_scores[chunk_id]
+            results.append(result)
+        return {
+            "query": query,
+            "reranked": use_rerank,
+            "results": results,
+            "timings_ms": {stage: round(seconds * 1000.0, 3) for stage, seconds in timings.items()},
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {
+            "active": self.active,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "max_concurrency": self.config.max_concurrency,
+            "max_queue": self.config.max_queue,
+            "rerank": self.backend.can_rerank,
+        }
+        encoder_stats = getattr(self.backend.encoder, "stats", None)
+        if callable(encoder_stats):
+            stats["query_cache"] = encoder_stats()
+        return stats
+
+    # ------------------------------------------------------------------
+    # HTTP
+    # ------------------------------------------------------------------
+    async def start(self) -> int:
+        """Bind the HTTP listener and return the port actually in use."""
+
+        self._server = await asyncio.start_server(
+            self._handle_connection,
+            self.config.host,
+            self.config.port,
+            limit=_MAX_BODY_BYTES,
+        )
+        port = int(self._server.sockets[0].getsockname()[1])
+        self.logger.info("Search service listening on http://%s:%d", self.config.host, port)
+        return port
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        assert self._server is not None
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        for stage in (self._encode, self._dense, self._rerank):
+            stage.close()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                status, payload, extra = await self._dispatch(method, path, body)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                self._write_response(writer, status, payload, extra, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except ValueError as exc:
+            self._write_response(writer, 400, {"error": str(exc)}, {}, False)
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _read_request(
+        reader: asyncio.StreamReader,
+    ) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+        line = await reader.readline()
+        if not line.strip():
+            return None
+        parts = line.decode("latin-1").split()
+        if len(parts) < 2:
+            raise ValueError("malformed request line")
+        headers: Dict[str, str] = {}
+        while True:
+            header = await reader.readline()
+            if header in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = header.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", "0") or 0)
+        if length > _MAX_BODY_BYTES:
+            raise ValueError("request body too large")
+        body = await reader.readexactly(length) if length else b""
+        return parts[0].upper(), parts[1].split("?", 1)[0], headers, body
+
+    async def _dispatch(self, method: str, path: str, body: bytes) -> Tuple[int, Any, Dict[str, str]]:
+        if path == "/healthz":
+            return 200, {"status": "ok"}, {}
+        if path == "/stats":
+            return 200, self.stats(), {}
+        if path == "/metrics":
+            return 200, self.registry.render(), {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+        if path != "/search":
+            return 404, {"error": f"unknown path {path}"}, {}
+        if method != "POST":
+            return 405, {"error": "use POST"}, {"Allow": "POST"}
+
+        try:
+            payload = json.loads(body or b"{}")
+            query = payload["query"]
+            if not isinstance(query, str) or not query.strip():
+                raise ValueError("query must be a non-empty string")
+            result = await self.search(
+                query,
+                top_k=payload.get("top_k"),
+                rerank=payload.get("rerank"),
+                candidates=payload.get("candidates"),
+            )
+        except ServiceOverloaded as exc:
+            return 503, {"error": str(exc)}, {"Retry-After": "1"}
+        except (KeyError, TypeError, ValueError) as exc:
+            return 400, {"error": f"invalid request: {exc}"}, {}
+        except Exception as exc:
+            self.logger.exception("Search request failed")
+            return 500, {"error": f"{type(exc).__name__}: {exc}"}, {}
+        return 200, result, {}
+
+    @staticmethod
+    def _write_response(
+        writer: asyncio.StreamWriter,
+        status: int,
+        payload: Any,
+        extra_headers: Dict[str, str],
+        keep_alive: bool,
+    ) -> None:
+        if isinstance(payload, str):
+            body = payload.encode("utf-8")
+        else:
+            body = json.dumps(payload).encode("utf-8")
+        headers = {
+            "Content-Type": "application/json",
+            "Content-Length": str(len(body)),
+            "Connection": "keep-alive" if keep_alive else "close",
+        }
+        headers.update(extra_headers)
+        head = f"HTTP/1.1 {status} {_REASONS.get(status, 'Unknown')}\r\n"
+        head += "".join(f"{name}: {value}\r\n" for name, value in headers.items())
+        writer.write(head.encode("latin-1") + b"\r\n" + body)
+
+
+def run_search_service(
+    backend: SearchBackend,
+    config: Optional[ServingConfig] = None,
+    logger: Optional[logging.Logger] = None,
+) -> None:
+    """Serve ``backend`` until interrupted."""
+
+    service = SearchService(backend, config, logger=logger)
+
+    async def _main() -> None:
+        try:
+            await service.serve_forever()
+        finally:
+            await service.stop()
+
+    try:
+        asyncio.run(_main())
+    except KeyboardInterrupt:
+        pass
+
+
+__all__ = [
+    "SearchBackend",
+    "SearchService",
+    "ServiceOverloaded",
+    "StageBatcher",
+    "run_search_service",
+]
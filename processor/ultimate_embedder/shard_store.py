@@ -0,0 +1,226 @@
+"""Resumable per-(model, shard) storage for long dense embedding runs.
+
+The encode corpus is cut into fixed row ranges ("shards"). Each model pass
+writes one ``.npy`` per shard, then a small JSON completion record; a shard
+counts as done only once both exist and agree on the row count, so a session
+killed mid-write leaves nothing half-valid behind. Layout::
+
+    <root>/<corpus fingerprint>/manifest.json
+    <root>/<corpus fingerprint>/<model>/shard_00000.npy
+    <root>/<corpus fingerprint>/<model>/shard_00000.json
+
+Keying the directory by corpus fingerprint means a changed corpus never
+resumes from stale rows. Workers sharing ``root`` (several sessions or
+machines) split shards round-robin by ``worker_index``/``worker_count``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+SHARD_STORE_VERSION = 1
+_SHARD_FILE_FORMAT = "shard_{index:05d}"
+
+
+class ShardsPendingError(RuntimeError):
+    """Raised when a worker finished its shards but others' are still missing."""
+
+    def __init__(self, pending: Dict[str, int]) -> None:
+        self.pending = dict(pending)
+        detail = ", ".join(f"{model}: {count}" for model, count in sorted(self.pending.items()))
+        super().__init__(
+            f"Shards owned by other workers are not complete yet ({detail}); "
+            "re-run once they finish to aggregate."
+        )
+
+
+def corpus_fingerprint(texts: Iterable[str], *extra: Any) -> str:
+    """Stable digest of the encode inputs (plus settings that change the rows)."""
+
+    digest = hashlib.blake2b(digest_size=16)
+    for value in extra:
+        digest.update(repr(value).encode("utf-8"))
+        digest.update(b"\x00")
+    for text in texts:
+        encoded = text.encode("utf-8", "surrogatepass")
+        digest.update(len(encoded).to_bytes(8, "little"))
+        digest.update(encoded)
+    return digest.hexdigest()
+
+
+def _safe_name(value: str) -> str:
+    return "".join(
+        character if character.isalnum() or character in {"-", "_", "."} else "_"
+        for character in value
+    ).strip("_") or "model"
+
+
+def _atomic_write_bytes(target: Path, writer: Any) -> None:
+    tmp_path = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, "wb") as handle:
+            writer(handle)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp_path, target)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+class ShardStore:
+    """Fixed-size shard checkpoints for one corpus, shared by every model pass."""
+
+    def __init__(
+        self,
+        root: Union[str, Path],
+        *,
+        fingerprint: str,
+        total_rows: int,
+        shard_size: int,
+        worker_index: int = 0,
+        worker_count: int = 1,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        if shard_size <= 0:
+            raise ValueError("shard_size must be positive")
+        if worker_count <= 0 or not 0 <= worker_index < worker_count:
+            raise ValueError(f"invalid shard worker {worker_index}/{worker_count}")
+
+        self.logger = logger or logging.getLogger(__name__)
+        self.fingerprint = fingerprint
+        self.total_rows = int(total_rows)
+        self.worker_index = int(worker_index)
+        self.worker_count = int(worker_count)
+        self.directory = Path(root).expanduser() / fingerprint
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.shard_size = self._load_or_write_manifest(int(shard_size))
+
+    def _load_or_write_manifest(self, shard_size: int) -> int:
+        manifest_path = self.directory / "manifest.json"
+        if manifest_path.exists():
+            try:
+                manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+                existing = int(manifest["shard_size"])
+                if int(manifest["total_rows"]) == self.total_rows and existing > 0:
+                    if existing != shard_size:
+                        # Shard boundaries must match the rows already on disk.
+                        self.logger.warning(
+                            "Shard store %s was started with shard_size=%d; keeping it (requested %d)",
+                            self.directory,
+                            existing,
+                            shard_size,
+                        )
+                    return existing
+            except (OSError, ValueError, KeyError, TypeError) as exc:
+                self.logger.warning("Rewriting unreadable shard manifest %s: %s", manifest_path, exc)
+
+        manifest = {
+            "version": SHARD_STORE_VERSION,
+            "fingerprint": self.fingerprint,
+            "total_rows": self.total_rows,
+            "shard_size": shard_size,
+            "shard_count": -(-self.total_rows // shard_size),
+            "created_at": time.time(),
+        }
+        payload = json.dumps(manifest, indent=2).encode("utf-8")
+        _atomic_write_bytes(manifest_path, lambda handle: handle.write(payload))
+        return shard_size
+
+    @property
+    def shard_count(self) -> int:
+        return -(-self.total_rows // self.shard_size)
+
+    def shard_range(self, index: int) -> Tuple[int, int]:
+        start = index * self.shard_size
+        return start, min(start + self.shard_size, self.total_rows)
+
+    def _paths(self, model_name: str, index: int) -> Tuple[Path, Path]:
+        model_dir = self.directory / _safe_name(model_name)
+        stem = _SHARD_FILE_FORMAT.format(index=index)
+        return model_dir / f"{stem}.npy", model_dir / f"{stem}.json"
+
+    def is_complete(self, model_name: str, index: int) -> bool:
+        array_path, record_path = self._paths(model_name, index)
+        if not array_path.exists() or not record_path.exists():
+            return False
+        try:
+            record = json.loads(record_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return False
+        start, end = self.shard_range(index)
+        return int(record.get("rows", -1)) == end - start
+
+    def missing_shards(self, model_name: str) -> List[int]:
+        return [index for index in range(self.shard_count) if not self.is_complete(model_name, index)]
+
+    def owns(self, index: int) -> bool:
+        return index % self.worker_count == self.worker_index
+
+    def pending_shards(self, model_name: str) -> List[int]:
+        """Incomplete shards this worker is responsible for."""
+
+        return [index for index in self.missing_shards(model_name) if self.owns(index)]
+
+    def write(self, model_name: str, index: int, matrix: np.ndarray) -> Path:
+        start, end = self.shard_range(index)
+        matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        if matrix.shape[0] != end - start:
+            raise ValueError(
+                f"Shard {index} of {model_name} expects {end - start} rows, got {matrix.shape[0]}"
+            )
+
+        array_path, record_path = self._paths(model_name, index)
+        array_path.parent.mkdir(parents=True, exist_ok=True)
+        _atomic_write_bytes(array_path, lambda handle: np.save(handle, matrix))
+        record = {
+            "model": model_name,
+            "shard": index,
+            "start": start,
+            "end": end,
+            "rows": end - start,
+            "dim": int(matrix.shape[1]) if matrix.ndim == 2 else 0,
+            "completed_at": time.time(),
+        }
+        payload = json.dumps(record).encode("utf-8")
+        _atomic_write_bytes(record_path, lambda handle: handle.write(payload))
+        return array_path
+
+    def read(self, model_name: str, index: int) -> np.ndarray:
+        array_path, _ = self._paths(model_name, index)
+        return np.load(array_path, mmap_mode="r")
+
+    def load_model(self, model_name: str) -> np.ndarray:
+        """Concatenate every shard of ``model_name`` in row order."""
+
+        missing = self.missing_shards(model_name)
+        if missing:
+            raise FileNotFoundError(f"{model_name} is missing shards {missing[:5]}")
+        return np.concatenate([self.read(model_name, index) for index in range(self.shard_count)], axis=0)
+
+    def summarize(self, models: Sequence[str]) -> Dict[str, Any]:
+        return {
+            "directory": str(self.directory),
+            "shard_size": self.shard_size,
+            "shard_count": self.shard_count,
+            "worker": f"{self.worker_index}/{self.worker_count}",
+            "completed": {
+                model: self.shard_count - len(self.missing_shards(model)) for model in models
+            },
+        }
+
+
+__all__ = [
+    "SHARD_STORE_VERSION",
+    "ShardStore",
+    "ShardsPendingError",
+    "corpus_fingerprint",
+]
@@ -3,11 +3,17 @@
 from __future__ import annotations
 
 import hashlib
+import re
+from collections import Counter
 from typing import Any, Dict, List, Optional
 
 import numpy as np
 
 
+# Mirrors the chunker's ``_compute_sparse_features`` term pattern.
+_QUERY_TERM_PATTERN = re.compile(r"[a-zA-Z0-9]{3,}")
+
+
 def _stable_term_index(term: str) -> int:
     digest = hashlib.sha1(term.encode("utf-8")).hexdigest()[:8]
     return int(digest, 16)
@@ -63,6 +69,16 @@ def build_sparse_vector_from_metadata(metadata: Dict[str, Any]) -> Optional[Dict
     }
 
 
+def build_query_term_weights(text: str) -> Dict[int, float]:
+    """Hash query terms into the metadata sparse index space (L2-normalised tf)."""
+
+    counts = Counter(_QUERY_TERM_PATTERN.findall(text.lower()))
+    if not counts:
+        return {}
+    norm = float(np.sqrt(sum(count * count for count in counts.values())))
+    return {_stable_term_index(term): count / norm for term, count in counts.items()}
+
+
 def infer_modal_hint(text: str, metadata: Dict[str, Any]) -> Optional[str]:
     """Infer the modal hint for a chunk using metadata and text heuristics."""
 
@@ -92,6 +108,7 @@ def infer_modal_hint(text: str, metadata: Dict[str, Any]) -> Optional[str]:
 
 
 __all__ = [
+    "build_query_term_weights",
     "build_sparse_vector_from_metadata",
     "infer_modal_hint",
 ]
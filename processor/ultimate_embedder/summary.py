@@ -111,6 +111,9 @@ def _extract_rerank_payload(stage: Mapping[str, Any]) -> Dict[str, Any]:
         "batch_size",
         "result_count",
         "initial_candidate_count",
+        "cache_hits",
+        "cache_misses",
+        "cache_hit_rate",
     ):
         value = stage.get(key)
         if value is not None:
@@ -120,6 +123,10 @@ def _extract_rerank_payload(stage: Mapping[str, Any]) -> Dict[str, Any]:
     if isinstance(device_state, Mapping):
         payload["device_state"] = _copy_mapping(device_state)
 
+    score_cache = stage.get("score_cache")
+    if isinstance(score_cache, Mapping):
+        payload["score_cache"] = _copy_mapping(score_cache)
+
     for key in ("fallback_count", "fallback_reason", "fallback_source"):
         if key in stage:
             payload[key] = stage[key]
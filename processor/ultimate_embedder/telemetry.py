@@ -4,6 +4,7 @@ from __future__ import annotations
 
 import logging
 import os
+import threading
 import time
 from typing import Callable
 import uuid
@@ -52,7 +53,11 @@ def resolve_rotation_payload_limit(
 
 
 class TelemetryTracker:
-    """Stateful recorder for mitigation, rotation, and GPU telemetry."""
+    """Stateful recorder for mitigation, rotation, and GPU telemetry.
+
+    Co-resident model passes record from several threads at once, so every
+    recorder mutates its buffers under one re-entrant lock.
+    """
 
     def __init__(
         self,
@@ -83,43 +88,47 @@ class TelemetryTracker:
         self.gpu_lease_events: List[Dict[str, Any]] = []
         self.span_events: Dict[str, Dict[str, Any]] = {}
         self.metrics_reports: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.RLock()
 
     def record_mitigation(self, event_type: str, **details: Any) -> None:
         """Track mitigation events for diagnostics."""
-        record = {"type": event_type, "timestamp": self._time_provider(), **details}
-        self.mitigation_events.append(record)
-        self._logger.info("Mitigation event captured: %s", record)
+        with self._lock:
+            record = {"type": event_type, "timestamp": self._time_provider(), **details}
+            self.mitigation_events.append(record)
+            self._logger.info("Mitigation event captured: %s", record)
 
     def record_rotation_event(self, event: Dict[str, Any]) -> None:
         """Capture per-batch ensemble rotation telemetry with bounded detail."""
-        samples = event.get("chunk_samples")
-        if isinstance(samples, list) and len(samples) > self.rotation_sample_limit:
-            event["chunk_samples"] = samples[: self.rotation_sample_limit]
-
-        event.setdefault("timestamp", self._time_provider())
-        if len(self.rotation_events) >= self.rotation_payload_limit:
-            self.rotation_overflow_count += 1
-            if event.get("status") != "completed":
-                for idx in range(len(self.rotation_events) - 1, -1, -1):
-                    if self.rotation_events[idx].get("status") == "completed":
-                        self.rotation_events[idx] = event
-                        break
-                else:
-                    self.rotation_events[-1] = event
-            self._logger.debug(
-                "Rotation telemetry overflow; limit=%d, discarded=%d",
-                self.rotation_payload_limit,
-                self.rotation_overflow_count,
-            )
-            return
-
-        self.rotation_events.append(event)
-        self._logger.debug("Rotation telemetry captured: %s", event)
+        with self._lock:
+            samples = event.get("chunk_samples")
+            if isinstance(samples, list) and len(samples) > self.rotation_sample_limit:
+                event["chunk_samples"] = samples[: self.rotation_sample_limit]
+
+            event.setdefault("timestamp", self._time_provider())
+            if len(self.rotation_events) >= self.rotation_payload_limit:
+                self.rotation_overflow_count += 1
+                if event.get("status") != "completed":
+                    for idx in range(len(self.rotation_events) - 1, -1, -1):
+                        if self.rotation_events[idx].get("status") == "completed":
+                            self.rotation_events[idx] = event
+                            break
+                    else:
+                        self.rotation_events[-1] = event
+                self._logger.debug(
+                    "Rotation telemetry overflow; limit=%d, discarded=%d",
+                    self.rotation_payload_limit,
+                    self.rotation_overflow_count,
+                )
+                return
+
+            self.rotation_events.append(event)
+            self._logger.debug("Rotation telemetry captured: %s", event)
 
     def record_cache_event(self, event: Dict[str, Any]) -> None:
         """Append cache hit/miss telemetry."""
-        event.setdefault("timestamp", self._time_provider())
-        self.cache_events.append(event)
+        with self._lock:
+            event.setdefault("timestamp", self._time_provider())
+            self.cache_events.append(event)
 
     def record_batch_progress(
         self,
@@ -135,29 +144,30 @@ class TelemetryTracker:
     ) -> None:
         """Capture batch-level progress telemetry with bounded payload."""
 
-        if len(self.batch_progress_events) >= self.batch_progress_limit:
-            return
-
-        payload: Dict[str, Any] = {
-            "timestamp": self._time_provider(),
-            "batch_index": max(0, batch_index),
-            "total_batches": max(1, total_batches),
-            "status": status,
-        }
-
-        if label:
-            payload["label"] = label[: self._progress_label_limit]
-        if model:
-            payload["model"] = model
-        if device:
-            payload["device"] = device
-        if attempt is not None:
-            payload["attempt"] = attempt
-        if metadata:
-            payload["metadata"] = metadata
-
-        self.batch_progress_events.append(payload)
-        self._logger.debug("Batch progress captured: %s", payload)
+        with self._lock:
+            if len(self.batch_progress_events) >= self.batch_progress_limit:
+                return
+
+            payload: Dict[str, Any] = {
+                "timestamp": self._time_provider(),
+                "batch_index": max(0, batch_index),
+                "total_batches": max(1, total_batches),
+                "status": status,
+            }
+
+            if label:
+                payload["label"] = label[: self._progress_label_limit]
+            if model:
+                payload["model"] = model
+            if device:
+                payload["device"] = device
+            if attempt is not None:
+                payload["attempt"] = attempt
+            if metadata:
+                payload["metadata"] = metadata
+
+            self.batch_progress_events.append(payload)
+            self._logger.debug("Batch progress captured: %s", payload)
 
     def record_span_presence(
         self,
@@ -170,29 +180,30 @@ class TelemetryTracker:
     ) -> Dict[str, Any]:
         """Record the presence of an observability span for summary reporting."""
 
-        existing = self.span_events.get(span_name, {})
-        span_id = existing.get("span_id") or uuid.uuid4().hex
-        record: Dict[str, Any] = {
-            "span_id": span_id,
-            "status": "active" if active else "skipped",
-            "timestamp": self._time_provider(),
-        }
-        if reason:
-            record["reason"] = reason
-
-        merged_attributes: Dict[str, Any] = {}
-        existing_attributes = existing.get("attributes")
-        if isinstance(existing_attributes, Mapping):
-            merged_attributes.update(existing_attributes)
-        if attributes:
-            merged_attributes.update(attributes)
-        if extra_fields:
-            merged_attributes.update(extra_fields)
-        if merged_attributes:
-            record["attributes"] = merged_attributes
-
-        self.span_events[span_name] = record
-        return record
+        with self._lock:
+            existing = self.span_events.get(span_name, {})
+            span_id = existing.get("span_id") or uuid.uuid4().hex
+            record: Dict[str, Any] = {
+                "span_id": span_id,
+                "status": "active" if active else "skipped",
+                "timestamp": self._time_provider(),
+            }
+            if reason:
+                record["reason"] = reason
+
+            merged_attributes: Dict[str, Any] = {}
+            existing_attributes = existing.get("attributes")
+            if isinstance(existing_attributes, Mapping):
+                merged_attributes.update(existing_attributes)
+            if attributes:
+                merged_attributes.update(attributes)
+            if extra_fields:
+                merged_attributes.update(extra_fields)
+            if merged_attributes:
+                record["attributes"] = merged_attributes
+
+            self.span_events[span_name] = record
+            return record
 
     def record_metrics_status(
         self,
@@ -205,18 +216,19 @@ class TelemetryTracker:
     ) -> Dict[str, Any]:
         """Capture metrics emission status for a pipeline stage."""
 
-        record: Dict[str, Any] = {
-            "status": "emitted" if emitted else "skipped",
-            "timestamp": self._time_provider(),
-        }
-        if reason:
-            record["reason"] = reason
-        if metrics:
-            record["metrics"] = list(metrics)
-        if details:
-            record["details"] = dict(details)
-        self.metrics_reports[stage] = record
-        return record
+        with self._lock:
+            record: Dict[str, Any] = {
+                "status": "emitted" if emitted else "skipped",
+                "timestamp": self._time_provider(),
+            }
+            if reason:
+                record["reason"] = reason
+            if metrics:
+                record["metrics"] = list(metrics)
+            if details:
+                record["details"] = dict(details)
+            self.metrics_reports[stage] = record
+            return record
 
     def _record_gpu_soft_limit_status(
         self,
@@ -259,40 +271,41 @@ class TelemetryTracker:
     ) -> None:
         """Persist GPU memory snapshots and enforce history limits."""
 
-        if not snapshots:
-            return
-
-        limit_gb = gpu0_soft_limit_bytes / (1024 ** 3)
-        payload = {
-            "timestamp": self._time_provider(),
-            "soft_limit_gb": round(limit_gb, 2),
-            "devices": {
-                device: snapshot.to_dict(gpu0_soft_limit_bytes if device == 0 else None)
+        with self._lock:
+            if not snapshots:
+                return
+
+            limit_gb = gpu0_soft_limit_bytes / (1024 ** 3)
+            payload = {
+                "timestamp": self._time_provider(),
+                "soft_limit_gb": round(limit_gb, 2),
+                "devices": {
+                    device: snapshot.to_dict(gpu0_soft_limit_bytes if device == 0 else None)
+                    for device, snapshot in snapshots.items()
+                },
+            }
+            payload["low_memory_devices"] = [
+                device
                 for device, snapshot in snapshots.items()
-            },
-        }
-        payload["low_memory_devices"] = [
-            device
-            for device, snapshot in snapshots.items()
-            if device == 0 and snapshot.allocated_bytes >= gpu0_soft_limit_bytes
-        ]
-        allocated_gb = [
-            snapshot.allocated_bytes / (1024 ** 3)
-            for snapshot in snapshots.values()
-        ]
-        peak_allocated_gb = max(allocated_gb) if allocated_gb else 0.0
-        self._record_gpu_soft_limit_status(
-            exceeded=bool(payload["low_memory_devices"]),
-            soft_limit_gb=limit_gb,
-            devices=payload["low_memory_devices"],
-            peak_allocated_gb=peak_allocated_gb,
-        )
+                if device == 0 and snapshot.allocated_bytes >= gpu0_soft_limit_bytes
+            ]
+            allocated_gb = [
+                snapshot.allocated_bytes / (1024 ** 3)
+                for snapshot in snapshots.values()
+            ]
+            peak_allocated_gb = max(allocated_gb) if allocated_gb else 0.0
+            self._record_gpu_soft_limit_status(
+                exceeded=bool(payload["low_memory_devices"]),
+                soft_limit_gb=limit_gb,
+                devices=payload["low_memory_devices"],
+                peak_allocated_gb=peak_allocated_gb,
+            )
 
-        self.gpu_snapshot_history.append(payload)
-        if len(self.gpu_snapshot_history) > self.history_limit:
-            self.gpu_snapshot_history = self.gpu_snapshot_history[-self.history_limit :]
+            self.gpu_snapshot_history.append(payload)
+            if len(self.gpu_snapshot_history) > self.history_limit:
+                self.gpu_snapshot_history = self.gpu_snapshot_history[-self.history_limit :]
 
-        self.latest_gpu_snapshots = snapshots
+            self.latest_gpu_snapshots = snapshots
 
     def record_gpu_lease_event(
         self,
@@ -304,19 +317,20 @@ class TelemetryTracker:
     ) -> None:
         """Record GPU lease lifecycle events (acquire/release)."""
 
-        payload: Dict[str, Any] = {
-            "timestamp": self._time_provider(),
-            "event_type": event_type,
-            "model": model,
-            "device_ids": device_ids,
-            "vram": {
-                device_id: snapshot.to_dict()
-                for device_id, snapshot in vram_snapshots.items()
-            },
-        }
-
-        self.gpu_lease_events.append(payload)
-        self._logger.debug("GPU lease event captured: %s", payload)
+        with self._lock:
+            payload: Dict[str, Any] = {
+                "timestamp": self._time_provider(),
+                "event_type": event_type,
+                "model": model,
+                "device_ids": device_ids,
+                "vram": {
+                    device_id: snapshot.to_dict()
+                    for device_id, snapshot in vram_snapshots.items()
+                },
+            }
+
+            self.gpu_lease_events.append(payload)
+            self._logger.debug("GPU lease event captured: %s", payload)
 
     def summarize_gpu_history(self) -> Dict[str, Any]:
         """Return a condensed view of recent GPU telemetry."""
@@ -349,13 +363,14 @@ class TelemetryTracker:
 
     def reset_runtime_state(self) -> None:
         """Clear per-run telemetry buffers."""
-        self.mitigation_events.clear()
-        self.rotation_events.clear()
-        self.batch_progress_events.clear()
-        self.gpu_lease_events.clear()
-        self.span_events.clear()
-        self.metrics_reports.clear()
-        self.rotation_overflow_count = 0
+        with self._lock:
+            self.mitigation_events.clear()
+            self.rotation_events.clear()
+            self.batch_progress_events.clear()
+            self.gpu_lease_events.clear()
+            self.span_events.clear()
+            self.metrics_reports.clear()
+            self.rotation_overflow_count = 0
 
 
 __all__ = ["TelemetryTracker", "resolve_rotation_payload_limit"]
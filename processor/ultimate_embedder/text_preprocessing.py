@@ -0,0 +1,108 @@
+"""Batch text preprocessing: normalisation plus tokenizer-aware truncation.
+
+Normalisation runs inline (C-level ``split``/``join`` costs less than pickling
+texts to worker processes); the batching that pays off is the single fast
+tokenizer call used for truncation.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+from typing import Any, List, Optional, Sequence
+
+from processor.ultimate_embedder.pre_encode import tokenize_family, tokenizer_family
+
+_EXCESS_NEWLINES = re.compile(r"\n{3,}")
+# Character fallback used only when no tokenizer is available.
+_CHARS_PER_TOKEN = 4
+
+
+def normalize_text(text: str, normalize_whitespace: bool = True, remove_excessive_newlines: bool = True) -> str:
+    """Whitespace and newline normalisation applied to every chunk."""
+
+    if normalize_whitespace:
+        text = " ".join(text.split())
+    if remove_excessive_newlines:
+        text = _EXCESS_NEWLINES.sub("\n\n", text)
+    return text
+
+
+def normalize_texts(
+    texts: Sequence[str],
+    *,
+    normalize_whitespace: bool = True,
+    remove_excessive_newlines: bool = True,
+) -> List[str]:
+    """Normalise ``texts`` inline; ``split``/``join`` is too cheap to pay for a process pool."""
+
+    if not normalize_whitespace and not remove_excessive_newlines:
+        return list(texts)
+    return [normalize_text(text, normalize_whitespace, remove_excessive_newlines) for text in texts]
+
+
+def truncate_texts(
+    texts: Sequence[str],
+    *,
+    tokenizer: Optional[Any],
+    max_length: Optional[int],
+    max_tokens: int,
+    logger: Optional[logging.Logger] = None,
+) -> List[str]:
+    """Cut texts at the token the model would stop reading at.
+
+    With a fast tokenizer the cut uses its offset mapping, so the kept prefix is
+    exactly what the model sees. Without one, falls back to the historical
+    ``max_tokens * 4`` character trim.
+    """
+
+    if tokenizer is not None and max_length is not None:
+        try:
+            return tokenize_family(
+                tokenizer,
+                texts,
+                family=tokenizer_family(tokenizer, max_length),
+                max_length=max_length,
+            ).texts
+        except Exception as exc:  # pragma: no cover - tokenizer quirks
+            (logger or logging.getLogger(__name__)).warning(
+                "Tokenizer truncation failed, using character trim: %s", exc
+            )
+
+    max_chars = max_tokens * _CHARS_PER_TOKEN
+    return [f"{text[:max_chars]}..." if len(text) > max_chars else text for text in texts]
+
+
+def preprocess_texts(
+    texts: Sequence[str],
+    *,
+    config: Any,
+    max_tokens: int,
+    tokenizer: Optional[Any] = None,
+    max_length: Optional[int] = None,
+    logger: Optional[logging.Logger] = None,
+) -> List[str]:
+    """Normalise then truncate ``texts`` as an ``AdvancedPreprocessingConfig`` asks."""
+
+    processed = normalize_texts(
+        texts,
+        normalize_whitespace=config.normalize_whitespace,
+        remove_excessive_newlines=config.remove_excessive_newlines,
+    )
+    if config.trim_long_sequences:
+        processed = truncate_texts(
+            processed,
+            tokenizer=tokenizer,
+            max_length=max_length,
+            max_tokens=max_tokens,
+            logger=logger,
+        )
+    return processed
+
+
+__all__ = [
+    "normalize_text",
+    "normalize_texts",
+    "preprocess_texts",
+    "truncate_texts",
+]
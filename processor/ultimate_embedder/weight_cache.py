@@ -0,0 +1,246 @@
+"""Pinned host weight cache for exclusive ensemble staging and hydration.
+
+Moving a model between GPU and pageable host memory with ``.to()`` on every
+rotation costs a full synchronous copy each way, plus a ``.half()`` pass after
+every hydration. ``PinnedWeightCache`` keeps one page-locked host copy per
+model instead, already in the run's precision:
+
+* ``stage`` repoints every parameter and buffer at its pinned host tensor.
+  The device-to-host copy happens only the first time; inference never
+  changes weights, so later stagings of a model that was hydrated from the
+  cache just drop the device copies.
+* ``hydrate`` issues ``non_blocking`` host-to-device copies for every tensor
+  (pinned memory makes them truly asynchronous) and synchronises once.
+* Models whose weights fit in a small slice of device memory stay resident
+  on the GPU between passes and are never staged at all.
+
+Configured through the environment:
+
+* ``EMBEDDER_PINNED_WEIGHTS``: ``0`` disables pinned staging (default on).
+* ``EMBEDDER_RESIDENT_VRAM_FRACTION``: share of each device's memory that
+  resident models may occupy together (default 0.1, ``0`` disables).
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import struct
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import torch
+
+_DEFAULT_RESIDENT_FRACTION = 0.1
+# safetensors dtype tags of floating tensors, with their element sizes.
+_SAFETENSORS_FLOAT_SIZES = {"F64": 8, "F32": 4, "F16": 2, "BF16": 2, "F8_E4M3": 1, "F8_E5M2": 1}
+
+
+def _module_tensors(module: torch.nn.Module) -> Iterator[torch.Tensor]:
+    """Parameters then buffers, each shared tensor once, in a stable order."""
+
+    seen = set()
+    for tensor in list(module.parameters()) + list(module.buffers()):
+        if id(tensor) in seen:
+            continue
+        seen.add(id(tensor))
+        yield tensor
+
+
+def module_nbytes(module: torch.nn.Module, *, fp16: bool = False) -> int:
+    """Bytes held by ``module``; ``fp16`` counts floating tensors at half precision."""
+
+    return sum(
+        tensor.numel() * (min(tensor.element_size(), 2) if fp16 and tensor.is_floating_point() else tensor.element_size())
+        for tensor in _module_tensors(module)
+    )
+
+
+def safetensors_nbytes(paths: Iterable[Path], *, fp16: bool = False) -> Optional[int]:
+    """Weight bytes recorded in safetensors headers, without loading any tensor.
+
+    Only the JSON header of each file is read. ``fp16`` counts floating
+    tensors at half precision, like ``module_nbytes``. Returns None when no
+    file is given or a header cannot be parsed.
+    """
+
+    total = 0
+    found = False
+    for path in paths:
+        try:
+            with open(path, "rb") as handle:
+                (header_size,) = struct.unpack("<Q", handle.read(8))
+                header = json.loads(handle.read(header_size))
+        except (OSError, ValueError, struct.error):
+            return None
+        for name, entry in header.items():
+            if name == "__metadata__" or not isinstance(entry, dict):
+                continue
+            start, end = entry["data_offsets"]
+            nbytes = int(end) - int(start)
+            element_size = _SAFETENSORS_FLOAT_SIZES.get(entry.get("dtype", ""))
+            if fp16 and element_size is not None and element_size > 2:
+                nbytes = nbytes * 2 // element_size
+            total += nbytes
+        found = True
+    return total if found else None
+
+
+def _device_of(module: torch.nn.Module) -> Optional[torch.device]:
+    for tensor in _module_tensors(module):
+        return tensor.device
+    return None
+
+
+class PinnedWeightCache:
+    """Per-model pinned host copies plus a small GPU-resident set."""
+
+    def __init__(
+        self,
+        *,
+        pinned: bool = True,
+        resident_fraction: float = _DEFAULT_RESIDENT_FRACTION,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        self.pinned = bool(pinned)
+        self.resident_fraction = max(0.0, float(resident_fraction))
+        self.logger = logger or logging.getLogger(__name__)
+        self._host: Dict[str, List[torch.Tensor]] = {}
+        # Models whose device tensors still equal their pinned host copy.
+        self._clean: Dict[str, bool] = {}
+        self.resident: Dict[str, Tuple[torch.device, int]] = {}
+
+    @classmethod
+    def from_env(cls, logger: Optional[logging.Logger] = None) -> "PinnedWeightCache":
+        fraction = _DEFAULT_RESIDENT_FRACTION
+        raw = os.environ.get("EMBEDDER_RESIDENT_VRAM_FRACTION", "").strip()
+        if raw:
+            try:
+                fraction = float(raw)
+            except ValueError:
+                pass
+        return cls(
+            pinned=os.environ.get("EMBEDDER_PINNED_WEIGHTS", "1").strip() != "0",
+            resident_fraction=fraction,
+            logger=logger,
+        )
+
+    @property
+    def host_bytes(self) -> int:
+        return sum(tensor.numel() * tensor.element_size() for tensors in self._host.values() for tensor in tensors)
+
+    def _resident_budget(self, device: torch.device) -> int:
+        if device.type != "cuda" or self.resident_fraction <= 0:
+            return 0
+        total = torch.cuda.get_device_properties(device).total_memory
+        return int(total * self.resident_fraction)
+
+    def keep_resident(self, model_name: str, model: torch.nn.Module) -> bool:
+        """Keep ``model`` on its GPU when it fits the resident budget with the others."""
+
+        if model_name in self.resident:
+            return True
+        device = _device_of(model)
+        if device is None or device.type != "cuda":
+            return False
+        size = module_nbytes(model)
+        used = sum(nbytes for other, nbytes in self.resident.values() if other == device)
+        if used + size > self._resident_budget(device):
+            return False
+        self.resident[model_name] = (device, size)
+        self.logger.info(
+            "Model %s kept resident on %s (%.2fGB; resident total %.2fGB)",
+            model_name,
+            device,
+            size / 1024**3,
+            (used + size) / 1024**3,
+        )
+        return True
+
+    def evict_resident(self, model_name: str) -> None:
+        self.resident.pop(model_name, None)
+
+    def _host_dtype(self, tensor: torch.Tensor, fp16: bool) -> torch.dtype:
+        return torch.float16 if fp16 and tensor.is_floating_point() else tensor.dtype
+
+    def stage(self, model_name: str, model: torch.nn.Module, *, fp16: bool) -> Dict[str, Any]:
+        """Point ``model`` at pinned host copies of its weights; returns a timing event."""
+
+        started = time.perf_counter()
+        self.evict_resident(model_name)
+        tensors = list(_module_tensors(model))
+        host = self._host.get(model_name)
+        compatible = (
+            host is not None
+            and len(host) == len(tensors)
+            and all(h.shape == t.shape and h.dtype == self._host_dtype(t, fp16) for h, t in zip(host, tensors))
+        )
+        reuse = compatible and self._clean.get(model_name, False)
+        pin = self.pinned and torch.cuda.is_available()
+        copied = 0
+        if not reuse:
+            if not compatible:
+                host = [
+                    torch.empty(t.shape, dtype=self._host_dtype(t, fp16), pin_memory=pin) for t in tensors
+                ]
+            assert host is not None
+            for tensor, target in zip(tensors, host):
+                source = tensor.data.to(target.dtype)
+                target.copy_(source, non_blocking=target.is_pinned() and source.is_cuda)
+                copied += target.numel() * target.element_size()
+            if pin:
+                torch.cuda.synchronize()
+            self._host[model_name] = host
+        assert host is not None
+        for tensor, host_tensor in zip(tensors, host):
+            tensor.data = host_tensor
+        self._clean[model_name] = True
+        return {
+            "model": model_name,
+            "status": "staged",
+            "source": "cached" if reuse else ("pinned" if pin else "pageable"),
+            "copied_bytes": copied,
+            "duration_seconds": round(time.perf_counter() - started, 6),
+        }
+
+    def hydrate(self, model_name: str, model: torch.nn.Module, device: str) -> str:
+        """Copy ``model`` onto ``device``; returns where the weights came from."""
+
+        target = torch.device(device)
+        current = _device_of(model)
+        if current is not None and current == target:
+            return "resident"
+        host = self._host.get(model_name)
+        tensors = list(_module_tensors(model))
+        from_cache = (
+            host is not None
+            and len(host) == len(tensors)
+            and all(tensor.data_ptr() == h.data_ptr() for tensor, h in zip(tensors, host))
+        )
+        non_blocking = from_cache and target.type == "cuda" and all(h.is_pinned() for h in host or [])
+        for tensor in tensors:
+            tensor.data = tensor.data.to(target, non_blocking=non_blocking)
+        if non_blocking:
+            torch.cuda.synchronize(target)
+        self._clean[model_name] = from_cache
+        if not from_cache:
+            return "pageable"
+        return "pinned" if non_blocking else "cached"
+
+    def drop(self, model_name: str) -> None:
+        self._host.pop(model_name, None)
+        self._clean.pop(model_name, None)
+        self.resident.pop(model_name, None)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "pinned": self.pinned,
+            "host_models": sorted(self._host),
+            "host_bytes": self.host_bytes,
+            "resident": {name: nbytes for name, (_, nbytes) in self.resident.items()},
+        }
+
+
+__all__ = ["PinnedWeightCache", "module_nbytes", "safetensors_nbytes"]
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""Run the CPU embed pipeline benchmark and compare it against a stored baseline."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from processor.ultimate_embedder.benchmark import (  # noqa: E402
+    BENCHMARK_STAGES,
+    BenchmarkConfig,
+    PipelineBenchmark,
+    compare_results,
+)
+
+LOGGER = logging.getLogger("embed_benchmark")
+
+
+def _parse_stage_thresholds(values: Iterable[str]) -> Dict[str, float]:
+    thresholds: Dict[str, float] = {}
+    for value in values:
+        stage, _, raw = value.partition("=")
+        if not raw or stage not in BENCHMARK_STAGES:
+            raise argparse.ArgumentTypeError(f"Expected <stage>=<fraction>, got {value!r}")
+        thresholds[stage] = float(raw)
+    return thresholds
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("--chunks", type=int, default=BenchmarkConfig.chunk_count, help="Synthetic chunk count")
+    parser.add_argument("--words", type=int, default=BenchmarkConfig.words_per_chunk, help="Words per chunk")
+    parser.add_argument("--batch-size", type=int, default=BenchmarkConfig.batch_size, help="Dense batch size")
+    parser.add_argument("--repeats", type=int, default=BenchmarkConfig.repeats, help="Timed repeats per stage")
+    parser.add_argument("--seed", type=int, default=BenchmarkConfig.seed, help="Corpus RNG seed")
+    parser.add_argument(
+        "--stages",
+        nargs="+",
+        choices=BENCHMARK_STAGES,
+        default=list(BENCHMARK_STAGES),
+        help="Stages to run",
+    )
+    parser.add_argument("--output", type=Path, default=Path("bench_results.json"), help="Results JSON path")
+    parser.add_argument("--baseline", type=Path, default=None, help="Baseline JSON to compare against")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="Allowed fractional throughput drop before a stage counts as a regression",
+    )
+    parser.add_argument(
+        "--stage-threshold",
+        action="append",
+        default=[],
+        metavar="STAGE=FRACTION",
+        help="Per-stage threshold override (repeatable)",
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="Write the results to --baseline instead of comparing",
+    )
+    return parser
+
+
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    try:
+        stage_thresholds = _parse_stage_thresholds(args.stage_threshold)
+    except argparse.ArgumentTypeError as exc:
+        parser.error(str(exc))
+
+    config = BenchmarkConfig(
+        chunk_count=args.chunks,
+        words_per_chunk=args.words,
+        batch_size=args.batch_size,
+        repeats=args.repeats,
+        seed=args.seed,
+    )
+    results = PipelineBenchmark(config, LOGGER).run(args.stages)
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    LOGGER.info("Benchmark results written to %s", args.output)
+
+    if args.baseline is None:
+        return 0
+
+    if args.update_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        LOGGER.info("Baseline updated at %s", args.baseline)
+        return 0
+
+    if not args.baseline.exists():
+        LOGGER.error("Baseline not found: %s (use --update-baseline to create it)", args.baseline)
+        return 2
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    regressions = compare_results(
+        results,
+        baseline,
+        threshold=args.threshold,
+        stage_thresholds=stage_thresholds,
+    )
+    if not regressions:
+        LOGGER.info("No throughput regressions against %s", args.baseline)
+        return 0
+
+    for regression in regressions:
+        LOGGER.error(
+            "Regression in %s: %.1f -> %.1f items/s (%.1f%%, allowed -%.1f%%)",
+            regression["stage"],
+            regression["baseline_items_per_second"],
+            regression["current_items_per_second"],
+            regression["change"] * 100.0,
+            regression["threshold"] * 100.0,
+        )
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,8 +9,6 @@ import logging
 from pathlib import Path
 from typing import Iterable, Set
 
-from qdrant_client import QdrantClient
-
 LOGGER = logging.getLogger("delete_collections")
 
 
@@ -44,6 +42,9 @@ def delete_collections(host: str, port: int, collections: Iterable[str]) -> None
         LOGGER.info("No valid collection names supplied; nothing to delete.")
         return
 
+    # Imported lazily so ``--help`` and ``--dry-run`` never pay for the client.
+    from qdrant_client import QdrantClient
+
     client = QdrantClient(host=host, port=port)
     existing = {collection.name for collection in client.get_collections().collections}
     LOGGER.info("Found %d existing collections", len(existing))
@@ -356,6 +356,7 @@ def parse_arguments() -> argparse.Namespace:
 
 # Constants for collection discovery
 CHUNK_FILE_PATTERN = "*_chunks.json"
+CHUNK_STORE_PATTERN = "*_chunks.jsonl"
 MAX_DISCOVERY_DEPTH = 5
 
 
@@ -374,8 +375,7 @@ def _is_collection_directory(directory: Path) -> bool:
     
     try:
         # Look for chunk files with the standard pattern
-        chunk_files = list(directory.glob(CHUNK_FILE_PATTERN))
-        return len(chunk_files) > 0
+        return any(directory.glob(CHUNK_FILE_PATTERN)) or any(directory.glob(CHUNK_STORE_PATTERN))
     except (OSError, PermissionError) as exc:
         LOGGER.debug(f"Cannot check directory {directory}: {exc}")
         return False
@@ -450,7 +450,7 @@ def _scan_directory_recursive(
     # Check if this is a collection directory
     if _is_collection_directory(directory):
         # Count chunks
-        chunk_files = list(directory.glob(CHUNK_FILE_PATTERN))
+        chunk_files = list(directory.glob(CHUNK_FILE_PATTERN)) + list(directory.glob(CHUNK_STORE_PATTERN))
         chunk_count = len(chunk_files)
         
         # Generate unique name
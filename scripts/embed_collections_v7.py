@@ -22,23 +22,27 @@ import logging
 import shutil
 import sys
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Sequence, Tuple
 
 
 REPO_ROOT = Path(__file__).resolve().parent.parent
 if str(REPO_ROOT) not in sys.path:
     sys.path.insert(0, str(REPO_ROOT))
 
-from processor.ultimate_embedder import (
+# Config-only imports keep ``--help`` fast; the embedder (and torch) is imported
+# in ``_build_embedder`` once arguments have been parsed.
+from processor.ultimate_embedder.config import (
     EnsembleConfig,
-    FeatureToggleConfig,
     KaggleExportConfig,
     KaggleGPUConfig,
     RerankingConfig,
     SPARSE_MODELS,
-    UltimateKaggleEmbedderV4,
+    get_reranking_model_config,
 )
-from processor.ultimate_embedder.config import get_reranking_model_config
+from processor.ultimate_embedder.runtime_config import FeatureToggleConfig
+
+if TYPE_CHECKING:  # pragma: no cover - typing only
+    from processor.ultimate_embedder.core import UltimateKaggleEmbedderV4
 
 # ---------------------------------------------------------------------------
 # Globals and defaults
@@ -459,6 +463,8 @@ def _build_feature_toggles(args: argparse.Namespace) -> FeatureToggleConfig:
 
 
 def _build_embedder(args: argparse.Namespace, output_dir: Path, toggles: FeatureToggleConfig) -> UltimateKaggleEmbedderV4:
+    from processor.ultimate_embedder.core import UltimateKaggleEmbedderV4
+
     ensemble_models = _resolve_ensemble_models(args.ensemble_models)
     export_prefix = args.export_prefix or "ultimate_embeddings_v7"
 
@@ -475,6 +481,10 @@ def _build_embedder(args: argparse.Namespace, output_dir: Path, toggles: Feature
         working_dir=str(output_dir),
         output_prefix=export_prefix,
         export_sparse_jsonl=toggles.enable_sparse,
+        shard_size=max(0, args.shard_size),
+        shard_dir=args.shard_dir,
+        shard_worker_index=args.shard_worker[0],
+        shard_worker_count=args.shard_worker[1],
     )
     rerank_config = RerankingConfig(
         model_name=args.rerank_model,
@@ -522,13 +532,24 @@ def _copy_kaggle_log(output_dir: Path, export_prefix: str) -> Optional[Path]:
 # ---------------------------------------------------------------------------
 # Argument parsing
 # ---------------------------------------------------------------------------
+def _parse_shard_worker(raw: str) -> Tuple[int, int]:
+    try:
+        index_text, count_text = raw.split("/", 1)
+        index, count = int(index_text), int(count_text)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError("expected INDEX/COUNT, e.g. 0/2") from exc
+    if count <= 0 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"worker index must be in [0, {count})")
+    return index, count
+
+
 def _build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         description="Embed a chunked knowledge base using the Kaggle ensemble defaults.",
         formatter_class=argparse.ArgumentDefaultsHelpFormatter,
     )
 
-    parser.add_argument("--chunked-dir", default=_default_chunk_dir(), help="Directory containing *_chunks.json files (recursively scanned).")
+    parser.add_argument("--chunked-dir", default=_default_chunk_dir(), help="Directory containing *_chunks.jsonl or *_chunks.json files (recursively scanned).")
     parser.add_argument("--output-dir", default=_default_output_dir(), help="Directory to write embeddings, metadata, and summaries.")
     parser.add_argument("--ensemble-models", nargs="+", default=None, help="Override the ensemble roster (default keeps Kaggle trio).")
     parser.add_argument("--backend", choices=("pytorch", "onnx"), default="pytorch", help="Embedding backend selection passed to KaggleGPUConfig.")
@@ -553,6 +574,20 @@ def _build_parser() -> argparse.ArgumentParser:
     parser.add_argument("--refresh-cache", action="store_true", help="Force re-download of model snapshots even if cached.")
     parser.add_argument("--monitor", action="store_true", help="Enable runtime monitoring thread during embedding.")
     parser.add_argument("--save-intermediate", action="store_true", help="Persist intermediate arrays for debugging.")
+    parser.add_argument(
+        "--shard-size",
+        type=int,
+        default=0,
+        help="Checkpoint dense embeddings every N unique texts so interrupted runs resume (0 disables).",
+    )
+    parser.add_argument("--shard-dir", default=None, help="Shard checkpoint directory shared across sessions (defaults under --output-dir).")
+    parser.add_argument(
+        "--shard-worker",
+        type=_parse_shard_worker,
+        default=(0, 1),
+        metavar="INDEX/COUNT",
+        help="Encode only shards with shard %% COUNT == INDEX, for splitting a run across machines.",
+    )
     parser.add_argument(
         "--disable-stage-report",
         action="store_true",
@@ -668,10 +703,17 @@ def main(argv: Optional[Iterable[str]] = None) -> int:
 
     LOGGER.info("Running dense ensemble for models: %s", _resolve_ensemble_models(args.ensemble_models))
     print("[embed_v7] Starting dense ensemble...", flush=True)
-    dense_results = embedder.generate_embeddings_kaggle_optimized(
-        enable_monitoring=args.monitor,
-        save_intermediate=args.save_intermediate,
-    )
+    from processor.ultimate_embedder.shard_store import ShardsPendingError
+
+    try:
+        dense_results = embedder.generate_embeddings_kaggle_optimized(
+            enable_monitoring=args.monitor,
+            save_intermediate=args.save_intermediate,
+        )
+    except ShardsPendingError as exc:
+        # This worker's shards are checkpointed; whichever worker finishes last aggregates.
+        print(f"[embed_v7] {exc}", flush=True)
+        return 0
     print("[embed_v7] Dense stage complete.", flush=True)
 
     if isinstance(dense_results, dict):
@@ -0,0 +1,210 @@
+"""Tests for the opt-in per-batch hot-path profiler."""
+
+import json
+import threading
+
+import numpy as np
+import torch
+
+from processor.ultimate_embedder.batch_profiler import PROFILE_STAGES, BatchProfiler
+from processor.ultimate_embedder.core import UltimateKaggleEmbedderV4
+from processor.ultimate_embedder.progress import BatchProgressContext
+
+
+class _StubSentenceModel(torch.nn.Module):
+    """Minimal SentenceTransformer look-alike exposing tokenize/forward."""
+
+    def __init__(self, dim: int = 4) -> None:
+        super().__init__()
+        self.dim = dim
+
+    def tokenize(self, texts):
+        lengths = torch.tensor([[float(len(text))] for text in texts])
+        return {"lengths": lengths, "texts": list(texts)}
+
+    def forward(self, features):
+        lengths = features["lengths"]
+        return {"sentence_embedding": lengths.repeat(1, self.dim) + torch.arange(self.dim)}
+
+
+class _EncodeOnlyModel:
+    def encode(self, texts, **kwargs):
+        return np.ones((len(texts), 3), dtype=np.float32)
+
+
+def _record_batch(profiler: BatchProfiler, model, texts, batch_size: int = 2) -> np.ndarray:
+    profiler.begin_batch(model="stub", device="cpu", size=len(texts))
+    result = profiler.profiled_encode(model, texts, batch_size=batch_size, device="cpu")
+    with profiler.stage("normalize"):
+        result = result.astype(np.float32)
+    with profiler.stage("progress"):
+        pass
+    profiler.end_batch()
+    return result
+
+
+def test_disabled_profiler_is_noop() -> None:
+    profiler = BatchProfiler(enabled=False)
+    profiler.begin_batch(model="stub", device="cpu", size=1)
+    with profiler.stage("normalize"):
+        pass
+    profiler.end_batch()
+
+    assert profiler.recording is False
+    assert profiler.summarize() == {}
+    assert profiler.write("unused") == {}
+
+
+def _static_sentence_model():
+    """Tiny offline SentenceTransformer with a default prompt."""
+
+    from sentence_transformers import SentenceTransformer
+    from sentence_transformers.models import StaticEmbedding
+    from tokenizers import Tokenizer
+    from tokenizers.models import WordLevel
+    from tokenizers.pre_tokenizers import Whitespace
+
+    words = "query alpha beta gamma delta epsilon".split()
+    vocab = {"[UNK]": 0, "[PAD]": 1, **{word: index + 2 for index, word in enumerate(words)}}
+    tokenizer = Tokenizer(WordLevel(vocab, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = Whitespace()
+    weights = np.random.default_rng(0).standard_normal((len(vocab), 8)).astype(np.float32)
+    return SentenceTransformer(
+        modules=[StaticEmbedding(tokenizer, embedding_weights=weights)],
+        device="cpu",
+        prompts={"query": "query "},
+        default_prompt_name="query",
+    )
+
+
+def test_profiled_encode_matches_unprofiled_encode_and_splits_stages() -> None:
+    profiler = BatchProfiler(enabled=True)
+    model = _static_sentence_model()
+    texts = ["alpha", "beta gamma delta epsilon", "gamma delta", "epsilon alpha beta"]
+
+    expected = model.encode(
+        texts,
+        batch_size=2,
+        show_progress_bar=False,
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+        device="cpu",
+    )
+    result = _record_batch(profiler, model, texts)
+
+    np.testing.assert_array_equal(result, expected)
+    assert "preprocess" not in vars(model) and "tokenize" not in vars(model)
+    assert not model._forward_hooks and not model._forward_pre_hooks
+
+    columnar = profiler.to_columnar()
+    assert columnar["batches_recorded"] == 1
+    columns = columnar["columns"]
+    assert columns["timer"] == ["perf_counter"]
+    trace = profiler.to_chrome_trace()
+    stage_names = [event["name"] for event in trace["traceEvents"] if event.get("cat") == "stage"]
+    for stage in ("tokenize", "h2d", "forward", "d2h"):
+        assert stage_names.count(stage) == 2, stage
+    assert set(profiler.summarize()["stages"]) == set(PROFILE_STAGES)
+
+
+def test_encode_only_models_fall_back_to_forward_stage() -> None:
+    profiler = BatchProfiler(enabled=True)
+
+    result = _record_batch(profiler, _EncodeOnlyModel(), ["x", "y"])
+
+    assert result.shape == (2, 3)
+    trace = profiler.to_chrome_trace()
+    stage_names = {event["name"] for event in trace["traceEvents"] if event.get("cat") == "stage"}
+    assert "forward" in stage_names
+    assert "tokenize" not in stage_names
+
+
+def test_trace_is_bounded_but_totals_keep_accumulating(tmp_path) -> None:
+    profiler = BatchProfiler(enabled=True, max_batches=2)
+    for _ in range(5):
+        _record_batch(profiler, _EncodeOnlyModel(), ["x"])
+
+    summary = profiler.summarize()
+    assert summary["batches"] == 5
+    assert summary["batches_dropped"] == 3
+    assert len(profiler.to_columnar()["columns"]["batch"]) == 2
+
+    written = profiler.write(str(tmp_path / "run"))
+    payload = json.loads((tmp_path / "run_batch_profile.json").read_text())
+    trace = json.loads((tmp_path / "run_batch_profile.trace.json").read_text())
+    assert set(written) == {"batch_profile", "batch_profile_trace"}
+    assert payload["batches_dropped"] == 3
+    assert any(event["ph"] == "X" for event in trace["traceEvents"])
+
+
+def test_abort_batch_discards_open_record() -> None:
+    profiler = BatchProfiler(enabled=True)
+    profiler.begin_batch(model="stub", device="cpu", size=1)
+    profiler.abort_batch()
+    profiler.end_batch()
+
+    assert profiler.batch_count == 0
+
+
+def test_concurrent_threads_record_their_own_batches() -> None:
+    profiler = BatchProfiler(enabled=True)
+    barrier = threading.Barrier(2)
+
+    def run(name: str) -> None:
+        profiler.begin_batch(model=name, device="cpu", size=1)
+        barrier.wait()
+        with profiler.stage("forward"):
+            pass
+        barrier.wait()
+        profiler.end_batch()
+
+    threads = [threading.Thread(target=run, args=(name,)) for name in ("left", "right")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert profiler.batch_count == 2
+    assert sorted(profiler.to_columnar()["columns"]["model"]) == ["left", "right"]
+
+
+class _EncodableStub(_StubSentenceModel):
+    def encode(self, texts, **kwargs):
+        raise AssertionError("profiled batches must not fall back to encode()")
+
+
+class _EncodeFacade:
+    """Borrows the facade's encode dispatch without loading any model."""
+
+    _call_encode = UltimateKaggleEmbedderV4._call_encode
+    _unwrap_model = UltimateKaggleEmbedderV4._unwrap_model
+
+    def __init__(self, profiler: BatchProfiler) -> None:
+        self.model_name = "stub"
+        self.batch_profiler = profiler
+
+
+def test_call_encode_profiles_gpu_batches_despite_progress_context(monkeypatch) -> None:
+    profiler = BatchProfiler(enabled=True)
+    calls = []
+
+    def fake_profiled_encode(model, texts, *, batch_size, device):
+        calls.append(device)
+        return np.ones((len(texts), 2), dtype=np.float32)
+
+    monkeypatch.setattr(profiler, "profiled_encode", fake_profiled_encode)
+    started = []
+    monkeypatch.setattr("rich.progress.Progress.start", lambda self: started.append(self))
+    profiler.begin_batch(model="stub", device="cuda:0", size=2)
+
+    result = _EncodeFacade(profiler)._call_encode(
+        _EncodableStub(),
+        ["a", "bb"],
+        batch_size=2,
+        device="cuda:0",
+        progress_context=BatchProgressContext(batch_index=0, total_batches=1, label="doc"),
+    )
+
+    assert calls == ["cuda:0"]
+    assert started == []
+    assert result.shape == (2, 2)
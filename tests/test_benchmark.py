@@ -0,0 +1,61 @@
+"""Tests for the CPU pipeline benchmark harness."""
+
+import json
+
+import pytest
+
+from processor.ultimate_embedder.benchmark import (
+    BENCHMARK_STAGES,
+    BenchmarkConfig,
+    PipelineBenchmark,
+    build_synthetic_corpus,
+    compare_results,
+)
+from scripts.benchmark_embed_pipeline import main
+
+
+def test_synthetic_corpus_is_deterministic() -> None:
+    config = BenchmarkConfig(chunk_count=20, files=3)
+
+    assert build_synthetic_corpus(config) == build_synthetic_corpus(config)
+    assert sum(len(chunks) for chunks in build_synthetic_corpus(config)) == 20
+
+
+def test_benchmark_runs_every_stage() -> None:
+    results = PipelineBenchmark(BenchmarkConfig(chunk_count=24, repeats=1, batch_size=8)).run()
+
+    assert set(results["stages"]) == set(BENCHMARK_STAGES)
+    for stage in results["stages"].values():
+        assert stage["items"] == 24
+        assert stage["repeats"] == 1
+        assert stage["items_per_second"] > 0
+
+
+def test_unknown_stage_rejected() -> None:
+    with pytest.raises(ValueError):
+        PipelineBenchmark(BenchmarkConfig(chunk_count=4, repeats=1)).run(["warp_drive"])
+
+
+def test_compare_results_flags_throughput_drops() -> None:
+    baseline = {"stages": {"export": {"items_per_second": 100.0}, "summary": {"items_per_second": 100.0}}}
+    current = {"stages": {"export": {"items_per_second": 70.0}, "summary": {"items_per_second": 95.0}}}
+
+    regressions = compare_results(current, baseline, threshold=0.2)
+    assert [entry["stage"] for entry in regressions] == ["export"]
+
+    assert compare_results(current, baseline, threshold=0.2, stage_thresholds={"export": 0.5}) == []
+
+
+def test_cli_writes_results_and_compares_baseline(tmp_path) -> None:
+    output = tmp_path / "results.json"
+    baseline = tmp_path / "baseline.json"
+    common = ["--chunks", "8", "--repeats", "1", "--stages", "summary", "--output", str(output)]
+
+    assert main([*common, "--baseline", str(baseline), "--update-baseline"]) == 0
+    assert json.loads(baseline.read_text())["stages"]["summary"]["items"] == 8
+
+    inflated = json.loads(baseline.read_text())
+    inflated["stages"]["summary"]["items_per_second"] *= 1000.0
+    baseline.write_text(json.dumps(inflated))
+    assert main([*common, "--baseline", str(baseline)]) == 1
+    assert main([*common, "--baseline", str(tmp_path / "missing.json")]) == 2
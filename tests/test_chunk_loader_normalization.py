@@ -1,7 +1,12 @@
 import json
 import logging
 
+import pytest
+
+from processor.ultimate_embedder import text_preprocessing
 from processor.ultimate_embedder.chunk_loader import ChunkLoader
+from processor.ultimate_embedder.chunk_store import write_chunk_store
+from processor.ultimate_embedder.config import AdvancedPreprocessingConfig
 
 
 def _make_loader(tmp_path):
@@ -175,3 +180,122 @@ def test_chunk_loader_treats_first_level_directory_as_collection(tmp_path):
         metadata["collection_alias"]
         for metadata in result.metadata
     } == {"FAST_DOCS"}
+
+
+def test_chunk_loader_streams_chunk_store_and_prefers_it(tmp_path):
+    chunk_dir = tmp_path / "store_chunks"
+    chunk_dir.mkdir()
+    chunks = [
+        {
+            "text": f"chunk body {index}",
+            "metadata": {"token_count": 120, "source_path": "docs/guide.md", "chunk_index": index},
+        }
+        for index in range(3)
+    ]
+    write_chunk_store(chunk_dir / "guide_chunks.jsonl", chunks)
+    _write_json(chunk_dir / "guide_chunks.json", chunks[:1])
+
+    loader = _make_loader(tmp_path)
+    result = loader.load(
+        str(chunk_dir),
+        preprocess_text=lambda text: text,
+        model_name="test-model",
+        model_vector_dim=768,
+        text_cache=None,
+    )
+
+    assert result.summary["total_chunks_loaded"] == 3
+    assert [meta["chunk_index"] for meta in result.metadata] == [0, 1, 2]
+    assert all(meta["source_path"] == "docs/guide.md" for meta in result.metadata)
+
+
+def test_chunk_loader_uses_batch_preprocessing(tmp_path):
+    chunk_dir = tmp_path / "batch_chunks"
+    chunk_dir.mkdir()
+    payload = [{"text": f"text {index}", "metadata": {"token_count": 120}} for index in range(3)]
+    _write_json(chunk_dir / "batch_chunks.json", payload)
+    batches = []
+
+    def preprocess_batch(texts):
+        batches.append(list(texts))
+        return [text.upper() for text in texts]
+
+    loader = _make_loader(tmp_path)
+    result = loader.load(
+        str(chunk_dir),
+        preprocess_text=lambda text: pytest.fail("per-text preprocessing should not run"),
+        preprocess_batch=preprocess_batch,
+        model_name="test-model",
+        model_vector_dim=768,
+        text_cache=None,
+    )
+
+    assert batches == [["text 0", "text 1", "text 2"]]
+    assert result.processed_texts == ["TEXT 0", "TEXT 1", "TEXT 2"]
+
+
+def test_chunk_loader_filters_chunks_before_batch_preprocessing(tmp_path):
+    chunk_dir = tmp_path / "filtered_chunks"
+    chunk_dir.mkdir()
+    payload = [
+        {"text": "kept one", "metadata": {"token_count": 120}},
+        {"text": "   ", "metadata": {"token_count": 120}},
+        {"text": "no tokens", "metadata": {"token_count": 0}},
+        {"text": "kept two", "metadata": {}},
+    ]
+    _write_json(chunk_dir / "filtered_chunks.json", payload)
+    batches = []
+
+    def preprocess_batch(texts):
+        batches.append(list(texts))
+        return [text.upper() for text in texts]
+
+    loader = _make_loader(tmp_path)
+    result = loader.load(
+        str(chunk_dir),
+        preprocess_text=lambda text: pytest.fail("per-text preprocessing should not run"),
+        preprocess_batch=preprocess_batch,
+        model_name="test-model",
+        model_vector_dim=768,
+        text_cache=None,
+    )
+
+    assert batches == [["kept one", "kept two"]]
+    assert result.processed_texts == ["KEPT ONE", "KEPT TWO"]
+    assert result.metadata[1]["token_count"] == 2
+    assert len(result.summary["skipped_chunks"]) == 2
+
+
+def test_chunk_loader_windows_normalise_through_batch_preprocessing(tmp_path):
+    chunk_dir = tmp_path / "windowed_chunks"
+    chunk_dir.mkdir()
+    per_file = 600
+    for file_index in range(2):
+        payload = [
+            {"text": f"  file {file_index}   chunk {index} ", "metadata": {"token_count": 120}}
+            for index in range(per_file)
+        ]
+        _write_json(chunk_dir / f"doc_{file_index}_chunks.json", payload)
+    windows = []
+
+    def preprocess_batch(texts):
+        windows.append(len(texts))
+        return text_preprocessing.preprocess_texts(
+            texts,
+            config=AdvancedPreprocessingConfig(trim_long_sequences=False),
+            max_tokens=512,
+        )
+
+    loader = _make_loader(tmp_path)
+    result = loader.load(
+        str(chunk_dir),
+        preprocess_text=lambda text: pytest.fail("per-text preprocessing should not run"),
+        preprocess_batch=preprocess_batch,
+        model_name="test-model",
+        model_vector_dim=768,
+        text_cache=None,
+    )
+
+    assert windows == [per_file, per_file]
+    assert len(result.processed_texts) == 2 * per_file
+    assert sorted(result.processed_texts)[:2] == ["file 0 chunk 0", "file 0 chunk 1"]
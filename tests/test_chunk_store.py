@@ -0,0 +1,55 @@
+"""Tests for the compact JSONL chunk store."""
+
+import json
+
+import pytest
+
+from processor.ultimate_embedder.chunk_store import (
+    dumps_chunk_store,
+    iter_chunk_store,
+    split_shared_metadata,
+    write_chunk_store,
+)
+
+
+def _chunks():
+    shared = {"source_path": "docs/a.md", "document_name": "a", "model": "jina"}
+    return [
+        {"text": "first", "metadata": {**shared, "chunk_index": 0, "section_path": ["A"]}},
+        {"text": "second", "metadata": {**shared, "chunk_index": 1, "section_path": ["B"]}},
+        {"text": "third", "metadata": {**shared, "chunk_index": 2}, "advanced_scores": {"q": 0.5}},
+    ]
+
+
+def test_round_trip_restores_chunks(tmp_path):
+    path = write_chunk_store(tmp_path / "a_chunks.jsonl", _chunks())
+
+    assert list(iter_chunk_store(path)) == _chunks()
+
+
+def test_shared_metadata_written_once(tmp_path):
+    text = dumps_chunk_store([_chunks()])
+    lines = [json.loads(line) for line in text.splitlines()]
+
+    assert lines[0]["document"] == {"source_path": "docs/a.md", "document_name": "a", "model": "jina"}
+    assert all("source_path" not in line["metadata"] for line in lines[1:])
+    assert split_shared_metadata([]) == {}
+
+
+def test_multiple_documents_reset_header(tmp_path):
+    other = [{"text": "x", "metadata": {"source_path": "docs/b.md"}}]
+    path = tmp_path / "mixed_chunks.jsonl"
+    path.write_text(dumps_chunk_store([_chunks(), other]), encoding="utf-8")
+
+    loaded = list(iter_chunk_store(path))
+
+    assert len(loaded) == 4
+    assert loaded[-1]["metadata"] == {"source_path": "docs/b.md"}
+
+
+def test_malformed_line_names_location(tmp_path):
+    path = tmp_path / "bad_chunks.jsonl"
+    path.write_text('{"chunk_store": 1, "document": {}}\n{not json\n', encoding="utf-8")
+
+    with pytest.raises(ValueError, match=":2:"):
+        list(iter_chunk_store(path))
@@ -0,0 +1,30 @@
+"""Tests for the CPU data-parallel encode pool planning."""
+
+from processor.ultimate_embedder.cpu_pool import CpuEncodePool, plan_core_groups
+
+
+def test_core_groups_are_disjoint_and_sized():
+    groups = plan_core_groups(range(96), workers=24, threads_per_worker=4)
+
+    assert len(groups) == 24
+    assert all(len(group) == 4 for group in groups)
+    assert sorted(core for group in groups for core in group) == list(range(96))
+
+
+def test_core_groups_shrink_to_available_cores():
+    groups = plan_core_groups([0, 1, 2], workers=8, threads_per_worker=4)
+
+    assert groups == [[0], [1], [2]]
+
+
+def test_pool_disabled_for_single_worker(monkeypatch):
+    monkeypatch.setenv("EMBEDDER_CPU_WORKERS", "1")
+
+    assert CpuEncodePool.from_env(object()) is None
+
+
+def test_pool_skipped_for_small_corpus(monkeypatch):
+    monkeypatch.setenv("EMBEDDER_CPU_WORKERS", "4")
+    monkeypatch.setenv("EMBEDDER_CPU_WORKER_BATCH", "16")
+
+    assert CpuEncodePool.from_env(object(), total_texts=63) is None
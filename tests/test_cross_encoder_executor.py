@@ -8,9 +8,12 @@ import pytest
 import torch
 
 from processor.ultimate_embedder.config import KaggleGPUConfig, RerankingConfig
+from processor.ultimate_embedder.core import UltimateKaggleEmbedderV4
 from processor.ultimate_embedder.cross_encoder_executor import (
     CrossEncoderBatchExecutor,
     CrossEncoderRerankRun,
+    RerankGroup,
+    plan_group_bins,
 )
 from processor.ultimate_embedder.rerank_pipeline import (
     RerankPipeline,
@@ -240,12 +243,145 @@ class TestJinaRerankerAdapter:
         # Scores follow original candidate order
         assert scores == [0.9, 0.7]
 
-    def test_predict_requires_single_query(self):
+    def test_predict_groups_mixed_queries(self):
         mock_model = MagicMock()
+        mock_model.rerank.side_effect = lambda query, documents, **kwargs: [
+            {"index": idx, "relevance_score": float(len(query) + idx)} for idx in range(len(documents))
+        ]
         adapter = _JinaRerankerAdapter(mock_model)
 
-        with pytest.raises(ValueError, match="single unique query"):
-            adapter.predict([["q1", "doc0"], ["q2", "doc1"]])
+        scores = adapter.predict([["q1", "a"], ["query2", "b"], ["q1", "c"]])
+
+        assert mock_model.rerank.call_count == 2
+        assert mock_model.rerank.call_args_list[0].kwargs["documents"] == ["a", "c"]
+        assert scores == [2.0, 6.0, 3.0]
+
+
+class TestGroupedRerank:
+    """Tests for multi-query grouped rerank execution."""
+
+    def test_plan_group_bins_never_splits_groups(self):
+        bins = plan_group_bins([30, 10, 25, 5, 40], budget=40)
+
+        assert sorted(idx for members in bins for idx in members) == [0, 1, 2, 3, 4]
+        sizes = [30, 10, 25, 5, 40]
+        assert all(sum(sizes[idx] for idx in members) <= 40 for members in bins)
+        assert len(bins) == 3
+
+    def test_oversized_group_gets_own_bin(self):
+        assert plan_group_bins([100, 3, 0], budget=10) == [[0], [1]]
+
+    def test_groups_share_calls_and_rank_per_group(self, executor):
+        mock_model = MagicMock()
+        mock_model.predict.side_effect = lambda pairs: [float(len(text)) for _, text in pairs]
+        executor.rerank_pipeline.model = mock_model
+        executor.embedder.device = "cpu"
+        groups = [
+            RerankGroup(query="q1", candidate_ids=["a", "b"], candidate_texts=["x", "xxx"]),
+            RerankGroup(query="q2", candidate_ids=["c", "d", "e"], candidate_texts=["yy", "y", "yyyy"]),
+        ]
+
+        with patch.object(executor, "ensure_model"):
+            runs = executor.execute_rerank_groups(groups, top_k=2)
+
+        assert mock_model.predict.call_count == 1
+        assert [run.candidate_ids for run in runs] == [["b", "a"], ["e", "c"]]
+        assert runs[1].scores == [4.0, 2.0]
+        assert runs[0].batch_size == 5
+
+    def test_oom_splits_at_group_boundaries(self, executor):
+        calls = []
+
+        def predict(pairs):
+            calls.append({query for query, _ in pairs})
+            if len(calls) == 1:
+                raise torch.cuda.OutOfMemoryError("CUDA OOM")
+            return [1.0] * len(pairs)
+
+        executor.rerank_pipeline.model = MagicMock(predict=Mock(side_effect=predict))
+        groups = [
+            RerankGroup(query=f"q{idx}", candidate_ids=[str(idx)], candidate_texts=["t"]) for idx in range(4)
+        ]
+
+        with patch("torch.cuda.is_available", return_value=False):
+            scores, _ = executor._execute_group_bins(groups, budget=32, max_retries=3)
+
+        assert calls[0] == {"q0", "q1", "q2", "q3"}
+        assert calls[1:] == [{"q0", "q1"}, {"q2", "q3"}]
+        assert scores == [[1.0]] * 4
+
+    def test_packed_calls_pass_candidate_ids_to_bi_encoders(self, executor):
+        mock_model = MagicMock()
+        mock_model.accepts_candidate_ids = True
+        mock_model.predict.side_effect = lambda pairs, candidate_ids: [float(len(cid)) for cid in candidate_ids]
+        executor.rerank_pipeline.model = mock_model
+        executor.rerank_pipeline.document_store = store = MagicMock()
+        groups = [
+            RerankGroup(query="q1", candidate_ids=["a", "bbb"], candidate_texts=["x", "y"]),
+            RerankGroup(query="q2", candidate_ids=["cc"], candidate_texts=["z"]),
+        ]
+
+        scores, _ = executor._execute_group_bins(groups, budget=32, max_retries=3)
+
+        mock_model.attach_document_store.assert_called_once_with(store)
+        assert mock_model.predict.call_count == 1
+        assert mock_model.predict.call_args.kwargs["candidate_ids"] == ["a", "bbb", "cc"]
+        assert scores == [[1.0, 3.0], [2.0]]
+
+    def test_packed_calls_follow_token_budget(self, executor):
+        mock_model = MagicMock()
+        mock_model.predict.side_effect = lambda pairs: [float(len(text)) for _, text in pairs]
+        executor.rerank_pipeline.model = mock_model
+        groups = [
+            RerankGroup(query="q1", candidate_ids=["a", "b"], candidate_texts=["a" * 40, "a" * 4000]),
+            RerankGroup(query="q2", candidate_ids=["c"], candidate_texts=["a" * 400]),
+        ]
+
+        with patch.object(executor.token_budget, "token_budget", return_value=1100):
+            scores, calls = executor._execute_group_bins(groups, budget=32, max_retries=3)
+
+        assert mock_model.predict.call_count == 2
+        assert mock_model.predict.call_args_list[0].args[0] == [["q1", "a" * 4000]]
+        assert scores == [[40.0, 4000.0], [400.0]]
+        assert calls[0][0] == calls[1][0] == 3
+
+
+class TestRerankScoreCaching:
+    """Tests for pair-score caching inside the executor."""
+
+    @patch("torch.cuda.is_available", return_value=False)
+    def test_only_uncached_pairs_reach_model(self, _mock_cuda_available, executor):
+        executor.embedder.device = "cpu"
+        mock_model = MagicMock()
+        mock_model.predict.side_effect = lambda pairs: [float(len(text)) for _, text in pairs]
+        executor.rerank_pipeline.model = mock_model
+
+        with patch.object(executor, "ensure_model"):
+            first = executor.execute_rerank("q", ["a", "b"], ["x", "xx"], top_k=3)
+            second = executor.execute_rerank("q", ["a", "b", "c"], ["x", "xx", "xxx"], top_k=3)
+
+        assert mock_model.predict.call_args_list[-1].args[0] == [["q", "xxx"]]
+        assert (first.cache_hits, first.cache_misses) == (0, 2)
+        assert (second.cache_hits, second.cache_misses) == (2, 1)
+        assert second.candidate_ids == ["c", "b", "a"]
+        assert second.to_dict()["cache_hit_rate"] == round(2 / 3, 4)
+
+    def test_fully_cached_query_skips_model(self, executor):
+        executor.score_cache.bind_model(executor.config.model_name)
+        executor.score_cache.store(executor.score_cache.keys_for("q", ["x", "y"]), [0.2, 0.8])
+
+        with patch.object(executor, "ensure_model") as mock_ensure:
+            run = executor.execute_rerank("q", ["a", "b"], ["x", "y"], top_k=2)
+
+        mock_ensure.assert_not_called()
+        assert run.candidate_ids == ["b", "a"]
+        assert run.cache_hits == 2
+
+    def test_caching_disabled(self, rerank_config, gpu_config, logger, mock_embedder):
+        rerank_config.enable_caching = False
+        executor = CrossEncoderBatchExecutor(rerank_config, gpu_config, logger, mock_embedder)
+
+        assert executor.score_cache is None
 
 
 class TestExecuteRerank:
@@ -418,6 +554,19 @@ class TestOOMRecovery:
         # Check log contains batch size reduction
         assert any("32 -> 16" in record.message for record in caplog.records)
 
+    def test_token_batches_restore_candidate_order(self, executor):
+        mock_model = MagicMock()
+        mock_model.predict.side_effect = lambda pairs: [float(len(text)) for _, text in pairs]
+        executor.rerank_pipeline.model = mock_model
+        texts = ["a" * 40, "a" * 4000, "a" * 400, "a" * 4]
+
+        with patch.object(executor.token_budget, "token_budget", return_value=1100):
+            scores = executor._execute_rerank_with_retry(query="q", candidate_texts=texts, batch_size=32)
+
+        assert scores == [40.0, 4000.0, 400.0, 4.0]
+        first_batch = mock_model.predict.call_args_list[0].args[0]
+        assert first_batch == [["q", "a" * 4000]]
+
     def test_model_not_loaded_raises_error(self, executor):
         """Test error raised if model not loaded."""
         executor.rerank_pipeline.model = None
@@ -567,10 +716,10 @@ class TestIntegrationWithEmbedder:
                 
                 with patch.object(embedder, "_get_primary_model", return_value=mock_model):
                     with patch.object(embedder, "_unwrap_model", return_value=mock_model):
-                        # Patch cosine_similarity to avoid pandas DataFrame issue
-                        with patch("processor.ultimate_embedder.core.cosine_similarity") as mock_cosine:
+                        # Patch the exact search kernel to pin the dense similarities
+                        with patch("processor.ultimate_embedder.core.ExactSearchIndex.scores") as mock_scores:
                             # Return similarities for all 10 chunks
-                            mock_cosine.return_value = np.array([[0.9, 0.8, 0.7, 0.6, 0.5, 0.4, 0.3, 0.2, 0.1, 0.05]])
+                            mock_scores.return_value = np.array([0.9, 0.8, 0.7, 0.6, 0.5, 0.4, 0.3, 0.2, 0.1, 0.05])
                             
                             # Execute search with reranking
                             results = embedder.search_with_reranking(
@@ -648,16 +797,16 @@ class TestIntegrationWithEmbedder:
                 
                 with patch.object(embedder, "_get_primary_model", return_value=mock_model):
                     with patch.object(embedder, "_unwrap_model", return_value=mock_model):
-                        # Patch cosine_similarity to return non-sequential top candidates
-                        with patch("processor.ultimate_embedder.core.cosine_similarity") as mock_cosine:
+                        # Patch the exact search kernel to return non-sequential top candidates
+                        with patch("processor.ultimate_embedder.core.ExactSearchIndex.scores") as mock_scores:
                             # Create similarity array where indices 512, 87, 4 have highest scores
-                            similarities = np.zeros((1, 1000))
-                            similarities[0, 512] = 0.95  # Highest
-                            similarities[0, 87] = 0.90
-                            similarities[0, 4] = 0.85
-                            similarities[0, 999] = 0.80
-                            similarities[0, 100] = 0.75
-                            mock_cosine.return_value = similarities
+                            similarities = np.zeros(1000)
+                            similarities[512] = 0.95  # Highest
+                            similarities[87] = 0.90
+                            similarities[4] = 0.85
+                            similarities[999] = 0.80
+                            similarities[100] = 0.75
+                            mock_scores.return_value = similarities
                             
                             # Execute search with reranking - critical test!
                             results = embedder.search_with_reranking(
@@ -710,3 +859,61 @@ class TestIntegrationWithEmbedder:
 
                 # Verify executor was NOT initialized
                 assert embedder.cross_encoder_executor is None
+
+
+class _BasisQueryEncoder:
+    """Encodes ``"q<i>"`` as basis vector ``i``."""
+
+    def __init__(self, dimension: int) -> None:
+        self.dimension = dimension
+
+    def encode_many(self, queries):
+        matrix = np.zeros((len(queries), self.dimension), dtype=np.float32)
+        for row, query in enumerate(queries):
+            matrix[row, int(query[1:])] = 1.0
+        return matrix
+
+
+class _GroupedSearchFacade:
+    """Just enough of the facade for ``search_many_with_reranking``."""
+
+    search_many_with_reranking = UltimateKaggleEmbedderV4.search_many_with_reranking
+    _build_rerank_result = UltimateKaggleEmbedderV4._build_rerank_result
+    _exact_search_index = UltimateKaggleEmbedderV4._exact_search_index
+    _require_embeddings = UltimateKaggleEmbedderV4._require_embeddings
+
+    def __init__(self, executor, rerank_config) -> None:
+        self.embeddings = np.eye(6, dtype=np.float32)
+        self.chunk_texts = [f"chunk-{idx}" * (idx + 1) for idx in range(6)]
+        self.chunks_metadata = [{"idx": idx} for idx in range(6)]
+        self.sparse_vectors = []
+        self.reranking_config = rerank_config
+        self.reranker = executor.rerank_pipeline.model
+        self.cross_encoder_executor = executor
+        self.metrics = []
+
+    def _get_query_encoder(self):
+        return _BasisQueryEncoder(6)
+
+    def _emit_metrics_for_stage(self, stage, **kwargs):
+        self.metrics.append((stage, kwargs))
+
+
+def test_search_many_with_reranking_packs_queries_into_shared_calls(executor, rerank_config):
+    mock_model = MagicMock()
+    mock_model.predict.side_effect = lambda pairs: [float(len(text)) for _, text in pairs]
+    executor.rerank_pipeline.model = mock_model
+    executor.embedder.device = "cpu"
+    facade = _GroupedSearchFacade(executor, rerank_config)
+
+    with patch.object(executor, "ensure_model"):
+        results = facade.search_many_with_reranking(["q0", "q4", "q2"], top_k=2, initial_candidates=3)
+
+    assert mock_model.predict.call_count == 1
+    assert len(mock_model.predict.call_args.args[0]) == 9
+    assert [len(per_query) for per_query in results] == [2, 2, 2]
+    # Pools are the query's own chunk plus the lowest-id ties; the longest text wins.
+    assert [per_query[0]["chunk_id"] for per_query in results] == [2, 4, 2]
+    assert results[1][0]["embedding_similarity"] == pytest.approx(1.0)
+    assert results[1][0]["rank"] == 1
+    assert facade.metrics[0][1]["details"]["queries"] == 3
@@ -0,0 +1,50 @@
+"""Tests for the indexed text/metadata doc store."""
+
+import numpy as np
+import pytest
+
+from processor.ultimate_embedder.doc_store import DocStore, write_doc_store
+
+_TEXTS = [f"chunk {i} ✓\nline" for i in range(70)]
+_METADATA = [{"id": i, "score": np.float32(0.5)} for i in range(70)]
+
+
+def _round_trip(tmp_path, compression):
+    base = str(tmp_path / "export")
+    paths = write_doc_store(base, _TEXTS, _METADATA, compression=compression, block_records=16)
+    return paths, DocStore.open(base)
+
+
+def test_uncompressed_store_reads_single_records(tmp_path):
+    paths, store = _round_trip(tmp_path, "none")
+
+    assert len(store) == 70
+    assert store.block_records == 1
+    assert store.get(42) == {"text": _TEXTS[42], "metadata": {"id": 42, "score": 0.5}}
+    assert store.texts[-1] == _TEXTS[-1]
+    assert np.load(paths["doc_store_index"]).shape == (71,)
+
+
+def test_get_many_preserves_input_order(tmp_path):
+    _, store = _round_trip(tmp_path, "none")
+
+    records = store.get_many([9, 3, 9, 60])
+
+    assert [record["metadata"]["id"] for record in records] == [9, 3, 9, 60]
+    assert store.metadata[3:5] == [{"id": 3, "score": 0.5}, {"id": 4, "score": 0.5}]
+    with pytest.raises(IndexError):
+        store.get(70)
+
+
+def test_zstd_blocks_round_trip(tmp_path):
+    pytest.importorskip("zstandard")
+    paths, store = _round_trip(tmp_path, "zstd")
+
+    assert store.compression == "zstd"
+    assert np.load(paths["doc_store_index"]).shape == (6,)  # ceil(70 / 16) blocks + end
+    assert [store.text(i) for i in (0, 15, 16, 69)] == [_TEXTS[i] for i in (0, 15, 16, 69)]
+
+
+def test_unknown_compression_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        write_doc_store(str(tmp_path / "x"), ["a"], compression="lz4")
@@ -0,0 +1,109 @@
+"""Tests for the block-wise exact top-k search kernel."""
+
+import logging
+
+import numpy as np
+import pytest
+
+from processor.ultimate_embedder.config import RerankingConfig
+from processor.ultimate_embedder.exact_search import ExactSearchIndex, SearchIndexCache, top_k_indices
+from processor.ultimate_embedder.rerank_pipeline import RerankPipeline
+
+
+def _matrix(rows=500, dim=32, seed=0):
+    rng = np.random.default_rng(seed)
+    matrix = rng.standard_normal((rows, dim)).astype(np.float32)
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def test_top_k_indices_matches_full_sort():
+    scores = np.random.default_rng(1).standard_normal(1000)
+
+    np.testing.assert_array_equal(top_k_indices(scores, 10), np.argsort(-scores)[:10])
+    assert top_k_indices(scores, 0).size == 0
+    assert top_k_indices(scores[:3], 10).tolist() == np.argsort(-scores[:3]).tolist()
+
+
+@pytest.mark.parametrize("block_rows,threads", [(None, 1), (64, 1), (64, 4), (7, 3)])
+def test_search_matches_brute_force(block_rows, threads):
+    matrix = _matrix()
+    queries = _matrix(rows=5, seed=2)
+    index = ExactSearchIndex(matrix, block_rows=block_rows, threads=threads)
+
+    ids, scores = index.search(queries, 10)
+
+    expected = np.argsort(-(queries @ matrix.T), axis=1)[:, :10]
+    np.testing.assert_array_equal(ids, expected)
+    np.testing.assert_allclose(scores, np.take_along_axis(queries @ matrix.T, expected, axis=1), rtol=1e-5)
+
+
+def test_scores_cover_every_row_and_single_query_is_1d():
+    matrix = _matrix(rows=130)
+    query = matrix[17] * 3.0  # queries are normalised, rows are not touched
+    index = ExactSearchIndex(matrix, block_rows=32, threads=2)
+
+    scores = index.scores(query)
+
+    assert scores.shape == (130,)
+    assert scores.dtype == np.float32
+    np.testing.assert_allclose(scores, matrix @ matrix[17], rtol=1e-5, atol=1e-6)
+    ids, top = index.search(query, 3)
+    assert ids[0] == 17 and ids.shape == (3,)
+    assert top[0] == pytest.approx(1.0, abs=1e-5)
+
+
+@pytest.mark.parametrize("storage", ["fp16", "int8"])
+def test_compact_storage_keeps_recall(storage):
+    matrix = _matrix(rows=400)
+    queries = matrix[:20]
+    index = ExactSearchIndex(matrix, storage=storage, block_rows=100, threads=2)
+
+    ids, _ = index.search(queries, 1)
+
+    assert index.nbytes < matrix.nbytes
+    assert (ids[:, 0] == np.arange(20)).mean() >= 0.95
+
+
+def test_k_larger_than_rows_and_invalid_storage():
+    matrix = _matrix(rows=4)
+    ids, scores = ExactSearchIndex(matrix).search(matrix[0], 10)
+
+    assert ids.tolist()[0] == 0 and len(ids) == 4
+    assert np.all(np.diff(scores) <= 0)
+    with pytest.raises(ValueError):
+        ExactSearchIndex(matrix, storage="bf16")
+
+
+def test_search_index_cache_rebuilds_only_for_new_matrix_or_storage():
+    matrix = _matrix()
+    cache = SearchIndexCache()
+
+    first = cache.get(matrix)
+    assert cache.get(matrix) is first
+    assert cache.get(matrix, "fp16") is not first
+    assert cache.get(matrix.copy(), "fp16").storage == "fp16"
+
+    pipeline = RerankPipeline(RerankingConfig(), logging.getLogger("exact-search-test"))
+    top = pipeline._dense_top_k(matrix[3], matrix, 5)
+    index = pipeline._search_index.get(matrix, pipeline.config.search_storage)
+    pipeline._dense_top_k(matrix[4], matrix, 5)
+
+    assert pipeline._search_index.get(matrix, pipeline.config.search_storage) is index
+    assert len(top) == 5 and next(iter(top)) == 3
+    assert list(top.values()) == sorted(top.values(), reverse=True)
+
+
+@pytest.mark.parametrize("storage", ["float32", "fp16", "int8"])
+def test_rows_off_unit_length_are_normalised_on_construction(storage):
+    matrix = _matrix(rows=200, dim=32)
+    trimmed = matrix[:, :16]  # a dimension trim leaves rows short of unit length
+    trimmed_unit = trimmed / np.linalg.norm(trimmed, axis=1, keepdims=True)
+    index = ExactSearchIndex(trimmed, storage=storage, block_rows=50)
+
+    ids, scores = index.search(trimmed[:10], 1)
+
+    assert ids[:, 0].tolist() == list(range(10))
+    np.testing.assert_allclose(scores[:, 0], 1.0, atol=2e-2)
+    np.testing.assert_allclose(index.row_scores(trimmed[0], [0, 5]), trimmed_unit[[0, 5]] @ trimmed_unit[0], atol=2e-2)
+    assert ExactSearchIndex(matrix)._data is matrix  # unit rows are used without a copy
+
@@ -245,4 +245,114 @@ def test_export_for_local_qdrant_sanitizes_companion_filenames(tmp_path: Path) -
     assert "alias_sample" in str(companion_path.parent)
 
     upload_script = Path(exported["upload_script"]).read_text(encoding="utf-8")
-    assert "vendor_model_name_embeddings.npy" in upload_script
\ No newline at end of file
+    assert "vendor_model_name_embeddings.npy" in upload_script
+
+
+def test_export_for_local_qdrant_writes_quantized_encodings(tmp_path: Path) -> None:
+    """Enabled int8/binary/fp16 exports are written for primary and companions."""
+
+    embedder = _ExportEmbedderStub(tmp_path)
+    embedder.export_config.quantize_int8 = True
+    embedder.export_config.quantize_binary = True
+    embedder.export_config.export_fp16 = True
+    runtime = ExportRuntime(embedder, logging.getLogger("export-runtime-test"))
+
+    exported = runtime.export_for_local_qdrant()
+
+    for key in ("int8", "binary", "fp16", "int8_vendor_model_name", "fp16_vendor_model_name"):
+        assert Path(exported[key]).exists(), key
+    assert np.load(exported["fp16"]).dtype == np.float16
+    assert np.load(exported["binary"]).tolist() == [[0b11100000]]
+    with np.load(exported["int8"]) as payload:
+        assert payload["codes"].dtype == np.int8
+        assert set(payload.files) == {"codes", "scale", "offset"}
+
+
+def test_export_for_local_qdrant_writes_doc_store(tmp_path: Path) -> None:
+    """The indexed doc store mirrors texts and metadata by point id."""
+
+    from processor.ultimate_embedder.doc_store import DocStore
+
+    embedder = _ExportEmbedderStub(tmp_path)
+    embedder.export_config.export_doc_store = True
+    embedder.export_config.doc_store_compression = "none"
+    embedder.export_config.doc_store_block_records = 32
+    runtime = ExportRuntime(embedder, logging.getLogger("export-runtime-test"))
+
+    exported = runtime.export_for_local_qdrant()
+
+    store = DocStore.open(exported["doc_store_manifest"])
+    assert store.get(0) == {"text": "example chunk", "metadata": {"chunk_id": "chunk-1"}}
+
+
+def test_doc_store_export_is_opt_in() -> None:
+    from processor.ultimate_embedder.config import KaggleExportConfig
+
+    assert KaggleExportConfig().export_doc_store is False
+
+
+def _export_basis(tmp_path: Path, **config: Any) -> Dict[str, str]:
+    embedder = _ExportEmbedderStub(tmp_path)
+    embedder.embeddings = np.eye(4, dtype=np.float32)
+    embedder.embeddings_by_model = {embedder.model_name: embedder.embeddings}
+    embedder.companion_model_configs = {}
+    embedder.model_config = _DummyModelConfig("primary/model", 4)
+    embedder.chunk_texts = [f"chunk {index}" for index in range(4)]
+    embedder.chunks_metadata = [{"chunk_id": index} for index in range(4)]
+    embedder.sparse_vectors = [{} for _ in range(4)]
+    for name, value in config.items():
+        setattr(embedder.export_config, name, value)
+    return ExportRuntime(embedder, logging.getLogger("export-runtime-test")).export_for_local_qdrant()
+
+
+def test_search_index_opens_fp16_export_without_float32_copy(tmp_path: Path) -> None:
+    """A float32-disabled export is searched from its ``_embeddings_fp16.npy``."""
+
+    from processor.ultimate_embedder.search_runtime import SearchIndex
+
+    exported = _export_basis(tmp_path, export_numpy=False, export_fp16=True)
+    assert "numpy" not in exported
+
+    index = SearchIndex.open(str(tmp_path), collection="alias_sample", load_encoder=False)
+
+    assert index.vectors.dtype == np.float16
+    assert index.searcher.storage == "fp16"
+    ids, _ = index.search_vectors(np.eye(4, dtype=np.float32)[2], 1)
+    assert ids.tolist() == [2]
+    assert index.texts[2] == "chunk 2"
+
+
+def test_search_index_int8_storage_loads_exported_codes(tmp_path: Path) -> None:
+    """``storage="int8"`` reuses the exported codes instead of requantising."""
+
+    from processor.ultimate_embedder.search_runtime import SearchIndex
+
+    exported = _export_basis(tmp_path, quantize_int8=True, export_fp16=True)
+
+    fp16_index = SearchIndex.open(str(tmp_path), collection="alias_sample", storage="fp16", load_encoder=False)
+    int8_index = SearchIndex.open(str(tmp_path), collection="alias_sample", storage="int8", load_encoder=False)
+
+    assert fp16_index.vectors.dtype == np.float16
+    assert isinstance(int8_index.vectors, np.memmap)
+    with np.load(exported["int8"]) as payload:
+        np.testing.assert_array_equal(int8_index.searcher._data, payload["codes"])
+    ids, _ = int8_index.search_vectors(np.eye(4, dtype=np.float32)[1], 1)
+    assert ids.tolist() == [1]
+
+
+def test_compress_embeddings_writes_compressed_float_stores(tmp_path: Path) -> None:
+    """``compress_embeddings`` swaps the ``.npy`` float stores for zlib ``.npz`` archives."""
+
+    from processor.ultimate_embedder.search_runtime import SearchIndex
+
+    exported = _export_basis(tmp_path, compress_embeddings=True)
+
+    assert exported["numpy"].endswith("_embeddings.npz")
+    assert not Path(exported["numpy"]).with_suffix(".npy").exists()
+    with np.load(exported["numpy"]) as payload:
+        np.testing.assert_array_equal(payload["embeddings"], np.eye(4, dtype=np.float32))
+    assert "_embeddings.npz" in Path(exported["upload_script"]).read_text(encoding="utf-8")
+
+    index = SearchIndex.open(str(tmp_path), collection="alias_sample", load_encoder=False)
+    ids, _ = index.search_vectors(np.eye(4, dtype=np.float32)[3], 1)
+    assert ids.tolist() == [3]
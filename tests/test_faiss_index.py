@@ -0,0 +1,65 @@
+"""Tests for trained FAISS index export helpers."""
+
+import numpy as np
+import pytest
+
+from processor.ultimate_embedder.faiss_index import (
+    build_index,
+    exact_top_k,
+    recall_at_k,
+    resolve_factory,
+)
+
+
+def _matrix(rows, dim=32, seed=0):
+    rng = np.random.default_rng(seed)
+    matrix = rng.standard_normal((rows, dim)).astype(np.float32)
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def test_factory_aliases_scale_with_rows():
+    assert resolve_factory("auto", 1000, 1024) == "Flat"
+    assert resolve_factory("auto", 1_000_000, 1024) == "IVF4000,Flat"
+    assert resolve_factory("ivf-pq", 1_000_000, 1024) == "IVF4000,PQ64"
+    assert resolve_factory("hnsw", 10, 8) == "HNSW32"
+    assert resolve_factory("OPQ16,IVF256,PQ16", 10, 64) == "OPQ16,IVF256,PQ16"
+
+
+def test_export_defaults_to_exact_flat_index():
+    from processor.ultimate_embedder.config import KaggleExportConfig
+
+    factory = KaggleExportConfig().faiss_index_factory
+
+    assert resolve_factory(factory, 1_000_000, 1024) == "Flat"
+    assert resolve_factory("", 1_000_000, 1024) == "Flat"
+
+
+def test_ivf_lists_respect_training_minimum():
+    assert resolve_factory("ivf-flat", 390, 8) == "IVF10,Flat"
+
+
+def test_exact_top_k_streams_blocks(tmp_path):
+    matrix = _matrix(300)
+    np.save(tmp_path / "store.npy", matrix)
+    store = np.load(tmp_path / "store.npy", mmap_mode="r")
+    queries = matrix[:4]
+
+    ids = exact_top_k(store, queries, k=5, block_rows=64)
+
+    expected = np.argsort(-(queries @ matrix.T), axis=1)[:, :5]
+    assert [set(row) for row in ids.tolist()] == [set(row) for row in expected.tolist()]
+
+
+def test_ivf_index_streams_and_reports_recall(tmp_path):
+    faiss = pytest.importorskip("faiss")
+    matrix = _matrix(2000)
+    np.save(tmp_path / "store.npy", matrix)
+    store = np.load(tmp_path / "store.npy", mmap_mode="r")
+
+    index, report = build_index(faiss, store, "ivf-flat", train_size=1000, nprobe=8, batch_rows=300)
+    recall = recall_at_k(index, store, k=10, queries=50)
+
+    assert index.ntotal == 2000
+    assert report["factory"].startswith("IVF")
+    assert report["trained_on"] == 1000
+    assert 0.5 < recall["recall"] <= 1.0
@@ -0,0 +1,119 @@
+"""Tests for the hybrid dense + sparse candidate retriever."""
+
+import types
+
+import numpy as np
+import pytest
+
+from processor.ultimate_embedder.config import RerankingConfig
+from processor.ultimate_embedder.exact_search import ExactSearchIndex
+from processor.ultimate_embedder.hybrid_retrieval import (
+    HybridRetriever,
+    SparseInvertedIndex,
+    build_query_terms,
+    get_hybrid_retriever,
+    reciprocal_rank_fusion,
+)
+from processor.ultimate_embedder.sparse_pipeline import build_sparse_vector_from_metadata
+
+
+def _vector(terms):
+    return {"indices": list(terms), "values": list(terms.values())}
+
+
+def _brute_force(vectors, query, top_k):
+    scores = []
+    for doc, vector in enumerate(vectors):
+        if not vector:
+            continue
+        weights = dict(zip(vector["indices"], vector["values"]))
+        score = sum(weight * weights.get(term, 0.0) for term, weight in query.items())
+        if score > 0:
+            scores.append((doc, score))
+    scores.sort(key=lambda item: (-item[1], item[0]))
+    return scores[:top_k]
+
+
+def test_inverted_index_matches_brute_force_with_pruning() -> None:
+    rng = np.random.default_rng(7)
+    vectors = []
+    for _ in range(300):
+        terms = rng.choice(50, size=6, replace=False)
+        vectors.append({"indices": terms.tolist(), "values": rng.random(6).astype(np.float32).tolist()})
+    vectors[10] = None
+    query = {int(term): float(weight) for term, weight in zip(range(0, 50, 3), rng.random(17))}
+
+    index = SparseInvertedIndex.build(vectors)
+    docs, scores = index.search(query, top_k=5)
+
+    expected = _brute_force(vectors, query, 5)
+    assert docs.tolist() == [doc for doc, _ in expected]
+    np.testing.assert_allclose(scores, [score for _, score in expected], rtol=1e-5)
+    assert index.last_query_stats["postings_skipped"] > 0
+
+
+def test_reciprocal_rank_fusion_rewards_agreement() -> None:
+    fused = reciprocal_rank_fusion([[1, 2, 3], [3, 4]], k=60)
+
+    assert fused[0][0] == 3
+    assert {doc for doc, _ in fused} == {1, 2, 3, 4}
+
+
+def test_retriever_surfaces_sparse_only_hits_without_growing_pool() -> None:
+    vectors = [_vector({1: 1.0}), _vector({2: 1.0}), _vector({3: 1.0}), _vector({9: 1.0})]
+    dense = np.asarray([0.9, 0.8, 0.7, 0.1], dtype=np.float32)
+    retriever = HybridRetriever(SparseInvertedIndex.build(vectors))
+
+    result = retriever.retrieve(dense, {9: 1.0}, top_k=2)
+
+    assert len(result.indices) == 2
+    assert 3 in result.indices
+    assert result.sparse_only_hits == 1
+    assert result.sparse_scores[result.indices.index(3)] == pytest.approx(1.0)
+    assert result.dense_scores[result.indices.index(3)] == pytest.approx(0.1)
+
+
+def test_dense_mode_and_missing_query_keep_dense_ranking() -> None:
+    vectors = [_vector({1: 1.0}), _vector({2: 1.0})]
+    dense = np.asarray([0.2, 0.9], dtype=np.float32)
+
+    dense_only = HybridRetriever(SparseInvertedIndex.build(vectors), fusion="dense").retrieve(dense, {1: 1.0}, 2)
+    no_terms = HybridRetriever(SparseInvertedIndex.build(vectors)).retrieve(dense, {}, 2)
+
+    assert dense_only.indices == [1, 0]
+    assert no_terms.fusion == "dense"
+    with pytest.raises(ValueError):
+        HybridRetriever(None, fusion="bogus")
+
+
+def test_retrieve_from_index_matches_full_scores() -> None:
+    vectors = [_vector({1: 1.0}), _vector({2: 1.0}), _vector({3: 1.0}), _vector({9: 1.0})]
+    rng = np.random.default_rng(0)
+    matrix = rng.standard_normal((4, 8)).astype(np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    query = matrix[0]
+    index = ExactSearchIndex(matrix)
+
+    for retriever in (HybridRetriever(SparseInvertedIndex.build(vectors)), HybridRetriever(None)):
+        full = retriever.retrieve(index.scores(query), {9: 1.0}, 2)
+        (pooled,) = retriever.retrieve_from_index(index, query, [{9: 1.0}], 2)
+
+        assert pooled.indices == full.indices
+        np.testing.assert_allclose(pooled.dense_scores, full.dense_scores, rtol=1e-5)
+        assert pooled.sparse_only_hits == full.sparse_only_hits == (1 if retriever.index else 0)
+
+
+def test_query_terms_hit_metadata_vectors_and_cache_on_embedder() -> None:
+    metadata_vector = build_sparse_vector_from_metadata(
+        {"sparse_features": {"term_weights": [{"term": "qdrant", "weight": 0.5}, {"term": "index", "weight": 0.5}]}}
+    )
+    embedder = types.SimpleNamespace(
+        sparse_vectors=[None, metadata_vector],
+        reranking_config=RerankingConfig(hybrid_fusion="weighted", sparse_weight=2.0),
+    )
+
+    retriever = get_hybrid_retriever(embedder)
+    result = retriever.retrieve(np.asarray([0.5, 0.4]), build_query_terms("How do I build a Qdrant index?"), 1)
+
+    assert result.indices == [1]
+    assert get_hybrid_retriever(embedder) is retriever
@@ -0,0 +1,86 @@
+"""Import-time budget checks for the lightweight embedder entry points."""
+
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+HEAVY_MODULES = ("torch", "sentence_transformers", "sklearn", "rich", "faiss", "onnxruntime", "optimum")
+# Generous wall-clock budget (microseconds) so slow CI hosts stay green; the
+# heavy-module assertions are what actually guard against regressions.
+IMPORT_BUDGET_US = 1_500_000
+
+
+def _importtime(args: List[str]) -> Dict[str, int]:
+    """Run ``python -X importtime`` and return cumulative microseconds per module."""
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        timeout=120,
+        check=False,
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    cumulative: Dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if cumulative_us.isdigit():
+            cumulative[name.strip()] = int(cumulative_us)
+    return cumulative
+
+
+def _top_level_packages(timings: Dict[str, int]) -> set:
+    return {name.split(".")[0] for name in timings}
+
+
+@pytest.mark.parametrize(
+    "module",
+    [
+        "processor.ultimate_embedder",
+        "processor.ultimate_embedder.config",
+        "processor.ultimate_embedder.runtime_config",
+        "processor.ultimate_embedder.summary",
+        "processor.ultimate_embedder.export_runtime",
+        "processor.ultimate_embedder.search_runtime",
+    ],
+)
+def test_lightweight_modules_skip_heavy_dependencies(module: str) -> None:
+    timings = _importtime(["-c", f"import {module}"])
+
+    assert module in timings
+    assert not _top_level_packages(timings) & set(HEAVY_MODULES)
+    assert timings[module] < IMPORT_BUDGET_US
+
+
+def test_cli_help_parses_before_importing_torch() -> None:
+    timings = _importtime(["scripts/embed_collections_v7.py", "--help"])
+
+    assert "processor.ultimate_embedder.config" in timings
+    assert not _top_level_packages(timings) & set(HEAVY_MODULES)
+
+
+def test_package_attributes_resolve_lazily() -> None:
+    code = (
+        "import sys, processor.ultimate_embedder as pkg\n"
+        "assert pkg.EnsembleConfig.__module__.endswith('.config')\n"
+        "assert 'UltimateKaggleEmbedderV4' in dir(pkg)\n"
+        "assert 'torch' not in sys.modules\n"
+        "try:\n"
+        "    pkg.does_not_exist\n"
+        "except AttributeError:\n"
+        "    pass\n"
+        "else:\n"
+        "    raise SystemExit('missing attribute did not raise')\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=REPO_ROOT, capture_output=True, text=True, timeout=120, check=False
+    )
+
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,87 @@
+"""Tests for the co-resident ensemble placement planner."""
+
+from processor.ultimate_embedder.placement import PlacementPlanner
+
+_GB = 1024**3
+
+
+def _plan(weights, budgets, **kwargs):
+    planner = PlacementPlanner(**kwargs)
+    return planner.plan(list(weights), weights, budgets)
+
+
+def _devices(plan):
+    return [[(placement.model_name, placement.device_ids) for placement in wave] for wave in plan.waves]
+
+
+def test_small_models_spread_across_devices_then_share():
+    weights = {"a": 1 * _GB, "b": 1 * _GB, "c": 1 * _GB}
+
+    plan = _plan(weights, {0: 12 * _GB, 1: 12 * _GB})
+
+    assert plan.concurrent
+    assert _devices(plan) == [[("a", [0]), ("b", [1]), ("c", [0])]]
+
+
+def test_model_larger_than_one_device_rotates_exclusively():
+    weights = {"small": 1 * _GB, "huge": 7 * _GB, "other": 1 * _GB}
+
+    plan = _plan(weights, {0: 12 * _GB, 1: 12 * _GB})
+
+    assert _devices(plan) == [[("small", [0]), ("other", [1])], [("huge", [0, 1])]]
+    assert plan.waves[1][0].exclusive is True
+
+
+def test_unmeasured_models_are_exclusive_and_full_devices_open_new_wave():
+    weights = {"a": 4 * _GB, "b": 4 * _GB, "unknown": None, "c": 4 * _GB}
+
+    plan = _plan(weights, {0: 10 * _GB}, activation_factor=0.0)
+
+    assert _devices(plan) == [[("a", [0]), ("b", [0])], [("unknown", [0])], [("c", [0])]]
+    assert plan.waves[1][0].exclusive is True
+
+
+def test_single_model_wave_leases_every_device():
+    plan = _plan({"solo": 1 * _GB}, {0: 12 * _GB, 1: 12 * _GB})
+
+    assert not plan.concurrent
+    assert _devices(plan) == [[("solo", [0, 1])]]
+
+
+def test_disabled_planner_falls_back_to_exclusive_rotation(monkeypatch):
+    monkeypatch.setenv("EMBEDDER_CORESIDENT", "0")
+    planner = PlacementPlanner.from_env()
+
+    plan = planner.plan(["a", "b"], {"a": 1, "b": 1}, {0: 10, 1: 10})
+
+    assert _devices(plan) == [[("a", [0, 1])], [("b", [0, 1])]]
+    assert plan.summarize()[0][0]["exclusive"] is True
+
+
+def test_co_residency_is_opt_in(monkeypatch):
+    monkeypatch.delenv("EMBEDDER_CORESIDENT", raising=False)
+    assert PlacementPlanner.from_env().enabled is False
+
+    monkeypatch.setenv("EMBEDDER_CORESIDENT", "1")
+    assert PlacementPlanner.from_env().enabled is True
+
+
+def test_lease_snapshots_put_the_leased_device_in_slot_zero():
+    from processor.ultimate_embedder.controllers import (
+        AdaptiveBatchController,
+        GPUMemorySnapshot,
+        lease_snapshots,
+    )
+
+    idle = GPUMemorySnapshot(0, total_bytes=16 * _GB, free_bytes=15 * _GB, allocated_bytes=0, reserved_bytes=0)
+    full = GPUMemorySnapshot(1, total_bytes=16 * _GB, free_bytes=0, allocated_bytes=15 * _GB, reserved_bytes=15 * _GB)
+    snapshots = {0: idle, 1: full}
+
+    assert lease_snapshots(snapshots, [1]) == {0: full}
+    assert lease_snapshots(snapshots, [1, 0]) == {0: full, 1: idle}
+
+    controller = AdaptiveBatchController(
+        primary_batch=64, device_count=1, gpu0_soft_limit_bytes=12 * _GB, companion_enabled=False
+    )
+    assert controller.register_snapshot(lease_snapshots(snapshots, [0])) is None
+    assert controller.register_snapshot(lease_snapshots(snapshots, [1]))["primary_batch"] < 64
@@ -0,0 +1,98 @@
+"""Tests for pre-encode dedup, token accounting and truncation."""
+
+import numpy as np
+import pytest
+
+from processor.ultimate_embedder.pre_encode import PreEncodeStage, dedupe_texts
+
+tokenizers = pytest.importorskip("tokenizers")
+transformers = pytest.importorskip("transformers")
+
+
+def _make_tokenizer():
+    vocab = {"[UNK]": 0, "[CLS]": 1, "[SEP]": 2}
+    for word in "the quick brown fox jumps over lazy dog".split():
+        vocab[word] = len(vocab)
+    backend = tokenizers.Tokenizer(tokenizers.models.WordLevel(vocab=vocab, unk_token="[UNK]"))
+    backend.pre_tokenizer = tokenizers.pre_tokenizers.Whitespace()
+    backend.post_processor = tokenizers.processors.TemplateProcessing(
+        single="[CLS] $A [SEP]",
+        special_tokens=[("[CLS]", 1), ("[SEP]", 2)],
+    )
+    return transformers.PreTrainedTokenizerFast(
+        tokenizer_object=backend,
+        unk_token="[UNK]",
+        cls_token="[CLS]",
+        sep_token="[SEP]",
+    )
+
+
+class _StubModel:
+    def __init__(self, tokenizer, max_seq_length: int) -> None:
+        self.tokenizer = tokenizer
+        self.max_seq_length = max_seq_length
+
+    def encode(self, texts, **kwargs):
+        return np.asarray([[float(len(text))] for text in texts], dtype=np.float32)
+
+
+class _Wrapper:
+    def __init__(self, module) -> None:
+        self.module = module
+
+
+def test_dedupe_texts_tracks_inverse_and_first_index() -> None:
+    result = dedupe_texts(["a", "b", "a", "c", "b"])
+
+    assert result.unique_texts == ["a", "b", "c"]
+    assert result.inverse.tolist() == [0, 1, 0, 2, 1]
+    assert result.first_index.tolist() == [0, 1, 3]
+    assert result.duplicate_count == 2
+
+
+def test_expand_fans_unique_rows_back_out() -> None:
+    stage = PreEncodeStage(["x", "y", "x"])
+    unique_rows = np.asarray([[1.0], [2.0]], dtype=np.float32)
+
+    assert stage.expand(unique_rows)[:, 0].tolist() == [1.0, 2.0, 1.0]
+    assert stage.source_range(1, 2) == (1, 2)
+
+
+def test_prepare_truncates_at_model_limit_and_shares_family() -> None:
+    tokenizer = _make_tokenizer()
+    texts = ["the quick brown fox jumps over the lazy dog", "the dog", "the dog"]
+    stage = PreEncodeStage(texts)
+
+    prepared = stage.prepare("model-a", _StubModel(tokenizer, max_seq_length=5))
+    # Shared tokenizer behind a DataParallel-style wrapper reuses the first pass.
+    again = stage.prepare("model-b", _Wrapper(_StubModel(tokenizer, max_seq_length=5)))
+
+    assert prepared == ["the quick brown", "the dog"]
+    assert again is prepared
+    summary = stage.summarize()
+    assert summary["duplicates_skipped"] == 1
+    (family_stats,) = summary["tokenizer_families"].values()
+    assert family_stats["models"] == ["model-a", "model-b"]
+    assert family_stats["truncated"] == 1
+    assert family_stats["max_tokens"] == 11
+    assert family_stats["total_tokens"] == 15
+
+
+def test_models_without_tokenizer_use_unique_texts() -> None:
+    stage = PreEncodeStage(["a", "a"])
+
+    class _EncodeOnly:
+        def encode(self, texts, **kwargs):
+            return np.zeros((len(texts), 1))
+
+    assert stage.prepare("encode-only", _EncodeOnly()) == ["a"]
+    assert stage.summarize()["model_families"] == {"encode-only": None}
+
+
+def test_env_flag_disables_stage(monkeypatch) -> None:
+    monkeypatch.setenv("EMBEDDER_PRE_ENCODE", "0")
+    stage = PreEncodeStage.from_env(["a", "a"])
+
+    assert stage.texts == ["a", "a"]
+    assert stage.prepare("m", _StubModel(_make_tokenizer(), max_seq_length=3)) == ["a", "a"]
+    assert stage.summarize() == {}
@@ -0,0 +1,120 @@
+"""Tests for the in-process Prometheus registry and /metrics endpoint."""
+
+import threading
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import pytest
+
+from processor.ultimate_embedder.prometheus_metrics import (
+    MetricsRegistry,
+    PrometheusMetricsEmitter,
+    create_prometheus_emitter,
+)
+
+
+def test_histogram_renders_cumulative_buckets() -> None:
+    registry = MetricsRegistry(namespace="rag", latency_buckets=(0.1, 1.0))
+
+    for value in (0.05, 0.5, 0.5, 5.0):
+        registry.observe("dense_latency_seconds", value, {"model": "m", "device": "cpu"})
+
+    text = registry.render()
+    assert "# TYPE rag_dense_latency_seconds histogram" in text
+    assert 'rag_dense_latency_seconds_bucket{device="cpu",model="m",le="0.1"} 1' in text
+    assert 'rag_dense_latency_seconds_bucket{device="cpu",model="m",le="1"} 3' in text
+    assert 'rag_dense_latency_seconds_bucket{device="cpu",model="m",le="+Inf"} 4' in text
+    assert 'rag_dense_latency_seconds_count{device="cpu",model="m"} 4' in text
+    assert 'rag_dense_latency_seconds_sum{device="cpu",model="m"} 6.05' in text
+
+
+def test_series_cap_bounds_memory() -> None:
+    registry = MetricsRegistry(namespace="rag", max_series=3)
+
+    for idx in range(10):
+        registry.inc("batches_total", labels={"model": f"m{idx}"})
+    registry.inc("batches_total", labels={"model": "m0"})
+
+    assert registry.series_count() == 3
+    assert registry.dropped_series == 7
+    text = registry.render()
+    assert 'rag_batches_total{model="m0"} 2' in text
+    assert "rag_metrics_dropped_series_total 7" in text
+
+
+def test_concurrent_increments_are_not_lost() -> None:
+    registry = MetricsRegistry(namespace="rag")
+
+    def _work() -> None:
+        for _ in range(2000):
+            registry.inc("batches_total", labels={"model": "m"})
+            registry.observe("batch_latency_seconds", 0.01, {"model": "m"})
+
+    workers = [threading.Thread(target=_work) for _ in range(8)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    text = registry.render()
+    assert 'rag_batches_total{model="m"} 16000' in text
+    assert 'rag_batch_latency_seconds_count{model="m"} 16000' in text
+
+
+def test_label_values_are_escaped() -> None:
+    registry = MetricsRegistry(namespace="rag")
+    registry.set_gauge("gpu_peak_bytes", 1, {"stage": 'a"b'})
+
+    assert 'rag_gpu_peak_bytes{stage="a\\"b"} 1' in registry.render()
+
+
+def test_emitter_feeds_registry_and_bounds_buffer() -> None:
+    emitter = PrometheusMetricsEmitter(enabled=True, namespace="rag", max_buffer=2)
+
+    for _ in range(5):
+        emitter.emit_counter(metric_name="rerank_fallback_total", labels={"stage": "rerank"})
+    emitter.observe_batch(stage="dense", model="m", device="cpu", latency_seconds=0.5, items=8)
+    emitter.update_resource_gauges(rss_bytes=1024, gpu_memory=[(0, 10, 20)])
+
+    assert len(emitter.get_buffered_metrics()) == 2
+    text = emitter.render_metrics()
+    assert 'rag_rerank_fallback_total{stage="rerank"} 5' in text
+    assert 'rag_items_total{device="cpu",model="m",stage="dense"} 8' in text
+    assert 'rag_batch_throughput_items_per_second{device="cpu",model="m",stage="dense"} 16' in text
+    assert "rag_process_resident_memory_bytes 1024" in text
+    assert 'rag_gpu_memory_reserved_bytes{device="cuda:0"} 20' in text
+
+
+def test_disabled_emitter_records_nothing() -> None:
+    emitter = PrometheusMetricsEmitter(enabled=False, http_port=0)
+
+    assert emitter.observe_batch(stage="dense", model="m", device="cpu", latency_seconds=1.0, items=1) is False
+    assert emitter.start_http_server() is None
+    assert emitter.registry.series_count() == 0
+
+
+def test_http_endpoint_serves_metrics() -> None:
+    emitter = PrometheusMetricsEmitter(enabled=True, namespace="rag", http_port=0)
+    emitter.observe_batch(stage="dense", model="m", device="cpu", latency_seconds=0.2, items=4)
+
+    port = emitter.start_http_server()
+    try:
+        assert port
+        with urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+            body = response.read().decode("utf-8")
+            assert response.headers["Content-Type"].startswith("text/plain")
+        assert 'rag_batches_total{device="cpu",model="m",stage="dense"} 1' in body
+
+        with pytest.raises(HTTPError):
+            urlopen(f"http://127.0.0.1:{port}/other", timeout=5)
+    finally:
+        emitter.stop_http_server()
+
+
+def test_factory_reads_port(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("EMBEDDER_METRICS_ENABLED", "true")
+    monkeypatch.setenv("EMBEDDER_METRICS_PORT", "9555")
+    assert create_prometheus_emitter().http_port == 9555
+
+    monkeypatch.setenv("EMBEDDER_METRICS_PORT", "not-a-port")
+    assert create_prometheus_emitter().http_port is None
@@ -0,0 +1,62 @@
+"""Tests for quantized embedding encodings and exact rescoring."""
+
+import numpy as np
+
+from processor.ultimate_embedder.quantization import (
+    Int8Codes,
+    binary_candidates,
+    int8_candidates,
+    quantize_binary,
+    quantize_int8,
+    rescore_exact,
+)
+
+
+def _matrix(rows=200, dim=32, seed=0):
+    rng = np.random.default_rng(seed)
+    matrix = rng.standard_normal((rows, dim)).astype(np.float32)
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def test_int8_round_trip_error_is_bounded(tmp_path):
+    matrix = _matrix()
+    codes = quantize_int8(matrix)
+
+    assert codes.codes.dtype == np.int8
+    assert np.abs(codes.dequantize() - matrix).max() <= codes.scale.max() / 2 + 1e-6
+
+    path = str(tmp_path / "codes.npz")
+    codes.save(path)
+    restored = Int8Codes.load(path)
+    np.testing.assert_array_equal(restored.codes, codes.codes)
+
+
+def test_int8_scores_match_dequantized_dot_products():
+    matrix = _matrix()
+    codes = quantize_int8(matrix)
+    query = matrix[3]
+
+    np.testing.assert_allclose(codes.scores(query), codes.dequantize() @ query, rtol=1e-4, atol=1e-4)
+    assert int8_candidates(query, codes, 1)[0] == 3
+
+
+def test_binary_codes_pack_signs():
+    codes = quantize_binary(np.array([[1.0, -1.0, 0.5, -0.1, 0.2, 0.3, -0.4, 0.9, 1.0]]))
+
+    assert codes.shape == (1, 2)
+    assert codes.tolist() == [[0b10101101, 0b10000000]]
+
+
+def test_coarse_search_then_exact_rescore_finds_true_neighbours(tmp_path):
+    matrix = _matrix(rows=500)
+    np.save(tmp_path / "float.npy", matrix)
+    float_store = np.load(tmp_path / "float.npy", mmap_mode="r")
+    query = matrix[42] + 0.01
+
+    candidates = binary_candidates(query, quantize_binary(matrix), k=50)
+    ids, scores = rescore_exact(query, candidates, float_store, k=5)
+
+    assert ids[0] == 42
+    assert set(ids) <= set(candidates.tolist())
+    np.testing.assert_allclose(scores, matrix[ids] @ query, rtol=1e-6)
+    assert np.all(np.diff(scores) <= 0)
@@ -0,0 +1,96 @@
+"""Tests for the cached, micro-batched query encoder."""
+
+import threading
+
+import numpy as np
+import pytest
+
+from processor.ultimate_embedder.query_encoder import QueryEncoder, normalize_query
+
+
+class _StubModel:
+    def __init__(self, dimension=8):
+        self.calls = []
+        self.dimension = dimension
+
+    def encode(self, texts, **kwargs):
+        self.calls.append(list(texts))
+        rows = [np.full(self.dimension, float(len(text)), dtype=np.float32) for text in texts]
+        return np.stack(rows)
+
+
+def _encoder(model, **kwargs):
+    encoder = QueryEncoder(**kwargs)
+    encoder.bind_model(model, model_id="stub", query_prefix="query: ", device="cpu")
+    return encoder
+
+
+def test_repeated_queries_hit_the_cache_and_prefix_is_applied():
+    model = _StubModel()
+    encoder = _encoder(model, batch_window_ms=0)
+
+    first = encoder.encode("find   the parser")
+    second = encoder.encode("find the parser")
+
+    assert model.calls == [["query: find the parser"]]
+    np.testing.assert_array_equal(first, second)
+    assert encoder.stats()["hits"] == 1
+    with pytest.raises(ValueError):
+        first[0] = 1.0
+
+
+def test_rebinding_model_invalidates_cache():
+    model = _StubModel()
+    encoder = _encoder(model, batch_window_ms=0)
+    encoder.encode("q")
+
+    encoder.bind_model(_StubModel(), model_id="other")
+    encoder.encode("q")
+
+    assert encoder.stats()["entries"] == 1
+    assert encoder.stats()["misses"] == 2
+
+
+def test_lru_evicts_oldest_query():
+    model = _StubModel()
+    encoder = _encoder(model, max_entries=2, batch_window_ms=0)
+    for query in ("a", "b", "a", "c", "b"):
+        encoder.encode(query)
+
+    assert [call[0] for call in model.calls] == ["query: a", "query: b", "query: c", "query: b"]
+
+
+def test_concurrent_misses_share_one_batch():
+    model = _StubModel()
+    encoder = _encoder(model, batch_window_ms=500, max_batch_size=4)
+    queries = ["alpha", "beta", "gamma", "alpha"]
+    results = {}
+
+    def worker(position, query):
+        results[position] = encoder.encode(query)
+
+    threads = [threading.Thread(target=worker, args=item) for item in enumerate(queries)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert len(model.calls) == 1
+    assert sorted(model.calls[0]) == ["query: alpha", "query: beta", "query: gamma"]
+    np.testing.assert_array_equal(results[0], results[3])
+
+
+def test_encode_many_preserves_order_and_skips_hits():
+    model = _StubModel()
+    encoder = _encoder(model, batch_window_ms=0)
+    encoder.encode("xx")
+
+    matrix = encoder.encode_many(["x", "xx", "x"])
+
+    assert matrix.shape == (3, 8)
+    assert model.calls[-1] == ["query: x"]
+    np.testing.assert_array_equal(matrix[0], matrix[2])
+
+
+def test_normalize_query_preserves_case():
+    assert normalize_query("  Foo\t Bar ") == "Foo Bar"
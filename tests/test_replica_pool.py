@@ -0,0 +1,68 @@
+"""Tests for the per-device replica encode pool using CPU "devices"."""
+
+import threading
+
+import numpy as np
+import pytest
+import torch
+
+from processor.ultimate_embedder.replica_pool import ReplicaEncodePool, replicate_module
+
+
+class _StubEncoder(torch.nn.Module):
+    """Encodes a text as ``[len(text), scale]`` and records which replica ran it."""
+
+    def __init__(self, fail_on=None):
+        super().__init__()
+        self.scale = torch.nn.Parameter(torch.ones(1))
+        self.fail_on = fail_on
+        self.threads = set()
+
+    def encode(self, texts, batch_size, device, **kwargs):
+        self.threads.add(threading.current_thread().name)
+        if self.fail_on in texts:
+            raise RuntimeError("CUDA out of memory")
+        assert len(texts) <= batch_size
+        return np.array([[len(text), float(self.scale)] for text in texts], dtype=np.float32)
+
+
+def test_rows_come_back_in_input_order_across_replicas():
+    model = _StubEncoder()
+    texts = ["x" * length for length in (3, 9, 1, 7, 5, 2, 8)]
+
+    with ReplicaEncodePool(model, ["cpu", "cpu"]) as pool:
+        output = pool.encode(texts, batch_size=2)
+        summary = pool.summary()
+
+    np.testing.assert_array_equal(output[:, 0], [3, 9, 1, 7, 5, 2, 8])
+    assert pool.replicas[0] is model
+    assert set(summary) == {"0:cpu", "1:cpu"}
+    assert sum(stats["rows"] for stats in summary.values()) == len(texts)
+    assert sum(stats["batches"] for stats in summary.values()) == 4
+
+
+def test_replicas_are_independent_copies():
+    model = _StubEncoder()
+
+    replica = replicate_module(model, "cpu")
+
+    assert replica is not model
+    assert replica.scale is not model.scale
+    assert replica.scale.data_ptr() != model.scale.data_ptr()
+    torch.testing.assert_close(replica.scale, model.scale)
+
+
+def test_worker_errors_propagate_and_pool_stays_usable():
+    with ReplicaEncodePool(_StubEncoder(fail_on="boom"), ["cpu", "cpu"]) as pool:
+        with pytest.raises(RuntimeError, match="out of memory"):
+            pool.encode(["a", "boom", "ccc", "dd"], batch_size=1)
+
+        assert pool.encode(["ok"], batch_size=4).shape == (1, 2)
+
+
+def test_from_env_needs_several_devices(monkeypatch):
+    model = _StubEncoder()
+
+    assert ReplicaEncodePool.from_env(model, [0]) is None
+    monkeypatch.setenv("EMBEDDER_REPLICA_ENCODE", "0")
+    assert ReplicaEncodePool.from_env(model, [0, 1]) is None
@@ -0,0 +1,83 @@
+"""Tests for token-budgeted rerank batch planning."""
+
+import json
+
+import numpy as np
+
+from processor.ultimate_embedder.rerank_batching import (
+    DEFAULT_BYTES_PER_TOKEN,
+    RerankTokenBudget,
+    pair_token_lengths,
+    plan_token_batches,
+)
+
+
+class _WhitespaceTokenizer:
+    name_or_path = "whitespace"
+
+    def __call__(self, texts, **kwargs):
+        return {"input_ids": [text.split() for text in texts]}
+
+    def num_special_tokens_to_add(self, pair=False):
+        return 3 if pair else 2
+
+
+class _Model:
+    tokenizer = _WhitespaceTokenizer()
+    max_seq_length = 8
+
+
+def test_pair_lengths_use_tokenizer_and_clip():
+    lengths = pair_token_lengths(_Model(), "a query", ["one", "one two three four five"])
+
+    assert lengths.tolist() == [6, 8]
+
+
+def test_pair_lengths_fall_back_without_tokenizer():
+    lengths = pair_token_lengths(object(), "q", ["x" * 40, "x" * 4])
+
+    assert lengths[0] > lengths[1]
+
+
+def test_batches_sort_longest_first_and_respect_budget():
+    lengths = [10, 100, 20, 90, 15]
+
+    batches = plan_token_batches(lengths, token_budget=200, max_batch_size=8)
+
+    assert batches[0].tolist() == [1, 3]
+    for batch in batches:
+        assert len(batch) * max(lengths[idx] for idx in batch) <= 200
+    assert sorted(np.concatenate(batches).tolist()) == [0, 1, 2, 3, 4]
+
+
+def test_oversized_pair_gets_own_batch():
+    batches = plan_token_batches([500, 5, 5], token_budget=100, max_batch_size=2)
+
+    assert [batch.tolist() for batch in batches] == [[0], [1, 2]]
+
+
+def test_budget_learns_and_persists(tmp_path):
+    path = tmp_path / "budgets.json"
+    budget = RerankTokenBudget(str(path))
+    assert budget.bytes_per_token("m") == DEFAULT_BYTES_PER_TOKEN
+
+    budget.observe("m", padded_tokens=1000, peak_bytes=2_000_000)
+    budget.observe("m", padded_tokens=1000, peak_bytes=1_000_000)
+    learned = budget.bytes_per_token("m")
+    assert 1000 < learned < 2000
+    budget.save()
+
+    reloaded = RerankTokenBudget(str(path))
+    assert reloaded.bytes_per_token("m") == learned
+    assert reloaded.token_budget("m", available_bytes=learned * 4096) == 4096
+    assert json.loads(path.read_text())["m"]["samples"] == 2
+
+
+def test_oom_halves_budget():
+    budget = RerankTokenBudget()
+    budget.observe("m", padded_tokens=100, peak_bytes=100_000)
+    before = budget.token_budget("m", 1_000_000)
+
+    budget.record_oom("m")
+
+    assert budget.token_budget("m", 1_000_000) == before // 2
@@ -0,0 +1,72 @@
+"""Tests for the rerank pair-score cache."""
+
+from processor.ultimate_embedder.rerank_cache import RerankScoreCache, text_digest
+
+
+def test_lookup_reports_misses_then_hits():
+    cache = RerankScoreCache(max_entries=10)
+    cache.bind_model("reranker-a")
+    keys = cache.keys_for("query", ["doc a", "doc b"])
+
+    assert cache.lookup(keys) == [None, None]
+    cache.store(keys, [0.5, 0.25])
+
+    assert cache.lookup(keys) == [0.5, 0.25]
+    assert cache.hits == 2
+    assert cache.misses == 2
+    assert cache.stats()["hit_rate"] == 0.5
+
+
+def test_lru_evicts_least_recently_used():
+    cache = RerankScoreCache(max_entries=2)
+    cache.bind_model("reranker-a")
+    first, second, third = cache.keys_for("q", ["one", "two", "three"])
+    cache.store([first, second], [1.0, 2.0])
+    cache.lookup([first])
+    cache.store([third], [3.0])
+
+    assert cache.lookup([first, second, third]) == [1.0, None, 3.0]
+
+
+def test_model_change_invalidates_entries():
+    cache = RerankScoreCache(max_entries=10)
+    cache.bind_model("reranker-a")
+    keys = cache.keys_for("q", ["doc"])
+    cache.store(keys, [0.9])
+
+    cache.bind_model("reranker-b")
+
+    assert cache.lookup(keys) == [None]
+
+
+def test_changed_chunk_text_misses():
+    cache = RerankScoreCache(max_entries=10)
+    cache.bind_model("reranker-a")
+    cache.store(cache.keys_for("q", ["old text"]), [0.9])
+
+    assert cache.lookup(cache.keys_for("q", ["new text"])) == [None]
+    assert text_digest("old text") != text_digest("new text")
+
+
+def test_disk_cache_survives_restart_for_same_model(tmp_path):
+    path = str(tmp_path / "rerank_scores.sqlite")
+    cache = RerankScoreCache(max_entries=10, path=path)
+    cache.bind_model("reranker-a")
+    keys = cache.keys_for("q", ["doc a", "doc b"])
+    cache.store(keys, [0.1, 0.2])
+    cache.close()
+
+    reopened = RerankScoreCache(max_entries=10, path=path)
+    reopened.bind_model("reranker-a")
+    assert reopened.lookup(keys) == [0.1, 0.2]
+    reopened.close()
+
+    switched = RerankScoreCache(max_entries=10, path=path)
+    switched.bind_model("reranker-b")
+    assert switched.lookup(keys) == [None, None]
+    switched.store(keys[:1], [0.7])
+    switched.bind_model("reranker-a")
+    assert switched.lookup(keys) == [0.1, 0.2]
+    switched.bind_model("reranker-b")
+    assert switched.lookup(keys) == [0.7, None]
+    switched.close()
@@ -10,7 +10,11 @@ from processor.ultimate_embedder.config import (
     RerankingConfig,
 )
 from processor.ultimate_embedder.core import UltimateKaggleEmbedderV4
-from processor.ultimate_embedder.rerank_pipeline import _BiEncoderRerankerAdapter
+from processor.ultimate_embedder.rerank_pipeline import (
+    DocumentVectorStore,
+    _BiEncoderRerankerAdapter,
+    resolve_document_store,
+)
 from processor.ultimate_embedder.runtime_config import FeatureToggleConfig
 
 
@@ -189,3 +193,62 @@ def test_bi_encoder_adapter_scores_pairs():
     assert len(scores) == 3
     assert scores[0] > scores[1]
     assert scores[2] == 0.0
+
+
+class _CountingSentenceTransformer(_DummySentenceTransformer):
+    def __init__(self, dim: int = 4):
+        super().__init__()
+        self.dim = dim
+        self.encoded = []
+
+    def encode(self, texts, **kwargs):
+        self.encoded.extend(texts)
+        matrix = np.ones((len(texts), self.dim), dtype=np.float32)
+        return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def test_bi_encoder_adapter_reuses_stored_document_vectors():
+    model = _CountingSentenceTransformer()
+    adapter = _BiEncoderRerankerAdapter(model)
+    vectors = np.eye(4, dtype=np.float32) * 2.0
+    adapter.attach_document_store(DocumentVectorStore(vectors))
+
+    scores = adapter.predict(
+        [["q", "doc0"], ["q", "doc2"], ["q", "unknown"]],
+        candidate_ids=["0", "2", "99"],
+    )
+
+    assert model.encoded == ["q", "unknown"]
+    assert scores[0] == pytest.approx(0.5)
+    assert scores[1] == pytest.approx(0.5)
+    assert scores[2] == pytest.approx(1.0)
+
+
+def test_bi_encoder_adapter_trims_query_to_stored_dimension(tmp_path):
+    path = tmp_path / "vectors.npy"
+    np.save(path, np.asarray([[1.0, 0.0], [0.0, 1.0]], dtype=np.float32))
+    model = _CountingSentenceTransformer(dim=4)
+    adapter = _BiEncoderRerankerAdapter(model)
+    adapter.attach_document_store(DocumentVectorStore.from_npy(str(path), ids=["a", "b"]))
+
+    scores = adapter.predict([["q", "x"], ["q", "y"]], candidate_ids=["b", "a"])
+
+    assert model.encoded == ["q"]
+    assert scores == pytest.approx([np.sqrt(0.5), np.sqrt(0.5)])
+
+
+def test_resolve_document_store_matches_reranker_checkpoint():
+    matrix = np.ones((3, 4), dtype=np.float32)
+    embedder = MagicMock()
+    embedder.model_name = "jina-code-embeddings-1.5b"
+    embedder.embeddings_by_model = {"jina-code-embeddings-1.5b": np.zeros((3, 4)), "nomic-coderank": matrix}
+
+    store = resolve_document_store(embedder, "coderank-bi-encoder")
+
+    assert store is not None and store.vectors is matrix
+    assert resolve_document_store(embedder, "bge-reranker-v2-m3") is None
+
+    # A fused primary slot must not be mistaken for the reranker's own vectors.
+    embedder.model_name = "nomic-coderank"
+    embedder.embeddings_by_model = {"nomic-coderank": matrix, "bge-m3": matrix}
+    assert resolve_document_store(embedder, "coderank-bi-encoder") is None
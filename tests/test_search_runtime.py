@@ -0,0 +1,98 @@
+"""Tests for the load-only search runtime over exported artefacts."""
+
+import json
+import os
+
+import numpy as np
+import pytest
+
+from processor.ultimate_embedder.search_runtime import JsonArrayRecords, SearchIndex
+
+_TEXTS = ["plain", "line\nbreak", "  indented ] bracket", "ünïcode ✓", ""]
+_METADATA = [
+    {"id": 0, "nested": {"tags": ["a", "b"]}},
+    {"id": 1, "nested": {}},
+    {},
+    {"id": 3, "path": "x\n  }, y"},
+    {"id": 4, "list": [{"k": 1}]},
+]
+
+
+class _StubModel:
+    def encode(self, texts, **kwargs):
+        # "q<i>" maps onto basis vector i.
+        matrix = np.zeros((len(texts), len(_TEXTS)), dtype=np.float32)
+        for row, text in enumerate(texts):
+            matrix[row, int(text.rsplit("q", 1)[-1])] = 1.0
+        return matrix
+
+
+def _write_export(directory, dtype=np.float32):
+    base = os.path.join(directory, "export")
+    np.save(f"{base}_embeddings.npy", np.eye(len(_TEXTS), dtype=dtype))
+    with open(f"{base}_texts.json", "w", encoding="utf-8") as handle:
+        json.dump(_TEXTS, handle, indent=2, ensure_ascii=False)
+    with open(f"{base}_metadata.json", "w", encoding="utf-8") as handle:
+        json.dump(_METADATA, handle, indent=2, ensure_ascii=False)
+    with open(f"{base}_stats.json", "w", encoding="utf-8") as handle:
+        json.dump({"model_config": {"name": "stub", "hf_model_id": "stub/model"}}, handle)
+    return base
+
+
+def test_json_array_records_random_access(tmp_path):
+    base = _write_export(str(tmp_path))
+
+    texts = JsonArrayRecords(f"{base}_texts.json")
+    metadata = JsonArrayRecords(f"{base}_metadata.json")
+
+    assert list(texts) == _TEXTS
+    assert [metadata[i] for i in (4, 0, 3)] == [_METADATA[4], _METADATA[0], _METADATA[3]]
+    assert metadata[-1] == _METADATA[-1]
+    assert os.path.exists(f"{base}_metadata.json.offsets.npy")
+    assert JsonArrayRecords(f"{base}_metadata.json")[2] == {}
+    with pytest.raises(IndexError):
+        texts[len(_TEXTS)]
+
+
+def test_compact_json_falls_back_to_full_parse(tmp_path):
+    path = tmp_path / "compact.json"
+    path.write_text(json.dumps(["a", "b"]), encoding="utf-8")
+
+    assert list(JsonArrayRecords(str(path))) == ["a", "b"]
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float16])
+def test_search_index_answers_queries_from_export(tmp_path, dtype):
+    _write_export(str(tmp_path), dtype=dtype)
+
+    index = SearchIndex.open(str(tmp_path), model=_StubModel())
+    results = index.search("q3", top_k=2)
+
+    assert isinstance(index.vectors, np.memmap)
+    assert len(index) == len(_TEXTS)
+    assert results[0]["chunk_id"] == 3
+    assert results[0]["text"] == _TEXTS[3]
+    assert results[0]["metadata"] == _METADATA[3]
+    assert results[0]["score"] == pytest.approx(1.0, abs=1e-3)
+
+
+def test_open_without_encoder_rejects_text_queries(tmp_path):
+    _write_export(str(tmp_path))
+    index = SearchIndex.open(str(tmp_path), load_encoder=False)
+
+    ids, _ = index.search_vectors(np.eye(len(_TEXTS), dtype=np.float32)[1], 1)
+    assert ids.tolist() == [1]
+    with pytest.raises(RuntimeError):
+        index.search("q1")
+
+
+def test_search_index_prefers_doc_store(tmp_path):
+    from processor.ultimate_embedder.doc_store import DocStore, write_doc_store
+
+    base = _write_export(str(tmp_path))
+    write_doc_store(base, _TEXTS, _METADATA, compression="none")
+
+    index = SearchIndex.open(str(tmp_path), model=_StubModel())
+
+    assert isinstance(index.texts._store, DocStore)
+    assert index.search("q1", top_k=1)[0]["text"] == _TEXTS[1]
@@ -0,0 +1,178 @@
+"""Tests for the asyncio search service using stub models."""
+
+import asyncio
+import json
+import threading
+
+import numpy as np
+import pytest
+
+from processor.ultimate_embedder.config import ServingConfig
+from processor.ultimate_embedder.cross_encoder_executor import CrossEncoderRerankRun
+from processor.ultimate_embedder.exact_search import ExactSearchIndex
+from processor.ultimate_embedder.search_service import (
+    SearchBackend,
+    SearchService,
+    ServiceOverloaded,
+)
+
+_TEXTS = [f"chunk {i}" for i in range(6)]
+
+
+class _StubEncoder:
+    """Maps query ``"q<i>"`` onto basis vector ``i``."""
+
+    def __init__(self, gate=None):
+        self.calls = []
+        self.gate = gate
+
+    def encode_many(self, queries):
+        self.calls.append(list(queries))
+        if self.gate is not None:
+            self.gate.wait(5)
+        matrix = np.zeros((len(queries), len(_TEXTS)), dtype=np.float32)
+        for row, query in enumerate(queries):
+            matrix[row, int(query[1:])] = 1.0
+        return matrix
+
+
+class _StubReranker:
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, pairs):
+        self.calls.append(list(pairs))
+        # Prefer higher chunk numbers regardless of the dense order.
+        return [float(text.split()[-1]) for _, text in pairs]
+
+
+class _StubRerankExecutor:
+    def __init__(self):
+        self.calls = []
+
+    def execute_rerank_groups(self, groups, top_k):
+        self.calls.append(list(groups))
+        runs = []
+        for group in groups:
+            scored = sorted(
+                zip(group.candidate_ids, (float(text.split()[-1]) for text in group.candidate_texts)),
+                key=lambda item: -item[1],
+            )[: group.top_k or top_k]
+            runs.append(
+                CrossEncoderRerankRun(
+                    query=group.query,
+                    candidate_ids=[cid for cid, _ in scored],
+                    scores=[score for _, score in scored],
+                )
+            )
+        return runs
+
+
+def _backend(encoder=None, reranker=None, rerank_executor=None):
+    return SearchBackend(
+        encoder=encoder or _StubEncoder(),
+        index=ExactSearchIndex(np.eye(len(_TEXTS), dtype=np.float32), threads=1),
+        texts=_TEXTS,
+        metadata=[{"id": i} for i in range(len(_TEXTS))],
+        reranker=reranker,
+        rerank_executor=rerank_executor,
+    )
+
+
+def test_concurrent_requests_share_batched_stage_calls():
+    encoder = _StubEncoder()
+    reranker = _StubReranker()
+    service = SearchService(
+        _backend(encoder, reranker),
+        ServingConfig(batch_window_ms=50, max_batch_size=8, rerank_candidates=3),
+    )
+
+    async def run():
+        return await asyncio.gather(*(service.search(f"q{i}", top_k=2) for i in range(4)))
+
+    responses = asyncio.run(run())
+
+    assert len(encoder.calls) == 1 and sorted(encoder.calls[0]) == ["q0", "q1", "q2", "q3"]
+    assert len(reranker.calls) == 1 and len(reranker.calls[0]) == 12
+    first = responses[0]
+    assert first["reranked"] is True
+    assert first["results"][0]["embedding_similarity"] == pytest.approx(0.0)
+    assert [result["rank"] for result in first["results"]] == [1, 2]
+    assert "stage=\"encode\"" in service.registry.render()
+
+
+def test_rerank_stage_uses_grouped_executor():
+    executor = _StubRerankExecutor()
+    reranker = _StubReranker()
+    service = SearchService(
+        _backend(reranker=reranker, rerank_executor=executor),
+        ServingConfig(batch_window_ms=50, max_batch_size=8, rerank_candidates=3),
+    )
+
+    async def run():
+        return await asyncio.gather(*(service.search(f"q{i}", top_k=2) for i in range(3)))
+
+    responses = asyncio.run(run())
+
+    assert reranker.calls == []
+    assert len(executor.calls) == 1
+    assert sorted(group.query for group in executor.calls[0]) == ["q0", "q1", "q2"]
+    assert all(len(group.candidate_ids) == 3 for group in executor.calls[0])
+    for response in responses:
+        scores = [result["score"] for result in response["results"]]
+        assert scores == sorted(scores, reverse=True)
+        assert [result["chunk_id"] for result in response["results"]] == [int(score) for score in scores]
+
+
+def test_dense_only_results_follow_similarity():
+    service = SearchService(_backend(), ServingConfig(batch_window_ms=0))
+
+    response = asyncio.run(service.search("q4", top_k=1))
+
+    assert response["reranked"] is False
+    assert response["results"][0]["chunk_id"] == 4
+    assert response["results"][0]["metadata"] == {"id": 4}
+
+
+def test_backpressure_rejects_beyond_queue():
+    gate = threading.Event()
+    service = SearchService(
+        _backend(_StubEncoder(gate)),
+        ServingConfig(batch_window_ms=0, max_concurrency=1, max_queue=1),
+    )
+
+    async def run():
+        admitted = [asyncio.ensure_future(service.search(f"q{i}")) for i in range(2)]
+        await asyncio.sleep(0.05)
+        with pytest.raises(ServiceOverloaded):
+            await service.search("q2")
+        gate.set()
+        return await asyncio.gather(*admitted)
+
+    assert len(asyncio.run(run())) == 2
+    assert service.stats()["rejected"] == 1
+
+
+def test_http_round_trip():
+    service = SearchService(_backend(), ServingConfig(port=0, batch_window_ms=0))
+
+    async def run():
+        port = await service.start()
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            body = json.dumps({"query": "q2", "top_k": 1}).encode()
+            writer.write(
+                b"POST /search HTTP/1.1\r\nHost: x\r\nConnection: close\r\n"
+                + f"Content-Length: {len(body)}\r\n\r\n".encode()
+                + body
+            )
+            await writer.drain()
+            raw = await reader.read()
+            writer.close()
+            return raw
+        finally:
+            await service.stop()
+
+    head, _, body = asyncio.run(run()).partition(b"\r\n\r\n")
+    assert head.startswith(b"HTTP/1.1 200")
+    assert json.loads(body)["results"][0]["chunk_id"] == 2
@@ -0,0 +1,64 @@
+"""Tests for resumable shard checkpoints."""
+
+import numpy as np
+import pytest
+
+from processor.ultimate_embedder.shard_store import ShardStore, ShardsPendingError, corpus_fingerprint
+
+
+def _store(root, **kwargs):
+    options = {"fingerprint": "corpus", "total_rows": 10, "shard_size": 4}
+    options.update(kwargs)
+    return ShardStore(root, **options)
+
+
+def test_shards_cover_rows_and_reload_in_order(tmp_path):
+    store = _store(tmp_path)
+    assert [store.shard_range(index) for index in range(store.shard_count)] == [(0, 4), (4, 8), (8, 10)]
+
+    matrix = np.arange(20, dtype=np.float32).reshape(10, 2)
+    for index in range(store.shard_count):
+        start, end = store.shard_range(index)
+        store.write("model-a", index, matrix[start:end])
+
+    assert store.missing_shards("model-a") == []
+    np.testing.assert_array_equal(store.load_model("model-a"), matrix)
+
+
+def test_restart_resumes_only_missing_shards(tmp_path):
+    store = _store(tmp_path)
+    store.write("model-a", 0, np.zeros((4, 2), dtype=np.float32))
+
+    restarted = _store(tmp_path, shard_size=8)
+
+    assert restarted.shard_size == 4
+    assert restarted.pending_shards("model-a") == [1, 2]
+    assert restarted.pending_shards("model-b") == [0, 1, 2]
+
+
+def test_partial_write_is_not_complete(tmp_path):
+    store = _store(tmp_path)
+    store.write("model-a", 1, np.zeros((4, 2), dtype=np.float32))
+    record_path = store.directory / "model-a" / "shard_00001.json"
+    record_path.unlink()
+
+    assert not store.is_complete("model-a", 1)
+    with pytest.raises(ValueError):
+        store.write("model-a", 2, np.zeros((4, 2), dtype=np.float32))
+
+
+def test_workers_split_shards_round_robin(tmp_path):
+    first = _store(tmp_path, worker_index=0, worker_count=2)
+    second = _store(tmp_path, worker_index=1, worker_count=2)
+
+    assert first.pending_shards("m") == [0, 2]
+    assert second.pending_shards("m") == [1]
+    assert "m: 3" in str(ShardsPendingError({"m": 3}))
+
+
+def test_fingerprint_tracks_texts_and_settings():
+    base = corpus_fingerprint(["a", "b"], 768)
+
+    assert base == corpus_fingerprint(["a", "b"], 768)
+    assert base != corpus_fingerprint(["ab"], 768)
+    assert base != corpus_fingerprint(["a", "b"], 512)
@@ -0,0 +1,79 @@
+"""Tests for the byte-bounded preprocessing text cache."""
+
+from processor.ultimate_embedder.config import AdvancedTextCache
+
+
+def _upper(text):
+    return text.upper()
+
+
+def test_lru_keeps_recently_used_entries():
+    cache = AdvancedTextCache(max_bytes=1_000)
+    calls = []
+
+    def process(text):
+        calls.append(text)
+        return text.upper()
+
+    for text in ("a" * 200, "b" * 200, "c" * 200):
+        cache.get_processed_text(text, process)
+    cache.get_processed_text("a" * 200, process)
+    cache.get_processed_text("d" * 200, process)
+
+    assert cache.get_stats()["eviction_count"] >= 1
+    calls.clear()
+    cache.get_processed_text("a" * 200, process)
+    assert calls == []
+    cache.get_processed_text("b" * 200, process)
+    assert calls == ["b" * 200]
+
+
+def test_memory_tracked_incrementally_within_budget():
+    cache = AdvancedTextCache(max_bytes=5_000)
+    for index in range(100):
+        cache.get_processed_text(f"text {index} " * 20, _upper)
+
+    stats = cache.get_stats()
+    assert 0 < stats["memory_mb"] * 1024 * 1024 <= 5_000
+    assert stats["miss_count"] == 100
+
+
+def test_unchanged_texts_are_stored_as_marker():
+    cache = AdvancedTextCache()
+    text = "already clean"
+
+    assert cache.get_processed_text(text, lambda value: value) == text
+    assert cache.get_processed_text(text, _upper) == text
+    assert cache.get_stats()["hit_count"] == 1
+
+
+def test_namespace_change_invalidates_entries():
+    cache = AdvancedTextCache(namespace="v1")
+    cache.get_processed_text("x", _upper)
+
+    cache.bind_namespace("v2")
+
+    assert cache.get_processed_text("x", lambda value: "fresh") == "fresh"
+
+
+def test_persistent_cache_survives_restart(tmp_path):
+    path = str(tmp_path / "text_cache.sqlite")
+    cache = AdvancedTextCache(path=path, namespace="ns")
+    cache.get_processed_text("hello", _upper)
+    cache.close()
+
+    reopened = AdvancedTextCache(path=path, namespace="ns")
+    assert reopened.get_processed_text("hello", lambda value: "recomputed") == "HELLO"
+    assert reopened.get_stats()["hit_count"] == 1
+
+    other = AdvancedTextCache(path=path, namespace="other")
+    assert other.get_processed_text("hello", lambda value: "recomputed") == "recomputed"
+
+
+def test_entry_cap_evicts_within_byte_budget():
+    cache = AdvancedTextCache(max_size=2)
+    for text in ("one", "two", "three"):
+        cache.get_processed_text(text, _upper)
+
+    assert len(cache.cache) == 2
+    assert cache.get_stats()["eviction_count"] == 1
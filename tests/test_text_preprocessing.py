@@ -0,0 +1,49 @@
+"""Tests for batch text preprocessing."""
+
+from processor.ultimate_embedder.text_preprocessing import normalize_texts, truncate_texts
+
+
+class _OffsetTokenizer:
+    """Fast-tokenizer stand-in: one token per whitespace-separated word."""
+
+    is_fast = True
+    name_or_path = "words"
+    vocab_size = 10
+
+    def num_special_tokens_to_add(self, pair=False):
+        return 0
+
+    def __call__(self, texts, return_offsets_mapping=False, **kwargs):
+        input_ids, offsets = [], []
+        for text in texts:
+            spans, position = [], 0
+            for word in text.split(" "):
+                spans.append((position, position + len(word)))
+                position += len(word) + 1
+            input_ids.append(list(range(len(spans))))
+            offsets.append(spans)
+        payload = {"input_ids": input_ids}
+        if return_offsets_mapping:
+            payload["offset_mapping"] = offsets
+        return payload
+
+
+def test_normalize_matches_single_text_rules():
+    texts = ["  a  b\n\n\n\nc ", "x\n\n\n\ny"]
+
+    assert normalize_texts(texts) == ["a b c", "x y"]
+    assert normalize_texts(texts, normalize_whitespace=False) == ["  a  b\n\nc ", "x\n\ny"]
+
+
+def test_truncation_uses_tokenizer_offsets():
+    texts = ["one two three four five", "short"]
+
+    truncated = truncate_texts(texts, tokenizer=_OffsetTokenizer(), max_length=3, max_tokens=1)
+
+    assert truncated == ["one two three", "short"]
+
+
+def test_truncation_falls_back_to_characters_without_tokenizer():
+    truncated = truncate_texts(["abcdefghij"], tokenizer=None, max_length=None, max_tokens=2)
+
+    assert truncated == ["abcdefgh..."]
@@ -0,0 +1,81 @@
+"""Tests for the pinned host weight cache used by exclusive ensemble staging."""
+
+import pytest
+import torch
+
+from processor.ultimate_embedder.weight_cache import PinnedWeightCache, module_nbytes, safetensors_nbytes
+
+
+def _model():
+    torch.manual_seed(0)
+    model = torch.nn.Sequential(torch.nn.Linear(4, 3), torch.nn.LayerNorm(3))
+    model.register_buffer("position_ids", torch.arange(5))
+    return model
+
+
+def test_module_nbytes_counts_shared_tensors_once():
+    model = _model()
+    model.add_module("alias", model[0])
+
+    assert module_nbytes(model) == (4 * 3 + 3 + 3 + 3) * 4 + 5 * 8
+
+
+def test_stage_casts_floats_to_fp16_and_keeps_integer_buffers():
+    model = _model()
+    expected = model[0].weight.detach().clone()
+    cache = PinnedWeightCache(resident_fraction=0.0)
+
+    event = cache.stage("mini", model, fp16=True)
+
+    assert event["source"] in ("pinned", "pageable")
+    assert model[0].weight.dtype == torch.float16
+    assert model.position_ids.dtype == torch.int64
+    torch.testing.assert_close(model[0].weight.float(), expected, atol=1e-3, rtol=1e-3)
+    assert cache.summary()["host_models"] == ["mini"]
+
+
+def test_restaging_clean_model_skips_the_copy():
+    model = _model()
+    cache = PinnedWeightCache(resident_fraction=0.0)
+    cache.stage("mini", model, fp16=False)
+
+    event = cache.stage("mini", model, fp16=False)
+
+    assert event["source"] == "cached"
+    assert event["copied_bytes"] == 0
+
+
+def test_cpu_models_are_never_kept_resident():
+    cache = PinnedWeightCache(resident_fraction=1.0)
+
+    assert cache.keep_resident("mini", _model()) is False
+    assert cache.hydrate("mini", _model(), "cpu") == "resident"
+
+
+@pytest.mark.skipif(not torch.cuda.is_available(), reason="requires CUDA")
+def test_hydrate_from_pinned_cache_round_trips():
+    model = _model().cuda()
+    expected = model[0].weight.detach().clone()
+    cache = PinnedWeightCache(resident_fraction=0.0)
+    cache.stage("mini", model, fp16=True)
+
+    assert cache.hydrate("mini", model, "cuda:0") == "pinned"
+    assert model[0].weight.is_cuda
+    torch.testing.assert_close(model[0].weight.float(), expected, atol=1e-3, rtol=1e-3)
+    assert cache.stage("mini", model, fp16=True)["source"] == "cached"
+
+
+def test_module_nbytes_fp16_halves_only_floating_tensors():
+    assert module_nbytes(_model(), fp16=True) == (4 * 3 + 3 + 3 + 3) * 2 + 5 * 8
+
+
+def test_safetensors_nbytes_reads_headers_only(tmp_path):
+    from safetensors.torch import save_file
+
+    path = tmp_path / "model.safetensors"
+    save_file({"weight": torch.zeros(4, 8), "ids": torch.zeros(3, dtype=torch.int64)}, str(path))
+
+    assert safetensors_nbytes([path]) == 4 * 8 * 4 + 3 * 8
+    assert safetensors_nbytes([path], fp16=True) == 4 * 8 * 2 + 3 * 8
+    assert safetensors_nbytes([]) is None
+    assert safetensors_nbytes([tmp_path / "missing.safetensors"]) is None